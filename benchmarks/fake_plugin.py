@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""A fake Synse plugin for benchmarking Synse Server.
+
+The fake plugin implements the Synse V3 plugin gRPC API and serves it on a
+unix socket, with a configurable number of devices and tags, so Synse Server
+can be benchmarked without real hardware or a plugin build. Readings are
+generated on request, and the plugin can be made slow or unreliable:
+
+- ``latency``/``jitter``: each data request (reads, writes, transactions) is
+  delayed by the latency, plus up to the jitter.
+- ``failure_rate``: the fraction of data requests which fail with an
+  UNAVAILABLE status.
+
+Requests made by Synse Server to manage the plugin (metadata, version, health,
+test and devices) are never delayed or failed, so the plugin stays registered.
+
+Example usage:
+
+    $ python benchmarks/fake_plugin.py --socket /tmp/synse/bench.sock --devices 1000
+"""
+
+import argparse
+import datetime
+import random
+import signal
+import sys
+import threading
+import time
+import uuid
+from concurrent import futures
+from typing import Dict, Iterator, List
+
+import grpc
+from synse_grpc import api, synse_pb2_grpc
+
+PLUGIN_ID = 'fake-plugin'
+PLUGIN_TAG = 'vaporio/fake-plugin'
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat() + 'Z'
+
+
+def _matches(device: api.V3Device, selector: api.V3DeviceSelector) -> bool:
+    """Check whether a device matches a device selector."""
+    if selector.id:
+        return device.id == selector.id
+
+    tags = {(t.namespace, t.annotation, t.label) for t in device.tags}
+    for tag in selector.tags:
+        # Tags without a namespace are in the default namespace.
+        if (tag.namespace or 'default', tag.annotation, tag.label) not in tags:
+            return False
+    return True
+
+
+class FakePlugin(synse_pb2_grpc.V3PluginServicer):
+    """A fake implementation of the Synse V3 plugin API.
+
+    Args:
+        devices: The number of devices the plugin manages.
+        tags: The number of tags, besides the system tags, on each device.
+        rate: The readings per second sent by each read stream.
+        latency: The time, in seconds, each data request is delayed by.
+        jitter: The maximum additional time, in seconds, each data request is
+            randomly delayed by.
+        failure_rate: The fraction of data requests which fail.
+        seed: The seed for the random delays, failures and reading values, so
+            runs are reproducible.
+    """
+
+    def __init__(
+            self,
+            devices: int = 100,
+            tags: int = 3,
+            rate: float = 10,
+            latency: float = 0,
+            jitter: float = 0,
+            failure_rate: float = 0,
+            seed: int = 0,
+    ) -> None:
+        self.rate = rate
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.devices = [self._device(i, tags) for i in range(devices)]
+        self.transactions: Dict[str, api.V3TransactionStatus] = {}
+
+    @staticmethod
+    def _device(index: int, tags: int) -> api.V3Device:
+        device_id = f'{index:08x}-0000-0000-0000-fake00000000'
+        device_tags = [
+            api.V3Tag(namespace='system', annotation='id', label=device_id),
+            api.V3Tag(namespace='system', annotation='type', label='temperature'),
+        ]
+        # Each tag has a different number of distinct labels, so tag filters
+        # select different numbers of devices.
+        for j in range(tags):
+            device_tags.append(api.V3Tag(
+                namespace='default', annotation=f'tag{j}', label=str(index % (j + 2)),
+            ))
+
+        return api.V3Device(
+            timestamp=_now(),
+            id=device_id,
+            type='temperature',
+            plugin=PLUGIN_ID,
+            info=f'fake temperature device {index}',
+            capabilities=api.V3DeviceCapability(
+                mode='rw',
+                write=api.V3WriteCapability(actions=['state']),
+            ),
+            tags=device_tags,
+            outputs=[api.V3DeviceOutput(
+                name='temperature',
+                type='temperature',
+                precision=2,
+                unit=api.V3OutputUnit(name='celsius', symbol='C'),
+            )],
+            sortIndex=index,
+        )
+
+    def _reading(self, device: api.V3Device) -> api.V3Reading:
+        with self._lock:
+            value = 20 + self.random.random() * 10
+        return api.V3Reading(
+            id=device.id,
+            timestamp=_now(),
+            type='temperature',
+            deviceType=device.type,
+            unit=api.V3OutputUnit(name='celsius', symbol='C'),
+            float64_value=value,
+        )
+
+    def _inject(self, context: grpc.ServicerContext) -> None:
+        """Delay and fail a data request, as configured."""
+        with self._lock:
+            delay = self.latency + self.random.random() * self.jitter
+            fail = self.random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            context.abort(grpc.StatusCode.UNAVAILABLE, 'injected failure')
+
+    def _select(self, selector: api.V3DeviceSelector) -> List[api.V3Device]:
+        return [d for d in self.devices if _matches(d, selector)]
+
+    # --- plugin management requests
+
+    def Devices(self, request, context) -> Iterator[api.V3Device]:
+        yield from self._select(request)
+
+    def Health(self, request, context) -> api.V3Health:
+        return api.V3Health(timestamp=_now(), status=api.OK)
+
+    def Metadata(self, request, context) -> api.V3Metadata:
+        return api.V3Metadata(
+            name='fake plugin',
+            maintainer='vaporio',
+            tag=PLUGIN_TAG,
+            description='a fake plugin for benchmarking synse server',
+            id=PLUGIN_ID,
+        )
+
+    def Test(self, request, context) -> api.V3TestStatus:
+        return api.V3TestStatus(ok=True)
+
+    def Version(self, request, context) -> api.V3Version:
+        return api.V3Version(
+            pluginVersion='0.0.0',
+            sdkVersion='0.0.0',
+            buildDate=_now(),
+            arch='amd64',
+            os='linux',
+        )
+
+    # --- data requests
+
+    def Read(self, request, context) -> Iterator[api.V3Reading]:
+        self._inject(context)
+        for device in self._select(request.selector):
+            yield self._reading(device)
+
+    def ReadCache(self, request, context) -> Iterator[api.V3Reading]:
+        self._inject(context)
+        for device in self.devices:
+            yield self._reading(device)
+
+    def ReadStream(self, request, context) -> Iterator[api.V3Reading]:
+        self._inject(context)
+        devices = [d for d in self.devices if any(_matches(d, s) for s in request.selectors)]
+        if not request.selectors:
+            devices = self.devices
+        if not devices:
+            return
+
+        interval = 1 / self.rate
+        i = 0
+        while context.is_active():
+            yield self._reading(devices[i % len(devices)])
+            i += 1
+            time.sleep(interval)
+
+    def WriteAsync(self, request, context) -> Iterator[api.V3WriteTransaction]:
+        self._inject(context)
+        for data in request.data:
+            txn = self._transaction(request.selector.id, data)
+            yield api.V3WriteTransaction(
+                id=txn.id, device=request.selector.id, context=data, timeout='30s',
+            )
+
+    def WriteSync(self, request, context) -> Iterator[api.V3TransactionStatus]:
+        self._inject(context)
+        for data in request.data:
+            yield self._transaction(request.selector.id, data)
+
+    def Transaction(self, request, context) -> api.V3TransactionStatus:
+        self._inject(context)
+        txn = self.transactions.get(request.id)
+        if txn is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f'transaction not found: {request.id}')
+        return txn
+
+    def Transactions(self, request, context) -> Iterator[api.V3TransactionStatus]:
+        yield from list(self.transactions.values())
+
+    def _transaction(self, device_id: str, data: api.V3WriteData) -> api.V3TransactionStatus:
+        # Writes complete immediately.
+        now = _now()
+        txn = api.V3TransactionStatus(
+            id=str(uuid.uuid4()),
+            created=now,
+            updated=now,
+            timeout='30s',
+            status=api.DONE,
+            context=data,
+        )
+        self.transactions[txn.id] = txn
+        return txn
+
+
+def serve(socket: str, plugin: FakePlugin, workers: int = 32) -> grpc.Server:
+    """Start serving a fake plugin on a unix socket.
+
+    Args:
+        socket: The path of the unix socket to serve on.
+        plugin: The fake plugin to serve.
+        workers: The number of threads handling requests. Each open read
+            stream holds a thread for its duration.
+
+    Returns:
+        The started gRPC server.
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers))
+    synse_pb2_grpc.add_V3PluginServicer_to_server(plugin, server)
+    server.add_insecure_port(f'unix:{socket}')
+    server.start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments which configure the fake plugin to a parser."""
+    parser.add_argument(
+        '--devices', default=100, type=int,
+        help='the number of devices the plugin manages',
+    )
+    parser.add_argument(
+        '--tags', default=3, type=int,
+        help='the number of tags on each device, besides the system tags',
+    )
+    parser.add_argument(
+        '--rate', default=10, type=float,
+        help='the readings per second sent by each read stream',
+    )
+    parser.add_argument(
+        '--latency', default=0, type=float,
+        help='the time, in seconds, each data request is delayed by',
+    )
+    parser.add_argument(
+        '--jitter', default=0, type=float,
+        help='the maximum additional time, in seconds, each data request is delayed by',
+    )
+    parser.add_argument(
+        '--failure-rate', default=0, type=float,
+        help='the fraction of data requests which fail',
+    )
+    parser.add_argument(
+        '--seed', default=0, type=int,
+        help='the seed for random delays, failures and reading values',
+    )
+    parser.add_argument(
+        '--workers', default=32, type=int,
+        help='the number of threads handling plugin requests',
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Run a fake Synse plugin')
+    parser.add_argument(
+        '--socket', required=True,
+        help='the path of the unix socket to serve the plugin on',
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    plugin = FakePlugin(
+        devices=args.devices,
+        tags=args.tags,
+        rate=args.rate,
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    server = serve(args.socket, plugin, args.workers)
+
+    stopped = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopped.set())
+    stopped.wait()
+    server.stop(grace=1).wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
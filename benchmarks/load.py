@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""Benchmark Synse Server request throughput and latency against a fake plugin.
+
+A fake plugin (see ``fake_plugin.py``) is started on a unix socket, with the
+configured number of devices, tags, stream reading rate, and injected latency
+and failures. Synse Server is run against it, and each scenario drives load
+from concurrent clients for a fixed duration, over HTTP or the WebSocket API:
+
+- scan, read, read_device, readcache/read_cache, write, write_sync (HTTP and
+  WebSocket)
+- read_stream (WebSocket only): each client opens a reading stream, which is
+  measured by the rate of streamed readings and the interval between them.
+
+Requests made during the warmup period of each scenario are not measured.
+The fake plugin is run in its own process, so it does not compete with the
+load generating clients for the interpreter.
+
+Results are reported as requests per second and latency percentiles. With
+``--json`` or ``--output``, they are written as JSON, along with the benchmark
+configuration and environment, for regression tracking.
+
+Example usage:
+
+    $ python benchmarks/load.py
+    $ python benchmarks/load.py --scenarios http:read ws:read_stream --devices 1000
+    $ python benchmarks/load.py --latency 0.005 --failure-rate 0.01 --output results.json
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import fake_plugin
+import websockets
+
+# The repository root, so the server runs from the source tree.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WRITE_PAYLOAD = [{'action': 'state', 'data': 'on'}]
+
+# HTTP scenarios, as the method, path and body of the i-th request, given
+# the device IDs.
+HTTP_SCENARIOS: Dict[str, Callable[[int, List[str]], Tuple[str, str, Optional[str]]]] = {
+    'scan': lambda i, ids: ('GET', '/v3/scan', None),
+    'read': lambda i, ids: ('GET', '/v3/read', None),
+    'read_device': lambda i, ids: ('GET', f'/v3/read/{ids[i % len(ids)]}', None),
+    'readcache': lambda i, ids: ('GET', '/v3/readcache', None),
+    'write': lambda i, ids: (
+        'POST', f'/v3/write/{ids[i % len(ids)]}', json.dumps(WRITE_PAYLOAD),
+    ),
+    'write_sync': lambda i, ids: (
+        'POST', f'/v3/write/wait/{ids[i % len(ids)]}', json.dumps(WRITE_PAYLOAD),
+    ),
+}
+
+# WebSocket scenarios, as the event and data of the i-th request, given the
+# device IDs.
+WS_SCENARIOS: Dict[str, Callable[[int, List[str]], Tuple[str, Dict[str, Any]]]] = {
+    'scan': lambda i, ids: ('request/scan', {}),
+    'read': lambda i, ids: ('request/read', {}),
+    'read_device': lambda i, ids: ('request/read_device', {'device': ids[i % len(ids)]}),
+    'read_cache': lambda i, ids: ('request/read_cache', {}),
+    'write': lambda i, ids: (
+        'request/write_async', {'device': ids[i % len(ids)], 'payload': WRITE_PAYLOAD},
+    ),
+    'write_sync': lambda i, ids: (
+        'request/write_sync', {'device': ids[i % len(ids)], 'payload': WRITE_PAYLOAD},
+    ),
+}
+
+SCENARIOS = [f'http:{name}' for name in HTTP_SCENARIOS]
+SCENARIOS.extend(f'ws:{name}' for name in WS_SCENARIOS)
+SCENARIOS.append('ws:read_stream')
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Summarize latency samples, in seconds, as milliseconds."""
+    if not samples:
+        return {'mean': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+
+    ordered = sorted(samples)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'mean': sum(ordered) / len(ordered) * 1000,
+        'p50': pct(0.50),
+        'p90': pct(0.90),
+        'p99': pct(0.99),
+        'max': ordered[-1] * 1000,
+    }
+
+
+def summarize(name: str, duration: float, latencies: List[float], errors: int) -> Dict:
+    """Summarize the measurements of a scenario."""
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'duration': duration,
+        'requests_per_sec': len(latencies) / duration,
+        'latency_ms': percentiles(latencies),
+    }
+
+
+class Measurements:
+    """Latencies and errors collected by concurrent clients, after the warmup."""
+
+    def __init__(self, warmup: float, duration: float) -> None:
+        self.start = time.perf_counter() + warmup
+        self.end = self.start + duration
+        self.latencies: List[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, started: float, latency: float, ok: bool) -> None:
+        if started < self.start:
+            return
+        with self._lock:
+            if ok:
+                self.latencies.append(latency)
+            else:
+                self.errors += 1
+
+
+def http_load(name: str, port: int, ids: List[str], args: argparse.Namespace) -> Dict:
+    """Drive HTTP load from concurrent clients, each reusing a keep-alive
+    connection.
+    """
+    scenario = HTTP_SCENARIOS[name]
+    m = Measurements(args.warmup, args.duration)
+
+    def client(n: int) -> None:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        i = n
+        while time.perf_counter() < m.end:
+            method, path, body = scenario(i, ids)
+            i += args.clients
+            headers = {'Content-Type': 'application/json'} if body else {}
+
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status < 400
+            except (http.client.HTTPException, OSError):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            m.add(started, time.perf_counter() - started, ok)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return summarize(f'http:{name}', args.duration, m.latencies, m.errors)
+
+
+async def _ws_clients(name: str, port: int, ids: List[str], args: argparse.Namespace,
+                      m: Measurements) -> None:
+    url = f'ws://127.0.0.1:{port}/v3/connect'
+    scenario = WS_SCENARIOS[name]
+
+    async def client(n: int) -> None:
+        async with websockets.connect(url, max_size=None) as ws:
+            i = n
+            while time.perf_counter() < m.end:
+                event, data = scenario(i, ids)
+                i += args.clients
+
+                started = time.perf_counter()
+                await ws.send(json.dumps({'id': i, 'event': event, 'data': data}))
+                resp = json.loads(await ws.recv())
+                m.add(started, time.perf_counter() - started, resp['event'] != 'response/error')
+
+    await asyncio.gather(*(client(n) for n in range(args.clients)))
+
+
+async def _ws_streams(port: int, args: argparse.Namespace, m: Measurements) -> None:
+    url = f'ws://127.0.0.1:{port}/v3/connect'
+
+    async def client(n: int) -> None:
+        async with websockets.connect(url, max_size=None) as ws:
+            await ws.send(json.dumps({'id': n, 'event': 'request/read_stream', 'data': {}}))
+            last = time.perf_counter()
+            while True:
+                remaining = m.end - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    resp = json.loads(await asyncio.wait_for(ws.recv(), remaining))
+                except asyncio.TimeoutError:
+                    break
+                now = time.perf_counter()
+                m.add(now, now - last, resp['event'] != 'response/error')
+                last = now
+            await ws.send(json.dumps({
+                'id': n, 'event': 'request/read_stream', 'data': {'stop': True},
+            }))
+
+    await asyncio.gather(*(client(n) for n in range(args.clients)))
+
+
+def ws_load(name: str, port: int, ids: List[str], args: argparse.Namespace) -> Dict:
+    """Drive WebSocket load from concurrent clients, each with its own
+    connection.
+    """
+    m = Measurements(args.warmup, args.duration)
+    if name == 'read_stream':
+        asyncio.run(_ws_streams(port, args, m))
+        result = summarize('ws:read_stream', args.duration, m.latencies, m.errors)
+        # Streamed readings are not requested, so their latency is the
+        # interval between them.
+        result['messages'] = result.pop('requests')
+        result['messages_per_sec'] = result.pop('requests_per_sec')
+        result['interval_ms'] = result.pop('latency_ms')
+        return result
+
+    asyncio.run(_ws_clients(name, port, ids, args, m))
+    return summarize(f'ws:{name}', args.duration, m.latencies, m.errors)
+
+
+def wait_for(check: Callable[[], bool], timeout: float, message: str) -> None:
+    """Wait for a check to pass."""
+    start = time.perf_counter()
+    while not check():
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError(message)
+        time.sleep(0.1)
+
+
+def get_json(port: int, path: str) -> Any:
+    """Get a JSON response from Synse Server."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        body = resp.read()
+        if resp.status != 200:
+            raise RuntimeError(f'{path} returned {resp.status}: {body[:200]!r}')
+        return json.loads(body)
+    finally:
+        conn.close()
+
+
+def start_plugin(workdir: str, args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Start the fake plugin, and wait for its socket to be created."""
+    socket = os.path.join(workdir, 'plugin.sock')
+    proc = subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT, 'benchmarks', 'fake_plugin.py'),
+            '--socket', socket,
+            '--devices', str(args.devices),
+            '--tags', str(args.tags),
+            '--rate', str(args.rate),
+            '--latency', str(args.latency),
+            '--jitter', str(args.jitter),
+            '--failure-rate', str(args.failure_rate),
+            '--seed', str(args.seed),
+            '--workers', str(args.workers),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    wait_for(
+        lambda: proc.poll() is not None or os.path.exists(socket),
+        args.timeout, 'fake plugin did not start',
+    )
+    if proc.poll() is not None:
+        raise RuntimeError(f'fake plugin exited with code {proc.returncode}')
+    return proc, socket
+
+
+def start_server(workdir: str, socket: str, args: argparse.Namespace) -> subprocess.Popen:
+    """Start Synse Server against the fake plugin, and wait for its device
+    cache to hold all of the plugin's devices.
+    """
+    # JSON is valid YAML, so the config file can be written as JSON.
+    with open(os.path.join(workdir, 'config.yml'), 'w') as f:
+        json.dump({
+            'logging': args.log_level,
+            'plugin': {'unix': [socket]},
+        }, f)
+
+    out = open(os.path.join(workdir, 'server.log'), 'w')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'synse_server', '--host', '127.0.0.1', '--port', str(args.port)],
+        cwd=workdir,
+        stdout=out,
+        stderr=subprocess.STDOUT,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    out.close()
+
+    def ready() -> bool:
+        if proc.poll() is not None:
+            raise RuntimeError(f'synse server exited with code {proc.returncode}')
+        try:
+            return len(get_json(args.port, '/v3/scan')) >= args.devices
+        except (RuntimeError, OSError, ValueError):
+            return False
+
+    try:
+        wait_for(ready, args.timeout, 'synse server did not load the fake plugin devices')
+    except Exception:
+        stop(proc)
+        raise
+    return proc
+
+
+def stop(proc: subprocess.Popen) -> None:
+    """Stop a running process."""
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the environment the benchmark ran in."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the benchmark scenarios."""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        plugin, socket = start_plugin(workdir, args)
+        try:
+            server = start_server(workdir, socket, args)
+            try:
+                ids = sorted(d['id'] for d in get_json(args.port, '/v3/scan'))
+                for scenario in args.scenarios:
+                    transport, name = scenario.split(':')
+                    load = http_load if transport == 'http' else ws_load
+                    results.append(load(name, args.port, ids, args))
+            finally:
+                stop(server)
+        finally:
+            stop(plugin)
+
+    config = {
+        k: v for k, v in vars(args).items() if k not in ('json', 'output', 'scenarios')
+    }
+    return {
+        'config': config,
+        'environment': environment(),
+        'results': results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmark Synse Server throughput and latency against a fake plugin',
+    )
+    parser.add_argument(
+        '--scenarios', nargs='+', default=SCENARIOS, choices=SCENARIOS, metavar='SCENARIO',
+        help=f'the scenarios to run, of: {", ".join(SCENARIOS)} (default: all)',
+    )
+    parser.add_argument(
+        '--duration', default=10, type=float,
+        help='the time, in seconds, to measure each scenario for',
+    )
+    parser.add_argument(
+        '--warmup', default=1, type=float,
+        help='the time, in seconds, to run each scenario for before measuring',
+    )
+    parser.add_argument(
+        '--clients', default=8, type=int,
+        help='the number of concurrent clients',
+    )
+    parser.add_argument(
+        '--port', default=5057, type=int,
+        help='the port to run synse server on',
+    )
+    parser.add_argument(
+        '--log-level', default='info',
+        help='the synse server log level',
+    )
+    parser.add_argument(
+        '--timeout', default=60, type=float,
+        help='the time, in seconds, to wait for the plugin and synse server to start',
+    )
+    fake_plugin.add_arguments(parser)
+    parser.add_argument(
+        '--json', action='store_true',
+        help='output the results as JSON',
+    )
+    parser.add_argument(
+        '--output',
+        help='the path of a file to write the results to, as JSON',
+    )
+    args = parser.parse_args()
+
+    report = run(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for r in report['results']:
+            if 'interval_ms' in r:
+                rate, count, lat, unit = (
+                    r['messages_per_sec'], r['messages'], r['interval_ms'], 'msg/s',
+                )
+            else:
+                rate, count, lat, unit = (
+                    r['requests_per_sec'], r['requests'], r['latency_ms'], 'req/s',
+                )
+            if count:
+                print(
+                    f'{r["scenario"]:>16}: {rate:9.1f} {unit} '
+                    f'p50 {lat["p50"]:7.2f}ms  p90 {lat["p90"]:7.2f}ms  '
+                    f'p99 {lat["p99"]:7.2f}ms  ({count} ok, {r["errors"]} errors)'
+                )
+            else:
+                print(f'{r["scenario"]:>16}: no successful requests ({r["errors"]} errors)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
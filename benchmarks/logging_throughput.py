@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Benchmark Synse Server request throughput by logging configuration.
+
+Synse Server is run once for each combination of log level (``logging``) and
+log pipeline (``log_async``), and ``/test`` is requested as fast as possible
+by concurrent clients for a fixed duration. Server output is written to a
+file, as it would be to a pipe or log collector, rather than discarded.
+
+Example usage:
+
+    $ python benchmarks/logging_throughput.py
+    $ python benchmarks/logging_throughput.py --levels info debug --duration 20 --json
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+# The repository root, so the server runs from the source tree.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PIPELINES = {
+    'sync': False,
+    'async': True,
+}
+
+
+def start_server(workdir: str, port: int, level: str, use_async: bool,
+                 timeout: float) -> subprocess.Popen:
+    """Start Synse Server with the given logging configuration, and wait for
+    it to respond to requests.
+    """
+    with open(os.path.join(workdir, 'config.yml'), 'w') as f:
+        f.write(f'logging: {level}\nlog_async: {str(use_async).lower()}\n')
+
+    out = open(os.path.join(workdir, 'server.log'), 'w')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'synse_server', '--host', '127.0.0.1', '--port', str(port)],
+        cwd=workdir,
+        stdout=out,
+        stderr=subprocess.STDOUT,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    out.close()
+
+    start = time.perf_counter()
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError(f'synse server exited with code {proc.returncode}')
+        if time.perf_counter() - start > timeout:
+            proc.kill()
+            raise RuntimeError(f'synse server did not respond within {timeout}s')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/test')
+            conn.getresponse().read()
+            conn.close()
+            return proc
+        except (ConnectionError, OSError):
+            time.sleep(0.05)
+
+
+def stop_server(proc: subprocess.Popen) -> None:
+    """Stop a running Synse Server."""
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def load(port: int, duration: float, clients: int) -> Dict:
+    """Request ``/test`` from concurrent clients for the duration.
+
+    Each client reuses a keep-alive connection, so the server's request
+    handling, rather than connection setup, is measured.
+    """
+    counts: List[int] = [0] * clients
+    errors: List[int] = [0] * clients
+    end = time.perf_counter() + duration
+
+    def client(i: int) -> None:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        while time.perf_counter() < end:
+            try:
+                conn.request('GET', '/test')
+                conn.getresponse().read()
+                counts[i] += 1
+            except (http.client.HTTPException, OSError):
+                errors[i] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': sum(counts),
+        'errors': sum(errors),
+        'requests_per_sec': sum(counts) / elapsed,
+    }
+
+
+def bench(level: str, pipeline: str, args: argparse.Namespace) -> Dict:
+    """Benchmark request throughput for a logging configuration."""
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(workdir, args.port, level, PIPELINES[pipeline], args.timeout)
+        try:
+            result = load(args.port, args.duration, args.clients)
+        finally:
+            stop_server(proc)
+        log_bytes = os.path.getsize(os.path.join(workdir, 'server.log'))
+
+    result.update({
+        'level': level,
+        'pipeline': pipeline,
+        'log_bytes_per_request': log_bytes / max(result['requests'], 1),
+    })
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description='Benchmark Synse Server request throughput by logging configuration',
+    )
+    parser.add_argument(
+        '--levels', nargs='+', default=['info', 'debug'],
+        help='the log levels to benchmark',
+    )
+    parser.add_argument(
+        '--pipelines', nargs='+', default=list(PIPELINES), choices=list(PIPELINES),
+        help='the log pipelines to benchmark',
+    )
+    parser.add_argument(
+        '--duration', default=10, type=float,
+        help='the time, in seconds, to send requests for in each run',
+    )
+    parser.add_argument(
+        '--clients', default=8, type=int,
+        help='the number of concurrent clients',
+    )
+    parser.add_argument(
+        '--port', default=5056, type=int,
+        help='the port to run synse server on',
+    )
+    parser.add_argument(
+        '--timeout', default=30, type=float,
+        help='the time, in seconds, to wait for synse server to start',
+    )
+    parser.add_argument(
+        '--json', action='store_true',
+        help='output the results as JSON',
+    )
+    args = parser.parse_args()
+
+    results = [
+        bench(level, pipeline, args)
+        for level, pipeline in itertools.product(args.levels, args.pipelines)
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(
+                f'{r["level"]:>8} {r["pipeline"]:>6}: {r["requests_per_sec"]:8.1f} req/s '
+                f'({r["requests"]} requests, {r["errors"]} errors, '
+                f'{r["log_bytes_per_request"]:.0f} log bytes/request)'
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
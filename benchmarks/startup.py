@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Benchmark Synse Server startup time.
+
+Two measurements are taken:
+
+- import time: the cumulative time to import the server module, measured
+  with ``python -X importtime`` in a fresh interpreter for each run. The
+  slowest imports are reported so regressions can be traced to a module.
+- first request time: the time from launching Synse Server to it first
+  responding to ``/test``.
+
+Example usage:
+
+    $ python benchmarks/startup.py
+    $ python benchmarks/startup.py --runs 10 --max-import-ms 500 --json
+
+When ``--max-import-ms`` is given, the script exits non-zero if the median
+import time exceeds it.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Tuple
+
+MODULE = 'synse_server.server'
+
+
+def import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """Import a module in a fresh interpreter and collect the import times.
+
+    Returns:
+        A mapping of module name to a tuple of its self and cumulative
+        import times, in microseconds.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def bench_import(module: str, runs: int, top: int) -> Dict:
+    """Benchmark the import time of a module."""
+    totals = []
+    slowest: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        times = import_times(module)
+        totals.append(times[module][1])
+        for name, (_, cumulative) in times.items():
+            slowest.setdefault(name, []).append(cumulative)
+
+    ranked = sorted(
+        ((name, statistics.median(t)) for name, t in slowest.items() if name != module),
+        key=lambda i: i[1],
+        reverse=True,
+    )
+    return {
+        'module': module,
+        'runs': runs,
+        'median_ms': statistics.median(totals) / 1000,
+        'min_ms': min(totals) / 1000,
+        'max_ms': max(totals) / 1000,
+        'slowest': [{'module': n, 'cumulative_ms': t / 1000} for n, t in ranked[:top]],
+    }
+
+
+def bench_first_request(port: int, timeout: float) -> Dict:
+    """Benchmark the time from launching Synse Server to its first response."""
+    url = f'http://127.0.0.1:{port}/test'
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'synse_server', '--host', '127.0.0.1', '--port', str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'),
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f'synse server exited with code {proc.returncode}')
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f'synse server did not respond within {timeout}s')
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    resp.read()
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    return {'port': port, 'first_request_ms': elapsed * 1000}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark Synse Server startup time')
+    parser.add_argument(
+        '--runs', default=5, type=int,
+        help='the number of import time runs to take the median of',
+    )
+    parser.add_argument(
+        '--top', default=10, type=int,
+        help='the number of slowest imports to report',
+    )
+    parser.add_argument(
+        '--port', default=5055, type=int,
+        help='the port to run synse server on for the first request benchmark',
+    )
+    parser.add_argument(
+        '--timeout', default=30, type=float,
+        help='the time, in seconds, to wait for the first response',
+    )
+    parser.add_argument(
+        '--skip-request', action='store_true',
+        help='only benchmark the import time',
+    )
+    parser.add_argument(
+        '--max-import-ms', type=float,
+        help='fail if the median import time exceeds this many milliseconds',
+    )
+    parser.add_argument(
+        '--json', action='store_true',
+        help='output the results as JSON',
+    )
+    args = parser.parse_args()
+
+    results = {'import': bench_import(MODULE, args.runs, args.top)}
+    if not args.skip_request:
+        results['request'] = bench_first_request(args.port, args.timeout)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        imp = results['import']
+        print(
+            f'import {imp["module"]}: median {imp["median_ms"]:.1f}ms '
+            f'(min {imp["min_ms"]:.1f}ms, max {imp["max_ms"]:.1f}ms, {imp["runs"]} runs)'
+        )
+        for item in imp['slowest']:
+            print(f'  {item["cumulative_ms"]:8.1f}ms  {item["module"]}')
+        if 'request' in results:
+            print(f'first request: {results["request"]["first_request_ms"]:.1f}ms')
+
+    if args.max_import_ms is not None and results['import']['median_ms'] > args.max_import_ms:
+        print(
+            f'median import time {results["import"]["median_ms"]:.1f}ms exceeds '
+            f'{args.max_import_ms}ms',
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
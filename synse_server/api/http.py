@@ -1,12 +1,14 @@
 """Synse Server HTTP API."""
 
+import math
+
 import ujson
 from sanic import Blueprint
 from sanic.request import Request
-from sanic.response import HTTPResponse, StreamingHTTPResponse, stream
+from sanic.response import HTTPResponse, StreamingHTTPResponse, stream, text
 from structlog import get_logger
 
-from synse_server import cmd, errors, plugin, utils
+from synse_server import cmd, errors, plugin, profiler, utils
 
 logger = get_logger()
 
@@ -39,6 +41,31 @@ async def test(request: Request) -> HTTPResponse:
     )
 
 
+@core.route('/ready')
+async def ready(request: Request) -> HTTPResponse:
+    """Check whether Synse Server is ready to serve device requests.
+
+    Plugins are registered in the background once Synse Server starts, so
+    unlike ``/test``, this only succeeds once the configured fraction of
+    plugins are ready and the device cache has been built. It is intended
+    for use as a readiness probe.
+
+    Args:
+        request: The Sanic request object.
+
+    Returns:
+        A JSON-formatted HTTP response with the possible statuses:
+          * 200: OK
+          * 500: Catchall processing error
+          * 503: Not ready
+    """
+    resp = await cmd.ready()
+    return utils.http_json_response(
+        resp,
+        status=200 if resp['ready'] else 503,
+    )
+
+
 @core.route('/version')
 async def version(request: Request) -> HTTPResponse:
     """Get the version information for the Synse Server instance.
@@ -319,6 +346,12 @@ async def read(request: Request) -> HTTPResponse:
             from each individual tag group.
         plugin: The ID of the plugin to get device readings from. If not specified,
             all plugins are considered valid for reading.
+        deadline: The time budget for the request, in seconds. Plugins which do not
+            respond within the deadline are considered timed out. (default: the
+            configured ``read.deadline``)
+        partial: Return the readings gathered from the plugins which responded,
+            along with a summary of the plugins which failed or timed out, rather
+            than failing the request. (default: false)
 
     Returns:
         A JSON-formatted HTTP response with the possible statuses:
@@ -347,12 +380,38 @@ async def read(request: Request) -> HTTPResponse:
             'invalid parameter: specified plugin ID does not correspond with known plugin',
         )
 
+    deadline = None
+    param_deadline = request.args.getlist('deadline')
+    if param_deadline:
+        if len(param_deadline) > 1:
+            raise errors.InvalidUsage(
+                'invalid parameter: only one deadline may be specified',
+            )
+        try:
+            deadline = float(param_deadline[0])
+        except ValueError as e:
+            raise errors.InvalidUsage(
+                'invalid parameter: deadline must be a number of seconds',
+            ) from e
+        if not math.isfinite(deadline):
+            raise errors.InvalidUsage(
+                'invalid parameter: deadline must be a number of seconds',
+            )
+        if deadline < 0:
+            raise errors.InvalidUsage(
+                'invalid parameter: deadline must not be negative',
+            )
+
+    partial = request.args.get('partial', 'false').lower() == 'true'
+
     try:
         return utils.http_json_response(
             await cmd.read(
                 ns=namespace,
                 tag_groups=tag_groups,
                 plugin_id=plugin_id,
+                deadline=deadline,
+                partial=partial,
             ),
         )
     except Exception:
@@ -376,6 +435,9 @@ async def read_cache(request: Request) -> StreamingHTTPResponse:
             cache data to return. If left unspecified, there will be no starting bound.
         end: An RFC3339 formatted timestamp which specifies an ending bound on the
             cache data to return. If left unspecified, there will be no ending bound.
+        ordered: Stream the cached readings in timestamp order. Otherwise, readings
+            are streamed in the order they are received from the plugins.
+            (default: false)
 
     Returns:
         A JSON-formatted HTTP response with the possible statuses:
@@ -401,6 +463,8 @@ async def read_cache(request: Request) -> StreamingHTTPResponse:
             )
         end = param_end[0]
 
+    ordered = request.args.get('ordered', 'false').lower() == 'true'
+
     # Define the function that will be used to stream the responses back.
     async def response_streamer(response):
         # Due to how streamed responses are handled, an exception here won't
@@ -409,7 +473,7 @@ async def read_cache(request: Request) -> StreamingHTTPResponse:
         # character in the chunk header. Instead of surfacing that error, we
         # just log it and move on.
         try:
-            async for reading in cmd.read_cache(start, end):
+            async for reading in cmd.read_cache(start, end, ordered=ordered):
                 try:
                     await response.write(ujson.dumps(reading, reject_bytes=False) + '\n')
                 except Exception:
@@ -650,3 +714,143 @@ async def device(request: Request, device_id: str) -> HTTPResponse:
         except Exception:
             logger.exception('failed to write synchronously', id=device_id, payload=data)
             raise
+
+
+@v3.route('/debug/profile')
+async def profile(request: Request) -> HTTPResponse:
+    """Profile the running Synse Server instance.
+
+    The stacks of all threads in the process are sampled for the given
+    duration, so a live instance can be profiled under real load without
+    restarting it. This endpoint is only enabled if a debug token is
+    configured (``debug.token``), which must be provided as a bearer token
+    in the Authorization header.
+
+    Args:
+        request: The Sanic request object.
+
+    Query Parameters:
+        duration: The time, in seconds, to profile for. (default: 10)
+        interval: The time, in seconds, between stack samples. (default: 0.01)
+        memory: Also trace memory allocations for the duration, and report the
+            source lines which allocated the most memory. (default: false)
+        top: The number of source lines to report for the memory profile.
+            (default: 25)
+        format: The response format, one of ``json`` or ``collapsed``. The
+            ``collapsed`` format is plain text with one line per sampled stack,
+            as used by flame graph tools. (default: json)
+
+    Returns:
+        A JSON-formatted (or plain text) HTTP response with the possible statuses:
+          * 200: OK
+          * 400: Invalid parameter(s)
+          * 401: Missing or invalid debug token
+          * 404: Debug endpoints not enabled
+          * 409: A profile is already running
+          * 500: Catchall processing error
+    """
+    cmd.authorize_debug(request.headers.get('Authorization'))
+
+    try:
+        duration = float(request.args.get('duration', 10))
+        interval = float(request.args.get('interval', 0.01))
+        top = int(request.args.get('top', 25))
+    except ValueError as e:
+        raise errors.InvalidUsage(
+            'invalid parameter: duration and interval must be numbers, top must be an integer',
+        ) from e
+
+    if duration <= 0 or interval <= 0 or top <= 0:
+        raise errors.InvalidUsage(
+            'invalid parameter: duration, interval and top must be positive',
+        )
+
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'collapsed'):
+        raise errors.InvalidUsage(
+            'invalid parameter: format must be one of: json, collapsed',
+        )
+
+    memory = request.args.get('memory', 'false').lower() == 'true'
+
+    try:
+        resp = await cmd.profile(
+            duration=duration,
+            interval=interval,
+            memory=memory,
+            top=top,
+        )
+    except Exception:
+        logger.exception('failed to profile server')
+        raise
+
+    if fmt == 'collapsed':
+        return text(profiler.collapsed(resp['stacks']))
+
+    resp['stacks'] = dict(sorted(resp['stacks'].items(), key=lambda i: i[1], reverse=True))
+    return utils.http_json_response(resp)
+
+
+@v3.route('/debug/traces')
+async def traces(request: Request) -> HTTPResponse:
+    """Get the recently finished request trace spans.
+
+    Spans are only kept when tracing is enabled with the in-memory exporter
+    (``tracing.exporter: memory``). Like the other debug endpoints, this is
+    only enabled if a debug token is configured (``debug.token``), which must
+    be provided as a bearer token in the Authorization header.
+
+    Args:
+        request: The Sanic request object.
+
+    Query Parameters:
+        trace: The ID of the trace to get the spans of. If not specified, the
+            spans of all traces are returned.
+
+    Returns:
+        A JSON-formatted HTTP response with the possible statuses:
+          * 200: OK
+          * 401: Missing or invalid debug token
+          * 404: Debug endpoints or in-memory trace exporter not enabled
+          * 500: Catchall processing error
+    """
+    cmd.authorize_debug(request.headers.get('Authorization'))
+
+    try:
+        return utils.http_json_response(
+            await cmd.traces(request.args.get('trace')),
+        )
+    except Exception:
+        logger.exception('failed to get traces')
+        raise
+
+
+@v3.route('/debug/cache')
+async def cache_summary(request: Request) -> HTTPResponse:
+    """Get a summary of the state of Synse Server's caches.
+
+    This includes the size of the device cache tag index, the time taken by
+    the last device cache rebuild (in total, and per plugin), and the size of
+    the transaction cache. Like the other debug endpoints, this is only enabled
+    if a debug token is configured (``debug.token``), which must be provided
+    as a bearer token in the Authorization header.
+
+    Args:
+        request: The Sanic request object.
+
+    Returns:
+        A JSON-formatted HTTP response with the possible statuses:
+          * 200: OK
+          * 401: Missing or invalid debug token
+          * 404: Debug endpoints not enabled
+          * 500: Catchall processing error
+    """
+    cmd.authorize_debug(request.headers.get('Authorization'))
+
+    try:
+        return utils.http_json_response(
+            await cmd.cache_summary(),
+        )
+    except Exception:
+        logger.exception('failed to get cache summary')
+        raise
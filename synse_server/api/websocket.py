@@ -2,6 +2,7 @@
 
 import asyncio
 import json
+import math
 import time
 from typing import Any, Dict, List, Union
 
@@ -11,7 +12,7 @@ from sanic.websocket import ConnectionClosed
 from structlog import get_logger
 from websockets import WebSocketCommonProtocol
 
-from synse_server import cmd, errors, utils
+from synse_server import cmd, errors, tracing, utils
 from synse_server.metrics import Monitor
 
 logger = get_logger()
@@ -33,6 +34,12 @@ async def connect(request: Request, ws: WebSocketCommonProtocol) -> None:
     finally:
         Monitor.ws_session_count.labels(request.ip).dec()
 
+        # If traced, the span of the connection request covers the session, and
+        # each message is traced as a child of it.
+        span = getattr(request.ctx, 'span', None)
+        if span is not None:
+            span.finish()
+
 
 class Payload:
     """Payload describes the message that was received on a WebSocket connection."""
@@ -133,7 +140,8 @@ class MessageHandler:
 
             logger.debug('websocket handler: got message', payload=p)
             try:
-                await self.dispatch(p)
+                with tracing.span(f'ws {p.event}', id=p.id):
+                    await self.dispatch(p)
             except Exception as e:
                 logger.error('error generating websocket response', err=e)
                 continue
@@ -360,6 +368,24 @@ class MessageHandler:
         """
         ns = payload.data.get('ns', 'default')
         tags = payload.data.get('tags', [])
+        deadline = payload.data.get('deadline')
+        partial = payload.data.get('partial', False)
+
+        if deadline is not None:
+            try:
+                deadline = float(deadline)
+            except (TypeError, ValueError):
+                raise errors.InvalidUsage(
+                    'invalid data: deadline must be a number of seconds',
+                )
+            if not math.isfinite(deadline):
+                raise errors.InvalidUsage(
+                    'invalid data: deadline must be a number of seconds',
+                )
+            if deadline < 0:
+                raise errors.InvalidUsage(
+                    'invalid data: deadline must not be negative',
+                )
 
         # If tags are specified and all elements in the tags parameter
         # are strings, they are part of a single tag group. Nest them
@@ -373,6 +399,8 @@ class MessageHandler:
             data=await cmd.read(
                 ns=ns,
                 tag_groups=tags,
+                deadline=deadline,
+                partial=partial,
             ),
         )
 
@@ -400,6 +428,7 @@ class MessageHandler:
         """
         start = payload.data.get('start')
         end = payload.data.get('end')
+        ordered = payload.data.get('ordered', False)
 
         # FIXME: should this return the whole list in one message? probably
         #   not.. we probably want to send in multiple messages..
@@ -410,6 +439,7 @@ class MessageHandler:
             data=[x async for x in cmd.read_cache(
                 start=start,
                 end=end,
+                ordered=ordered,
             )],
         )
 
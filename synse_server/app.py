@@ -7,7 +7,7 @@ from sanic.request import Request
 from sanic.response import HTTPResponse
 from structlog import contextvars
 
-from synse_server import errors
+from synse_server import config, errors, log, timing, tracing
 from synse_server.api import http, websocket
 
 logger = structlog.get_logger()
@@ -19,20 +19,36 @@ def on_request(request: Request) -> None:
     # takes place during the request handling.
     req_id = shortuuid.uuid()
     request.ctx.uuid = req_id
+    timing.start()
+
+    # Trace the request, continuing the caller's trace if one is given.
+    if tracing.enabled:
+        span = tracing.start_span(
+            f'{request.method} {request.path}',
+            traceparent=request.headers.get(tracing.TRACEPARENT),
+            method=request.method,
+            path=request.path,
+            request_id=req_id,
+        )
+        request.ctx.span = span
+        tracing.activate(span)
 
     contextvars.clear_contextvars()
     contextvars.bind_contextvars(
         request_id=req_id,
     )
+    log.debug_request(request.headers.get(log.DEBUG_HEADER))
 
-    logger.debug(
-        'processing HTTP request',
-        method=request.method,
-        ip=request.ip,
-        path=request.path,
-        headers=dict(request.headers),
-        args=request.args,
-    )
+    # Copying the headers is not free, so only do it if the event is logged.
+    if log.debug_enabled(__name__):
+        logger.debug(
+            'processing HTTP request',
+            method=request.method,
+            ip=request.ip,
+            path=request.path,
+            headers=dict(request.headers),
+            args=request.args,
+        )
 
 
 def on_response(request: Request, response: HTTPResponse) -> None:
@@ -52,6 +68,22 @@ def on_response(request: Request, response: HTTPResponse) -> None:
         bytes=byte_count,
     )
 
+    # Finish the request's trace span. Spans are named by route template, once
+    # the route is known, rather than by the request path.
+    span = getattr(getattr(request, 'ctx', None), 'span', None)
+    if span is not None:
+        if getattr(request, 'uri_template', None):
+            span.name = f'{request.method} {request.uri_template}'
+        span.set_attribute('status', response.status)
+        if response.status >= 500:
+            span.status = 'error'
+        span.finish()
+
+    # Return the request stage timings, if enabled.
+    timings = timing.current()
+    if timings is not None and config.options.get('metrics.server_timing'):
+        response.headers['Server-Timing'] = timings.header()
+
     # Unbind the request ID from the logger.
     contextvars.unbind_contextvars(
         'request_id',
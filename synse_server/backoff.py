@@ -54,3 +54,7 @@ class ExponentialBackoff:
 
         self._exp = min(self._exp + 1, self._max)
         return self.rand.uniform(0, self._base * 2 ** self._exp)
+
+    def reset(self) -> None:
+        """Reset the backoff, so the next delay starts from the base again."""
+        self._exp = 0
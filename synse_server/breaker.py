@@ -0,0 +1,179 @@
+"""Circuit breaker for guarding calls to plugins."""
+
+import collections
+import time
+from typing import Callable, Deque, Optional, Tuple, Union
+
+__all__ = ['CircuitBreaker']
+
+
+class CircuitBreaker:
+    """An implementation of the circuit breaker pattern.
+
+    The breaker tracks the outcome and duration of the most recent calls
+    through it. It starts in the "closed" state, where all calls are allowed.
+    Once enough calls have been made, if the fraction of calls which failed
+    (or which were slower than the slow call duration) exceeds the configured
+    rate, the breaker "opens" and rejects calls outright.
+
+    After the reset timeout elapses, the breaker becomes "half-open" and
+    allows a single trial call through. If the trial call succeeds, the
+    breaker closes again; if it fails, the breaker re-opens. A trial call
+    whose outcome is never recorded is given up on after the reset timeout,
+    and another trial call is allowed through.
+
+    Args:
+        window: The number of most recent calls to consider when computing
+            the error and slow call rates.
+        min_calls: The minimum number of recorded calls needed before the
+            breaker will consider opening.
+        error_rate: The fraction of failed calls in the window at or above
+            which the breaker opens.
+        slow_call_duration: The duration, in seconds, above which a call is
+            considered slow. If 0, calls are never considered slow.
+        slow_call_rate: The fraction of slow calls in the window at or above
+            which the breaker opens.
+        reset_timeout: The time, in seconds, to wait in the open state before
+            allowing a trial call through.
+        on_state_change: An optional callback which is called with the
+            new state whenever the breaker changes state.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(
+            self,
+            window: int = 20,
+            min_calls: int = 5,
+            error_rate: float = 0.5,
+            slow_call_duration: Union[int, float] = 0,
+            slow_call_rate: float = 1.0,
+            reset_timeout: Union[int, float] = 30,
+            on_state_change: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+
+        # Each call is recorded as a tuple of (failed, slow).
+        self._calls: Deque[Tuple[bool, bool]] = collections.deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+    @property
+    def state(self) -> str:
+        """The current state of the breaker.
+
+        An open breaker whose reset timeout has elapsed transitions to half-open.
+        """
+        self._advance()
+        return self._state
+
+    def _advance(self) -> None:
+        """Move an open breaker to half-open once its reset timeout has elapsed.
+
+        This is the only place the transition is made, so the state change
+        callback fires whether the state is first checked by reading it or by
+        a call through the breaker.
+        """
+        if self._state == self.OPEN and \
+                time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+
+    def _set_state(self, state: str) -> None:
+        if state == self._state:
+            return
+
+        self._state = state
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+        if state != self.HALF_OPEN:
+            self._trial_in_flight = False
+        if self.on_state_change is not None:
+            self.on_state_change(state)
+
+    def allow(self) -> bool:
+        """Check whether a call is allowed through the breaker.
+
+        If the call is allowed, its outcome should be recorded via ``record``.
+
+        Returns:
+            True if the call may proceed; False if it should be rejected.
+        """
+        self._advance()
+        if self._state == self.CLOSED:
+            return True
+        if self._state == self.OPEN:
+            return False
+
+        # Half-open: only a single trial call is allowed through at a time.
+        now = time.monotonic()
+        if self._trial_in_flight and now - self._trial_started < self.reset_timeout:
+            return False
+        self._trial_in_flight = True
+        self._trial_started = now
+        return True
+
+    def admit(self) -> bool:
+        """Check whether a long-lived call, such as a stream, is allowed
+        through the breaker.
+
+        Unlike ``allow``, this does not take the half-open trial, and the
+        outcome of the call should not be recorded, as its duration says
+        nothing about the health of the plugin. Long-lived calls are only
+        admitted while the breaker is closed.
+
+        Returns:
+            True if the call may proceed; False if it should be rejected.
+        """
+        self._advance()
+        return self._state == self.CLOSED
+
+    def record(self, success: bool, duration: Union[int, float] = 0) -> None:
+        """Record the outcome of a call made through the breaker.
+
+        Args:
+            success: Whether the call completed successfully.
+            duration: The time, in seconds, that the call took.
+        """
+        slow = bool(self.slow_call_duration) and duration > self.slow_call_duration
+
+        if self._state == self.HALF_OPEN:
+            if success and not slow:
+                self._calls.clear()
+                self._set_state(self.CLOSED)
+            else:
+                self._set_state(self.OPEN)
+            return
+
+        self._calls.append((not success, slow))
+        if self._state == self.CLOSED and self._should_open():
+            self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        """Release a call which was allowed through the breaker without
+        recording its outcome, e.g. if the call was cancelled.
+        """
+        if self._state == self.HALF_OPEN:
+            self._trial_in_flight = False
+
+    def _should_open(self) -> bool:
+        total = len(self._calls)
+        if total == 0 or total < self.min_calls:
+            return False
+
+        failed = sum(1 for f, _ in self._calls if f)
+        slow = sum(1 for _, s in self._calls if s)
+        return failed / total >= self.error_rate or slow / total >= self.slow_call_rate
+
+    def reset(self) -> None:
+        """Reset the breaker to the closed state, clearing all recorded calls."""
+        self._calls.clear()
+        self._set_state(self.CLOSED)
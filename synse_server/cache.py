@@ -1,7 +1,11 @@
 """Synse Server caches and cache utilities."""
 
 import asyncio
-from typing import Iterable, List, Union
+import collections
+import contextlib
+import math
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
 
 import aiocache
 import grpc
@@ -9,7 +13,7 @@ import synse_grpc.utils
 from structlog import get_logger
 from synse_grpc import api
 
-from synse_server import loop, plugin
+from synse_server import config, errors, loop, plugin, tracing
 from synse_server.metrics import Monitor
 
 logger = get_logger()
@@ -37,6 +41,52 @@ alias_cache = aiocache.SimpleMemoryCache(
 device_cache_lock = asyncio.Lock(loop=loop.synse_loop)
 alias_cache_lock = asyncio.Lock(loop=loop.synse_loop)
 
+# Serializes the updates to the device cache. An update gets devices from the
+# plugins before it takes the cache locks, so without this a full rebuild and
+# a plugin's update could each overwrite the other with older devices.
+device_update_lock = asyncio.Lock(loop=loop.synse_loop)
+
+# Whether the device cache has been built from the plugins at least once.
+loaded = False
+
+# Whether the device cache holds devices loaded from a snapshot which have not
+# yet been revalidated against the plugins by a device cache rebuild.
+stale = False
+
+# Pending debounced refreshes of the device cache, keyed by plugin ID.
+_pending_refreshes: Dict[str, asyncio.TimerHandle] = {}
+
+# The time and duration of the last full device cache rebuild, and the time
+# it last took to get the devices of each plugin.
+last_rebuild: Optional[Dict[str, float]] = None
+plugin_rebuilds: Dict[str, float] = {}
+
+# The expiry time of each cached transaction, in the order they expire, used
+# to count cached and expired transactions without scanning the cache. The
+# in-memory cache data is shared by all caches, so scanning it means scanning
+# the devices and aliases as well.
+_transaction_expiry: 'collections.OrderedDict[str, float]' = collections.OrderedDict()
+transaction_evictions = 0
+
+
+@contextlib.asynccontextmanager
+async def _locked(lock: asyncio.Lock, name: str) -> AsyncIterator[None]:
+    """Acquire a cache lock, recording the time spent waiting for it and the
+    time it is held for.
+
+    Args:
+        lock: The lock to acquire.
+        name: The name of the lock, used to label its metrics.
+    """
+    start = time.perf_counter()
+    async with lock:
+        acquired = time.perf_counter()
+        Monitor.cache_lock_wait.labels(name).observe(acquired - start)
+        try:
+            yield
+        finally:
+            Monitor.cache_lock_hold.labels(name).observe(time.perf_counter() - acquired)
+
 
 async def get_transaction(transaction_id: str) -> dict:
     """Get the cached transaction information with the provided ID.
@@ -68,7 +118,41 @@ def get_cached_transaction_ids() -> List[str]:
             if k.startswith(NS_TRANSACTION)]
 
 
-async def add_transaction(transaction_id: str, device: str, plugin_id: str) -> bool:
+def _expire_transactions() -> int:
+    """Count the transactions which have expired from the transaction cache
+    since this was last called.
+
+    All transactions are cached with the same TTL, so they expire in the order
+    they were added and only the expired transactions are visited. This is
+    called whenever a transaction is added and when the metrics are scraped,
+    so the eviction count stays current.
+
+    Returns:
+        The number of transactions currently cached.
+    """
+    global transaction_evictions
+
+    now = time.monotonic()
+    evicted = 0
+    while _transaction_expiry and next(iter(_transaction_expiry.values())) <= now:
+        _transaction_expiry.popitem(last=False)
+        evicted += 1
+
+    if evicted:
+        transaction_evictions += evicted
+        Monitor.transaction_cache_evictions.inc(evicted)
+    return len(_transaction_expiry)
+
+
+Monitor.transaction_cache_entries.set_function(_expire_transactions)
+
+
+async def add_transaction(
+        transaction_id: str,
+        device: str,
+        plugin_id: str,
+        address: str = None,
+) -> bool:
     """Add a new transaction to the transaction cache.
 
     This cache tracks transactions and maps them to the plugin from which they
@@ -78,20 +162,30 @@ async def add_transaction(transaction_id: str, device: str, plugin_id: str) -> b
         transaction_id: The ID of the transaction.
         device: The ID of the device associated with the transaction.
         plugin_id: The ID of the plugin to associate with the transaction.
+        address: The address of the plugin replica which holds the transaction.
+            If the plugin has replicas, the transaction is only known to the
+            replica which processed the write.
 
     Returns:
         True if successful; False otherwise.
     """
     logger.debug(
         'caching transaction', plugin=plugin_id, id=transaction_id, device=device,
+        address=address,
     )
-    return await transaction_cache.set(
-        transaction_id,
-        {
-            'plugin': plugin_id,
-            'device': device,
-        },
-    )
+    txn = {
+        'plugin': plugin_id,
+        'device': device,
+    }
+    if address is not None:
+        txn['address'] = address
+    ok = await transaction_cache.set(transaction_id, txn)
+
+    ttl = transaction_cache.ttl
+    _transaction_expiry[transaction_id] = time.monotonic() + ttl if ttl else math.inf
+    _transaction_expiry.move_to_end(transaction_id)
+    _expire_transactions()
+    return ok
 
 
 async def add_alias(alias: str, device: api.V3Device) -> bool:
@@ -108,7 +202,7 @@ async def add_alias(alias: str, device: api.V3Device) -> bool:
         'adding alias to cache', alias=alias, device=device.id,
     )
 
-    async with alias_cache_lock:
+    async with _locked(alias_cache_lock, 'alias'):
         return await alias_cache.set(alias, device)
 
 
@@ -123,10 +217,11 @@ async def get_alias(alias: str) -> Union[api.V3Device, None]:
         not match a device, None is returned.
     """
 
-    async with alias_cache_lock:
+    async with _locked(alias_cache_lock, 'alias'):
         return await alias_cache.get(alias)
 
 
+@tracing.traced('cache.update')
 async def update_device_cache() -> None:
     """Update the device cache.
 
@@ -139,8 +234,14 @@ async def update_device_cache() -> None:
          "default/foo": [{...}, {...}, {...}]
          "default/x:bar": [{...}]
          "vaporio/svc:xyz": [{...}, {...}]
+
+    Rebuilding the device cache revalidates any devices which were loaded
+    from a snapshot, so the cache is no longer marked stale.
     """
+    global loaded, stale, last_rebuild
+
     logger.info('updating the device cache')
+    start = time.perf_counter()
 
     # Get the list of all devices (including their associated tags) from
     # each registered plugin. This device data will be used to generate
@@ -152,77 +253,210 @@ async def update_device_cache() -> None:
     # networking error.
     if not plugin.manager.has_plugins() or not plugin.manager.all_ready():
         logger.debug('refreshing plugins prior to updating device cache')
-        plugin.manager.refresh()
-
-    # A temporary dicts used to collect the data for rebuilding the device cache.
-    alias_map = {}
-    tags_map = {}
-
-    total_devices = 0
-    for p in plugin.manager:
-        if not p.active:
-            logger.debug(
-                'plugin not active, will not get its devices',
-                plugin=p.tag, plugin_id=p.id,
-            )
-            continue
+        await plugin.manager.refresh()
 
-        try:
-            with p as client:
-                device_count = 0
-                for device in client.devices():  # all devices
-                    # Get updates for device alias
-                    if device.alias:
-                        if device.alias in alias_map:
-                            logger.error(
-                                'alias already exists... not updating alias map',
-                                alias=device.alias, device=device.id,
-                            )
-                        else:
-                            alias_map[device.alias] = device
-
-                    # Get updates for device tags
-                    for tag in device.tags:
-                        key = synse_grpc.utils.tag_string(tag)
-                        tag_devices = tags_map.get(key)
-                        if tag_devices:
-                            tag_devices.append(device)
-                        else:
-                            tags_map[key] = [device]
-
-                    device_count += 1
-
-                total_devices += device_count
+    async with _locked(device_update_lock, 'update'):
+        # A temporary dicts used to collect the data for rebuilding the device cache.
+        alias_map = {}
+        tags_map = {}
+
+        total_devices = 0
+        for p in plugin.manager.select_all():
+            if not p.active:
                 logger.debug(
-                    'got devices from plugin',
-                    plugin=p.tag, plugin_id=p.id, device_count=device_count,
+                    'plugin not active, will not get its devices',
+                    plugin=p.tag, plugin_id=p.id,
                 )
+                continue
 
-        except grpc.RpcError as e:
-            logger.warning('failed to get device(s)', plugin=p.tag, plugin_id=p.id, error=e)
-            continue
-        except Exception:
-            logger.exception(
-                'unexpected error when updating devices for plugin', plugin_id=p.id)
-            raise
+            try:
+                plugin_start = time.perf_counter()
+                with p as client:
+                    device_count = 0
+                    for device in client.devices():  # all devices
+                        # Get updates for device alias
+                        if device.alias:
+                            if device.alias in alias_map:
+                                logger.error(
+                                    'alias already exists... not updating alias map',
+                                    alias=device.alias, device=device.id,
+                                )
+                            else:
+                                alias_map[device.alias] = device
+
+                        # Get updates for device tags
+                        for tag in device.tags:
+                            key = synse_grpc.utils.tag_string(tag)
+                            tag_devices = tags_map.get(key)
+                            if tag_devices:
+                                tag_devices.append(device)
+                            else:
+                                tags_map[key] = [device]
+
+                        device_count += 1
+
+                    total_devices += device_count
+                    plugin_rebuilds[p.id] = time.perf_counter() - plugin_start
+                    Monitor.cache_plugin_rebuild_latency.labels(p.id).observe(plugin_rebuilds[p.id])
+                    logger.debug(
+                        'got devices from plugin',
+                        plugin=p.tag, plugin_id=p.id, device_count=device_count,
+                    )
+
+            except (grpc.RpcError, errors.PluginUnavailable) as e:
+                logger.warning('failed to get device(s)', plugin=p.tag, plugin_id=p.id, error=e)
+                continue
+            except Exception:
+                logger.exception(
+                    'unexpected error when updating devices for plugin', plugin_id=p.id)
+                raise
+
+        Monitor.registered_devices.set(total_devices)
+
+        async with _locked(device_cache_lock, 'device'):
+            # IMPORTANT (etd): `clear` must be called with the namespace. It seems weird
+            #   to require the namespace since the cache instance has an associated namespace,
+            #   but the implementation of clear will clear out the ENTIRE cache backing (a dict
+            #   shared by all cache instances), so not specifying a namespace clears all caches.
+            #   Opened an issue to track.
+            #   https://github.com/argaen/aiocache/issues/479
+            await device_cache.clear(NS_DEVICE)
+            await alias_cache.clear(NS_ALIAS)
+
+            for k, v in alias_map.items():
+                await add_alias(k, v)
+
+            for k, v in tags_map.items():
+                await device_cache.set(k, v)
+
+            loaded = True
+            stale = False
+
+    update_index_metrics()
+
+    duration = time.perf_counter() - start
+    last_rebuild = {'time': time.time(), 'duration': duration}
+    Monitor.cache_rebuild_latency.observe(duration)
+
+
+def on_plugin_event(event: str, p: plugin.Plugin) -> None:
+    """Listener for plugin lifecycle events which keeps the device cache
+    up to date with the plugin's devices.
+
+    A plugin state change typically emits a burst of events (e.g. a new
+    plugin is both registered and activated), and replicas of the same
+    plugin may change state together, so refreshes are debounced per plugin
+    ID: the plugin's devices are refreshed once events for it have settled.
+
+    Args:
+        event: The name of the lifecycle event.
+        p: The plugin instance the event is for.
+    """
+    delay = config.options.get('cache.device.refresh_debounce', 0.5)
+
+    pending = _pending_refreshes.pop(p.id, None)
+    if pending is not None:
+        pending.cancel()
+
+    logger.debug(
+        'scheduling device cache refresh for plugin', plugin_id=p.id, plugin_event=event,
+    )
+    _pending_refreshes[p.id] = asyncio.get_event_loop().call_later(
+        delay, _start_plugin_refresh, p.id,
+    )
+
+
+def _start_plugin_refresh(plugin_id: str) -> None:
+    """Start a debounced device cache refresh for a plugin."""
+    _pending_refreshes.pop(plugin_id, None)
+    asyncio.ensure_future(update_plugin_devices(plugin_id))
+
+
+async def update_plugin_devices(plugin_id: str) -> None:
+    """Update the device cache with the current devices of a single plugin.
+
+    If the plugin is ready, its devices are fetched and replace the plugin's
+    previous contribution to the device and alias caches. If the plugin is
+    no longer registered, or all of its instances are disabled, its devices
+    are removed from the caches. If it is only inactive, e.g. after a failed
+    request, its devices are kept until it recovers. Devices from other
+    plugins are left untouched.
 
-    Monitor.registered_devices.set(total_devices)
+    Args:
+        plugin_id: The ID of the plugin to update the devices for.
+    """
+    logger.info('updating device cache for plugin', plugin_id=plugin_id)
+
+    async with _locked(device_update_lock, 'update'):
+        await _update_plugin_devices(plugin_id)
 
-    async with device_cache_lock:
-        # IMPORTANT (etd): `clear` must be called with the namespace. It seems weird
-        #   to require the namespace since the cache instance has an associated namespace,
-        #   but the implementation of clear will clear out the ENTIRE cache backing (a dict
-        #   shared by all cache instances), so not specifying a namespace clears all caches.
-        #   Opened an issue to track.
-        #   https://github.com/argaen/aiocache/issues/479
-        await device_cache.clear(NS_DEVICE)
-        await alias_cache.clear(NS_ALIAS)
+    Monitor.registered_devices.set(update_index_metrics()['devices'])
 
-        for k, v in alias_map.items():
-            await add_alias(k, v)
 
-        for k, v in tags_map.items():
-            await device_cache.set(k, v)
+async def _update_plugin_devices(plugin_id: str) -> None:
+    """Replace a plugin's devices in the device cache with its current devices."""
+    enabled = [p for p in plugin.manager.group(plugin_id) if not p.disabled]
+    if enabled and not any(p.is_ready() for p in enabled):
+        # A plugin is marked inactive by a single failed request, so its devices
+        # are kept, if stale, rather than failing lookups until it recovers.
+        logger.debug('plugin not ready, keeping its devices', plugin_id=plugin_id)
+        return
+
+    devices = []
+    p = plugin.manager.get(plugin_id)
+    if enabled:
+        try:
+            start = time.perf_counter()
+            with p as client:
+                devices = await asyncio.get_event_loop().run_in_executor(
+                    None, lambda: list(client.devices()),
+                )
+            plugin_rebuilds[plugin_id] = time.perf_counter() - start
+            Monitor.cache_plugin_rebuild_latency.labels(plugin_id).observe(
+                plugin_rebuilds[plugin_id],
+            )
+        except (grpc.RpcError, errors.PluginUnavailable) as e:
+            # If the plugin could not be reached, it is marked inactive. Its
+            # devices are kept, and refreshed once it is activated again.
+            logger.warning('failed to get device(s)', plugin=p.tag, plugin_id=p.id, error=e)
+            return
+        logger.debug('got devices from plugin', plugin_id=plugin_id, device_count=len(devices))
+    else:
+        logger.debug('plugin not registered or disabled, removing its devices', plugin_id=plugin_id)
+
+    async with _locked(device_cache_lock, 'device'):
+        # Remove the plugin's previous devices from the cache.
+        for key, cached in list(device_cache._cache.items()):
+            if not key.startswith(NS_DEVICE):
+                continue
+            remaining = [d for d in cached if d.plugin != plugin_id]
+            if len(remaining) == len(cached):
+                continue
+            if remaining:
+                await device_cache.set(key[len(NS_DEVICE):], remaining)
+            else:
+                await device_cache.delete(key[len(NS_DEVICE):])
+
+        async with _locked(alias_cache_lock, 'alias'):
+            for key, device in list(alias_cache._cache.items()):
+                if key.startswith(NS_ALIAS) and device.plugin == plugin_id:
+                    await alias_cache.delete(key[len(NS_ALIAS):])
+
+        # Add the plugin's current devices to the cache.
+        for device in devices:
+            if device.alias:
+                if await get_alias(device.alias) is not None:
+                    logger.error(
+                        'alias already exists... not updating alias map',
+                        alias=device.alias, device=device.id,
+                    )
+                else:
+                    await add_alias(device.alias, device)
+
+            for tag in device.tags:
+                key = synse_grpc.utils.tag_string(tag)
+                tag_devices = await device_cache.get(key) or []
+                await device_cache.set(key, tag_devices + [device])
 
 
 async def get_device(device_id: str) -> Union[api.V3Device, None]:
@@ -246,7 +480,7 @@ async def get_device(device_id: str) -> Union[api.V3Device, None]:
     # which we can use here to get the device. If the ID tag is not in the cache,
     # we take that to mean that there is no such device.
     logger.debug('looking up device ID in cache', id=device_id)
-    async with device_cache_lock:
+    async with _locked(device_cache_lock, 'device'):
         result = await device_cache.get(f'system/id:{device_id}')
 
         # The device cache stores all devices in a list against the key, even
@@ -259,11 +493,14 @@ async def get_device(device_id: str) -> Union[api.V3Device, None]:
         else:
             logger.debug('failed to lookup device from cache', id=device_id)
 
+    Monitor.cache_lookups.labels('id', 'hit' if device else 'miss').inc()
+
     # No device was found from an ID lookup. Try looking up the ID in the
     # alias cache.
     if not device:
         logger.debug('device ID not found in cache - checking for alias', id=device_id)
         device = await get_alias(device_id)
+        Monitor.cache_lookups.labels('alias', 'hit' if device else 'miss').inc()
 
     return device
 
@@ -300,8 +537,9 @@ async def get_devices(*tags: Iterable[str]) -> List[api.V3Device]:
         return list(results.values())
 
     for i, tag in enumerate(tags):
-        async with device_cache_lock:
+        async with _locked(device_cache_lock, 'device'):
             devices = await device_cache.get(tag)
+        Monitor.cache_lookups.labels('tag', 'miss' if devices is None else 'hit').inc()
 
         # If there are no devices matching the first tag, we will ultimately
         # get nothing, as an intersection with nothing is nothing.
@@ -326,6 +564,87 @@ async def get_devices(*tags: Iterable[str]) -> List[api.V3Device]:
     return list(results.values())
 
 
+def get_index_stats() -> Dict[str, int]:
+    """Get the size of the device cache tag index and the alias cache.
+
+    The size in bytes is a rough estimate of the memory held by the index: the
+    serialized size of each distinct device, plus the tag keys and a pointer
+    for each of their device entries.
+
+    Returns:
+        The number of tags, device entries across all tags (postings),
+        distinct devices, and aliases, and the estimated size in bytes.
+    """
+    tags = postings = size = 0
+    devices = {}
+    for key, cached in device_cache._cache.items():
+        if not key.startswith(NS_DEVICE):
+            continue
+        tags += 1
+        postings += len(cached)
+        size += len(key) + 8 * len(cached)
+        for device in cached:
+            devices[device.id] = device
+
+    size += sum(d.ByteSize() for d in devices.values())
+    aliases = len([k for k in alias_cache._cache.keys() if k.startswith(NS_ALIAS)])
+
+    return {
+        'tags': tags,
+        'postings': postings,
+        'devices': len(devices),
+        'aliases': aliases,
+        'size_bytes': size,
+    }
+
+
+def update_index_metrics() -> Dict[str, int]:
+    """Update the device cache index size metrics.
+
+    Returns:
+        The index stats the metrics were updated from.
+    """
+    stats = get_index_stats()
+    Monitor.cache_tags.set(stats['tags'])
+    Monitor.cache_postings.set(stats['postings'])
+    Monitor.cache_size_bytes.set(stats['size_bytes'])
+    Monitor.cache_aliases.set(stats['aliases'])
+    return stats
+
+
+def get_summary() -> Dict[str, Any]:
+    """Get a summary of the state of the caches, for debugging.
+
+    Returns:
+        The device cache index size and rebuild timings, and the transaction
+        cache size and eviction count.
+    """
+    stats = update_index_metrics()
+
+    return {
+        'devices': {
+            'loaded': loaded,
+            'stale': stale,
+            'tags': stats['tags'],
+            'postings': stats['postings'],
+            'devices': stats['devices'],
+            'size_bytes': stats['size_bytes'],
+            'last_rebuild': last_rebuild,
+            'plugin_rebuilds': dict(plugin_rebuilds),
+            'locked': device_cache_lock.locked(),
+        },
+        'aliases': {
+            'entries': stats['aliases'],
+            'locked': alias_cache_lock.locked(),
+        },
+        'transactions': {
+            'entries': _expire_transactions(),
+            'ttl': transaction_cache.ttl,
+            'evictions': transaction_evictions,
+        },
+    }
+
+
 def get_cached_device_tags() -> List[str]:
     """Get a list of all the currently cached device tags.
 
@@ -0,0 +1,237 @@
+"""gRPC channel configuration for plugin clients."""
+
+import contextlib
+import itertools
+import threading
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import grpc
+from synse_grpc import client
+from synse_grpc import grpc as synse_grpc
+
+from synse_server import config
+
+__all__ = ['CallGroup', 'CallTracker', 'PluginClient', 'StubPool', 'from_config', 'track']
+
+# The channel compression algorithms which may be configured.
+COMPRESSION = {
+    'none': grpc.Compression.NoCompression,
+    'deflate': grpc.Compression.Deflate,
+    'gzip': grpc.Compression.Gzip,
+}
+
+
+# The call group which streaming calls started by the current thread are
+# added to, if any.
+_tracking = threading.local()
+
+
+class CallGroup:
+    """A group of gRPC calls which can be cancelled together from any thread.
+
+    The plugin client is synchronous and consumes streams in an executor
+    thread, which blocks waiting on the next message. Cancelling the call is
+    the only way to unblock the thread from the event loop.
+
+    A call added to a group which has already been cancelled is cancelled
+    immediately.
+    """
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self._calls: List[grpc.Call] = []
+        self._lock = threading.Lock()
+
+    def add(self, call: grpc.Call) -> None:
+        """Add a call to the group."""
+        with self._lock:
+            self._calls.append(call)
+            cancelled = self.cancelled
+        if cancelled:
+            call.cancel()
+
+    def cancel(self) -> None:
+        """Cancel all calls in the group, and any added to it later."""
+        with self._lock:
+            self.cancelled = True
+            calls, self._calls = self._calls, []
+        for call in calls:
+            call.cancel()
+
+
+@contextlib.contextmanager
+def track(group: CallGroup) -> Iterator[None]:
+    """Add the streaming calls started by the current thread within the
+    context to a call group.
+
+    Args:
+        group: The call group to add calls to.
+    """
+    _tracking.group = group
+    try:
+        yield
+    finally:
+        _tracking.group = None
+
+
+class CallTracker(grpc.UnaryStreamClientInterceptor):
+    """A gRPC client interceptor which adds streaming calls to the call group
+    being tracked by the calling thread, if any.
+
+    This is applied closest to the channel, so the call it tracks is the gRPC
+    call itself rather than a stream wrapped by another interceptor.
+    """
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        call = continuation(client_call_details, request)
+        group = getattr(_tracking, 'group', None)
+        if group is not None:
+            group.add(call)
+        return call
+
+
+class StubPool:
+    """A pool of gRPC stubs, each with its own channel, which requests are
+    balanced across round-robin.
+
+    The pool exposes the same RPC methods as a single stub, so it can be used
+    in place of one. Each channel has its own HTTP/2 connection, so spreading
+    concurrent requests across the pool keeps them from contending for the
+    stream limit of a single connection.
+
+    Args:
+        stubs: The stubs in the pool.
+    """
+
+    def __init__(self, stubs: Sequence[Any]) -> None:
+        self.stubs = list(stubs)
+        self._next = itertools.cycle(self.stubs)
+
+    def __len__(self) -> int:
+        return len(self.stubs)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not set on the pool, i.e. the RPC methods.
+        return getattr(next(self._next), name)
+
+
+class PluginClient(client.PluginClientV3):
+    """A plugin client whose gRPC channels are created with the configured
+    channel options, and which may spread requests over a pool of channels.
+
+    Args:
+        address: The address of the plugin to connect to.
+        protocol: The network protocol to use. This must be one of: 'tcp', 'unix'.
+        timeout: The default timeout to use for the gRPC client.
+        tls: The path to the TLS cert to use, if any.
+        interceptors: A collection of gRPC client interceptors that will be
+            applied to each channel.
+        options: The gRPC channel arguments, as key-value pairs.
+        compression: The compression algorithm to use for the channels.
+        pool_size: The number of channels to create for the plugin.
+    """
+
+    def __init__(
+            self,
+            address: str,
+            protocol: str,
+            timeout: Optional[float] = None,
+            tls: Optional[str] = None,
+            interceptors: Optional[List[Any]] = None,
+            options: Optional[List[Tuple[str, Any]]] = None,
+            compression: Optional[grpc.Compression] = None,
+            pool_size: int = 1,
+    ) -> None:
+        # These must be set before the base initializer, which creates the channel(s).
+        self.options = options or []
+        self.compression = compression
+        self.pool_size = max(1, pool_size)
+        super(PluginClient, self).__init__(
+            address=address,
+            protocol=protocol,
+            timeout=timeout,
+            tls=tls,
+            interceptors=interceptors,
+        )
+
+    def make_channel(self, local_pool: bool = False) -> grpc.Channel:
+        """Make a channel for the gRPC client, using the configured options.
+
+        Args:
+            local_pool: Give the channel its own subchannel pool. gRPC otherwise
+                shares connections between channels with the same target and
+                arguments, so this is needed for pooled channels to each get
+                their own connection.
+        """
+        options = self.options
+        if local_pool:
+            options = options + [('grpc.use_local_subchannel_pool', 1)]
+
+        if self.tls:
+            with open(self.tls, 'rb') as f:
+                cert = f.read()
+            credentials = grpc.ssl_channel_credentials(root_certificates=cert)
+            channel = grpc.secure_channel(
+                self.get_address(), credentials,
+                options=options, compression=self.compression,
+            )
+        else:
+            channel = grpc.insecure_channel(
+                self.get_address(),
+                options=options, compression=self.compression,
+            )
+
+        # Interceptors are called in order, so the call tracker is last to get
+        # the call from the channel itself.
+        return grpc.intercept_channel(channel, *(self.interceptors or []), CallTracker())
+
+    def make_grpc_client(self) -> Any:
+        """Make the gRPC stub, or a pool of stubs if more than one channel
+        is configured.
+        """
+        if self.pool_size == 1:
+            return synse_grpc.V3PluginStub(self.make_channel())
+
+        return StubPool([
+            synse_grpc.V3PluginStub(self.make_channel(local_pool=True))
+            for _ in range(self.pool_size)
+        ])
+
+
+def from_config() -> dict:
+    """Get the plugin client channel arguments from the gRPC configuration.
+
+    Returns:
+        The keyword arguments for a PluginClient which configure its channels.
+
+    Raises:
+        ValueError: An unsupported compression algorithm is configured.
+    """
+    cfg = config.options.get('grpc') or {}
+    options = []
+
+    keepalive = cfg.get('keepalive') or {}
+    if keepalive.get('time'):
+        options.extend([
+            ('grpc.keepalive_time_ms', int(keepalive['time'] * 1000)),
+            ('grpc.keepalive_timeout_ms', int(keepalive.get('timeout', 20) * 1000)),
+            ('grpc.keepalive_permit_without_calls', int(keepalive.get('without_calls', False))),
+            ('grpc.http2.max_pings_without_data', 0),
+        ])
+
+    if cfg.get('max_send_message_size'):
+        options.append(('grpc.max_send_message_length', cfg['max_send_message_size']))
+    if cfg.get('max_receive_message_size'):
+        options.append(('grpc.max_receive_message_length', cfg['max_receive_message_size']))
+
+    compression = cfg.get('compression') or 'none'
+    if compression not in COMPRESSION:
+        raise ValueError(
+            f'unsupported gRPC compression: {compression} (must be one of: {list(COMPRESSION)})'
+        )
+
+    return {
+        'options': options,
+        'compression': COMPRESSION[compression],
+        'pool_size': cfg.get('pool_size') or 1,
+    }
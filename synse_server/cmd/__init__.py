@@ -1,7 +1,9 @@
 from .config import config
+from .debug import authorize_debug, cache_summary, profile, traces
 from .info import info
 from .plugin import plugin, plugin_health, plugins
 from .read import read, read_cache, read_device, read_stream
+from .ready import ready
 from .scan import scan
 from .tags import tags
 from .test import test
@@ -7,6 +7,9 @@ from synse_server.config import options
 
 logger = get_logger()
 
+# The value shown in place of secret configuration values.
+REDACTED = '<redacted>'
+
 
 async def config() -> Dict[str, Any]:
     """Generate the config response data.
@@ -16,4 +19,10 @@ async def config() -> Dict[str, Any]:
     """
     logger.info('issuing command', command='CONFIG')
 
-    return {k: v for k, v in options.config.items() if not k.startswith('_')}
+    cfg = {k: v for k, v in options.config.items() if not k.startswith('_')}
+
+    # Do not expose the token which authorizes requests to the debug endpoints.
+    if (cfg.get('debug') or {}).get('token'):
+        cfg['debug'] = {**cfg['debug'], 'token': REDACTED}
+
+    return cfg
@@ -0,0 +1,117 @@
+
+import asyncio
+import concurrent.futures
+import functools
+import hmac
+from typing import Any, Dict, List, Optional
+
+from structlog import get_logger
+
+from synse_server import cache, config, errors, profiler, tracing
+
+logger = get_logger()
+
+# Profiles run in their own thread, so they do not tie up a worker of the
+# default executor (used for plugin requests) for their duration.
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='profiler')
+
+
+def authorize_debug(authorization: Optional[str]) -> None:
+    """Authorize a request to a debug endpoint.
+
+    The debug endpoints are only enabled when a debug token is configured,
+    and requests to them must provide it as a bearer token.
+
+    Args:
+        authorization: The value of the request's Authorization header.
+
+    Raises:
+        errors.NotFound: The debug endpoints are not enabled.
+        errors.Unauthorized: The request does not provide the debug token.
+    """
+    token = config.options.get('debug.token')
+    if not token:
+        raise errors.NotFound('debug endpoints are not enabled')
+
+    if not authorization or not hmac.compare_digest(
+            authorization.encode(), f'Bearer {token}'.encode(),
+    ):
+        raise errors.Unauthorized('a valid debug token is required')
+
+
+async def profile(
+        duration: float = 10,
+        interval: float = 0.01,
+        memory: bool = False,
+        top: int = 25,
+) -> Dict[str, Any]:
+    """Generate the profile response data.
+
+    The live process is profiled by sampling the stacks of all its threads
+    for the duration. Only one profile may run at a time.
+
+    Args:
+        duration: The time, in seconds, to profile for. (default: 10)
+        interval: The time, in seconds, between stack samples. (default: 0.01)
+        memory: Also trace memory allocations for the duration, reporting
+            the source lines which allocated the most. (default: False)
+        top: The number of source lines to report for the memory profile.
+            (default: 25)
+
+    Returns:
+        A dictionary representation of the profile response.
+    """
+    logger.info(
+        'issuing command', command='PROFILE',
+        duration=duration, interval=interval, memory=memory,
+    )
+
+    max_duration = config.options.get('debug.max_profile_duration', 60)
+    if duration > max_duration:
+        raise errors.InvalidUsage(
+            f'invalid parameter: duration must not exceed {max_duration}s',
+        )
+
+    try:
+        return await asyncio.get_event_loop().run_in_executor(
+            _executor,
+            functools.partial(profiler.profile, duration, interval, memory=memory, top=top),
+        )
+    except profiler.ProfilerBusy as e:
+        raise errors.Conflict(str(e)) from e
+
+
+async def traces(trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Generate the traces response data.
+
+    The recently finished trace spans are only kept when tracing is enabled
+    with the in-memory exporter.
+
+    Args:
+        trace_id: The ID of the trace to get the spans of. If not specified,
+            the spans of all traces are returned.
+
+    Returns:
+        A list of dictionary representations of the finished spans, oldest first.
+    """
+    logger.info('issuing command', command='TRACES', trace_id=trace_id)
+
+    exporter = tracing.get_exporter()
+    if not tracing.enabled or not isinstance(exporter, tracing.MemoryExporter):
+        raise errors.NotFound('in-memory trace exporter is not enabled')
+
+    return [
+        s.to_dict() for s in exporter.spans
+        if trace_id is None or s.trace_id == trace_id
+    ]
+
+
+async def cache_summary() -> Dict[str, Any]:
+    """Generate the cache summary response data.
+
+    Returns:
+        A dictionary representation of the state of Synse Server's caches.
+    """
+    logger.info('issuing command', command='CACHE SUMMARY')
+
+    return cache.get_summary()
@@ -4,7 +4,7 @@ from typing import Any, Dict
 from structlog import get_logger
 from synse_grpc import utils
 
-from synse_server import cache, errors
+from synse_server import cache, errors, timing
 
 logger = get_logger()
 
@@ -20,7 +20,8 @@ async def info(device_id: str) -> Dict[str, Any]:
     """
     logger.info('issuing command', command='INFO', device_id=device_id)
 
-    device = await cache.get_device(device_id)
+    with timing.stage(timing.CACHE):
+        device = await cache.get_device(device_id)
     if device is None:
         raise errors.NotFound(f'device not found: {device_id}')
 
@@ -5,7 +5,7 @@ from structlog import get_logger
 from synse_grpc import api, utils
 
 import synse_server.utils
-from synse_server import errors
+from synse_server import errors, health
 from synse_server.plugin import manager
 
 logger = get_logger()
@@ -25,7 +25,7 @@ async def plugin(plugin_id: str) -> Dict[str, Any]:
     # If there are no plugins registered, re-registering to ensure
     # the most up-to-date plugin state.
     if not manager.has_plugins():
-        manager.refresh()
+        await manager.refresh()
 
     p = manager.get(plugin_id)
     if p is None:
@@ -34,6 +34,8 @@ async def plugin(plugin_id: str) -> Dict[str, Any]:
     try:
         with p as client:
             health = client.health()
+    except errors.SynseError:
+        raise
     except Exception as e:
         raise errors.ServerError(
             'error while issuing gRPC request: plugin health'
@@ -42,6 +44,7 @@ async def plugin(plugin_id: str) -> Dict[str, Any]:
     response = {
         **p.metadata,
         'active': p.active,
+        'circuit_breaker': p.circuit_state(),
         'network': {
             'address': p.address,
             'protocol': p.protocol,
@@ -67,12 +70,13 @@ async def plugins(refresh: bool) -> List[Dict[str, Any]]:
     # If there are no plugins registered, re-registering to ensure
     # the most up-to-date plugin state.
     if refresh or not manager.has_plugins():
-        manager.refresh()
+        await manager.refresh()
 
     summaries = []
     for p in manager:
         summary = p.metadata.copy()
         summary['active'] = p.active
+        summary['circuit_breaker'] = p.circuit_state()
         if 'vcs' in summary:
             del summary['vcs']
         summaries.append(summary)
@@ -83,6 +87,9 @@ async def plugins(refresh: bool) -> List[Dict[str, Any]]:
 async def plugin_health() -> Dict[str, Any]:
     """Generate the plugin health response data.
 
+    The health reported by the plugins is cached for a short TTL and refreshed
+    in the background, so this does not wait on the plugins once cached.
+
     Returns:
          A dictionary representation of the plugin health.
     """
@@ -91,7 +98,10 @@ async def plugin_health() -> Dict[str, Any]:
     # If there are no plugins registered, re-registering to ensure
     # the most up-to-date plugin state.
     if not manager.has_plugins():
-        manager.refresh()
+        await manager.refresh()
+
+    summary = health.get_summary()
+    results = await summary.get()
 
     active_count = 0
     inactive_count = 0
@@ -99,26 +109,22 @@ async def plugin_health() -> Dict[str, Any]:
     unhealthy = []
 
     for p in manager:
-        try:
-            with p as client:
-                health = client.health()
-        except Exception as e:
-            logger.warning('failed to get plugin health', plugin=p.tag, error=e)
-        else:
-            if health.status == api.OK:
+        status = results.get(p.id)
+        if status is not None:
+            if status.status == api.OK:
                 healthy.append(p.id)
             else:
                 unhealthy.append(p.id)
-        finally:
-            if p.active:
-                active_count += 1
-            else:
-                inactive_count += 1
+
+        if p.active:
+            active_count += 1
+        else:
+            inactive_count += 1
 
     is_healthy = len(manager.plugins) == len(healthy)
     return {
         'status': 'healthy' if is_healthy else 'unhealthy',
-        'updated': synse_server.utils.rfc3339now(),
+        'updated': summary.updated or synse_server.utils.rfc3339now(),
         'healthy': healthy,
         'unhealthy': unhealthy,
         'active': active_count,
@@ -1,20 +1,34 @@
 
 import asyncio
+import datetime
+import functools
+import heapq
 import json
 import math
 import queue
+import re
 import threading
-from typing import Any, AsyncIterable, Dict, List, Optional, Union
+import time
+from typing import (Any, AsyncIterable, Callable, Dict, Iterable, List,
+                    Optional, Tuple, Union)
 
+import grpc
 import synse_grpc.utils
 import websockets
 from structlog import get_logger
 from synse_grpc import api
 
-from synse_server import cache, errors, plugin
+from synse_server import (cache, channels, config, errors, log, plugin, timing,
+                          tracing)
+from synse_server.metrics import Monitor
 
 logger = get_logger()
 
+# An RFC3339 timestamp, with optional fractional seconds of any precision.
+_RFC3339 = re.compile(
+    r'(\d{4}-\d{2}-\d{2})[Tt ](\d{2}:\d{2}:\d{2})(?:\.(\d+))?([Zz]|[+-]\d{2}:\d{2})$'
+)
+
 
 def reading_to_dict(reading: api.V3Reading) -> Dict[str, Any]:
     """Convert a V3Reading to its dict representation for the Synse V3 read schema.
@@ -84,9 +98,15 @@ async def read(
         ns: str,
         tag_groups: Union[List[str], List[List[str]]],
         plugin_id: Optional[str] = None,
-) -> List[Dict[str, Any]]:
+        deadline: Optional[float] = None,
+        partial: bool = False,
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """Generate the readings response data.
 
+    Readings are requested from all matching plugins concurrently. If a deadline
+    is set, the request only waits that long for plugins to respond. Plugins which
+    have not responded by the deadline are considered timed out.
+
     Args:
         ns: The default namespace to use for tags which do no specify one.
             If all tags specify a namespace, or no tags are defined, this
@@ -95,90 +115,274 @@ async def read(
             groups are given (and thus no tags), no filtering is done.
         plugin_id: The ID of the plugin to get device readings from. If not specified,
             all plugins are considered valid for reading.
+        deadline: The time budget, in seconds, for the request. If not specified,
+            the configured default (``read.deadline``) is used. A deadline of 0
+            or None means that there is no deadline.
+        partial: Return the readings which were gathered even if some plugins
+            fail or time out. If set, the response is a dictionary containing the
+            readings along with details on any plugins which did not respond.
+            Otherwise, any plugin failure results in an error. (default: False)
 
     Returns:
-        A list of dictionary representations of device reading response(s).
+        A list of dictionary representations of device reading response(s). If
+        ``partial`` is set, a dictionary representation of the partial readings
+        response is returned instead.
     """
-    logger.info('issuing command', command='READ', ns=ns, tag_groups=tag_groups)
-
-    # If there are no tags specified, read with no tag filter.
+    logger.info(
+        'issuing command', command='READ',
+        ns=ns, tag_groups=tag_groups, deadline=deadline, partial=partial,
+    )
+
+    if deadline is None:
+        deadline = config.options.get('read.deadline')
+
+    # If there are no tags specified, read with no tag filter. Otherwise, there is
+    # at least one tag group. We need to issue a read request for each group and
+    # collect the results of each group. The provided tag groups may take the form
+    # of a List[str] in the case of a single tag group, or a List[List[str]] in the
+    # case of multiple tag groups.
     if len(tag_groups) == 0:
         logger.debug('no tags specified, reading with no tag filter', command='READ')
-        readings = []
-        for p in plugin.manager:
-            if plugin_id and p.id != plugin_id:
-                logger.debug(
-                    'skipping plugin for read - plugin filter set',
-                    filter=plugin_id,
-                    skipped=p.id,
-                )
-                continue
+        groups = [None]
+    else:
+        if all(isinstance(x, str) for x in tag_groups):
+            tag_groups = [tag_groups]
+
+        for group in tag_groups:
+            logger.debug('parsing tag groups', command='READ', group=group)
+            # Apply the default namespace to the tags in the group which do not
+            # have any namespace defined.
+            for i, tag in enumerate(group):
+                if '/' not in tag:
+                    group[i] = f'{ns}/{tag}'
+        groups = tag_groups
+
+    tasks = {}
+    for p in plugin.manager.select_all():
+        if plugin_id and p.id != plugin_id:
+            logger.debug(
+                'skipping plugin for read - plugin filter set',
+                filter=plugin_id,
+                skipped=p.id,
+            )
+            continue
 
-            if not p.active:
-                logger.debug(
-                    'plugin not active, will not read its devices',
-                    plugin=p.tag, plugin_id=p.id,
-                )
-                continue
+        if not p.active:
+            logger.debug(
+                'plugin not active, will not read its devices',
+                plugin=p.tag, plugin_id=p.id,
+            )
+            continue
 
-            try:
-                with p as client:
-                    for reading in client.read():
-                        readings.append(reading_to_dict(reading))
-            except Exception as e:
-                raise errors.ServerError(
-                    'error while issuing gRPC request: read'
-                ) from e
-
-        logger.debug('got readings', count=len(readings), command='READ')
-        return readings
-
-    # Otherwise, there is at least one tag group. We need to issue a read request
-    # for each group and collect the results of each group. The provided tag groups
-    # may take the form of a List[str] in the case of a single tag group, or a
-    # List[List[str]] in the case of multiple tag groups.
-    if all(isinstance(x, str) for x in tag_groups):
-        tag_groups = [tag_groups]
-
-    results = {}
-    for group in tag_groups:
-        logger.debug('parsing tag groups', command='READ', group=group)
-        # Apply the default namespace to the tags in the group which do not
-        # have any namespace defined.
-        for i, tag in enumerate(group):
-            if '/' not in tag:
-                group[i] = f'{ns}/{tag}'
-
-        for p in plugin.manager:
-            if plugin_id and p.id != plugin_id:
-                logger.debug(
-                    'skipping plugin for read - plugin filter set',
-                    filter=plugin_id,
-                    skipped=p.id,
-                )
-                continue
+        tasks[asyncio.ensure_future(_read_hedged(p, groups))] = p
 
-            if not p.active:
-                logger.debug(
-                    'plugin not active, will not read its devices',
-                    plugin=p.tag, plugin_id=p.id,
-                )
-                continue
+    done, pending = set(), set()
+    if tasks:
+        done, pending = await asyncio.wait(tasks.keys(), timeout=deadline or None)
 
-            try:
-                with p as client:
-                    for r in client.read(tags=group):
-                        results[f'{r.id}{r.type}{r.timestamp}'] = reading_to_dict(r)
-            except Exception as e:
+    # The reads which missed the deadline are cancelled, so they do not keep
+    # running in the executor after the request has been answered.
+    for task in pending:
+        task.cancel()
+
+    # Readings gathered for multiple tag groups may overlap, so they are
+    # de-duplicated. A read with no tag filter returns every reading as is.
+    readings = []
+    seen = set()
+    failures = []
+    for task, p in tasks.items():
+        if task in pending:
+            logger.warning(
+                'plugin did not respond within the request deadline',
+                command='READ', plugin=p.tag, plugin_id=p.id, deadline=deadline,
+            )
+            failures.append({
+                'plugin': p.id,
+                'error': 'timeout',
+                'context': f'no response within request deadline ({deadline}s)',
+            })
+            continue
+
+        plugin_readings, err = task.result()
+        if err is not None:
+            if not partial:
+                if isinstance(err, errors.SynseError):
+                    raise err
                 raise errors.ServerError(
                     'error while issuing gRPC request: read'
-                ) from e
+                ) from err
+
+            logger.warning('failed to read from plugin', command='READ', plugin_id=p.id, error=err)
+            failures.append({
+                'plugin': p.id,
+                'error': 'error',
+                'context': str(err),
+            })
+            continue
+
+        for r in plugin_readings:
+            if groups != [None]:
+                key = f'{r["device"]}{r["type"]}{r["timestamp"]}'
+                if key in seen:
+                    continue
+                seen.add(key)
+            readings.append(r)
+
+    if pending and not partial:
+        raise errors.ServerError(
+            f'request deadline exceeded ({deadline}s): no response from plugin(s) '
+            f'{", ".join(sorted(tasks[t].id for t in pending))}'
+        )
 
-    readings = list(results.values())
     logger.debug('got readings', count=len(readings), command='READ')
+
+    if partial:
+        return {
+            'readings': readings,
+            'partial': len(failures) > 0,
+            'errors': failures,
+        }
     return readings
 
 
+async def _read_plugin(
+        p: plugin.Plugin,
+        groups: List[Optional[List[str]]],
+) -> Tuple[List[Dict[str, Any]], Optional[Exception]]:
+    """Read from a plugin for each of the given tag groups.
+
+    The plugin client is synchronous, so each read is run in the default
+    executor. Any error which occurs is returned rather than raised so the
+    caller can determine how to handle it. If the read is cancelled, its
+    gRPC call is cancelled as well, so the executor thread is released.
+
+    Args:
+        p: The plugin to read from.
+        groups: The tag groups to read with. A group of None designates
+            a read with no tag filter.
+
+    Returns:
+        A tuple of the readings collected from the plugin and the error
+        which occurred while reading, if any.
+    """
+    loop = asyncio.get_event_loop()
+    calls = channels.CallGroup()
+    readings = []
+    try:
+        with p as client:
+            for group in groups:
+                if group is None:
+                    fn = client.read
+                else:
+                    fn = functools.partial(client.read, tags=group)
+                converted, received, elapsed = await loop.run_in_executor(
+                    None, tracing.propagate(_read_timed), fn, calls,
+                )
+                timing.record(timing.GRPC, received)
+                timing.record(timing.CONVERT, elapsed - received)
+                readings.extend(converted)
+    except asyncio.CancelledError:
+        calls.cancel()
+        raise
+    except Exception as e:
+        return readings, e
+    return readings, None
+
+
+def _read_timed(
+        fn: Callable[[], Iterable[api.V3Reading]],
+        calls: channels.CallGroup,
+) -> Tuple[List[Dict[str, Any]], float, float]:
+    """Read from a plugin and convert the readings, timing each step.
+
+    This is run in an executor, which does not share the request context, so
+    the durations are returned to be recorded from the event loop.
+
+    Args:
+        fn: The plugin client read function.
+        calls: The call group to add the read's gRPC call to.
+
+    Returns:
+        A tuple of the converted readings, the time taken to receive all of
+        the readings, and the total time taken.
+    """
+    start = time.perf_counter()
+    with channels.track(calls):
+        readings = list(fn())
+    received = time.perf_counter() - start
+    converted = [reading_to_dict(r) for r in readings]
+    return converted, received, time.perf_counter() - start
+
+
+async def _read_hedged(
+        p: plugin.Plugin,
+        groups: List[Optional[List[str]]],
+) -> Tuple[List[Dict[str, Any]], Optional[Exception]]:
+    """Read from a plugin, hedging the request against one of its replicas.
+
+    If hedging is enabled and the plugin has another replica available, a
+    second read is issued to that replica if the first has not succeeded
+    within the hedge delay. The hedge delay is the configured percentile of
+    the plugin's observed read latency, falling back to a static delay when
+    there is not enough data. The first successful result is used; the other
+    request is left to complete in the background, unless the hedged read is
+    itself cancelled.
+
+    Args:
+        p: The plugin to read from.
+        groups: The tag groups to read with. A group of None designates
+            a read with no tag filter.
+
+    Returns:
+        A tuple of the readings collected from the plugin and the error
+        which occurred while reading, if any.
+    """
+    cfg = config.options.get('plugin.hedging') or {}
+    if not cfg.get('enabled', False):
+        return await _read_plugin(p, groups)
+
+    alternates = [r for r in plugin.manager.group(p.id) if r is not p and r.is_available()]
+    if not alternates:
+        return await _read_plugin(p, groups)
+
+    delay = p.latency('Read', cfg.get('percentile', 0.95))
+    if delay is None:
+        delay = cfg.get('delay', 0.1)
+
+    first = asyncio.ensure_future(_read_plugin(p, groups))
+    reads = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done and first.result()[1] is None:
+            return first.result()
+
+        # A read which fails before the hedge delay is hedged immediately, rather
+        # than returning its error while a replica is available.
+        logger.debug(
+            'plugin read failed or exceeded hedge delay, issuing hedged read to replica',
+            command='READ', plugin_id=p.id, addr=p.address, replica=alternates[0].address,
+            delay=delay, failed=bool(done),
+        )
+        Monitor.plugin_hedged_reads.labels(p.id).inc()
+
+        hedge = asyncio.ensure_future(_read_plugin(alternates[0], groups))
+        reads.append(hedge)
+        pending = {hedge} if done else {first, hedge}
+        result = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result[1] is None:
+                    return result
+        return result
+    except asyncio.CancelledError:
+        # Cancelling this task does not cancel the reads it waits on.
+        for task in reads:
+            task.cancel()
+        raise
+
+
 async def read_device(device_id: str) -> List[Dict[str, Any]]:
     """Generate the readings response data for the specified device.
 
@@ -190,18 +394,25 @@ async def read_device(device_id: str) -> List[Dict[str, Any]]:
     """
     logger.info('issuing command', command='READ DEVICE', device_id=device_id)
 
-    p = await cache.get_plugin(device_id)
+    with timing.stage(timing.CACHE):
+        p = await cache.get_plugin(device_id)
     if p is None:
         raise errors.NotFound(
             f'plugin not found for device {device_id}',
         )
+    log.debug_scope(plugin=p.id, device=device_id)
 
     readings = []
     try:
         with p as client:
-            for reading in client.read(device_id=device_id):
-                readings.append(reading_to_dict(reading))
-
+            with timing.stage(timing.GRPC):
+                received = list(client.read(device_id=device_id))
+            with timing.stage(timing.CONVERT):
+                for reading in received:
+                    readings.append(reading_to_dict(reading))
+
+    except errors.SynseError:
+        raise
     except Exception as e:
         raise errors.ServerError(
             'error while issuing gRPC request: read device',
@@ -211,9 +422,18 @@ async def read_device(device_id: str) -> List[Dict[str, Any]]:
     return readings
 
 
-async def read_cache(start: str = None, end: str = None) -> AsyncIterable:
+async def read_cache(
+        start: str = None,
+        end: str = None,
+        ordered: bool = False,
+) -> AsyncIterable:
     """Generate the readings response data for the cached readings.
 
+    The cached readings for all active plugins are streamed concurrently. Each
+    plugin stream is bounded by a deadline (the plugin's gRPC timeout), so a
+    single slow plugin does not hold up readings from the rest; any readings a
+    plugin has not returned by its deadline are dropped from the response.
+
     Args:
         start: An RFC3339 formatted timestamp defining the starting
             bound on the cache data to return. An empty string or None
@@ -221,15 +441,21 @@ async def read_cache(start: str = None, end: str = None) -> AsyncIterable:
         end: An RFC3339 formatted timestamp defining the ending
             bound on the cache data to return. An empty string or None
             designates no ending bound. (default: None)
+        ordered: Merge the plugin streams so readings are yielded in timestamp
+            order. This relies on each plugin returning its cached readings in
+            timestamp order. Otherwise, readings are yielded in the order they
+            are received from the plugins. (default: False)
 
     Yields:
         A dictionary representation of a device reading response.
     """
-    logger.info('issuing command', command='READ CACHE', start=start, end=end)
+    logger.info('issuing command', command='READ CACHE', start=start, end=end, ordered=ordered)
+
+    default_timeout = config.options.get('grpc.timeout') or 3
+    shared = asyncio.Queue()
 
-    # FIXME: this could benefit from being async. this would require the plugin
-    #   api client to provide async behaviors as well.
-    for p in plugin.manager:
+    streams = []
+    for p in plugin.manager.select_all():
         if not p.active:
             logger.debug(
                 'plugin not active, will not read its devices',
@@ -238,14 +464,211 @@ async def read_cache(start: str = None, end: str = None) -> AsyncIterable:
             continue
 
         logger.debug('getting cached readings for plugin', plugin=p.tag, command='READ CACHE')
-        try:
-            with p as client:
-                for reading in client.read_cache(start=start, end=end):
-                    yield reading_to_dict(reading)
-        except Exception as e:
+        stream = CacheStream(
+            plugin=p,
+            start=start,
+            end=end,
+            timeout=p.timeout('ReadCache') or default_timeout,
+            q=asyncio.Queue() if ordered else shared,
+        )
+        stream.open()
+        streams.append(stream)
+
+    try:
+        if ordered:
+            # Each plugin stream is ordered, so a k-way heap merge over the
+            # head reading of each stream yields all readings in order.
+            heap = []
+            for i, stream in enumerate(streams):
+                reading = await stream.get()
+                if reading is not CacheStream.done:
+                    heapq.heappush(heap, (timestamp_key(reading['timestamp']), i, reading))
+
+            while heap:
+                _, i, reading = heapq.heappop(heap)
+                yield reading
+
+                nxt = await streams[i].get()
+                if nxt is not CacheStream.done:
+                    heapq.heappush(heap, (timestamp_key(nxt['timestamp']), i, nxt))
+
+        else:
+            remaining = len(streams)
+            while remaining:
+                reading = await CacheStream.get_from(shared)
+                if reading is CacheStream.done:
+                    remaining -= 1
+                    continue
+                yield reading
+
+    finally:
+        # If streaming terminates early (e.g. error, client disconnect), make sure
+        # the plugin streams stop collecting readings in the background.
+        for stream in streams:
+            stream.cancel()
+
+
+def timestamp_key(timestamp: str) -> Tuple[float, int]:
+    """Get a key which orders RFC3339 timestamps chronologically.
+
+    Timestamps may differ in their timezone offset and in the precision of
+    their fractional seconds, so they do not order correctly as strings.
+
+    Args:
+        timestamp: The RFC3339 formatted timestamp.
+
+    Returns:
+        The seconds since the epoch and the nanoseconds within that second.
+        Timestamps which cannot be parsed are ordered before all others.
+    """
+    match = _RFC3339.match(timestamp or '')
+    if match is None:
+        return -math.inf, 0
+
+    date, clock, fraction, offset = match.groups()
+    if offset in ('Z', 'z'):
+        offset = '+00:00'
+    seconds = datetime.datetime.fromisoformat(f'{date}T{clock}{offset}').timestamp()
+    return seconds, int((fraction or '')[:9].ljust(9, '0'))
+
+
+class CacheStream:
+    """A stream of cached readings from a single plugin.
+
+    The plugin client is synchronous, so the gRPC stream is consumed in the
+    default executor and readings are passed back to the event loop via an
+    asyncio queue. Once the plugin stream completes, fails, or exceeds its
+    deadline, the ``done`` sentinel is put onto the queue, and no readings
+    are put onto it after that. If the stream exceeds its deadline or is
+    cancelled, its gRPC call is cancelled so the executor thread is freed.
+
+    Args:
+        plugin: The plugin to get cached readings from.
+        start: The starting bound on the cache data to return.
+        end: The ending bound on the cache data to return.
+        timeout: The deadline, in seconds, for the plugin to return all of
+            its cached readings.
+        q: The queue to pass collected readings to. This may be shared by
+            multiple streams.
+    """
+
+    # Sentinel put onto the queue when the stream is finished.
+    done = object()
+
+    def __init__(
+            self,
+            plugin: plugin.Plugin,
+            start: Optional[str],
+            end: Optional[str],
+            timeout: float,
+            q: asyncio.Queue,
+    ) -> None:
+        self.plugin = plugin
+        self.start = start
+        self.end = end
+        self.timeout = timeout
+        self.q = q
+        self.event = threading.Event()
+        self.calls = channels.CallGroup()
+        self.finished = False
+        self.task: Optional[asyncio.Task] = None
+
+    def open(self) -> None:
+        """Open the plugin stream and start collecting readings."""
+        self.task = asyncio.ensure_future(self.run())
+
+    def cancel(self) -> None:
+        """Stop collecting readings from the plugin."""
+        self.event.set()
+        self.calls.cancel()
+
+    async def get(self) -> Any:
+        """Get the next reading from the stream.
+
+        Returns:
+            The next reading, or the ``done`` sentinel if the stream is finished.
+        """
+        return await self.get_from(self.q)
+
+    @classmethod
+    async def get_from(cls, q: asyncio.Queue) -> Any:
+        """Get the next reading from a stream queue.
+
+        Raises:
+            errors.ServerError: A plugin stream writing to the queue failed.
+        """
+        item = await q.get()
+        if isinstance(item, errors.SynseError):
+            raise item
+        if isinstance(item, Exception):
             raise errors.ServerError(
                 'error while issuing gRPC request: read cache',
-            ) from e
+            ) from item
+        return item
+
+    def _collect(self, loop: asyncio.AbstractEventLoop, readings: Iterable) -> None:
+        """Collect readings from the plugin. This is run in an executor thread."""
+        with channels.track(self.calls):
+            for reading in readings:
+                # Important: we need to check if the event is set -- this allows
+                # collection to be stopped once the stream is cancelled.
+                if self.event.is_set():
+                    break
+                loop.call_soon_threadsafe(self._put, reading_to_dict(reading))
+
+    def _put(self, reading: Dict[str, Any]) -> None:
+        # Readings are handed over from the executor thread, so one may arrive
+        # after the stream has finished. It is dropped, since the consumer does
+        # not expect anything from the stream after the done sentinel.
+        if not self.finished:
+            self.q.put_nowait(reading)
+
+    async def run(self) -> None:
+        """Stream the cached readings from the plugin onto the queue."""
+        loop = asyncio.get_event_loop()
+        try:
+            with self.plugin as client:
+                try:
+                    fut = loop.run_in_executor(
+                        None,
+                        tracing.propagate(self._collect),
+                        loop,
+                        client.read_cache(start=self.start, end=self.end),
+                    )
+                    done, _ = await asyncio.wait({fut}, timeout=self.timeout)
+                    if not done:
+                        # The collection is abandoned, so retrieve its eventual
+                        # error (the cancelled call) to keep it from being logged.
+                        fut.add_done_callback(_discard_result)
+                        self.calls.cancel()
+                        raise asyncio.TimeoutError
+                    fut.result()
+
+                # A plugin exceeding its deadline is not indicative of a failure to
+                # communicate with it, so handle it here rather than letting the
+                # plugin context mark the plugin as inactive.
+                except (asyncio.TimeoutError, grpc.RpcError) as e:
+                    if isinstance(e, grpc.RpcError) and \
+                            e.code() != grpc.StatusCode.DEADLINE_EXCEEDED:
+                        raise
+                    logger.warning(
+                        'plugin exceeded read cache deadline, dropping remaining readings',
+                        plugin=self.plugin.tag, plugin_id=self.plugin.id, timeout=self.timeout,
+                    )
+        except Exception as e:
+            self.q.put_nowait(e)
+        finally:
+            self.event.set()
+            self.finished = True
+            self.q.put_nowait(self.done)
+
+
+def _discard_result(fut: asyncio.Future) -> None:
+    """Retrieve the result of an abandoned future, so an error it finishes
+    with is not reported as never retrieved.
+    """
+    if not fut.cancelled():
+        fut.exception()
 
 
 class Stream(threading.Thread):
@@ -284,7 +707,7 @@ class Stream(threading.Thread):
         """Run the thread."""
         logger.info('running Stream thread', plugin=self.plugin.id)
         try:
-            with self.plugin as client:
+            with self.plugin.stream() as client:
                 for reading in client.read_stream(devices=self.ids, tag_groups=self.tag_groups):
                     self.q.put(reading_to_dict(reading))
 
@@ -294,6 +717,8 @@ class Stream(threading.Thread):
                         logger.info('stream thread cancelled', plugin=self.plugin.id)
                         break
 
+        except errors.SynseError:
+            raise
         except Exception as e:
             raise errors.ServerError(
                 'error while issuing gRPC request: read stream',
@@ -336,7 +761,7 @@ async def read_stream(
     q = queue.Queue()
 
     threads = []
-    for p in plugin.manager:
+    for p in plugin.manager.select_all():
         if not p.active:
             logger.debug(
                 'plugin not active, will not read its devices',
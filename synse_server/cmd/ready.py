@@ -0,0 +1,49 @@
+
+import math
+from typing import Any, Dict
+
+from structlog import get_logger
+
+from synse_server import cache, config, plugin, utils
+
+logger = get_logger()
+
+
+async def ready() -> Dict[str, Any]:
+    """Generate the readiness response data.
+
+    Synse Server is ready once plugin discovery has run, the configured
+    fraction of the plugins are ready, and the device cache has been built
+    from the plugins. Plugins are registered in the background after the
+    server starts, so this can be used to hold off traffic until Synse Server
+    is able to serve device requests.
+
+    Returns:
+        A dictionary representation of the readiness response.
+    """
+    logger.info('issuing command', command='READY')
+
+    fraction = config.options.get('ready.plugins', 0.8)
+    expected = plugin.manager.expected
+
+    instances = [p for p in plugin.manager.all() if not p.disabled]
+    ready_count = len([p for p in instances if p.is_ready()])
+
+    # Plugins which have registered, e.g. via a discovery watch, since the last
+    # refresh are also expected to be ready.
+    total = max(expected or 0, len(instances))
+    required = math.ceil(fraction * total)
+
+    return {
+        'ready': expected is not None and ready_count >= required and cache.loaded,
+        'timestamp': utils.rfc3339now(),
+        'plugins': {
+            'ready': ready_count,
+            'expected': total,
+            'required': required,
+        },
+        'device_cache': {
+            'loaded': cache.loaded,
+            'stale': cache.stale,
+        },
+    }
@@ -4,7 +4,7 @@ from typing import Any, Dict, List
 from structlog import get_logger
 from synse_grpc import utils
 
-from synse_server import cache, errors
+from synse_server import cache, errors, timing
 
 logger = get_logger()
 
@@ -48,7 +48,8 @@ async def scan(
     if len(tag_groups) == 0:
         logger.debug('getting devices with no tag filter', command='SCAN')
         try:
-            devices = await cache.get_devices()
+            with timing.stage(timing.CACHE):
+                devices = await cache.get_devices()
         except Exception as e:
             logger.exception(e)
             raise errors.ServerError('failed to get all devices from cache') from e
@@ -66,7 +67,8 @@ async def scan(
                     group[i] = f'{ns}/{tag}'
 
             try:
-                device_group = await cache.get_devices(*group)
+                with timing.stage(timing.CACHE):
+                    device_group = await cache.get_devices(*group)
             except Exception as e:
                 logger.exception(e)
                 raise errors.ServerError('failed to get devices from cache') from e
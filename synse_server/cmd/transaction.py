@@ -34,8 +34,15 @@ async def transaction(transaction_id: str) -> Dict[str, Any]:
             f'malformed cached transaction ({transaction_id}): "plugin" not defined'
         )
 
-    p = plugin.manager.get(plugin_id)
+    # The transaction is only known to the plugin replica which processed the
+    # write, so if that replica is gone, no other replica can answer for it.
+    address = txn.get('address')
+    p = plugin.manager.get(plugin_id, address=address)
     if not p:
+        if address is not None and plugin.manager.get(plugin_id):
+            raise errors.NotFound(
+                f'plugin replica for transaction no longer registered: {plugin_id} @ {address}',
+            )
         raise errors.NotFound(
             f'plugin not found for transaction: {plugin_id}',
         )
@@ -47,6 +54,8 @@ async def transaction(transaction_id: str) -> Dict[str, Any]:
         )
         with p as client:
             response = client.transaction(transaction_id)
+    except errors.SynseError:
+        raise
     except Exception as e:
         raise errors.ServerError(
             'error while issuing gRPC request: transaction',
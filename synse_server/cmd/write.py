@@ -4,7 +4,7 @@ from typing import Any, Dict, List, Union
 from structlog import get_logger
 from synse_grpc import utils as grpc_utils
 
-from synse_server import cache, errors, utils
+from synse_server import cache, errors, log, timing, utils
 
 logger = get_logger()
 
@@ -24,21 +24,25 @@ async def write_async(device_id: str, payload: Union[Dict, List[Dict]]) -> List[
         command='WRITE ASYNC', device_id=device_id, payload=payload,
     )
 
-    plugin = await cache.get_plugin(device_id)
+    with timing.stage(timing.CACHE):
+        plugin = await cache.get_plugin(device_id)
     if plugin is None:
         raise errors.NotFound(
             f'plugin not found for device {device_id}',
         )
+    log.debug_scope(plugin=plugin.id, device=device_id)
 
     response = []
     try:
         with plugin as client:
             for txn in client.write_async(device_id=device_id, data=payload):
                 # Add the transaction to the cache
-                await cache.add_transaction(txn.id, txn.device, plugin.id)
+                await cache.add_transaction(txn.id, txn.device, plugin.id, plugin.address)
                 rsp = grpc_utils.to_dict(txn)
                 utils.normalize_write_ctx(rsp)
                 response.append(rsp)
+    except errors.SynseError:
+        raise
     except Exception as e:
         raise errors.ServerError(
             'error while issuing gRPC request: async write',
@@ -62,22 +66,26 @@ async def write_sync(device_id: str, payload: Union[Dict, List[Dict]]) -> List[D
         command='WRITE SYNC', device_id=device_id, payload=payload,
     )
 
-    plugin = await cache.get_plugin(device_id)
+    with timing.stage(timing.CACHE):
+        plugin = await cache.get_plugin(device_id)
     if plugin is None:
         raise errors.NotFound(
             f'plugin not found for device {device_id}',
         )
+    log.debug_scope(plugin=plugin.id, device=device_id)
 
     response = []
     try:
         with plugin as client:
             for status in client.write_sync(device_id=device_id, data=payload):
                 # Add the transaction to the cache
-                await cache.add_transaction(status.id, device_id, plugin.id)
+                await cache.add_transaction(status.id, device_id, plugin.id, plugin.address)
                 s = grpc_utils.to_dict(status)
                 s['device'] = device_id
                 utils.normalize_write_ctx(s)
                 response.append(s)
+    except errors.SynseError:
+        raise
     except Exception as e:
         raise errors.ServerError(
             'error while issuing gRPC request: sync write',
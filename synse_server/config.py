@@ -5,32 +5,103 @@ from bison import Bison, DictOption, ListOption, Option, Scheme
 # The Synse Server configuration scheme
 scheme = Scheme(
     Option('logging', default='debug', choices=['debug', 'info', 'warning', 'error', 'critical']),
+    Option('log_format', default='text', choices=['text', 'json']),
+    Option('log_async', default=True, field_type=bool),
+    DictOption('log_limits', required=False, scheme=Scheme(
+        Option('rate', default=0, field_type=(int, float)),  # events per second; 0 for no limit
+        Option('burst', default=10, field_type=int),
+        Option('level', default='debug', choices=['debug', 'info', 'warning']),  # highest limited
+        DictOption('sample', required=False, scheme=None),  # event: fraction of events to log
+    )),
+    DictOption('log_debug', required=False, scheme=Scheme(
+        ListOption('plugins', default=[], member_type=str),
+        ListOption('devices', default=[], member_type=str),
+    )),
     Option('pretty_json', default=True, field_type=bool),
     DictOption('plugin', default={}, scheme=Scheme(
         ListOption('tcp', default=[], member_type=str, bind_env=True),
         ListOption('unix', default=[], member_type=str, bind_env=True),
         DictOption('discover', required=False, bind_env=True, scheme=Scheme(
+            DictOption('file', required=False, bind_env=True, scheme=Scheme(
+                Option('path', required=False, bind_env=True, field_type=str),
+                Option('poll_interval', default=0.5, field_type=(int, float)),  # seconds
+            )),
             DictOption('kubernetes', required=False, bind_env=True, scheme=Scheme(
                 Option('namespace', required=False, bind_env=True, field_type=str),
+                Option('watch', default=False, bind_env=True, field_type=bool),
                 DictOption('endpoints', required=False, bind_env=True, scheme=Scheme(
                     DictOption('labels', bind_env=True, scheme=None)
                 )),
             ))
         )),
+        DictOption('health_check', required=False, scheme=Scheme(
+            Option('enabled', default=True, field_type=bool),
+            Option('interval', default=10, field_type=(int, float)),  # seconds
+            Option('jitter', default=0.2, field_type=float),  # fraction of the interval
+            Option('timeout', default=3, field_type=(int, float)),  # seconds
+            Option('failure_threshold', default=2, field_type=int),
+            Option('success_threshold', default=1, field_type=int),
+            Option('summary_ttl', default=5, field_type=(int, float)),  # seconds
+        )),
+        DictOption('hedging', required=False, scheme=Scheme(
+            Option('enabled', default=False, field_type=bool),
+            Option('percentile', default=0.95, field_type=float),
+            Option('delay', default=0.1, field_type=(int, float)),  # seconds
+        )),
+        DictOption('circuit_breaker', required=False, scheme=Scheme(
+            Option('enabled', default=True, field_type=bool),
+            Option('window', default=20, field_type=int),
+            Option('min_calls', default=5, field_type=int),
+            Option('error_rate', default=0.5, field_type=float),
+            Option('slow_call_duration', default=0, field_type=(int, float)),  # seconds; 0 disables
+            Option('slow_call_rate', default=1.0, field_type=float),
+            Option('reset_timeout', default=30, field_type=(int, float)),  # seconds
+        )),
     )),
     DictOption('cache', default=None, scheme=Scheme(
         DictOption('device', scheme=Scheme(
             Option('rebuild_every', default=180, field_type=int),  # three minutes
+            Option('refresh_debounce', default=0.5, field_type=(int, float)),  # seconds
+            DictOption('snapshot', required=False, scheme=Scheme(
+                Option('path', required=False, field_type=str),
+                Option('interval', default=60, field_type=int),  # one minute
+            )),
         )),
         DictOption('plugin', scheme=Scheme(
             Option('refresh_every', default=120, field_type=int),  # two minutes
+            Option('refresh_timeout', default=10, field_type=(int, float)),  # seconds
+            Option('refresh_concurrency', default=16, field_type=int),
         )),
         DictOption('transaction', scheme=Scheme(
             Option('ttl', default=300, field_type=int),  # five minutes
         ))
     )),
+    DictOption('ready', scheme=Scheme(
+        Option('plugins', default=0.8, field_type=(int, float)),  # fraction of plugins ready
+    )),
+    DictOption('read', scheme=Scheme(
+        Option('deadline', default=0, field_type=(int, float)),  # seconds; 0 for no deadline
+    )),
     DictOption('grpc', scheme=Scheme(
         Option('timeout', default=3, field_type=int),
+        Option('compression', default='none', choices=['none', 'deflate', 'gzip']),
+        Option('pool_size', default=1, field_type=int),  # channels per plugin
+        Option('max_send_message_size', required=False, field_type=int),  # bytes
+        Option('max_receive_message_size', required=False, field_type=int),  # bytes
+        DictOption('keepalive', required=False, scheme=Scheme(
+            Option('time', default=0, field_type=(int, float)),  # seconds; 0 disables
+            Option('timeout', default=20, field_type=(int, float)),  # seconds
+            Option('without_calls', default=False, field_type=bool),
+        )),
+        DictOption('adaptive_timeout', required=False, scheme=Scheme(
+            Option('enabled', default=False, field_type=bool),
+            Option('window', default=100, field_type=int),
+            Option('min_samples', default=20, field_type=int),
+            Option('percentile', default=0.99, field_type=float),
+            Option('factor', default=3, field_type=(int, float)),
+            Option('min', default=0.5, field_type=(int, float)),  # seconds
+            Option('max', required=False, field_type=(int, float)),  # seconds; <= grpc.timeout
+        )),
         DictOption('tls', required=False, bind_env=True, scheme=Scheme(
             Option('cert', field_type=str)
         ))
@@ -39,8 +110,30 @@ scheme = Scheme(
         Option('cert', bind_env=True, field_type=str),
         Option('key', bind_env=True, field_type=str),
     )),
+    DictOption('debug', required=False, scheme=Scheme(
+        Option('token', required=False, bind_env=True, field_type=str),  # enables debug endpoints
+        Option('max_profile_duration', default=60, field_type=(int, float)),  # seconds
+    )),
+    DictOption('tracing', required=False, scheme=Scheme(
+        Option('enabled', default=False, bind_env=True, field_type=bool),
+        Option('exporter', default='memory', field_type=str),  # memory, file, or import path
+        Option('path', required=False, field_type=str),  # file exporter output
+        Option('buffer', default=1000, field_type=int),  # spans kept by the memory exporter
+        Option('sample_rate', default=1.0, field_type=float),  # fraction of new traces
+    )),
+    DictOption('loop_monitor', required=False, scheme=Scheme(
+        Option('enabled', default=True, field_type=bool),
+        Option('interval', default=0.25, field_type=(int, float)),  # seconds
+        Option('threshold', default=0.5, field_type=(int, float)),  # seconds blocked
+    )),
     DictOption('metrics', scheme=Scheme(
         Option('enabled', default=False, bind_env=True, field_type=bool),
+        DictOption('http', required=False, scheme=Scheme(
+            Option('client_ip', default=False, field_type=bool),  # label by client IP
+            Option('path', default=False, field_type=bool),  # label by raw request path
+            Option('max_series', default=1000, field_type=int),  # per metric
+        )),
+        Option('server_timing', default=False, field_type=bool),  # Server-Timing header
     )),
 )
 
@@ -0,0 +1,193 @@
+"""Plugin discovery from a plugins file."""
+
+import asyncio
+import os
+from typing import Any, Callable, List, Optional, Tuple
+
+import yaml
+from structlog import get_logger
+
+from synse_server import config
+
+logger = get_logger()
+
+# A callback for changes to the discovered plugins, called with the added
+# and removed plugin configuration tuples.
+ChangeCallback = Callable[[List[Tuple[str, str]], List[Tuple[str, str]]], Any]
+
+# The file watcher used for file-based discovery, if it is running.
+watcher: Optional['FileWatcher'] = None
+
+
+def discover() -> List[Tuple[str, str]]:
+    """Discover plugins from the configured plugins file.
+
+    Returns:
+        A list of plugin configuration tuples where the first element is the
+        plugin address and the second element is the protocol.
+    """
+    # If the plugins file is being watched, the watcher already tracks the
+    # current set of plugins from the file.
+    if watcher is not None and watcher.synced:
+        logger.debug('using plugins from plugins file watch')
+        return watcher.plugins
+
+    path = config.options.get('plugin.discover.file.path')
+    if not path:
+        logger.debug('plugin discovery via file is disabled')
+        return []
+
+    logger.info('plugin discovery via file is enabled', path=path)
+    return read(path)
+
+
+def read(path: str) -> List[Tuple[str, str]]:
+    """Read the plugins defined in a plugins file.
+
+    The plugins file is YAML and takes the same form as the ``plugin``
+    configuration, e.g.
+
+        tcp:
+        - 10.1.2.3:5001
+        unix:
+        - /tmp/synse/plugin.sock
+
+    Args:
+        path: The path to the plugins file.
+
+    Returns:
+        A list of plugin configuration tuples where the first element is the
+        plugin address and the second element is the protocol.
+
+    Raises:
+        ValueError: The plugins file is not correctly formatted.
+    """
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+
+    if not isinstance(data, dict):
+        raise ValueError(f'plugins file must define a mapping of protocol to addresses: {path}')
+
+    plugins = []
+    for protocol in ('tcp', 'unix'):
+        addresses = data.get(protocol) or []
+        if not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses):
+            raise ValueError(f'plugins file "{protocol}" must be a list of addresses: {path}')
+
+        for address in addresses:
+            if (address, protocol) not in plugins:
+                plugins.append((address, protocol))
+
+    logger.debug('read plugins from file', path=path, plugins=plugins)
+    return plugins
+
+
+class FileWatcher:
+    """Discover plugins by watching a plugins file for changes.
+
+    The watcher polls the file's status and re-reads it whenever it changes,
+    so it works on any filesystem (including ConfigMap volume mounts, which
+    are updated via symlink swap). Whenever the set of plugins defined in the
+    file changes, the ``on_change`` callback is awaited with the plugins which
+    were added and removed.
+
+    If the file is missing or cannot be parsed, the previously read set of
+    plugins is kept, so a partially written file does not cause plugins to
+    be removed.
+
+    Args:
+        path: The path to the plugins file.
+        on_change: A coroutine function which is awaited with the lists of
+            added and removed plugin configuration tuples whenever the set of
+            plugins changes.
+        interval: The interval, in seconds, at which to check the file for changes.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            on_change: Optional[ChangeCallback] = None,
+            interval: float = 0.5,
+    ) -> None:
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+
+        self.plugins: List[Tuple[str, str]] = []
+        self.synced = False
+
+        self._stat: Optional[Tuple[int, int, int, float]] = None
+        self._stopped = False
+
+    @classmethod
+    def from_config(
+            cls,
+            on_change: Optional[ChangeCallback] = None,
+    ) -> Optional['FileWatcher']:
+        """Create a file watcher from the file discovery configuration.
+
+        Returns:
+            The file watcher, or None if file-based discovery is not configured.
+        """
+        path = config.options.get('plugin.discover.file.path')
+        if not path:
+            return None
+
+        return cls(
+            path=path,
+            on_change=on_change,
+            interval=config.options.get('plugin.discover.file.poll_interval') or 0.5,
+        )
+
+    async def run(self) -> None:
+        """Run the watcher until it is stopped.
+
+        This should be run as a background task.
+        """
+        logger.info('starting plugins file watch', path=self.path, interval=self.interval)
+        while not self._stopped:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def stop(self) -> None:
+        """Stop the watcher."""
+        self._stopped = True
+
+    async def check(self) -> None:
+        """Check the plugins file for changes, updating the tracked plugins
+        if it has changed.
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if self._stat is not None:
+                logger.warning('unable to stat plugins file', path=self.path, error=e)
+                self._stat = None
+            return
+
+        stat = (st.st_ino, st.st_dev, st.st_size, st.st_mtime)
+        if stat == self._stat:
+            return
+        self._stat = stat
+
+        try:
+            plugins = read(self.path)
+        except Exception as e:
+            logger.warning('failed to read plugins file', path=self.path, error=e)
+            return
+
+        previous = self.plugins
+        self.plugins = plugins
+        self.synced = True
+
+        added = [p for p in plugins if p not in previous]
+        removed = [p for p in previous if p not in plugins]
+        if not added and not removed:
+            return
+
+        logger.info('plugins file changed', path=self.path, added=added, removed=removed)
+        if self.on_change is not None:
+            try:
+                await self.on_change(added, removed)
+            except Exception as e:
+                logger.error('failed to update plugins for plugins file change', error=e)
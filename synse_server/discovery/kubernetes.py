@@ -1,15 +1,25 @@
-"""Service discovery for plugins using Kubernetes."""
+"""Service discovery for plugins using Kubernetes.
 
-from typing import List
+The Kubernetes client is large and slow to import, so it is only imported
+once Kubernetes discovery is actually used.
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
-import kubernetes.client
-import kubernetes.config
 from structlog import get_logger
 
-from synse_server import config
+from synse_server import backoff, config
+
+if TYPE_CHECKING:
+    import kubernetes.client
+    import kubernetes.watch
 
 logger = get_logger()
 
+# The endpoint watcher used for watch-based discovery, if it is running.
+watcher: Optional['EndpointWatcher'] = None
+
 
 def discover() -> List[str]:
     """Discover plugins for kubernetes based on the kubernetes service
@@ -21,6 +31,12 @@ def discover() -> List[str]:
     """
     addresses = []
 
+    # If watch-based discovery is running and has synced with the API server, the
+    # watcher already tracks the current set of endpoint addresses.
+    if watcher is not None and watcher.synced:
+        logger.debug('using plugin addresses from Kubernetes endpoint watch')
+        return watcher.addresses
+
     cfg = config.options.get('plugin.discover.kubernetes')
     if not cfg:
         logger.debug('plugin discovery via Kubernetes is disabled')
@@ -54,6 +70,19 @@ def discover() -> List[str]:
     return addresses
 
 
+def _label_selector(labels: Dict[str, str]) -> str:
+    """Get the label selector string for the configured endpoint labels.
+
+    Each label is specified in the config as a key-value pair. Here, we
+    want to take each pair and join them into the appropriate label selector
+    string. For example,
+      app: synse
+      component: plugin
+    would become the selector string: 'app=synse,component=plugin'
+    """
+    return ','.join([f'{k}={v}' for k, v in labels.items()])
+
+
 def _register_from_endpoints(ns: str, cfg: dict) -> List[str]:
     """Register plugins with Synse Server discovered via kubernetes
     service endpoints.
@@ -87,110 +116,360 @@ def _register_from_endpoints(ns: str, cfg: dict) -> List[str]:
         )
         return found
 
-    # Each label is specified in the config as a key-value pair. Here, we
-    # want to take each pair and join them into the appropriate label selector
-    # string. For example,
-    #   app: synse
-    #   component: plugin
-    # would become the selector string: 'app=synse,component=plugin'
-    label_selector = ','.join([f'{k}={v}' for k, v in labels.items()])
+    label_selector = _label_selector(labels)
 
     # Now, we can create a kubernetes client and search for endpoints with
     # the corresponding config.
+    import kubernetes.client
+    import kubernetes.config
+
     kubernetes.config.load_incluster_config()
     v1 = kubernetes.client.CoreV1Api()
 
     logger.debug('listing Kubernetes endpoint', namespace=ns, label_selector=label_selector)
     endpoints = v1.list_namespaced_endpoints(namespace=ns, label_selector=label_selector)
 
-    # Now we parse out the endpoints to get the routing info to a plugin.
-    # There are some assumptions here:
-    #  - The port must have the name 'http'
     for endpoint in endpoints.items:
-        name = endpoint.metadata.name
-        logger.debug('discovered matching Endpoint', name=name)
+        found.extend(_endpoint_addresses(endpoint))
 
-        for i, subset in enumerate(endpoint.subsets):
-            logger.debug('parsing EndpointSubset')
-            ips = []
-            port = None
+    if not found:
+        logger.debug('no plugins found via Kubernetes Endpoints', labels=labels)
+    else:
+        logger.info('found plugins via Kubernetes Endpoints', count=len(found))
 
-            addresses = subset.addresses
-            if not addresses:
-                logger.debug('no addresses for EndpointSubset - skipping', name=name, subset=i)
-                continue
+    return found
 
-            # Iterate over all of the addresses. If there are multiple instances of a plugin
-            # sitting behind a service, e.g. a DaemonSet or Deployment with replica count > 1,
-            # then we will want to reach all of the plugins.
-            logger.debug('collecting available addresses for EndpointSubset',
-                         name=name, subset=i)
-            for address in addresses:
-                logger.debug(
-                    'parsing EndpointAddress',
-                    name=name, hostname=address.hostname, ip=address.ip,
-                    node=address.node_name, subset=i,
-                )
-                ref = address.target_ref
-                if ref is None:
-                    logger.debug('address has no target_ref - skipping', name=name, subset=i)
-                    continue
 
-                kind = ref.kind
-                if kind.lower() != 'pod':
-                    logger.debug('address is not a Pod address - skipping',
-                                 name=name, kind=kind, subset=i)
-                    continue
+def _endpoint_addresses(endpoint: 'kubernetes.client.V1Endpoints') -> List[str]:
+    """Get the plugin addresses exposed by a Kubernetes Endpoints resource.
 
-                ips.append(address.ip)
+    Args:
+        endpoint: The Endpoints resource to get the plugin addresses from.
 
-            # If we don't have any IPs yet, there is no point in getting the port for
-            # for this subset, so just continue.
-            if not ips:
-                logger.debug('no IPs found for EndpointSubset - skipping', name=name, subset=i)
-                continue
+    Returns:
+        A list of host:port addresses for the plugins behind the endpoint.
+    """
+    found = []
 
-            logger.debug('found IPs for EndpointSubset', ips=ips)
+    # Now we parse out the endpoints to get the routing info to a plugin.
+    # There are some assumptions here:
+    #  - The port must have the name 'http'
+    name = endpoint.metadata.name
+    logger.debug('discovered matching Endpoint', name=name)
+
+    for i, subset in enumerate(endpoint.subsets or []):
+        logger.debug('parsing EndpointSubset')
+        ips = []
+        port = None
+
+        addresses = subset.addresses
+        if not addresses:
+            logger.debug('no addresses for EndpointSubset - skipping', name=name, subset=i)
+            continue
+
+        # Iterate over all of the addresses. If there are multiple instances of a plugin
+        # sitting behind a service, e.g. a DaemonSet or Deployment with replica count > 1,
+        # then we will want to reach all of the plugins.
+        logger.debug('collecting available addresses for EndpointSubset',
+                     name=name, subset=i)
+        for address in addresses:
+            logger.debug(
+                'parsing EndpointAddress',
+                name=name, hostname=address.hostname, ip=address.ip,
+                node=address.node_name, subset=i,
+            )
+            ref = address.target_ref
+            if ref is None:
+                logger.debug('address has no target_ref - skipping', name=name, subset=i)
+                continue
 
-            # Parse the ports. If there is only one port, use that port. Otherwise, use the
-            # port named 'http'.
-            ports = subset.ports
-            if not ports:
-                logger.debug('no ports for EndpointSubset - skipping', name=name, subset=i)
+            kind = ref.kind
+            if kind.lower() != 'pod':
+                logger.debug('address is not a Pod address - skipping',
+                             name=name, kind=kind, subset=i)
                 continue
 
-            if len(ports) == 1:
-                port = ports[0].port
+            ips.append(address.ip)
+
+        # If we don't have any IPs yet, there is no point in getting the port for
+        # for this subset, so just continue.
+        if not ips:
+            logger.debug('no IPs found for EndpointSubset - skipping', name=name, subset=i)
+            continue
+
+        logger.debug('found IPs for EndpointSubset', ips=ips)
+
+        # Parse the ports. If there is only one port, use that port. Otherwise, use the
+        # port named 'http'.
+        ports = subset.ports
+        if not ports:
+            logger.debug('no ports for EndpointSubset - skipping', name=name, subset=i)
+            continue
+
+        if len(ports) == 1:
+            port = ports[0].port
+            logger.debug(
+                'found single port for EndpointSubset',
+                subset=i, name=ports[0].name, protocol=ports[0].protocol, port=port,
+            )
+        else:
+            # Search for a port with name 'http'
+            logger.debug('found multiple ports - searching for port named "http"')
+            for p in ports:
+                logger.debug('found port', subset=i, name=p.name)
+                if p.name != 'http':
+                    logger.debug('skipping port - does not match')
+                    continue
+
                 logger.debug(
-                    'found single port for EndpointSubset',
-                    subset=i, name=ports[0].name, protocol=ports[0].protocol, port=port,
+                    'found port name "http"',
+                    subset=i, name=p.name, port=p.port, protocol=p.protocol,
                 )
-            else:
-                # Search for a port with name 'http'
-                logger.debug('found multiple ports - searching for port named "http"')
-                for p in ports:
-                    logger.debug('found port', subset=i, name=p.name)
-                    if p.name != 'http':
-                        logger.debug('skipping port - does not match')
-                        continue
-
-                    logger.debug(
-                        'found port name "http"',
-                        subset=i, name=p.name, port=p.port, protocol=p.protocol,
-                    )
-                    port = p.port
-                    break
-
-            # If we have addresses and we have a port, we can register those endpoints
-            # as plugins. Otherwise, we move on.
-            if ips and port is not None:
-                for ip in ips:
-                    logger.info('discovered plugin via Endpoint', name=name, ip=ip, port=port)
-                    found.append(f'{ip}:{port}')
+                port = p.port
+                break
 
-    if not found:
-        logger.debug('no plugins found via Kubernetes Endpoints', labels=labels)
-    else:
-        logger.info('found plugins via Kubernetes Endpoints', count=len(found))
+        # If we have addresses and we have a port, we can register those endpoints
+        # as plugins. Otherwise, we move on.
+        if ips and port is not None:
+            for ip in ips:
+                logger.info('discovered plugin via Endpoint', name=name, ip=ip, port=port)
+                found.append(f'{ip}:{port}')
 
     return found
+
+
+class EndpointWatcher:
+    """Discover plugins by watching Kubernetes service endpoints.
+
+    Rather than listing the endpoints on every plugin refresh, the watcher lists
+    them once and then follows a watch stream of changes to them, maintaining
+    the set of plugin addresses locally. If the watch expires (HTTP 410 Gone),
+    the endpoints are listed again and the watch resumes from the new resource
+    version. Whenever the set of plugin addresses changes, the ``on_change``
+    callback is awaited with the addresses which were added and removed.
+
+    Args:
+        ns: The namespace to watch endpoints in.
+        label_selector: The label selector for the endpoints to watch.
+        on_change: A coroutine function which is awaited with the lists of
+            added and removed addresses whenever the set of addresses changes.
+        api: The CoreV1Api to use. If not given, one is created from the
+            in-cluster config when the watcher starts.
+        new_watch: A function which creates the watch used for streaming
+            endpoint events. A new watch is created each time the watch is
+            (re)established. If not given, ``kubernetes.watch.Watch`` is used.
+        timeout: The duration, in seconds, of each watch request before it is
+            re-established.
+    """
+
+    def __init__(
+            self,
+            ns: str,
+            label_selector: str,
+            on_change: Optional[Callable[[List[str], List[str]], Any]] = None,
+            api: Optional['kubernetes.client.CoreV1Api'] = None,
+            new_watch: Optional[Callable[[], 'kubernetes.watch.Watch']] = None,
+            timeout: int = 300,
+    ) -> None:
+        self.ns = ns
+        self.label_selector = label_selector
+        self.on_change = on_change
+        self.api = api
+        self.new_watch = new_watch
+        self.timeout = timeout
+
+        # The watch for the current watch request, if any.
+        self.watch: Optional['kubernetes.watch.Watch'] = None
+
+        # The plugin addresses for each watched endpoint, by endpoint name.
+        self.endpoints: Dict[str, List[str]] = {}
+        self.resource_version: Optional[str] = None
+        self.synced = False
+
+        self._stopped = False
+        self._bo = backoff.ExponentialBackoff()
+
+    @classmethod
+    def from_config(
+            cls,
+            on_change: Optional[Callable[[List[str], List[str]], Any]] = None,
+    ) -> Optional['EndpointWatcher']:
+        """Create an endpoint watcher from the Kubernetes discovery configuration.
+
+        Returns:
+            The endpoint watcher, or None if watch-based Kubernetes discovery is
+            not configured.
+        """
+        cfg = config.options.get('plugin.discover.kubernetes')
+        if not cfg or not cfg.get('watch'):
+            return None
+
+        labels = (cfg.get('endpoints') or {}).get('labels')
+        if not labels:
+            logger.warning(
+                'found no configured labels for plugin discovery via Kubernetes Endpoints',
+            )
+            return None
+
+        return cls(
+            ns=cfg.get('namespace') or 'default',
+            label_selector=_label_selector(labels),
+            on_change=on_change,
+        )
+
+    @property
+    def addresses(self) -> List[str]:
+        """The addresses of all plugins currently exposed by the watched endpoints."""
+        return sorted({a for addresses in self.endpoints.values() for a in addresses})
+
+    async def run(self) -> None:
+        """Run the watcher until it is stopped.
+
+        This should be run as a background task.
+        """
+        logger.info(
+            'starting Kubernetes endpoint watch',
+            namespace=self.ns, label_selector=self.label_selector,
+        )
+        import kubernetes.client
+        import kubernetes.config
+
+        if self.api is None:
+            kubernetes.config.load_incluster_config()
+            self.api = kubernetes.client.CoreV1Api()
+
+        while not self._stopped:
+            try:
+                if self.resource_version is None:
+                    await self._list()
+                await self._watch()
+            except kubernetes.client.rest.ApiException as e:
+                if e.status == 410:
+                    logger.info('Kubernetes endpoint watch expired, relisting', error=e.reason)
+                    self.resource_version = None
+                    continue
+                await self._backoff(e)
+            except Exception as e:
+                await self._backoff(e)
+
+    def stop(self) -> None:
+        """Stop the watcher."""
+        self._stopped = True
+        if self.watch is not None:
+            self.watch.stop()
+
+    async def _backoff(self, error: Exception) -> None:
+        delay = self._bo.delay()
+        logger.warning('failed to watch Kubernetes endpoints, retrying', error=error, delay=delay)
+        await asyncio.sleep(delay)
+
+    async def _list(self) -> None:
+        """List the watched endpoints to (re)build the set of plugin addresses."""
+        logger.debug(
+            'listing Kubernetes endpoints', namespace=self.ns, label_selector=self.label_selector,
+        )
+        endpoints = await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: self.api.list_namespaced_endpoints(
+                namespace=self.ns, label_selector=self.label_selector,
+            ),
+        )
+
+        previous = self.addresses
+        self.endpoints = {e.metadata.name: _endpoint_addresses(e) for e in endpoints.items}
+        self.resource_version = endpoints.metadata.resource_version
+        self.synced = True
+        await self._notify(previous)
+
+    async def _watch(self) -> None:
+        """Follow the endpoint watch stream, applying each event as it is received.
+
+        The watch stream is blocking, so it is consumed in the default executor.
+        Events are handed back to the event loop, in order, to be applied.
+        """
+        loop = asyncio.get_event_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        # A watch is not reused across requests: restarting its stream resets
+        # its stop flag, so the consumer of the previous stream could keep its
+        # HTTP connection open until the server times it out.
+        if self.new_watch is None:
+            import kubernetes.watch
+            self.new_watch = kubernetes.watch.Watch
+        watch = self.watch = self.new_watch()
+
+        def consume():
+            try:
+                for event in watch.stream(
+                        self.api.list_namespaced_endpoints,
+                        namespace=self.ns,
+                        label_selector=self.label_selector,
+                        resource_version=self.resource_version,
+                        timeout_seconds=self.timeout,
+                        allow_watch_bookmarks=True,
+                ):
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+                    if self._stopped:
+                        break
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, done)
+
+        loop.run_in_executor(None, consume)
+        try:
+            while True:
+                event = await events.get()
+                if event is done:
+                    return
+                if isinstance(event, Exception):
+                    raise event
+                await self._apply(event)
+                # The stream is healthy, so later failures back off afresh.
+                self._bo.reset()
+        except BaseException:
+            watch.stop()
+            raise
+
+    async def _apply(self, event: Dict[str, Any]) -> None:
+        """Apply a watch event to the tracked endpoints."""
+        kind = event['type']
+        if kind == 'ERROR':
+            import kubernetes.client
+
+            status = event.get('raw_object') or {}
+            raise kubernetes.client.rest.ApiException(
+                status=status.get('code'), reason=status.get('message'),
+            )
+
+        if kind == 'BOOKMARK':
+            raw = event.get('raw_object') or {}
+            self.resource_version = raw.get('metadata', {}).get('resourceVersion')
+            return
+
+        endpoint = event['object']
+        self.resource_version = endpoint.metadata.resource_version
+
+        previous = self.addresses
+        name = endpoint.metadata.name
+        if kind == 'DELETED':
+            self.endpoints.pop(name, None)
+        else:
+            self.endpoints[name] = _endpoint_addresses(endpoint)
+        logger.debug('applied Kubernetes endpoint event', type=kind, name=name)
+        await self._notify(previous)
+
+    async def _notify(self, previous: List[str]) -> None:
+        current = self.addresses
+        added = [a for a in current if a not in previous]
+        removed = [a for a in previous if a not in current]
+        if not added and not removed:
+            return
+
+        logger.info('plugin endpoints changed', added=added, removed=removed)
+        if self.on_change is not None:
+            try:
+                await self.on_change(added, removed)
+            except Exception as e:
+                logger.error('failed to update plugins for endpoint change', error=e)
@@ -81,6 +81,17 @@ class InvalidUsage(SynseError):
     description = 'invalid user input'
 
 
+class Unauthorized(SynseError):
+    """The request was not authorized.
+
+    This occurs when a request to a restricted endpoint (e.g. a debug endpoint)
+    does not provide the configured credentials.
+    """
+
+    http_code = 401
+    description = 'unauthorized'
+
+
 class NotFound(SynseError):
     """The requested resource was not found.
 
@@ -105,6 +116,17 @@ class UnsupportedAction(SynseError):
     description = 'device action not supported'
 
 
+class Conflict(SynseError):
+    """The request conflicts with the current state of the server.
+
+    This occurs when an operation which may only run one at a time, such as
+    a profile of the server, is requested while it is already running.
+    """
+
+    http_code = 409
+    description = 'request conflicts with server state'
+
+
 class ServerError(SynseError):
     """The request failed for a non-specific reason.
 
@@ -117,6 +139,18 @@ class ServerError(SynseError):
     description = 'error processing the request'
 
 
+class PluginUnavailable(ServerError):
+    """The plugin is not currently accepting requests.
+
+    This occurs when the circuit breaker for a plugin is open due to a high
+    rate of failed or slow requests to it. Requests to the plugin are rejected
+    immediately until the breaker allows a trial request through.
+    """
+
+    http_code = 503
+    description = 'plugin unavailable'
+
+
 class ClientCreateError(ServerError):
     """Synse Server was unable to create a client (e.g. gRPC).
 
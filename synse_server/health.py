@@ -0,0 +1,333 @@
+"""Background health monitoring of registered plugins."""
+
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from structlog import get_logger
+from synse_grpc import api
+
+from synse_server import breaker, config, plugin, utils
+from synse_server.metrics import Monitor
+from synse_server.timeouts import LatencyTracker
+
+logger = get_logger()
+
+# The health monitor for registered plugins, if it is running.
+monitor: Optional['HealthMonitor'] = None
+
+# The cached health summary of the registered plugins, once created.
+summary: Optional['HealthSummary'] = None
+
+
+class PluginHealth:
+    """The health check state for a single plugin instance.
+
+    Attributes:
+        status: The health status of the plugin, one of "unknown" (not yet
+            checked), "healthy", or "unhealthy".
+        failures: The number of consecutive failed checks.
+        successes: The number of consecutive successful checks.
+        last_checked: The RFC3339 timestamp of the most recent check.
+        last_error: The error from the most recent failed check.
+        latency: Tracks the latency of successful checks.
+    """
+
+    UNKNOWN = 'unknown'
+    HEALTHY = 'healthy'
+    UNHEALTHY = 'unhealthy'
+
+    def __init__(self) -> None:
+        self.status = self.UNKNOWN
+        self.failures = 0
+        self.successes = 0
+        self.last_checked: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.latency = LatencyTracker(window=100, min_samples=1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a dictionary representation of the health check state."""
+        return {
+            'status': self.status,
+            'failures': self.failures,
+            'last_checked': self.last_checked,
+            'last_error': self.last_error,
+            'latency': {
+                'p50': self.latency.quantile(0.5),
+                'p99': self.latency.quantile(0.99),
+            },
+        }
+
+
+class HealthMonitor:
+    """Periodically probe all registered plugins, updating their active state.
+
+    Each plugin instance (including replicas) is probed with the plugin Test
+    request on every interval. Probes are spread across the start of the
+    interval by a random jitter so that plugins are not all probed at once.
+    A plugin is marked inactive once it fails the configured number of
+    consecutive checks, and active once it passes the configured number of
+    consecutive checks.
+
+    Since dead plugins are detected by the monitor, a failed request does not
+    start a reconnect task for the plugin while the monitor is running.
+
+    Args:
+        interval: The time, in seconds, between checks of each plugin.
+        jitter: The fraction (0-1) of the interval over which the probes
+            of each check round are randomly spread.
+        timeout: The time, in seconds, to wait for a plugin to respond.
+        failure_threshold: The number of consecutive failed checks after
+            which a plugin is marked inactive.
+        success_threshold: The number of consecutive successful checks
+            after which an inactive plugin is marked active.
+    """
+
+    def __init__(
+            self,
+            interval: float = 10,
+            jitter: float = 0.2,
+            timeout: float = 3,
+            failure_threshold: int = 2,
+            success_threshold: int = 1,
+    ) -> None:
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.success_threshold = success_threshold
+
+        self.states: Dict[Tuple[str, str], PluginHealth] = {}
+        self._stopped = False
+
+    @classmethod
+    def from_config(cls) -> Optional['HealthMonitor']:
+        """Create a health monitor from the plugin health check configuration.
+
+        Returns:
+            The health monitor, or None if health monitoring is disabled.
+        """
+        cfg = config.options.get('plugin.health_check') or {}
+        if not cfg.get('enabled', True):
+            return None
+
+        return cls(
+            interval=cfg.get('interval', 10),
+            jitter=cfg.get('jitter', 0.2),
+            timeout=cfg.get('timeout', 3),
+            failure_threshold=cfg.get('failure_threshold', 2),
+            success_threshold=cfg.get('success_threshold', 1),
+        )
+
+    def get(self, p: plugin.Plugin) -> PluginHealth:
+        """Get the health check state of a plugin instance."""
+        key = (p.id, p.address)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = PluginHealth()
+        return state
+
+    async def run(self) -> None:
+        """Run the health monitor until it is stopped.
+
+        This should be run as a background task.
+        """
+        logger.info('starting plugin health monitor', interval=self.interval, jitter=self.jitter)
+        plugin.Plugin.reconnect_on_error = False
+        try:
+            while not self._stopped:
+                await self.check()
+                await asyncio.sleep(self.interval)
+        finally:
+            plugin.Plugin.reconnect_on_error = True
+
+    def stop(self) -> None:
+        """Stop the health monitor."""
+        self._stopped = True
+
+    async def check(self) -> None:
+        """Check all registered plugin instances, concurrently."""
+        plugins = [p for p in plugin.manager.all() if not p.disabled]
+
+        # Drop the state of plugin instances which are no longer registered.
+        registered = {(p.id, p.address) for p in plugins}
+        for key in list(self.states):
+            if key not in registered:
+                del self.states[key]
+
+        await asyncio.gather(
+            *[self._check_later(p) for p in plugins],
+            return_exceptions=True,
+        )
+
+    async def _check_later(self, p: plugin.Plugin) -> None:
+        if self.jitter:
+            await asyncio.sleep(random.uniform(0, self.jitter * self.interval))
+        await self.probe(p)
+
+    async def probe(self, p: plugin.Plugin) -> PluginHealth:
+        """Probe a plugin instance and update its health and active state.
+
+        Args:
+            p: The plugin instance to probe.
+
+        Returns:
+            The updated health check state of the plugin.
+        """
+        state = self.get(p)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                asyncio.get_event_loop().run_in_executor(None, p.client.test),
+                self.timeout,
+            )
+        except Exception as e:
+            self._failed(p, state, e)
+        else:
+            self._succeeded(p, state, time.monotonic() - start)
+
+        state.last_checked = utils.rfc3339now()
+        return state
+
+    def _succeeded(self, p: plugin.Plugin, state: PluginHealth, latency: float) -> None:
+        state.latency.record(latency)
+        state.failures = 0
+        state.successes += 1
+        state.last_error = None
+        Monitor.plugin_health_check_latency.labels(p.id).observe(latency)
+        self._resolve_trial(p, success=True, duration=latency)
+
+        if state.successes >= self.success_threshold:
+            if state.status != PluginHealth.HEALTHY:
+                logger.info('plugin health check passing', id=p.id, addr=p.address)
+            state.status = PluginHealth.HEALTHY
+            p.mark_active()
+
+    def _failed(self, p: plugin.Plugin, state: PluginHealth, error: Exception) -> None:
+        state.successes = 0
+        state.failures += 1
+        state.last_error = str(error) or type(error).__name__
+        Monitor.plugin_health_check_failures.labels(p.id).inc()
+        self._resolve_trial(p, success=False)
+
+        if state.failures >= self.failure_threshold:
+            if state.status != PluginHealth.UNHEALTHY:
+                logger.warning(
+                    'plugin health check failing',
+                    id=p.id, addr=p.address, failures=state.failures, error=state.last_error,
+                )
+            state.status = PluginHealth.UNHEALTHY
+            p.mark_inactive()
+
+    @staticmethod
+    def _resolve_trial(p: plugin.Plugin, success: bool, duration: float = 0) -> None:
+        # A probe does not go through the plugin's circuit breaker, but while the
+        # breaker is half-open it serves as the trial call, so the breaker does not
+        # stay half-open when no requests are being made to the plugin.
+        if p.breaker is not None and p.breaker.state == breaker.CircuitBreaker.HALF_OPEN:
+            p.breaker.record(success=success, duration=duration)
+
+
+class HealthSummary:
+    """A cache of the health reported by each registered plugin.
+
+    The plugin health endpoint is polled frequently, so rather than asking
+    every plugin for its health on each request, the results are cached.
+    Once they are older than the TTL, the cached results are still returned
+    while all plugins are asked for their health again, concurrently, in the
+    background. Only the first request, before anything is cached, waits on
+    the plugins.
+
+    Args:
+        ttl: The time, in seconds, for which the cached results are fresh.
+        timeout: The time, in seconds, to wait for a plugin to respond.
+    """
+
+    def __init__(self, ttl: float = 5, timeout: float = 3) -> None:
+        self.ttl = ttl
+        self.timeout = timeout
+
+        # The health reported by each plugin, by plugin ID. The health is
+        # None if the plugin could not be reached.
+        self.results: Dict[str, Optional[api.V3Health]] = {}
+        self.updated: Optional[str] = None
+        self._refreshed: Optional[float] = None
+        self._refresh: Optional[asyncio.Future] = None
+
+    @classmethod
+    def from_config(cls) -> 'HealthSummary':
+        """Create a health summary cache from the plugin health check configuration."""
+        cfg = config.options.get('plugin.health_check') or {}
+        return cls(
+            ttl=cfg.get('summary_ttl', 5),
+            timeout=cfg.get('timeout', 3),
+        )
+
+    def is_fresh(self) -> bool:
+        """Check whether the cached results are within their TTL."""
+        if self._refreshed is None:
+            return False
+        return time.monotonic() - self._refreshed < self.ttl
+
+    def clear(self) -> None:
+        """Clear the cached results."""
+        self.results = {}
+        self.updated = None
+        self._refreshed = None
+        self._refresh = None
+
+    async def get(self) -> Dict[str, Optional[api.V3Health]]:
+        """Get the cached plugin health, refreshing it if it is stale.
+
+        Returns:
+            The health reported by each plugin, by plugin ID.
+        """
+        # Wait on the plugins if nothing is cached for them yet, e.g. on the
+        # first request or once a new plugin is registered.
+        if self._refreshed is None or any(p.id not in self.results for p in plugin.manager):
+            await self.refresh()
+        elif not self.is_fresh():
+            self.refresh()
+        return self.results
+
+    def refresh(self) -> asyncio.Future:
+        """Refresh the cached plugin health in the background.
+
+        If a refresh is already in progress, no new one is started.
+
+        Returns:
+            A future which completes once the cached results are refreshed.
+        """
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._update())
+        return self._refresh
+
+    async def _update(self) -> None:
+        plugins = list(plugin.manager)
+        results = await asyncio.gather(*[self._fetch(p) for p in plugins])
+
+        self.results = {p.id: h for p, h in zip(plugins, results)}
+        self.updated = utils.rfc3339now()
+        self._refreshed = time.monotonic()
+
+    async def _fetch(self, p: plugin.Plugin) -> Optional[api.V3Health]:
+        try:
+            with p as client:
+                return await asyncio.wait_for(
+                    asyncio.get_event_loop().run_in_executor(None, client.health),
+                    self.timeout,
+                )
+        except Exception as e:
+            logger.warning('failed to get plugin health', plugin=p.tag, error=e)
+            return None
+
+
+def get_summary() -> HealthSummary:
+    """Get the cached health summary of the registered plugins, creating it
+    from the configuration on first use.
+    """
+    global summary
+    if summary is None:
+        summary = HealthSummary.from_config()
+    return summary
@@ -0,0 +1,126 @@
+"""Event loop lag monitoring and blocking call detection.
+
+Synse Server makes some blocking calls (e.g. gRPC requests to plugins) from
+the event loop thread. While such a call runs, no other request is served,
+which shows up as a latency spike with no obvious cause. The loop monitor
+measures how late the event loop is in running a scheduled callback, and a
+watchdog thread logs the stack of the event loop thread whenever it has been
+blocked for longer than a threshold, so the blocking call can be found.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from structlog import get_logger
+
+from synse_server import config
+from synse_server.metrics import Monitor
+
+logger = get_logger()
+
+
+class LoopMonitor:
+    """Measure event loop lag and detect callbacks which block the loop.
+
+    The monitor sleeps for the interval and records how much longer than the
+    interval it took to be woken up. Each wake up is a heartbeat; a watchdog
+    thread checks the heartbeat and, if the loop has not woken up within the
+    interval plus the threshold, logs the stack the event loop thread is
+    currently executing. A stall is only logged once, however long it lasts.
+
+    Args:
+        interval: The time, in seconds, between lag measurements.
+        threshold: The time, in seconds, beyond the interval after which the
+            event loop is considered blocked.
+    """
+
+    def __init__(self, interval: float = 0.25, threshold: float = 0.5) -> None:
+        self.interval = interval
+        self.threshold = threshold
+
+        self.heartbeat = time.monotonic()
+        self._thread_id: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_config(cls) -> Optional['LoopMonitor']:
+        """Create a loop monitor from the loop monitor configuration.
+
+        Returns:
+            The loop monitor, or None if loop monitoring is disabled.
+        """
+        cfg = config.options.get('loop_monitor') or {}
+        if not cfg.get('enabled', True):
+            return None
+
+        return cls(
+            interval=cfg.get('interval', 0.25),
+            threshold=cfg.get('threshold', 0.5),
+        )
+
+    async def run(self) -> None:
+        """Run the loop monitor until it is stopped.
+
+        This must be run as a task on the event loop which is to be monitored.
+        """
+        logger.info(
+            'starting event loop monitor',
+            interval=self.interval, threshold=self.threshold,
+        )
+        event_loop = asyncio.get_event_loop()
+        self._thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+
+        self._stopped.clear()
+        self._watchdog = threading.Thread(
+            target=self.watch, name='synse-loop-watchdog', daemon=True,
+        )
+        self._watchdog.start()
+
+        try:
+            while not self._stopped.is_set():
+                start = event_loop.time()
+                await asyncio.sleep(self.interval)
+                lag = event_loop.time() - start - self.interval
+                Monitor.loop_lag.observe(max(lag, 0))
+                self.heartbeat = time.monotonic()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Stop the loop monitor and its watchdog thread."""
+        self._stopped.set()
+
+    def watch(self) -> None:
+        """Watch the event loop heartbeat, logging the stack of the event loop
+        thread when it is blocked.
+
+        This is run in the watchdog thread.
+        """
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked > self.threshold and heartbeat != reported:
+                reported = heartbeat
+                self.report(blocked)
+
+    def report(self, blocked: float) -> None:
+        """Log the stack of the blocked event loop thread.
+
+        Args:
+            blocked: The time, in seconds, the event loop has been blocked for.
+        """
+        Monitor.loop_blocked.inc()
+
+        frame = sys._current_frames().get(self._thread_id)
+        stack = ''.join(traceback.format_stack(frame)) if frame is not None else None
+        logger.warning(
+            'event loop blocked',
+            blocked=round(blocked, 3), threshold=self.threshold, stack=stack,
+        )
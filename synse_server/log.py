@@ -1,8 +1,32 @@
-"""Synse Server application logging."""
+"""Synse Server application logging.
 
+Log events are processed in two parts. The caller's thread does only the work
+which must be done at the time of the call (level filtering, adding the
+context, level and timestamp, and formatting exceptions), then hands the
+event to the logging handlers. Rendering the event to a line and writing it
+out is done by the handlers' formatter, which, when logging is asynchronous,
+runs on a background thread fed by a queue, so the event loop is not blocked
+on writes to stdout.
+
+To keep debug logging usable in production, events may be rate limited per
+event (``log_limits.rate``) or sampled (``log_limits.sample``), and debug
+logging may be enabled only for specific plugins and devices (``log_debug``)
+or for requests which opt in with the ``X-Synse-Debug`` header, whatever the
+configured log level.
+"""
+
+import atexit
+import hmac
 import logging
 import logging.config
+import logging.handlers
+import queue
+import random
 import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import structlog
 from sanic import app, asgi, handlers, request, server
@@ -10,6 +34,17 @@ from structlog import contextvars
 
 from synse_server import config
 
+# The processors which prepare log records which did not come from structlog
+# (e.g. from third party libraries) for rendering.
+foreign_pre_chain = [
+    structlog.stdlib.add_logger_name,
+    structlog.stdlib.add_log_level,
+    structlog.processors.TimeStamper(fmt='iso'),
+    structlog.processors.format_exc_info,
+]
+
+# Loggers with their own handlers do not propagate, since 'root' is the root
+# logger (as of Python 3.9), which would write their records out a second time.
 logging_config = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -21,16 +56,17 @@ logging_config = {
         'synse_server': {
             'level': 'INFO',
             'handlers': ['default'],
-            'propagate': True,
+            'propagate': False,
         },
         'sanic.root': {
             'level': 'INFO',
             'handlers': ['default'],
+            'propagate': False,
         },
         'sanic.error': {
             'level': 'INFO',
             'handlers': ['error'],
-            'propagate': True,
+            'propagate': False,
             'qualname': 'sanic.error',
         },
     },
@@ -38,36 +74,211 @@ logging_config = {
         'default': {
             'class': 'logging.StreamHandler',
             'stream': sys.stdout,
+            'formatter': 'default',
         },
         'error': {
             'class': 'logging.StreamHandler',
             'stream': sys.stderr,
+            'formatter': 'default',
+        },
+    },
+    'formatters': {
+        'default': {
+            '()': structlog.stdlib.ProcessorFormatter,
+            'processor': structlog.processors.KeyValueRenderer(
+                key_order=['timestamp', 'logger', 'level', 'event'],
+            ),
+            'foreign_pre_chain': foreign_pre_chain,
         },
     },
 }
 
-logging.config.dictConfig(logging_config)
-
-structlog.configure(
-    processors=[
-        contextvars.merge_contextvars,
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt='iso'),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.KeyValueRenderer(
-            key_order=['timestamp', 'logger', 'level', 'event']
-        ),
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
+# Whether logging has been configured by ``configure_logging``.
+_configured = False
+
+# The listeners which write out the log records queued by asynchronous logging.
+_listeners: List[logging.handlers.QueueListener] = []
+
+# The request header which enables debug logging for the request. Its value
+# must be the debug token (``debug.token``).
+DEBUG_HEADER = 'X-Synse-Debug'
+
+# Whether debug logging is enabled for the current context (e.g. a request)
+# regardless of the log level.
+_debug_scope: ContextVar[bool] = ContextVar('debug_scope', default=False)
+
+# The plugin and device IDs to log debug events for, regardless of the log
+# level. Events are matched by their plugin and device ID fields.
+debug_plugins: Set[str] = set()
+debug_devices: Set[str] = set()
+
+_PLUGIN_FIELDS = ('plugin_id', 'plugin')
+_DEVICE_FIELDS = ('device_id', 'device')
+
+# The levels of the bound logger methods.
+_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'warn': logging.WARNING,
+    'error': logging.ERROR,
+    'exception': logging.ERROR,
+    'critical': logging.CRITICAL,
+    'fatal': logging.CRITICAL,
+}
+
+
+class FilteringBoundLogger(structlog.stdlib.BoundLogger):
+    """A structlog bound logger which drops events below the level of its
+    logger before they are processed.
+
+    The standard bound logger builds the event dict (copying the bound context)
+    and runs the processor chain up to the level filter for every call, so
+    even dropped debug events have a cost. Checking the level first makes
+    disabled log calls close to free.
+
+    Events below the level are still logged if they are in the debug scope
+    (see :func:`in_debug_scope`).
+    """
+
+    def _proxy_to_logger(
+            self,
+            method_name: str,
+            event: Optional[str] = None,
+            *event_args: Any,
+            **event_kw: Any,
+    ) -> Any:
+        level = _LEVELS.get(method_name)
+        if level is not None and not self._logger.isEnabledFor(level):
+            if not in_debug_scope(event_kw):
+                return None
+            return self._log_scoped(level, method_name, event, event_args, event_kw)
+        return super()._proxy_to_logger(method_name, event, *event_args, **event_kw)
+
+    def _log_scoped(
+            self,
+            level: int,
+            method_name: str,
+            event: Optional[str],
+            event_args: Tuple[Any, ...],
+            event_kw: Dict[str, Any],
+    ) -> None:
+        # The stdlib logger would drop the event for being below its level,
+        # so the record is handed to its handlers directly.
+        if event_args:
+            event_kw['positional_args'] = event_args
+        try:
+            args, kw = self._process_event(method_name, event, event_kw)
+        except structlog.DropEvent:
+            return None
+
+        record = self._logger.makeRecord(
+            self._logger.name, level, '(unknown file)', 0, args[0], (), None,
+            extra=kw.get('extra'),
+        )
+        self._logger.handle(record)
+
+
+class RateLimiter:
+    """A structlog processor which limits the rate of each distinct low level
+    event.
+
+    Each event, by logger and event name, has a token bucket which refills at
+    the rate, up to the burst size. Events are dropped while their bucket is
+    empty; the next event let through reports how many were dropped in its
+    ``suppressed`` field. Events above the level are never limited.
+
+    Args:
+        rate: The number of events per second to allow for each event. If 0,
+            events are not limited.
+        burst: The number of events for each event which may be logged at
+            once, before being limited.
+        level: The highest level of the events to limit. By default, only
+            debug events are limited.
+        max_keys: The maximum number of distinct events to track. Events
+            with dynamic names could otherwise grow the buckets without bound,
+            so they are reset once this is reached.
+    """
+
+    def __init__(
+            self,
+            rate: float = 0,
+            burst: int = 10,
+            level: str = 'debug',
+            max_keys: int = 10000,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.level = level
+        self.max_keys = max_keys
+
+        # The tokens, last refill time, and suppressed count of each event.
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict) -> Dict:
+        if not self.rate or _LEVELS.get(method_name, logging.CRITICAL) > _LEVELS[self.level]:
+            return event_dict
+
+        key = (getattr(logger, 'name', ''), str(event_dict.get('event')))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [self.burst, now, 0]
+
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                raise structlog.DropEvent
+
+            bucket[0] = tokens - 1
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            event_dict['suppressed'] = int(suppressed)
+        return event_dict
+
+
+class Sampler:
+    """A structlog processor which logs a random sample of events.
+
+    Args:
+        rates: The fraction of events to log, by event name. Events which
+            are not listed are always logged.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None) -> None:
+        self.rates = rates or {}
+
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict) -> Dict:
+        if self.rates:
+            rate = self.rates.get(event_dict.get('event'))
+            if rate is not None and random.random() >= rate:
+                raise structlog.DropEvent
+        return event_dict
+
+
+# The rate limiter and sampler of the processor chain. They do nothing until
+# configured by ``setup_filters``.
+rate_limiter = RateLimiter()
+sampler = Sampler()
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """A queue handler which enqueues log records without formatting them.
+
+    The standard queue handler formats records before enqueueing them, so they
+    can be pickled. Records are only passed between threads here, so they are
+    enqueued as they are and formatted by the handlers of the queue listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
 
 
 def override_sanic_loggers():
@@ -88,10 +299,216 @@ def override_sanic_loggers():
     server.logger = root
 
 
-override_sanic_loggers()
+def configure_logging() -> None:
+    """Configure the logging handlers and structured logger.
+
+    This is done once, on server initialization, rather than on import, so
+    importing Synse Server modules does not reconfigure the logging of the
+    importing process. Subsequent calls do nothing.
+    """
+    global _configured
+    if _configured:
+        return
+
+    logging.config.dictConfig(logging_config)
+
+    # Rendering the event is left to the handlers' formatter (see
+    # ``logging_config``), so it may be done off of the caller's thread.
+    structlog.configure(
+        processors=[
+            # Events are filtered by level by the FilteringBoundLogger.
+            sampler,
+            rate_limiter,
+            contextvars.merge_contextvars,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt='iso'),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=FilteringBoundLogger,
+        cache_logger_on_first_use=True,
+    )
+
+    override_sanic_loggers()
+    _configured = True
 
 
 def setup_logger() -> None:
     """Configure the Synse Server logger."""
+    configure_logging()
+
     level = logging.getLevelName(config.options.get('logging', 'info').upper())
     structlog.get_logger('synse_server').setLevel(level)
+
+
+def setup_handlers() -> None:
+    """Configure the log output, using the loaded config.
+
+    This sets the renderer used to format log events (``log_format``) and
+    whether log records are written out by a background thread
+    (``log_async``).
+    """
+    if config.options.get('log_format', 'text') == 'json':
+        renderer = structlog.processors.JSONRenderer()
+    else:
+        renderer = structlog.processors.KeyValueRenderer(
+            key_order=['timestamp', 'logger', 'level', 'event'],
+        )
+
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processor=renderer,
+        foreign_pre_chain=foreign_pre_chain,
+    )
+    for handler in _handlers():
+        handler.setFormatter(formatter)
+
+    if config.options.get('log_async', True):
+        start_queue()
+
+
+def _handlers() -> List[logging.Handler]:
+    """Get the distinct handlers of the configured loggers."""
+    handlers = []
+    for name in logging_config['loggers']:
+        for handler in logging.getLogger(name).handlers:
+            if handler not in handlers:
+                handlers.append(handler)
+    return handlers
+
+
+def start_queue() -> None:
+    """Write log records out asynchronously.
+
+    The handlers of the configured loggers are replaced with handlers which
+    put records on a queue, and each original handler is run by a queue
+    listener on its own thread. Records are written out in the order they
+    were logged, and any still queued are written out on exit.
+
+    Starting the queue when it is already started does nothing.
+    """
+    if _listeners:
+        return
+
+    queued = {}
+    for handler in _handlers():
+        q = queue.SimpleQueue()
+        queued[handler] = QueueHandler(q)
+        listener = logging.handlers.QueueListener(q, handler, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+
+    for name in logging_config['loggers']:
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            logger.addHandler(queued[handler])
+
+    atexit.register(stop_queue)
+
+
+def stop_queue() -> None:
+    """Stop writing log records out asynchronously.
+
+    Any queued records are written out, and the configured loggers are given
+    back their original handlers.
+    """
+    restore = {}
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        restore[id(listener.queue)] = listener.handlers[0]
+
+    for name in logging_config['loggers']:
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler) and id(handler.queue) in restore:
+                logger.removeHandler(handler)
+                logger.addHandler(restore[id(handler.queue)])
+
+    atexit.unregister(stop_queue)
+
+
+def setup_filters() -> None:
+    """Configure the log rate limits, sampling and debug scope, using the
+    loaded config.
+    """
+    limits = config.options.get('log_limits') or {}
+    rate_limiter.rate = limits.get('rate', 0)
+    rate_limiter.burst = limits.get('burst', 10)
+    rate_limiter.level = limits.get('level', 'debug')
+    sampler.rates = limits.get('sample') or {}
+
+    scope = config.options.get('log_debug') or {}
+    debug_plugins.clear()
+    debug_plugins.update(scope.get('plugins') or [])
+    debug_devices.clear()
+    debug_devices.update(scope.get('devices') or [])
+
+
+def in_debug_scope(fields: Optional[Dict[str, Any]] = None) -> bool:
+    """Check whether debug logging is enabled for the current context, or for
+    an event's plugin or device.
+
+    Args:
+        fields: The fields of the event.
+    """
+    if _debug_scope.get():
+        return True
+    if not fields or not (debug_plugins or debug_devices):
+        return False
+
+    # Fields may hold other values than IDs (e.g. a device message), which
+    # are not matched.
+    for key in _PLUGIN_FIELDS:
+        value = fields.get(key)
+        if isinstance(value, str) and value in debug_plugins:
+            return True
+    for key in _DEVICE_FIELDS:
+        value = fields.get(key)
+        if isinstance(value, str) and value in debug_devices:
+            return True
+    return False
+
+
+def debug_enabled(name: str) -> bool:
+    """Check whether debug events of a logger are logged in the current context.
+
+    Args:
+        name: The name of the logger.
+    """
+    return _debug_scope.get() or logging.getLogger(name).isEnabledFor(logging.DEBUG)
+
+
+def debug_request(header: Optional[str]) -> None:
+    """Set whether debug logging is enabled for the current request.
+
+    Debug logging is enabled if the value of the request's debug header is
+    the debug token; otherwise, it is disabled, so the scope of a previous
+    request in the same context is not carried over.
+
+    Args:
+        header: The value of the request's debug header, if any.
+    """
+    enabled = False
+    if header:
+        token = config.options.get('debug.token')
+        enabled = bool(token) and hmac.compare_digest(header.encode(), token.encode())
+    _debug_scope.set(enabled)
+
+
+def debug_scope(plugin: Optional[str] = None, device: Optional[str] = None) -> None:
+    """Enable debug logging for the rest of the current context if it is for
+    one of the scoped plugins or devices.
+
+    Args:
+        plugin: The ID of the plugin the context is for.
+        device: The ID of the device the context is for.
+    """
+    if plugin in debug_plugins or device in debug_devices:
+        _debug_scope.set(True)
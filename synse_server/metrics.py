@@ -1,6 +1,7 @@
 """Application metrics for Synse Server."""
 
 import time
+from typing import Collection, Set, Tuple
 
 import grpc
 import sanic
@@ -9,6 +10,39 @@ from prometheus_client.exposition import CONTENT_TYPE_LATEST, generate_latest
 from sanic.request import Request
 from sanic.response import HTTPResponse, raw
 
+from synse_server import config
+
+
+class CardinalityLimiter:
+    """Bound the number of distinct label sets, and so time series, of a metric.
+
+    Label sets are admitted as they are first seen, up to the limit. Once the
+    limit is reached, new label sets have their unbounded labels folded into
+    the "other" value, so they are all counted in a shared overflow series
+    rather than each creating a new one.
+
+    Args:
+        limit: The maximum number of distinct label sets to admit.
+        fold: The positions of the labels which are folded on overflow.
+    """
+
+    OTHER = 'other'
+
+    def __init__(self, limit: int, fold: Collection[int]) -> None:
+        self.limit = limit
+        self.fold = set(fold)
+        self.seen: Set[Tuple[str, ...]] = set()
+
+    def __call__(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        if labels in self.seen:
+            return labels
+        if len(self.seen) < self.limit:
+            self.seen.add(labels)
+            return labels
+        return tuple(
+            self.OTHER if i in self.fold else value for i, value in enumerate(labels)
+        )
+
 
 class Monitor:
 
@@ -33,6 +67,12 @@ class Monitor:
         labelnames=('method', 'template', 'endpoint', 'http_code', 'ip'),
     )
 
+    request_stage_latency = Histogram(
+        name='synse_request_stage_latency_sec',
+        documentation='The time spent in each stage of handling a request',
+        labelnames=('stage',),
+    )
+
     #
     # Metrics for Synse Server's WebSocket API
     #
@@ -93,6 +133,24 @@ class Monitor:
         labelnames=('type', 'service', 'method', 'plugin'),
     )
 
+    grpc_stream_first_message_latency = Histogram(
+        name='synse_grpc_stream_first_message_latency_sec',
+        documentation='The time it takes for a gRPC stream to return its first message',
+        labelnames=('type', 'service', 'method', 'plugin'),
+    )
+
+    grpc_stream_message_interval = Histogram(
+        name='synse_grpc_stream_message_interval_sec',
+        documentation='The time between consecutive messages returned by a gRPC stream',
+        labelnames=('type', 'service', 'method', 'plugin'),
+    )
+
+    grpc_adaptive_timeout = Gauge(
+        name='synse_grpc_adaptive_timeout_sec',
+        documentation='The current adaptive timeout applied to gRPC requests to plugins',
+        labelnames=('method', 'plugin'),
+    )
+
     #
     # Metrics around Synse Server's plugin state/status
     #
@@ -120,6 +178,114 @@ class Monitor:
         labelnames=('plugin',),
     )
 
+    plugin_circuit_state = Gauge(
+        name='synse_plugin_circuit_breaker_state',
+        documentation='The plugin circuit breaker state: closed (0), half-open (1), open (2)',
+        labelnames=('plugin',),
+    )
+
+    plugin_health_check_latency = Histogram(
+        name='synse_plugin_health_check_latency_sec',
+        documentation='The time it takes for a plugin to respond to a background health check',
+        labelnames=('plugin',),
+    )
+
+    plugin_health_check_failures = Counter(
+        name='synse_plugin_health_check_failure_count',
+        documentation='The total number of failed background plugin health checks',
+        labelnames=('plugin',),
+    )
+
+    plugin_circuit_rejected = Counter(
+        name='synse_plugin_circuit_breaker_rejected_count',
+        documentation='The total number of requests rejected by an open plugin circuit breaker',
+        labelnames=('plugin',),
+    )
+
+    plugin_hedged_reads = Counter(
+        name='synse_plugin_hedged_read_count',
+        documentation='The total number of reads hedged against a plugin replica',
+        labelnames=('plugin',),
+    )
+
+    #
+    # Metrics for Synse Server's event loop
+    #
+    loop_lag = Histogram(
+        name='synse_event_loop_lag_sec',
+        documentation='The time by which the event loop is late in running a scheduled callback',
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+
+    loop_blocked = Counter(
+        name='synse_event_loop_blocked_count',
+        documentation='The total number of times the event loop was blocked beyond the threshold',
+    )
+
+    #
+    # Metrics for Synse Server's caches
+    #
+    cache_rebuild_latency = Histogram(
+        name='synse_device_cache_rebuild_latency_sec',
+        documentation='The time it takes to rebuild the device cache from all plugins',
+    )
+
+    cache_plugin_rebuild_latency = Histogram(
+        name='synse_device_cache_plugin_rebuild_latency_sec',
+        documentation='The time it takes to get the devices of a plugin for the device cache',
+        labelnames=('plugin',),
+    )
+
+    cache_tags = Gauge(
+        name='synse_device_cache_tags',
+        documentation='The number of distinct tags in the device cache tag index',
+    )
+
+    cache_postings = Gauge(
+        name='synse_device_cache_postings',
+        documentation='The number of device entries across all tags in the device cache tag index',
+    )
+
+    cache_size_bytes = Gauge(
+        name='synse_device_cache_size_bytes',
+        documentation='An estimate of the memory used by the device cache tag index',
+    )
+
+    cache_aliases = Gauge(
+        name='synse_alias_cache_entries',
+        documentation='The number of device aliases in the alias cache',
+    )
+
+    cache_lock_wait = Histogram(
+        name='synse_cache_lock_wait_sec',
+        documentation='The time spent waiting to acquire a cache lock',
+        labelnames=('lock',),
+        buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    )
+
+    cache_lock_hold = Histogram(
+        name='synse_cache_lock_hold_sec',
+        documentation='The time a cache lock is held for once acquired',
+        labelnames=('lock',),
+        buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    )
+
+    cache_lookups = Counter(
+        name='synse_device_cache_lookup_count',
+        documentation='The total number of device cache lookups, by lookup path and result',
+        labelnames=('path', 'result'),
+    )
+
+    transaction_cache_entries = Gauge(
+        name='synse_transaction_cache_entries',
+        documentation='The number of transactions in the transaction cache',
+    )
+
+    transaction_cache_evictions = Counter(
+        name='synse_transaction_cache_eviction_count',
+        documentation='The total number of transactions expired from the transaction cache',
+    )
+
     #
     # General / other metrics
     #
@@ -131,6 +297,36 @@ class Monitor:
     def __init__(self, app: sanic.Sanic) -> None:
         self.app = app
 
+        # HTTP metrics are labeled by route template. The raw path and the client
+        # IP are unbounded, so they are only labeled when enabled, and the number
+        # of series is limited regardless.
+        cfg = config.options.get('metrics.http') or {}
+        self.label_ip = cfg.get('client_ip', False)
+        self.label_path = cfg.get('path', False)
+        self.http_limiter = CardinalityLimiter(
+            limit=cfg.get('max_series', 1000),
+            fold=(1, 2, 4),  # template, endpoint, ip
+        )
+
+    def http_labels(self, request: Request, code: int) -> Tuple[str, ...]:
+        """Get the labels for the HTTP metrics of a request.
+
+        Args:
+            request: The HTTP request.
+            code: The HTTP status code of the response.
+
+        Returns:
+            The method, template, endpoint, http_code, and ip label values.
+        """
+        return self.http_limiter((
+            request.method,
+            # Requests which do not match a route (e.g. 404s) have no template.
+            request.uri_template or 'unmatched',
+            request.path if self.label_path else '',
+            str(code),
+            request.ip if self.label_ip else '',
+        ))
+
     def register(self) -> None:
         """Register the metrics monitor with the Sanic application.
 
@@ -157,7 +353,7 @@ class Monitor:
             # WebSocket handler ignores response logic, so default
             # to a 200 response in such case.
             code = response.status if response else 200
-            labels = (request.method, request.uri_template, request.path, code, request.ip)
+            labels = self.http_labels(request, code)
 
             if request.path != '/metrics':
                 if latency is not None:
@@ -200,7 +396,7 @@ class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor,
             self.plugin,
         ).inc()
 
-        start = time.time()
+        start = time.monotonic()
         resp = continuation(client_call_details, request)
 
         Monitor.grpc_req_latency.labels(
@@ -208,7 +404,7 @@ class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor,
             service,
             method,
             self.plugin,
-        ).observe(time.time() - start)
+        ).observe(time.monotonic() - start)
 
         Monitor.grpc_msg_received.labels(
             self.type_unary,
@@ -228,16 +424,11 @@ class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor,
             self.plugin,
         ).inc()
 
-        start = time.time()
+        start = time.monotonic()
         resp = continuation(client_call_details, request)
 
-        Monitor.grpc_req_latency.labels(
-            self.type_server_stream,
-            service,
-            method,
-            self.plugin,
-        ).observe(time.time() - start)
-
+        # The request latency is only known once the stream has been consumed,
+        # so it is recorded by the stream wrapper.
         return wrap_stream_resp(
             response=resp,
             counter=Monitor.grpc_msg_received,
@@ -245,6 +436,7 @@ class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor,
             service=service,
             method=method,
             plugin=self.plugin,
+            start=start,
         )
 
 
@@ -263,14 +455,28 @@ def get_metadata(call_details):
     return items[1:3]
 
 
-def wrap_stream_resp(response, counter, grpc_type, service, method, plugin):
-    """Wrap a stream response so the individual returned messages can be counted."""
+def wrap_stream_resp(response, counter, grpc_type, service, method, plugin, start=None):
+    """Wrap a stream response so the individual returned messages can be counted.
 
-    for item in response:
-        counter.labels(
-            grpc_type,
-            service,
-            method,
-            plugin,
-        ).inc()
-        yield item
+    If the start time of the request is given, the time to the first message,
+    the time between messages, and, once the stream is exhausted or closed, the
+    total request latency are also recorded.
+    """
+
+    labels = (grpc_type, service, method, plugin)
+    last = None
+    try:
+        for item in response:
+            if start is not None:
+                now = time.monotonic()
+                if last is None:
+                    Monitor.grpc_stream_first_message_latency.labels(*labels).observe(now - start)
+                else:
+                    Monitor.grpc_stream_message_interval.labels(*labels).observe(now - last)
+                last = now
+
+            counter.labels(*labels).inc()
+            yield item
+    finally:
+        if start is not None:
+            Monitor.grpc_req_latency.labels(*labels).observe(time.monotonic() - start)
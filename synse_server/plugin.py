@@ -1,18 +1,41 @@
 """Management and access logic for configured plugin backends."""
 
 import asyncio
+import contextlib
+import contextvars
 import time
-from typing import Dict, List, Optional, Tuple, Union
+from typing import (Awaitable, Callable, Dict, Iterator, List, Optional, Tuple,
+                    Union)
 
 from structlog import get_logger
 from synse_grpc import client, utils
 
-from synse_server import backoff, config, errors, loop
-from synse_server.discovery import kubernetes
+from synse_server import (backoff, breaker, channels, config, errors, loop,
+                          tracing)
+from synse_server.discovery import file, kubernetes
 from synse_server.metrics import MetricsInterceptor, Monitor
+from synse_server.timeouts import AdaptiveTimeoutInterceptor
 
 logger = get_logger()
 
+# The start times of the calls currently being made within plugin contexts. A
+# plugin context may be entered concurrently by multiple tasks, so the start
+# times are tracked per execution context rather than on the Plugin instance.
+_call_starts: contextvars.ContextVar[Tuple[float, ...]] = contextvars.ContextVar(
+    'plugin_call_starts', default=(),
+)
+
+# Plugin lifecycle events emitted by the PluginManager to its listeners.
+EVENT_REGISTERED = 'registered'
+EVENT_ACTIVATED = 'activated'
+EVENT_DEACTIVATED = 'deactivated'
+EVENT_DISABLED = 'disabled'
+EVENT_ENABLED = 'enabled'
+
+# A listener for plugin lifecycle events, called with the event name and the
+# plugin instance the event is for.
+Listener = Callable[[str, 'Plugin'], None]
+
 
 class PluginManager:
     """A manager for plugins registered with the Synse Server instance.
@@ -26,16 +49,40 @@ class PluginManager:
         is_refreshing: A state flag determining whether the manager is
             currently performing a plugin refresh. Since plugin refresh
             may be started via async task or API call, this state variable
-            is used to prevent two refreshes from happening simultaneously.
+            is used to prevent two refreshes from happening simultaneously;
+            a refresh started during another waits for it instead.
+        expected: The number of plugin addresses found by the most recent
+            refresh, from configuration and discovery. This is None until
+            the first refresh has completed discovery.
     """
 
     plugins: Dict[str, 'Plugin'] = {}
 
+    # Additional instances of registered plugins, keyed by plugin ID. Plugins
+    # which share an ID but run at different addresses (e.g. the pods of a
+    # plugin Deployment) are replicas of one another. The first instance to
+    # register is kept in ``plugins``; any others are tracked here.
+    replicas: Dict[str, List['Plugin']] = {}
+
+    # Round-robin counters used to balance requests across plugin replicas.
+    _rr: Dict[str, int] = {}
+
+    # Listeners which are notified of plugin lifecycle events.
+    listeners: List[Listener] = []
+
     def __init__(self):
         self.is_refreshing = False
+        self.expected: Optional[int] = None
+
+        # Resolved once the plugins of the refresh in progress are registered.
+        self._refreshed: Optional[asyncio.Future] = None
 
     def __iter__(self) -> 'PluginManager':
-        self._snapshot = list(self.plugins.values())
+        # Iterating does not advance the round-robin counters, so monitoring the
+        # plugins does not skew how requests are balanced across replicas.
+        self._snapshot = [
+            self._select(plugin_id, advance=False) for plugin_id in list(self.plugins)
+        ]
         self._idx = 0
         return self
 
@@ -47,6 +94,46 @@ class PluginManager:
         self._idx += 1
         return plugin
 
+    @classmethod
+    def add_listener(cls, listener: Listener) -> None:
+        """Add a listener for plugin lifecycle events.
+
+        Listeners are called synchronously when an event is emitted, so they
+        should not block; any real work should be scheduled on the loop.
+
+        Args:
+            listener: A callable which is called with the event name and the
+                plugin instance the event is for.
+        """
+        if listener not in cls.listeners:
+            cls.listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener: Listener) -> None:
+        """Remove a listener for plugin lifecycle events, if it was added."""
+        if listener in cls.listeners:
+            cls.listeners.remove(listener)
+
+    @classmethod
+    def emit(cls, event: str, plugin: 'Plugin') -> None:
+        """Notify all listeners of a plugin lifecycle event.
+
+        A failing listener is logged and does not prevent other listeners
+        from being notified.
+
+        Args:
+            event: The name of the lifecycle event.
+            plugin: The plugin instance the event is for.
+        """
+        logger.debug(
+            'emitting plugin event', plugin_event=event, id=plugin.id, addr=plugin.address,
+        )
+        for listener in list(cls.listeners):
+            try:
+                listener(event, plugin)
+            except Exception:
+                logger.exception('plugin event listener failed', plugin_event=event, id=plugin.id)
+
     def has_plugins(self) -> bool:
         """Convenience function to determine whether any plugins are
         currently registered with the manager.
@@ -57,19 +144,85 @@ class PluginManager:
         """
         return len(self.plugins) > 0
 
-    def get(self, plugin_id: str) -> Union['Plugin', None]:
+    def get(self, plugin_id: str, address: Optional[str] = None) -> Union['Plugin', None]:
         """Get a ``Plugin`` by ID.
 
+        If the plugin has replicas, requests are balanced across the replicas
+        which are ready, unless a specific address is given.
+
         Args:
             plugin_id: The ID of the plugin.
+            address: The address of a specific replica of the plugin to get.
 
         Returns:
             The plugin with the matching ID. If the given ID is not associated
-            with a registered plugin, None is returned.
+            with a registered plugin, or no replica of it has the given address,
+            None is returned.
+        """
+        if plugin_id not in self.plugins:
+            return None
+
+        if address is not None:
+            for p in self.group(plugin_id):
+                if p.address == address:
+                    return p
+            return None
+
+        return self._select(plugin_id)
+
+    def group(self, plugin_id: str) -> List['Plugin']:
+        """Get all registered instances of a plugin.
+
+        Args:
+            plugin_id: The ID of the plugin.
+
+        Returns:
+            The plugin and all of its replicas. If the given ID is not associated
+            with a registered plugin, an empty list is returned.
         """
-        return self.plugins.get(plugin_id)
+        if plugin_id not in self.plugins:
+            return []
+        return [self.plugins[plugin_id]] + self.replicas.get(plugin_id, [])
+
+    def all(self) -> List['Plugin']:
+        """Get all registered plugin instances, including replicas."""
+        return [p for plugin_id in list(self.plugins) for p in self.group(plugin_id)]
+
+    def select_all(self) -> List['Plugin']:
+        """Select an instance of each registered plugin to issue a request to.
 
-    def register(self, address: str, protocol: str) -> str:
+        Unlike iterating over the manager, this balances requests across the
+        replicas of each plugin, so it should only be used when the selected
+        instances are sent requests.
+        """
+        return [self._select(plugin_id) for plugin_id in list(self.plugins)]
+
+    def _select(self, plugin_id: str, advance: bool = True) -> 'Plugin':
+        """Select an instance of a plugin to issue a request to.
+
+        Replicas which are ready and whose circuit breaker is not open are
+        selected round-robin. If no replica is available, the primary instance
+        is returned so the caller sees its state.
+
+        Args:
+            plugin_id: The ID of the plugin.
+            advance: Whether to advance the round-robin counter for the plugin.
+                If False, the instance the next request would go to is returned.
+        """
+        group = self.group(plugin_id)
+        if len(group) == 1:
+            return group[0]
+
+        available = [p for p in group if p.is_available()]
+        if not available:
+            return group[0]
+
+        idx = self._rr.get(plugin_id, 0)
+        if advance:
+            self._rr[plugin_id] = idx + 1
+        return available[idx % len(available)]
+
+    async def register(self, address: str, protocol: str) -> str:
         """Register a new Plugin with the manager.
 
         With the provided address and communication protocol, the manager
@@ -87,39 +240,34 @@ class PluginManager:
         """
         logger.info('registering new plugin', addr=address, protocol=protocol)
 
-        interceptors = []
-        if config.options.get('metrics.enabled'):
-            logger.debug('application metrics enabled: registering gRPC interceptor')
-            interceptors = [MetricsInterceptor()]
-
-        # Prior to registering the plugin, we need to get the plugin metadata
-        # and ensure that we can connect to the plugin. These calls may raise
-        # an exception - we want to let them propagate up to signal that registration
-        # for the particular address failed.
-        try:
-            c = client.PluginClientV3(
-                address=address,
-                protocol=protocol,
-                timeout=config.options.get('grpc.timeout'),
-                tls=config.options.get('grpc.tls.cert'),
-                interceptors=interceptors,
-            )
-        except Exception as e:
-            logger.error(
-                'failed to create plugin client',
-                address=address,
-                protocol=protocol,
-                timeout=config.options.get('grpc.timeout'),
-                tls=config.options.get('grpc.tls.cert'),
-                interceptors=interceptors,
-            )
-            raise errors.ClientCreateError('error creating plugin client') from e
+        # Routine refreshes re-register plugins which are already registered. An
+        # active plugin at the address is probed with its existing client, so a
+        # new client (and its channels) is only created for a plugin which is not.
+        known = next((
+            p for p in self.all()
+            if p.client.address == address and p.protocol == protocol and not p.disabled
+        ), None)
+        c = known.client if known is not None else self._new_client(address, protocol)
 
         # Let any exceptions here raise up. The caller should handle appropriately.
         # Generally any exceptions raised here should not propagate past the caller,
         # as a failure to communicate may be intermittent and should be retried later.
-        meta = c.metadata()
-        ver = c.version()
+        #
+        # The client is synchronous, so the requests are run in the default executor
+        # to avoid blocking the event loop.
+        event_loop = asyncio.get_event_loop()
+        meta, ver = await asyncio.gather(
+            event_loop.run_in_executor(None, c.metadata),
+            event_loop.run_in_executor(None, c.version),
+        )
+
+        if known is not None:
+            if meta.id == known.id:
+                # The plugin is already registered at this address; keep the existing instance.
+                known.mark_active()
+                return known.id
+            # A different plugin is now at the address, so it gets its own client.
+            c = self._new_client(address, protocol)
 
         plugin = Plugin(
             info=utils.to_dict(meta),
@@ -139,6 +287,8 @@ class PluginManager:
             # - During routine refresh of plugins, discovery or some other mechanism will
             #   find plugins and attempt to re-register them, relying on this block to
             #   determine whether or not the plugin needs to be re-registered.
+            # - Multiple replicas of the same plugin are running at different addresses,
+            #   e.g. multiple pods for a plugin Deployment.
             # - Plugins were mis-configured and are having ID collisions. There is nothing
             #   that can be done here other than logging the potential collision.
             # - Plugins were rescheduled and could potentially be given a new IP address.
@@ -147,9 +297,14 @@ class PluginManager:
             # In addition to checking whether or not the plugin exists in the manager cache,
             # we also need to check some general state of the plugin, including whether it is
             # enabled/disabled, what its address is, etc.
-            cached = self.plugins[plugin.id]
-
-            if cached.disabled:
+            group = self.group(plugin.id)
+            cached = next((p for p in group if p.address == plugin.address), None)
+            if cached is None:
+                # If there is no plugin at the same address, a previously disabled
+                # instance may have been rescheduled to a new address.
+                cached = next((p for p in group if p.disabled), None)
+
+            if cached is not None and cached.disabled:
                 if cached.address != plugin.address:
                     logger.info(
                         'address changed for existing plugin',
@@ -164,28 +319,115 @@ class PluginManager:
                 # Update the exported metrics disabled plugins gauge: remove the old disabled plugin
                 Monitor.plugin_disabled.labels(plugin.id).dec()
 
-                self.plugins[plugin.id] = plugin
+                self._replace(cached, plugin)
                 logger.debug('re-registered existing plugin', new=plugin, previous=cached)
+                self.emit(EVENT_REGISTERED, plugin)
+
+            elif cached is not None:
+                # The plugin is already registered at this address; keep the existing instance.
+                plugin = cached
+
+            elif plugin.tag == group[0].tag:
+                # Plugins with the same ID and tag at a different address are replicas.
+                self.replicas.setdefault(plugin.id, []).append(plugin)
+                logger.info(
+                    'registered new plugin replica',
+                    id=plugin.id, tag=plugin.tag, addr=plugin.address, replicas=len(group) + 1,
+                )
+                self.emit(EVENT_REGISTERED, plugin)
 
             else:
-                if cached.address != plugin.address:
-                    # If we have matching plugin IDs, but differing addresses, and both plugins
-                    # are considered "active", there is a chance that we are communicating with
-                    # different plugins which have the same ID. This is indicative of a plugin ID
-                    # collision due to misconfiguration.
-                    logger.warning(
-                        'potential plugin ID collision: plugins with same ID, different addresses '
-                        'detected. this may also indicate plugin cycling.',
-                        id=plugin.id, old_addr=cached.address, new_addr=plugin.address,
-                    )
+                # If we have matching plugin IDs, but differing addresses and tags, we are
+                # communicating with different plugins which have the same ID. This is
+                # indicative of a plugin ID collision due to misconfiguration.
+                logger.warning(
+                    'potential plugin ID collision: plugins with same ID, different addresses '
+                    'and tags detected',
+                    id=plugin.id, old_addr=group[0].address, new_addr=plugin.address,
+                    old_tag=group[0].tag, new_tag=plugin.tag,
+                )
+                plugin = group[0]
         else:
             self.plugins[plugin.id] = plugin
             logger.info('successfully registered new plugin', id=plugin.id, tag=plugin.tag)
+            self.emit(EVENT_REGISTERED, plugin)
 
         # Since we were able to communicate with the plugin, ensure it is put in the active state.
-        self.plugins[plugin.id].mark_active()
+        plugin.mark_active()
         return plugin.id
 
+    @staticmethod
+    def _new_client(address: str, protocol: str) -> channels.PluginClient:
+        """Create a client for a plugin, with the configured interceptors and
+        channel options.
+
+        Args:
+            address: The address of the plugin.
+            protocol: The protocol that the plugin uses.
+
+        Raises:
+            errors.ClientCreateError: The client could not be created.
+        """
+        interceptors = []
+        if tracing.enabled:
+            logger.debug('tracing enabled: registering gRPC interceptor')
+            interceptors.append(tracing.TracingInterceptor())
+
+        if config.options.get('metrics.enabled'):
+            logger.debug('application metrics enabled: registering gRPC interceptor')
+            interceptors.append(MetricsInterceptor())
+
+        adaptive = config.options.get('grpc.adaptive_timeout') or {}
+        if adaptive.get('enabled', False):
+            logger.debug('adaptive timeouts enabled: registering gRPC interceptor')
+            # Adaptive timeouts may only tighten the configured timeout, never
+            # relax it, so the ceiling is capped by it.
+            ceiling = config.options.get('grpc.timeout')
+            if adaptive.get('max') is not None:
+                ceiling = min(ceiling or adaptive['max'], adaptive['max'])
+            interceptors.append(AdaptiveTimeoutInterceptor(
+                window=adaptive.get('window', 100),
+                min_samples=adaptive.get('min_samples', 20),
+                percentile=adaptive.get('percentile', 0.99),
+                factor=adaptive.get('factor', 3),
+                floor=adaptive.get('min', 0.5),
+                ceiling=ceiling,
+            ))
+
+        # A failure to create the client is raised up to signal that registration
+        # for the particular address failed.
+        try:
+            return channels.PluginClient(
+                address=address,
+                protocol=protocol,
+                timeout=config.options.get('grpc.timeout'),
+                tls=config.options.get('grpc.tls.cert'),
+                interceptors=interceptors,
+                **channels.from_config(),
+            )
+        except Exception as e:
+            logger.error(
+                'failed to create plugin client',
+                address=address,
+                protocol=protocol,
+                timeout=config.options.get('grpc.timeout'),
+                tls=config.options.get('grpc.tls.cert'),
+                interceptors=interceptors,
+            )
+            raise errors.ClientCreateError('error creating plugin client') from e
+
+    def _replace(self, old: 'Plugin', new: 'Plugin') -> None:
+        """Replace a registered plugin instance with a new instance."""
+        if self.plugins.get(old.id) is old:
+            self.plugins[old.id] = new
+            return
+
+        group = self.replicas.get(old.id, [])
+        for i, p in enumerate(group):
+            if p is old:
+                group[i] = new
+                return
+
     @classmethod
     def load(cls) -> List[Tuple[str, str]]:
         """Load plugins from configuration.
@@ -218,7 +460,8 @@ class PluginManager:
     def discover(cls) -> List[Tuple[str, str]]:
         """Discover plugins via the supported discovery methods.
 
-        Currently, plugin discovery is supported by kubernetes service endpoints.
+        Currently, plugin discovery is supported by kubernetes service endpoints
+        and by a plugins file.
 
         Returns:
             A list of plugin configuration tuples where the first element is the
@@ -234,6 +477,11 @@ class PluginManager:
             for address in addresses:
                 configs.append((address, 'tcp'))
 
+        try:
+            configs.extend(file.discover())
+        except Exception as e:
+            logger.info('failed plugin discovery via file', error=e)
+
         logger.debug('found addresses via plugin discovery', addresses=configs)
         return configs
 
@@ -260,7 +508,7 @@ class PluginManager:
         existing, new, removed = [], [], []
         cfgs = []
 
-        for p in self.plugins.values():
+        for p in self.all():
             cfg = (p.address, p.protocol)
             cfgs.append(cfg)
 
@@ -275,21 +523,35 @@ class PluginManager:
 
         return existing, new, removed
 
-    def refresh(self) -> None:
+    @tracing.traced('plugin.refresh')
+    async def refresh(self) -> None:
         """Refresh the manager's tracked plugin state.
 
         This refreshes plugin state by checking if any new plugins are available
         to Synse Server. Once any plugins are added or disabled, it will also
         update the active/inactive state of each of the enabled plugins.
 
+        Plugin discovery, registration of new plugins, and the state refresh of
+        registered plugins are each run concurrently, bounded by the configured
+        refresh concurrency, with each step bounded by the refresh timeout.
+
         Refresh does not re-load plugins from configuration. That is done on
         initialization. New plugins may only be added at runtime via plugin
         discovery mechanisms.
         """
         if self.is_refreshing:
-            logger.debug('manager is already refreshing')
+            # Wait for the refresh in progress to register the plugins, so the
+            # caller (e.g. the device cache rebuild) does not go on to use the
+            # manager before any plugins have been registered.
+            logger.debug('manager is already refreshing, waiting for it')
+            if self._refreshed is not None:
+                await asyncio.shield(self._refreshed)
             return
 
+        event_loop = asyncio.get_event_loop()
+        bounded, timeout = self._limiter()
+
+        self._refreshed = event_loop.create_future()
         try:
             self.is_refreshing = True
             logger.debug('refreshing plugin manager')
@@ -297,43 +559,34 @@ class PluginManager:
 
             plugins = []
             plugins.extend(self.load())
-            plugins.extend(self.discover())
+
+            discovered = True
+            try:
+                plugins.extend(await asyncio.wait_for(
+                    event_loop.run_in_executor(None, self.discover), timeout,
+                ))
+            except asyncio.TimeoutError:
+                # If discovery did not complete, we do not know which plugins are no
+                # longer available, so none are disabled in this refresh.
+                logger.warning('plugin discovery timed out', timeout=timeout)
+                discovered = False
+
+            if discovered or self.expected is None:
+                self.expected = len(set(plugins))
 
             existing, new, removed = self.bucket_plugins(plugins)
             logger.debug('bucketed plugins', existing=existing, new=new, removed=removed)
 
             # Register all new plugins
-            for plugin in new:
-                try:
-                    self.register(address=plugin[0], protocol=plugin[1])
-                except errors.ClientCreateError as e:
-                    logger.error(
-                        'failed client refresh - unable to configure client',
-                        address=plugin[0], protocol=plugin[1], error=e,
-                    )
-                    raise
-                except Exception as e:
-                    # Do not raise. This could happen if we can't communicate with
-                    # the configured plugin. Future refreshes will attempt to re-register
-                    # in this case. Log the failure and continue trying to register
-                    # any remaining plugins.
-                    logger.warning(
-                        'failed to register configured plugin - will attempt re-registering later',
-                        address=plugin[0], protocol=plugin[1], error=e,
-                    )
-                    continue
+            await self._register_all(new, bounded)
 
             # Disable all removed plugins and stop any active tasks they may be running.
-            for plugin in removed:
+            for plugin in removed if discovered else []:
                 logger.warn(
                     'registered plugin not found during refresh, marking as disabled',
                     plugin=plugin,
                 )
-                plugin.disabled = True
-                plugin.cancel_tasks()
-
-                # Update the exported metrics disabled plugins gauge: add a disabled plugin
-                Monitor.plugin_disabled.labels(plugin.id).inc()
+                self._disable(plugin)
 
             # Check if the existing plugin was disabled. If so, re-enable it. Otherwise, there
             # is nothing to do here.
@@ -343,17 +596,17 @@ class PluginManager:
                         'refresh found previously disabled plugin; re-enabling',
                         plugin=plugin,
                     )
-                    plugin.disabled = False
-
-                    # Update the exported metrics disabled plugins gauge: remove a disabled plugin
-                    Monitor.plugin_disabled.labels(plugin.id).dec()
+                    self._enable(plugin)
 
         finally:
             self.is_refreshing = False
+            self._refreshed.set_result(None)
 
         # Now, ensure that all enabled plugins have their active/inactive state refreshed.
-        for p in self.plugins.values():
-            p.refresh_state()
+        await asyncio.gather(
+            *[bounded(p.refresh_state(timeout=timeout)) for p in self.all()],
+            return_exceptions=True,
+        )
 
         logger.debug(
             'plugin manager refresh complete',
@@ -361,12 +614,116 @@ class PluginManager:
             elapsed_time=time.time() - start,
         )
 
+    async def update_discovered(
+            self,
+            added: List[Tuple[str, str]],
+            removed: List[Tuple[str, str]],
+    ) -> None:
+        """Incrementally update the registered plugins for a change in the
+        discovered plugins.
+
+        This is used by watch-based plugin discovery, which is notified of
+        changes as they happen, so only the plugins at the changed addresses
+        need to be registered or disabled.
+
+        Args:
+            added: The configuration tuples (address, protocol) of newly
+                discovered plugins.
+            removed: The configuration tuples (address, protocol) of plugins
+                which are no longer discovered.
+        """
+        logger.info('updating discovered plugins', added=added, removed=removed)
+        bounded, _ = self._limiter()
+
+        existing, new, _ = self.bucket_plugins(added)
+        for plugin in existing:
+            if plugin.disabled:
+                self._enable(plugin)
+        await self._register_all(new, bounded)
+
+        for plugin in self.all():
+            if (plugin.address, plugin.protocol) in removed and not plugin.disabled:
+                logger.warn('discovered plugin removed, marking as disabled', plugin=plugin)
+                self._disable(plugin)
+
+    @staticmethod
+    def _limiter() -> Tuple[Callable[[Awaitable], Awaitable], float]:
+        """Get a function which runs a plugin refresh step, bounded by the
+        refresh concurrency and timeout, along with the timeout.
+        """
+        timeout = config.options.get('cache.plugin.refresh_timeout') or 10
+        sem = asyncio.Semaphore(config.options.get('cache.plugin.refresh_concurrency') or 16)
+
+        async def bounded(coro):
+            async with sem:
+                return await asyncio.wait_for(coro, timeout)
+
+        return bounded, timeout
+
+    async def _register_all(
+            self,
+            cfgs: List[Tuple[str, str]],
+            bounded: Callable[[Awaitable], Awaitable],
+    ) -> None:
+        """Register plugins concurrently.
+
+        Args:
+            cfgs: The address and protocol of each plugin to register.
+            bounded: The function used to bound each registration.
+
+        Raises:
+            errors.ClientCreateError: A client could not be created for a plugin.
+        """
+        results = await asyncio.gather(
+            *[bounded(self.register(address=cfg[0], protocol=cfg[1])) for cfg in cfgs],
+            return_exceptions=True,
+        )
+        create_error = None
+        for plugin, result in zip(cfgs, results):
+            if isinstance(result, errors.ClientCreateError):
+                logger.error(
+                    'failed client refresh - unable to configure client',
+                    address=plugin[0], protocol=plugin[1], error=result,
+                )
+                create_error = create_error or result
+            elif isinstance(result, Exception):
+                # Do not raise. This could happen if we can't communicate with
+                # the configured plugin. Future refreshes will attempt to re-register
+                # in this case. Log the failure and continue trying to register
+                # any remaining plugins.
+                logger.warning(
+                    'failed to register configured plugin - will attempt re-registering later',
+                    address=plugin[0], protocol=plugin[1], error=result,
+                )
+        if create_error is not None:
+            raise create_error
+
+    @staticmethod
+    def _disable(plugin: 'Plugin') -> None:
+        """Disable a plugin and stop any active tasks it may be running."""
+        plugin.disabled = True
+        plugin.cancel_tasks()
+
+        # Update the exported metrics disabled plugins gauge: add a disabled plugin
+        Monitor.plugin_disabled.labels(plugin.id).inc()
+        PluginManager.emit(EVENT_DISABLED, plugin)
+
+    @staticmethod
+    def _enable(plugin: 'Plugin') -> None:
+        """Re-enable a previously disabled plugin."""
+        plugin.disabled = False
+
+        # Update the exported metrics disabled plugins gauge: remove a disabled plugin
+        Monitor.plugin_disabled.labels(plugin.id).dec()
+        PluginManager.emit(EVENT_ENABLED, plugin)
+
     def all_ready(self) -> bool:
         """Check to see if all registered plugins are ready.
 
         If a single plugin is not ready, this returns False. If no plugins are
         registered, this returns True. In such a case, it is up to the caller to
-        perform additional checks for number of registered plugins.
+        perform additional checks for number of registered plugins. A plugin with
+        replicas is ready if any of its replicas are ready.
         """
         return all(plugin.is_ready() for plugin in self)
 
@@ -391,6 +748,11 @@ class Plugin:
         loop: The event loop to run plugin tasks on.
     """
 
+    # Whether a failed request to the plugin starts a task to reconnect to it. This
+    # is turned off while the plugin health monitor is running, as the monitor
+    # probes inactive plugins and marks them active again once they recover.
+    reconnect_on_error = True
+
     def __init__(
             self,
             info: dict,
@@ -427,6 +789,19 @@ class Plugin:
             for interceptor in self.client.interceptors:
                 interceptor.plugin = self.id
 
+        self.breaker: Optional[breaker.CircuitBreaker] = None
+        cfg = config.options.get('plugin.circuit_breaker') or {}
+        if cfg.get('enabled', True):
+            self.breaker = breaker.CircuitBreaker(
+                window=cfg.get('window', 20),
+                min_calls=cfg.get('min_calls', 5),
+                error_rate=cfg.get('error_rate', 0.5),
+                slow_call_duration=cfg.get('slow_call_duration', 0),
+                slow_call_rate=cfg.get('slow_call_rate', 1.0),
+                reset_timeout=cfg.get('reset_timeout', 30),
+                on_state_change=self._on_breaker_state_change,
+            )
+
         self._reconnect_task: Optional[asyncio.Task] = None
 
     def __str__(self) -> str:
@@ -439,12 +814,64 @@ class Plugin:
         self.cancel_tasks()
 
     def __enter__(self) -> client.PluginClientV3:
+        # Consult the circuit breaker prior to handing out the client so requests
+        # to a plugin which is failing are rejected immediately rather than waiting
+        # on the gRPC timeout.
+        if self.breaker is not None and not self.breaker.allow():
+            self._reject()
+
+        _call_starts.set(_call_starts.get() + (time.monotonic(),))
         return self.client
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        # Upon exiting the plugin context, check for any raised exception. If no
-        # exception was found, mark the plugin as active. Otherwise, mark it as
-        # inactive.
+        starts = _call_starts.get()
+        duration = time.monotonic() - starts[-1] if starts else 0
+        _call_starts.set(starts[:-1])
+
+        # A cancelled call says nothing about the state of the plugin, so do not
+        # update any state for it.
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            if self.breaker is not None:
+                self.breaker.release()
+            return
+
+        success = exc_type is None or isinstance(exc_val, client.errors.PluginError)
+        if self.breaker is not None:
+            self.breaker.record(success=success, duration=duration)
+        self._update_state(exc_type, exc_val, exc_tb)
+
+    @contextlib.contextmanager
+    def stream(self) -> Iterator[client.PluginClientV3]:
+        """Get the plugin client for a long-lived stream.
+
+        A stream is admitted by the circuit breaker like any other request, but
+        its outcome is not recorded on the breaker, since a stream is expected
+        to outlive the slow call duration. The plugin's active state is still
+        updated when the stream ends.
+        """
+        if self.breaker is not None and not self.breaker.admit():
+            self._reject()
+
+        try:
+            yield self.client
+        except Exception as e:
+            self._update_state(type(e), e, e.__traceback__)
+            raise
+        else:
+            self._update_state(None, None, None)
+
+    def _reject(self) -> None:
+        """Reject a request to the plugin because its circuit breaker is open."""
+        Monitor.plugin_circuit_rejected.labels(self.id).inc()
+        raise errors.PluginUnavailable(
+            f'circuit breaker open for plugin {self.id}: not accepting requests',
+        )
+
+    def _update_state(self, exc_type, exc_val, exc_tb) -> None:
+        """Update the active state of the plugin once a request to it completes."""
+
+        # Check for any exception raised by the request. If no exception was found,
+        # mark the plugin as active. Otherwise, mark it as inactive.
         if exc_type is None or isinstance(exc_val, client.errors.PluginError):
             self.mark_active()
         else:
@@ -455,7 +882,8 @@ class Plugin:
                 exc_tb=exc_tb,
                 id=self.id,
             )
-            self._reconnect_task = asyncio.create_task(self._reconnect())
+            if self.reconnect_on_error:
+                self._reconnect_task = asyncio.create_task(self._reconnect())
             self.mark_inactive()
 
     async def _reconnect(self):
@@ -473,7 +901,7 @@ class Plugin:
         while True:
             _l.debug('plugin reconnect task: attempting reconnect')
             try:
-                self.client.test()
+                await asyncio.get_event_loop().run_in_executor(None, self.client.test)
             except Exception as ex:
                 _l.info('plugin reconnect task: failed to reconnect to plugin', error=ex)
                 # The plugin should still be in the inactive state, but we re-set
@@ -491,7 +919,7 @@ class Plugin:
             _l.debug('plugin reconnect task: waiting until next retry', delay=delay)
             await asyncio.sleep(delay)
 
-    def refresh_state(self):
+    async def refresh_state(self, timeout: Optional[float] = None) -> None:
         """Refresh the state of the plugin.
 
         When a plugin becomes inactive, it will start a task to periodically retry
@@ -507,6 +935,10 @@ class Plugin:
         ensure that Synse Server refreshes the state of known plugins, and that it
         also refreshes the state of each existing individual plugin to ensure that
         its active/inactive state is up-to-date.
+
+        Args:
+            timeout: The time, in seconds, to wait for the plugin to respond. If
+                the plugin does not respond in time, it is marked inactive.
         """
         _l = logger.bind(plugin=self.id)
         _l.info('refreshing plugin state')
@@ -516,14 +948,75 @@ class Plugin:
             return
 
         try:
-            self.client.test()
+            await asyncio.wait_for(
+                asyncio.get_event_loop().run_in_executor(None, self.client.test),
+                timeout,
+            )
         except Exception as ex:
-            _l.debug('plugin refresh: failed to connect to plugin', errror=ex)
+            _l.debug('plugin refresh: failed to connect to plugin', error=ex)
             self.mark_inactive()
         else:
             _l.debug('plugin refresh: successfully connected to plugin')
             self.mark_active()
 
+    def timeout(self, method: str) -> Optional[float]:
+        """Get the timeout applied to requests to the plugin for a gRPC method.
+
+        If adaptive timeouts are enabled and enough requests have been made to
+        the plugin for the method, this is the timeout derived from the observed
+        latency. Otherwise, it is the static timeout configured for the client.
+
+        Args:
+            method: The name of the gRPC method, e.g. "ReadCache".
+
+        Returns:
+            The timeout, in seconds.
+        """
+        for interceptor in self.client.interceptors or []:
+            if isinstance(interceptor, AdaptiveTimeoutInterceptor):
+                deadline = interceptor.deadline(method)
+                if deadline is not None:
+                    return deadline
+        return self.client.timeout
+
+    def latency(self, method: str, percentile: float) -> Optional[float]:
+        """Get a percentile of the observed latency of requests to the plugin
+        for a gRPC method.
+
+        Args:
+            method: The name of the gRPC method, e.g. "Read".
+            percentile: The latency percentile (0-1) to get.
+
+        Returns:
+            The latency, in seconds. If adaptive timeouts are not enabled or not
+            enough requests have been made to the plugin, None is returned.
+        """
+        for interceptor in self.client.interceptors or []:
+            if isinstance(interceptor, AdaptiveTimeoutInterceptor):
+                tracker = interceptor.trackers.get(method)
+                if tracker is not None:
+                    return tracker.quantile(percentile)
+        return None
+
+    def circuit_state(self) -> str:
+        """Get the state of the plugin's circuit breaker.
+
+        Returns:
+            The circuit breaker state. If the circuit breaker is not enabled
+            for the plugin, this is "disabled".
+        """
+        if self.breaker is None:
+            return 'disabled'
+        return self.breaker.state
+
+    def is_available(self) -> bool:
+        """Check whether the plugin is ready and its circuit breaker is not
+        rejecting requests.
+        """
+        if not self.is_ready():
+            return False
+        return self.breaker is None or self.breaker.state != breaker.CircuitBreaker.OPEN
+
     def is_ready(self):
         """Check whether the plugin is ready to communicate with.
 
@@ -532,6 +1025,15 @@ class Plugin:
         """
         return self.active and not self.disabled
 
+    def _on_breaker_state_change(self, state: str) -> None:
+        """Callback for when the plugin's circuit breaker changes state."""
+        logger.info('plugin circuit breaker changed state', id=self.id, tag=self.tag, state=state)
+        Monitor.plugin_circuit_state.labels(self.id).set({
+            breaker.CircuitBreaker.CLOSED: 0,
+            breaker.CircuitBreaker.HALF_OPEN: 1,
+            breaker.CircuitBreaker.OPEN: 2,
+        }[state])
+
     def cancel_tasks(self) -> None:
         """Cancel any tasks associated with the plugin."""
         if self.loop.is_running():
@@ -550,9 +1052,11 @@ class Plugin:
             self._connects += 1
 
             # Update exported metrics
-            Monitor.plugin_active.labels(self.id).inc()
+            self._update_active_metric()
             Monitor.plugin_connects.labels(self.id).inc()
 
+            PluginManager.emit(EVENT_ACTIVATED, self)
+
     def mark_inactive(self) -> None:
         """Mark the plugin as inactive, if it is not already inactive."""
 
@@ -562,5 +1066,16 @@ class Plugin:
             self._disconnects += 1
 
             # Update exported metrics
-            Monitor.plugin_active.labels(self.id).dec()
+            self._update_active_metric()
             Monitor.plugin_disconnects.labels(self.id).inc()
+
+            PluginManager.emit(EVENT_DEACTIVATED, self)
+
+    def _update_active_metric(self) -> None:
+        """Update the active state metric for the plugin.
+
+        The metric is labelled by plugin ID, which is shared by all of a plugin's
+        replicas, so the plugin is active while any of its instances are.
+        """
+        active = self.active or any(p.active for p in manager.group(self.id) if p is not self)
+        Monitor.plugin_active.labels(self.id).set(int(active))
@@ -0,0 +1,158 @@
+"""Statistical sampling profiler for a running Synse Server.
+
+Unlike the ``--profile`` flag, which traces every function call for the
+lifetime of the process, the sampler periodically takes the stack of every
+thread for a fixed duration, so it can be run against a live instance with
+little overhead.
+
+Samples are aggregated as collapsed stacks: one line per distinct stack, with
+frames from the outermost to the innermost separated by semicolons, followed
+by the number of times it was sampled. This is the input format of most
+flame graph tools (e.g. ``flamegraph.pl``, speedscope).
+"""
+
+import collections
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+# Guards against more than one profile running at a time.
+_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """A profile is already running."""
+
+
+def _frame_name(frame: Any) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename}:{frame.f_lineno})'
+
+
+def _collapse(frame: Any) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def sample(duration: float, interval: float) -> Dict[str, Any]:
+    """Sample the stacks of all threads in the process.
+
+    This blocks for the duration, so it should be run in its own thread.
+
+    Args:
+        duration: The time, in seconds, to sample for.
+        interval: The time, in seconds, between samples.
+
+    Returns:
+        The number of samples taken and the sampled collapsed stacks, each
+        mapped to the number of times it was sampled.
+    """
+    own = threading.get_ident()
+    stacks: Dict[str, int] = collections.Counter()
+    samples = 0
+
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = [names.get(ident, str(ident))] + _collapse(frame)
+            stacks[';'.join(stack)] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return {
+        'samples': samples,
+        'stacks': dict(stacks),
+    }
+
+
+def allocations(snapshot: tracemalloc.Snapshot, top: int) -> List[Dict[str, Any]]:
+    """Get the source lines which allocated the most memory in a snapshot.
+
+    Args:
+        snapshot: The tracemalloc snapshot.
+        top: The number of source lines to return.
+
+    Returns:
+        The top source lines by allocated size, in descending order.
+    """
+    return [
+        {
+            'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'size': stat.size,
+            'count': stat.count,
+        }
+        for stat in snapshot.statistics('lineno')[:top]
+    ]
+
+
+def profile(
+        duration: float,
+        interval: float,
+        memory: bool = False,
+        top: int = 25,
+) -> Dict[str, Any]:
+    """Profile the process for a duration.
+
+    Only one profile may run at a time. This blocks for the duration, so it
+    should be run in its own thread.
+
+    Args:
+        duration: The time, in seconds, to profile for.
+        interval: The time, in seconds, between stack samples.
+        memory: Also trace memory allocations over the duration, returning
+            the source lines which allocated the most memory. Tracing
+            allocations slows down the process while it is enabled.
+        top: The number of source lines to return for the memory profile.
+
+    Returns:
+        The profile results.
+
+    Raises:
+        ProfilerBusy: A profile is already running.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy('a profile is already running')
+
+    # Only stop tracing memory if it was not already enabled (e.g. by
+    # PYTHONTRACEMALLOC), so it is left as it was found.
+    started = memory and not tracemalloc.is_tracing()
+    try:
+        if started:
+            tracemalloc.start()
+
+        start = time.monotonic()
+        result = sample(duration, interval)
+        result['duration'] = time.monotonic() - start
+        result['interval'] = interval
+
+        result['memory'] = None
+        if memory:
+            result['memory'] = allocations(tracemalloc.take_snapshot(), top)
+
+        return result
+    finally:
+        if started:
+            tracemalloc.stop()
+        _lock.release()
+
+
+def collapsed(stacks: Dict[str, int]) -> str:
+    """Format sampled stacks as collapsed stack lines.
+
+    Args:
+        stacks: The collapsed stacks, mapped to their sample counts.
+
+    Returns:
+        The stacks, one per line, in descending order of sample count.
+    """
+    lines = sorted(stacks.items(), key=lambda i: i[1], reverse=True)
+    return ''.join(f'{stack} {count}\n' for stack, count in lines)
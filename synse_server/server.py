@@ -14,8 +14,9 @@ from structlog import get_logger
 
 import synse_server
 from synse_server import (app, cache, config, errors, loop, metrics, plugin,
-                          tasks)
-from synse_server.log import setup_logger
+                          snapshot, tasks, tracing)
+from synse_server.log import (configure_logging, setup_filters, setup_handlers,
+                              setup_logger)
 
 logger = get_logger()
 
@@ -92,6 +93,7 @@ class Synse:
         the backing Sanic application. Additionally, it lets us set up
         logging early on.
         """
+        configure_logging()
         logger.info('initializing synse server')
 
         # Load the application configuration(s).
@@ -104,6 +106,8 @@ class Synse:
 
         # Configure logging, using the loaded config.
         setup_logger()
+        setup_handlers()
+        setup_filters()
         logger.info('configured logger')
 
         # Make sure that the filesystem layout needed by Synse Server
@@ -118,6 +122,9 @@ class Synse:
         # Configure caches
         cache.transaction_cache.ttl = config.options.get('cache.transaction.ttl', None)
 
+        # Configure request tracing.
+        tracing.configure()
+
     def run(self) -> None:
         """Run Synse Server."""
 
@@ -142,6 +149,10 @@ class Synse:
         logger.debug('registering tasks with application')
         tasks.register_with_app(self.app)
 
+        # Keep the device cache up to date as plugins change state, rather than
+        # waiting for the next periodic rebuild.
+        plugin.PluginManager.add_listener(cache.on_plugin_event)
+
         # If application metrics are enabled, configure the application now.
         if config.options.get('metrics.enabled'):
             logger.info('application performance metrics enabled (/metrics)')
@@ -170,8 +181,18 @@ class Synse:
                     f'gRPC cert not found: {cert}'
                 )
 
-        # Load the plugins defined in the configuration.
-        plugin.manager.refresh()
+        # Load the last snapshot of the device cache, if configured, so device
+        # catalog requests can be served before the plugins have been registered
+        # and the device cache has been rebuilt.
+        if config.options.get('cache.device.snapshot.path'):
+            loop.synse_loop.run_until_complete(
+                snapshot.load(config.options.get('cache.device.snapshot.path')),
+            )
+
+        # Plugins are not registered here. The device cache rebuild task registers
+        # the configured and discovered plugins in the background once the server
+        # is listening, so startup is not held up by unreachable plugins. The
+        # /ready endpoint reports when enough plugins have been registered.
 
         logger.debug('serving API endpoints')
         self.server = self.app.create_server(
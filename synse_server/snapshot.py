@@ -0,0 +1,241 @@
+"""Persisted snapshots of the device cache.
+
+A snapshot lets a restarted Synse Server answer device catalog queries
+immediately, using the devices it last knew about, rather than waiting for
+every plugin to be registered and the device cache to be rebuilt. Devices
+loaded from a snapshot are considered stale until the device cache is
+rebuilt from the plugins.
+
+The snapshot is a compact binary file containing the serialized device
+protobufs, the tag index, and the alias index. All integers are unsigned
+and little-endian:
+
+    magic      6 bytes   b'SYNSDC'
+    version    uint8
+    devices    uint32 count, then per device: uint32 length, protobuf bytes
+    tags       uint32 count, then per tag: uint16 length, utf-8 tag string,
+               uint32 count, then uint32 device indices
+    aliases    uint32 count, then per alias: uint16 length, utf-8 alias,
+               uint32 device index
+"""
+
+import asyncio
+import io
+import os
+import struct
+from typing import Dict, List, Tuple
+
+from google.protobuf.message import DecodeError
+from structlog import get_logger
+from synse_grpc import api
+
+from synse_server import cache
+
+logger = get_logger()
+
+MAGIC = b'SYNSDC'
+VERSION = 1
+
+_u8 = struct.Struct('<B')
+_u16 = struct.Struct('<H')
+_u32 = struct.Struct('<I')
+
+
+def encode(
+        tags: Dict[str, List[api.V3Device]],
+        aliases: Dict[str, api.V3Device],
+) -> bytes:
+    """Encode a device cache snapshot.
+
+    Args:
+        tags: The tag index, mapping tag strings to the devices with the tag.
+        aliases: The alias index, mapping aliases to their device.
+
+    Returns:
+        The binary snapshot.
+    """
+    # Devices appear under many tags, so each is only serialized once and
+    # referenced from the indices by its position.
+    devices: List[api.V3Device] = []
+    positions: Dict[str, int] = {}
+
+    def position(device: api.V3Device) -> int:
+        if device.id not in positions:
+            positions[device.id] = len(devices)
+            devices.append(device)
+        return positions[device.id]
+
+    tag_index = [(tag, [position(d) for d in devs]) for tag, devs in tags.items()]
+    alias_index = [(alias, position(d)) for alias, d in aliases.items()]
+
+    buf = io.BytesIO()
+    buf.write(MAGIC)
+    buf.write(_u8.pack(VERSION))
+
+    buf.write(_u32.pack(len(devices)))
+    for device in devices:
+        data = device.SerializeToString()
+        buf.write(_u32.pack(len(data)))
+        buf.write(data)
+
+    buf.write(_u32.pack(len(tag_index)))
+    for tag, idx in tag_index:
+        _write_str(buf, tag)
+        buf.write(_u32.pack(len(idx)))
+        buf.write(struct.pack(f'<{len(idx)}I', *idx))
+
+    buf.write(_u32.pack(len(alias_index)))
+    for alias, idx in alias_index:
+        _write_str(buf, alias)
+        buf.write(_u32.pack(idx))
+
+    return buf.getvalue()
+
+
+def decode(data: bytes) -> Tuple[Dict[str, List[api.V3Device]], Dict[str, api.V3Device]]:
+    """Decode a device cache snapshot.
+
+    Args:
+        data: The binary snapshot.
+
+    Returns:
+        A tuple of the tag index and the alias index.
+
+    Raises:
+        ValueError: The data is not a valid snapshot.
+    """
+    buf = io.BytesIO(data)
+    if buf.read(len(MAGIC)) != MAGIC:
+        raise ValueError('not a device cache snapshot')
+
+    version = _read(buf, _u8)
+    if version != VERSION:
+        raise ValueError(f'unsupported device cache snapshot version: {version}')
+
+    try:
+        devices = []
+        for _ in range(_read(buf, _u32)):
+            devices.append(api.V3Device.FromString(_read_bytes(buf, _read(buf, _u32))))
+
+        tags = {}
+        for _ in range(_read(buf, _u32)):
+            tag = _read_str(buf)
+            count = _read(buf, _u32)
+            idx = struct.unpack(f'<{count}I', _read_bytes(buf, count * _u32.size))
+            tags[tag] = [devices[i] for i in idx]
+
+        aliases = {}
+        for _ in range(_read(buf, _u32)):
+            alias = _read_str(buf)
+            aliases[alias] = devices[_read(buf, _u32)]
+
+    except (DecodeError, IndexError, UnicodeDecodeError, struct.error) as e:
+        raise ValueError('corrupt device cache snapshot') from e
+
+    return tags, aliases
+
+
+async def save(path: str) -> None:
+    """Write a snapshot of the device cache to disk.
+
+    The snapshot is written to a temporary file which replaces any existing
+    snapshot once it is complete, so a failed write never leaves a partial
+    snapshot behind. The cache locks are only held while the snapshot is
+    encoded; the file is written in an executor so it does not block the loop.
+
+    Args:
+        path: The path of the snapshot file.
+    """
+    async with cache._locked(cache.device_cache_lock, 'device'):
+        tags = {
+            k[len(cache.NS_DEVICE):]: v for k, v in cache.device_cache._cache.items()
+            if k.startswith(cache.NS_DEVICE)
+        }
+        async with cache._locked(cache.alias_cache_lock, 'alias'):
+            aliases = {
+                k[len(cache.NS_ALIAS):]: v for k, v in cache.alias_cache._cache.items()
+                if k.startswith(cache.NS_ALIAS)
+            }
+        data = encode(tags, aliases)
+
+    await asyncio.get_event_loop().run_in_executor(None, _write_file, path, data)
+
+    logger.debug('saved device cache snapshot', path=path, tags=len(tags), size=len(data))
+
+
+async def load(path: str) -> bool:
+    """Load a snapshot of the device cache from disk.
+
+    The loaded devices are marked stale until the device cache is next rebuilt
+    from the plugins. If the device cache has already been populated, the
+    snapshot is not loaded, as it would be older than the cached data.
+
+    Args:
+        path: The path of the snapshot file.
+
+    Returns:
+        True if the snapshot was loaded; False otherwise.
+    """
+    try:
+        data = await asyncio.get_event_loop().run_in_executor(None, _read_file, path)
+    except FileNotFoundError:
+        logger.info('no device cache snapshot found', path=path)
+        return False
+    except OSError as e:
+        logger.warning('failed to read device cache snapshot', path=path, error=e)
+        return False
+
+    try:
+        tags, aliases = decode(data)
+    except Exception as e:
+        logger.warning('failed to decode device cache snapshot', path=path, error=e)
+        return False
+
+    async with cache._locked(cache.device_cache_lock, 'device'):
+        if cache.get_cached_device_tags():
+            logger.info('device cache already populated, not loading snapshot', path=path)
+            return False
+
+        for k, v in aliases.items():
+            await cache.add_alias(k, v)
+
+        for k, v in tags.items():
+            await cache.device_cache.set(k, v)
+
+        cache.stale = True
+
+    logger.info('loaded device cache snapshot', path=path, tags=len(tags), aliases=len(aliases))
+    return True
+
+
+def _write_file(path: str, data: bytes) -> None:
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _write_str(buf: io.BytesIO, value: str) -> None:
+    data = value.encode('utf-8')
+    buf.write(_u16.pack(len(data)))
+    buf.write(data)
+
+
+def _read_str(buf: io.BytesIO) -> str:
+    return _read_bytes(buf, _read(buf, _u16)).decode('utf-8')
+
+
+def _read_bytes(buf: io.BytesIO, n: int) -> bytes:
+    data = buf.read(n)
+    if len(data) != n:
+        raise ValueError('truncated device cache snapshot')
+    return data
+
+
+def _read(buf: io.BytesIO, fmt: struct.Struct) -> int:
+    return fmt.unpack(_read_bytes(buf, fmt.size))[0]
@@ -1,12 +1,14 @@
 """Asynchronous background tasks."""
 
 import asyncio
+from typing import List
 
 import sanic
 from structlog import get_logger
 
-from synse_server import config, plugin
+from synse_server import cache, config, health, lag, plugin, snapshot
 from synse_server.cache import update_device_cache
+from synse_server.discovery import file, kubernetes
 
 logger = get_logger()
 
@@ -23,9 +25,35 @@ def register_with_app(app: sanic.Sanic) -> None:
     logger.info('adding task', task='periodic plugin refresh')
     app.add_task(_refresh_plugins)
 
+    if config.options.get('plugin.health_check.enabled', True):
+        logger.info('adding task', task='plugin health monitor')
+        app.add_task(_monitor_plugin_health)
+
+    if config.options.get('cache.device.snapshot.path'):
+        logger.info('adding task', task='periodic device cache snapshot')
+        app.add_task(_snapshot_device_cache)
+
+    if config.options.get('plugin.discover.kubernetes.watch'):
+        logger.info('adding task', task='kubernetes endpoint watch')
+        app.add_task(_watch_kubernetes_endpoints)
+
+    if config.options.get('plugin.discover.file.path'):
+        logger.info('adding task', task='plugins file watch')
+        app.add_task(_watch_plugins_file)
+
+    if config.options.get('loop_monitor.enabled', True):
+        logger.info('adding task', task='event loop monitor')
+        app.add_task(_monitor_event_loop)
+
 
 async def _rebuild_device_cache() -> None:
-    """Periodically rebuild the device cache."""
+    """Periodically rebuild the device cache.
+
+    Rebuilding the device cache refreshes the plugin manager if no plugins
+    are registered, so the first rebuild also registers the plugins when
+    Synse Server starts. If the periodic plugin refresh is already registering
+    them, the rebuild waits for it to finish.
+    """
     interval = config.options.get('cache.device.rebuild_every', 3 * 60)  # 3 minute default
 
     while True:
@@ -45,6 +73,33 @@ async def _rebuild_device_cache() -> None:
         await asyncio.sleep(interval)
 
 
+async def _snapshot_device_cache() -> None:
+    """Periodically snapshot the device cache to disk."""
+    path = config.options.get('cache.device.snapshot.path')
+    interval = config.options.get('cache.device.snapshot.interval', 60)  # 1 minute default
+
+    while True:
+        await asyncio.sleep(interval)
+
+        # A stale cache holds the devices loaded from the existing snapshot,
+        # so there is nothing new to save until it has been revalidated.
+        if cache.stale or not cache.get_cached_device_tags():
+            continue
+
+        logger.debug(
+            'task: snapshotting device cache',
+            task='periodic cache snapshot', interval=interval, path=path,
+        )
+
+        try:
+            await snapshot.save(path)
+        except Exception as e:
+            logger.error(
+                'task: failed to snapshot device cache',
+                task='periodic cache snapshot', interval=interval, path=path, error=e,
+            )
+
+
 async def _refresh_plugins() -> None:
     """Periodically refresh the plugin manager."""
     interval = config.options.get('cache.plugin.refresh_every', 2 * 60)  # 2 minute default
@@ -56,7 +111,7 @@ async def _refresh_plugins() -> None:
         )
 
         try:
-            plugin.manager.refresh()
+            await plugin.manager.refresh()
         except Exception as e:
             logger.error(
                 'task: failed to refresh plugins',
@@ -64,3 +119,64 @@ async def _refresh_plugins() -> None:
             )
 
         await asyncio.sleep(interval)
+
+
+async def _monitor_plugin_health() -> None:
+    """Monitor the health of the registered plugins."""
+    monitor = health.HealthMonitor.from_config()
+    if monitor is None:
+        logger.warning('task: plugin health monitor not enabled', task='health monitor')
+        return
+
+    health.monitor = monitor
+    try:
+        await monitor.run()
+    finally:
+        monitor.stop()
+        health.monitor = None
+
+
+async def _monitor_event_loop() -> None:
+    """Monitor the event loop for lag and blocking calls."""
+    monitor = lag.LoopMonitor.from_config()
+    if monitor is None:
+        logger.warning('task: event loop monitor not enabled', task='loop monitor')
+        return
+
+    await monitor.run()
+
+
+async def _watch_kubernetes_endpoints() -> None:
+    """Watch Kubernetes endpoints for changes to the discovered plugins."""
+    async def on_change(added: List[str], removed: List[str]) -> None:
+        await plugin.manager.update_discovered(
+            added=[(address, 'tcp') for address in added],
+            removed=[(address, 'tcp') for address in removed],
+        )
+
+    watcher = kubernetes.EndpointWatcher.from_config(on_change=on_change)
+    if watcher is None:
+        logger.warning('task: kubernetes endpoint watch not configured', task='endpoint watch')
+        return
+
+    kubernetes.watcher = watcher
+    try:
+        await watcher.run()
+    finally:
+        watcher.stop()
+        kubernetes.watcher = None
+
+
+async def _watch_plugins_file() -> None:
+    """Watch the plugins file for changes to the discovered plugins."""
+    watcher = file.FileWatcher.from_config(on_change=plugin.manager.update_discovered)
+    if watcher is None:
+        logger.warning('task: plugins file watch not configured', task='file watch')
+        return
+
+    file.watcher = watcher
+    try:
+        await watcher.run()
+    finally:
+        watcher.stop()
+        file.watcher = None
@@ -0,0 +1,218 @@
+"""Adaptive gRPC request timeouts for plugin communication."""
+
+import collections
+import math
+import threading
+import time
+from typing import Deque, Dict, Optional, Union
+
+import grpc
+
+from synse_server.metrics import Monitor, get_metadata
+
+__all__ = ['AdaptiveTimeoutInterceptor', 'CallDetails', 'LatencyTracker']
+
+
+class LatencyTracker:
+    """Track the latency of recent calls for a single gRPC method and derive
+    a deadline from it.
+
+    The deadline is the configured percentile of the recorded latencies,
+    multiplied by a safety factor and clamped between a floor and a ceiling.
+    Until enough samples have been recorded, no deadline is derived and the
+    caller should fall back to its default.
+
+    Args:
+        window: The number of most recent latency samples to keep.
+        min_samples: The minimum number of samples required before a
+            deadline is derived.
+        percentile: The latency percentile (0-1) to base the deadline on.
+        factor: The multiplier applied to the percentile latency.
+        floor: The minimum deadline, in seconds.
+        ceiling: The maximum deadline, in seconds.
+    """
+
+    def __init__(
+            self,
+            window: int = 100,
+            min_samples: int = 20,
+            percentile: float = 0.99,
+            factor: float = 3,
+            floor: Union[int, float] = 0.5,
+            ceiling: Union[int, float] = 30,
+    ) -> None:
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+        self._deadline: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """The derived deadline, in seconds, or None if not enough samples
+        have been recorded yet.
+        """
+        return self._deadline
+
+    def record(self, latency: float) -> None:
+        """Record the latency of a call.
+
+        Args:
+            latency: The time, in seconds, that the call took.
+        """
+        with self._lock:
+            self._samples.append(latency)
+
+        value = self.quantile(self.percentile)
+        if value is not None:
+            self._deadline = min(self.ceiling, max(self.floor, value * self.factor))
+
+    def quantile(self, percentile: float) -> Optional[float]:
+        """Get a percentile of the recorded latencies.
+
+        Args:
+            percentile: The latency percentile (0-1) to get.
+
+        Returns:
+            The latency, in seconds, or None if not enough samples have been
+            recorded yet.
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+
+        idx = min(len(ordered) - 1, max(0, math.ceil(percentile * len(ordered)) - 1))
+        return ordered[idx]
+
+
+class CallDetails(
+    collections.namedtuple(
+        'CallDetails',
+        ('method', 'timeout', 'metadata', 'credentials', 'wait_for_ready', 'compression'),
+    ),
+    grpc.ClientCallDetails,
+):
+    """The details of a gRPC call, for client interceptors which need to
+    change them (e.g. the timeout or metadata) before continuing the call.
+    """
+
+
+class AdaptiveTimeoutInterceptor(grpc.UnaryUnaryClientInterceptor,
+                                 grpc.UnaryStreamClientInterceptor):
+    """A gRPC client interceptor which replaces the static request timeout with
+    one derived from the observed latency of the plugin.
+
+    Latency is tracked per gRPC method, since different methods (e.g. Metadata
+    and Read) have very different costs. For streaming methods, latency is
+    measured through to the end of the stream, as that is what the deadline
+    bounds. Calls made without a timeout (e.g. ReadStream) are left untouched.
+
+    Successful calls are recorded with their latency. A call which exceeds its
+    deadline is recorded with the deadline it was given: its real latency is
+    unknown, but at least that long. This lets the deadline back off towards
+    the ceiling when the plugin slows down, rather than every later call timing
+    out against a deadline derived from the faster calls before it. Calls which
+    fail for any other reason are not recorded.
+
+    One interceptor is created per plugin client, so latency is tracked for
+    each plugin separately.
+
+    Args:
+        kwargs: Options passed through to each method's LatencyTracker.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        # Initialize with no plugin defined. This is because we create the
+        # gRPC client before we know the identity of the plugin.
+        self.plugin = ''
+        self.trackers: Dict[str, LatencyTracker] = {}
+        self._tracker_kwargs = kwargs
+        self._lock = threading.Lock()
+
+    def deadline(self, method: str) -> Optional[float]:
+        """Get the adaptive deadline for a gRPC method.
+
+        Args:
+            method: The name of the gRPC method, e.g. "ReadCache".
+
+        Returns:
+            The deadline, in seconds, or None if one has not been derived.
+        """
+        tracker = self.trackers.get(method)
+        if tracker is None:
+            return None
+        return tracker.deadline
+
+    def _tracker(self, method: str) -> LatencyTracker:
+        tracker = self.trackers.get(method)
+        if tracker is None:
+            with self._lock:
+                tracker = self.trackers.setdefault(
+                    method, LatencyTracker(**self._tracker_kwargs),
+                )
+        return tracker
+
+    def _record(self, method: str, latency: float) -> None:
+        tracker = self._tracker(method)
+        tracker.record(latency)
+        if tracker.deadline is not None:
+            Monitor.grpc_adaptive_timeout.labels(method, self.plugin).set(tracker.deadline)
+
+    def _details(self, method: str, client_call_details):
+        timeout = self.deadline(method)
+        if client_call_details.timeout is None or timeout is None:
+            return client_call_details
+
+        return CallDetails(
+            client_call_details.method,
+            timeout,
+            client_call_details.metadata,
+            client_call_details.credentials,
+            getattr(client_call_details, 'wait_for_ready', None),
+            getattr(client_call_details, 'compression', None),
+        )
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        _, method = get_metadata(client_call_details)
+        details = self._details(method, client_call_details)
+
+        start = time.monotonic()
+        resp = continuation(details, request)
+
+        # The outcome of a unary call is resolved by the time the continuation
+        # returns.
+        err = resp.exception()
+        if err is None:
+            self._record(method, time.monotonic() - start)
+        elif _deadline_exceeded(err):
+            self._record(method, details.timeout)
+        return resp
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        _, method = get_metadata(client_call_details)
+        if client_call_details.timeout is None:
+            return continuation(client_call_details, request)
+
+        details = self._details(method, client_call_details)
+        return self._wrap_stream(method, details.timeout, continuation(details, request))
+
+    def _wrap_stream(self, method, timeout, response):
+        start = time.monotonic()
+        try:
+            for item in response:
+                yield item
+        except grpc.RpcError as e:
+            if _deadline_exceeded(e):
+                self._record(method, timeout)
+            raise
+        self._record(method, time.monotonic() - start)
+
+
+def _deadline_exceeded(err: BaseException) -> bool:
+    """Check whether a call failed because it exceeded its deadline."""
+    return isinstance(err, grpc.Call) and err.code() == grpc.StatusCode.DEADLINE_EXCEEDED
@@ -0,0 +1,115 @@
+"""Per-stage timing of request handling.
+
+Request handling is broken down into stages (e.g. device cache lookups, gRPC
+requests to plugins, reading conversion, JSON encoding). The time spent in
+each stage is recorded in a per-stage Prometheus histogram and, for the
+current request, accumulated so that it may be returned to the client in
+the ``Server-Timing`` response header.
+
+Example:
+
+    with timing.stage('cache'):
+        device = await cache.get_device(device_id)
+
+The timings of the current request are held in a context variable, so any
+code running in the request's task records to them without the timings
+having to be passed around. Code run in an executor does not share the
+context, so its durations should be measured there and recorded with
+:func:`record` once back on the event loop.
+"""
+
+import contextlib
+import contextvars
+import time
+from typing import Dict, Iterator, Optional
+
+from synse_server import tracing
+from synse_server.metrics import Monitor
+
+# Stage names used across Synse Server.
+CACHE = 'cache'
+GRPC = 'grpc'
+CONVERT = 'convert'
+ENCODE = 'encode'
+
+_timings: contextvars.ContextVar[Optional['Timings']] = contextvars.ContextVar(
+    'timings', default=None,
+)
+
+
+class Timings:
+    """The accumulated time spent in each stage of handling a request.
+
+    Stages may be entered more than once, e.g. for concurrent gRPC requests
+    to multiple plugins, in which case their durations are summed.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        """Add time spent in a stage.
+
+        Args:
+            name: The name of the stage.
+            duration: The time, in seconds, spent in the stage.
+        """
+        self.stages[name] = self.stages.get(name, 0) + duration
+
+    def header(self) -> str:
+        """Format the timings as a ``Server-Timing`` header value.
+
+        Durations are given in milliseconds, and include the total time
+        since the timings were started.
+        """
+        total = time.perf_counter() - self.start
+        metrics = [f'{name};dur={duration * 1000:.2f}' for name, duration in self.stages.items()]
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def start() -> Timings:
+    """Start timing a request in the current context.
+
+    Returns:
+        The timings for the request.
+    """
+    timings = Timings()
+    _timings.set(timings)
+    return timings
+
+
+def current() -> Optional[Timings]:
+    """Get the timings of the request in the current context, if any."""
+    return _timings.get()
+
+
+def record(name: str, duration: float) -> None:
+    """Record time spent in a stage.
+
+    Args:
+        name: The name of the stage.
+        duration: The time, in seconds, spent in the stage.
+    """
+    Monitor.request_stage_latency.labels(name).observe(duration)
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, duration)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as a stage of request handling.
+
+    If tracing is enabled, the stage is also traced as a span.
+
+    Args:
+        name: The name of the stage.
+    """
+    start_time = time.perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        record(name, time.perf_counter() - start_time)
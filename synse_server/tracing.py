@@ -0,0 +1,457 @@
+"""Span-based request tracing.
+
+A trace follows a request through Synse Server, as a tree of timed spans:
+the HTTP request or WebSocket message, the request stages (device cache
+lookups, plugin reads, etc.), and each gRPC request made to a plugin.
+
+Trace context is propagated with the W3C Trace Context ``traceparent``
+header (https://www.w3.org/TR/trace-context/). An inbound ``traceparent``
+makes the request part of the caller's trace, and each gRPC request sends
+the ``traceparent`` of its span to the plugin as request metadata, so the
+trace can be continued by plugins which support it.
+
+Finished spans are handed to an exporter. The in-memory exporter keeps the
+most recent spans (viewable from the ``/v3/debug/traces`` endpoint) and the
+file exporter appends them to a file as JSON lines, which is convenient for
+local testing. Other exporters may be plugged in by configuring the import
+path of an :class:`Exporter` subclass, or with :func:`set_exporter`.
+
+The current span is held in a context variable. Code run in an executor does
+not share the context unless it is wrapped with :func:`propagate`.
+"""
+
+import atexit
+import collections
+import contextlib
+import contextvars
+import functools
+import importlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import grpc
+from structlog import get_logger
+
+from synse_server import config
+from synse_server.metrics import get_metadata
+from synse_server.timeouts import CallDetails
+
+logger = get_logger()
+
+# The W3C Trace Context header (and gRPC metadata key).
+TRACEPARENT = 'traceparent'
+
+_TRACEPARENT_RE = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})')
+
+# Whether tracing is enabled, and the fraction of new traces to sample.
+enabled = False
+sample_rate = 1.0
+
+_current: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar(
+    'span', default=None,
+)
+
+
+class Span:
+    """A timed operation within a trace.
+
+    Args:
+        name: The name of the operation.
+        trace_id: The ID of the trace the span belongs to (32 hex digits).
+        parent_id: The ID of the parent span (16 hex digits), if any.
+        sampled: Whether the span is exported once finished.
+        attributes: Attributes describing the operation.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            trace_id: str,
+            parent_id: Optional[str] = None,
+            sampled: bool = True,
+            attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _random_id(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes or {}
+
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self._start = time.perf_counter()
+
+    @property
+    def traceparent(self) -> str:
+        """The W3C ``traceparent`` header value which identifies this span."""
+        return f'00-{self.trace_id}-{self.span_id}-{"01" if self.sampled else "00"}'
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute of the span."""
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        """Mark the span as failed with the given error."""
+        self.status = 'error'
+        self.error = str(error) or type(error).__name__
+
+    def finish(self) -> None:
+        """Finish the span, exporting it if it is sampled.
+
+        Finishing a span more than once has no effect.
+        """
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if self.sampled:
+            try:
+                _exporter.export(self)
+            except Exception as e:
+                logger.warning('failed to export trace span', span=self.name, error=e)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a dictionary representation of the span."""
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration': self.duration,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class Exporter:
+    """The base class for trace span exporters.
+
+    Exporters are called with each finished span from whichever thread
+    finished it, so they must be thread-safe and should not block.
+    """
+
+    def export(self, span: Span) -> None:
+        """Export a finished span."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the exporter once it is replaced."""
+
+
+class MemoryExporter(Exporter):
+    """Keep the most recently finished spans in memory.
+
+    Args:
+        size: The maximum number of spans to keep.
+    """
+
+    def __init__(self, size: int = 1000) -> None:
+        self._spans = collections.deque(maxlen=size)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        """The finished spans, oldest first."""
+        return list(self._spans)
+
+    def clear(self) -> None:
+        """Clear the finished spans."""
+        self._spans.clear()
+
+
+class FileExporter(Exporter):
+    """Append finished spans to a file, as JSON lines.
+
+    Spans are put on a queue and written out by a queue listener on its own
+    thread, as log records are (see ``log.start_queue``), so exporting a span
+    does not block on the file. Any spans still queued are written out when
+    the exporter is closed, or on exit.
+
+    Args:
+        path: The path of the file to write spans to.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        handler = logging.FileHandler(path, delay=True)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler)
+        self._listener.start()
+        self._closed = False
+        atexit.register(self.close)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        self._listener.queue.put(logging.makeLogRecord({'msg': line}))
+
+    def close(self) -> None:
+        """Write out any queued spans and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        atexit.unregister(self.close)
+
+
+_exporter: Exporter = MemoryExporter()
+
+
+def get_exporter() -> Exporter:
+    """Get the exporter which finished spans are handed to."""
+    return _exporter
+
+
+def set_exporter(exporter: Exporter) -> None:
+    """Set the exporter which finished spans are handed to.
+
+    The exporter being replaced is closed.
+    """
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not exporter:
+        previous.close()
+
+
+def configure() -> None:
+    """Configure tracing from the tracing configuration.
+
+    Raises:
+        ValueError: The configured exporter is not valid.
+    """
+    global enabled, sample_rate
+
+    cfg = config.options.get('tracing') or {}
+    enabled = cfg.get('enabled', False)
+    sample_rate = cfg.get('sample_rate', 1.0)
+    if not enabled:
+        return
+
+    exporter = cfg.get('exporter') or 'memory'
+    if exporter == 'memory':
+        set_exporter(MemoryExporter(cfg.get('buffer', 1000)))
+    elif exporter == 'file':
+        if not cfg.get('path'):
+            raise ValueError('tracing: the file exporter requires a path')
+        set_exporter(FileExporter(cfg['path']))
+    else:
+        module, _, name = exporter.rpartition('.')
+        try:
+            cls = getattr(importlib.import_module(module), name)
+        except (ImportError, AttributeError, ValueError) as e:
+            raise ValueError(f'tracing: unable to load exporter: {exporter}') from e
+        set_exporter(cls())
+
+    logger.info('tracing enabled', exporter=exporter, sample_rate=sample_rate)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """Parse a W3C ``traceparent`` header value.
+
+    Args:
+        value: The header value.
+
+    Returns:
+        A tuple of the trace ID, the parent span ID, and whether the trace is
+        sampled; or None if the value is not a valid traceparent.
+    """
+    if not value:
+        return None
+
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if match is None:
+        return None
+
+    version, trace_id, parent_id, flags = match.groups()
+    if version == 'ff' or trace_id == '0' * 32 or parent_id == '0' * 16:
+        return None
+    # Version 00 defines the exact length; later versions may append fields.
+    if version == '00' and len(value.strip()) != 55:
+        return None
+
+    return trace_id, parent_id, bool(int(flags, 16) & 0x01)
+
+
+def start_span(
+        name: str,
+        parent: Optional[Span] = None,
+        traceparent: Optional[str] = None,
+        **attributes: Any,
+) -> Span:
+    """Start a span, without making it the current span.
+
+    Args:
+        name: The name of the operation.
+        parent: The parent span. If not given, the span continues the trace of
+            the traceparent, if valid; otherwise, it starts a new trace.
+        traceparent: The W3C traceparent of a remote parent span.
+        attributes: Attributes describing the operation.
+
+    Returns:
+        The started span.
+    """
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+
+    remote = parse_traceparent(traceparent)
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+        return Span(name, trace_id, parent_id, sampled, attributes)
+
+    return Span(name, _random_id(128), None, random.random() < sample_rate, attributes)
+
+
+def activate(span: Optional[Span]) -> contextvars.Token:
+    """Make a span the current span.
+
+    Returns:
+        A token which can be used to restore the previous current span.
+    """
+    return _current.set(span)
+
+
+def current() -> Optional[Span]:
+    """Get the current span, if any."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Trace the enclosed block as a child of the current span, or as a new
+    trace if there is no current span.
+
+    If tracing is not enabled, nothing is traced and None is yielded.
+
+    Args:
+        name: The name of the operation.
+        attributes: Attributes describing the operation.
+    """
+    if not enabled:
+        yield None
+        return
+
+    s = start_span(name, parent=current(), **attributes)
+    token = activate(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.finish()
+
+
+def traced(name: str) -> Callable:
+    """Decorate a coroutine function so each call is traced as a span.
+
+    Args:
+        name: The name of the operation.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap a function so it runs in a copy of the current context.
+
+    This lets a function run in an executor trace as part of the current
+    span (e.g. its gRPC requests to plugins).
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+class TracingInterceptor(grpc.UnaryUnaryClientInterceptor,
+                         grpc.UnaryStreamClientInterceptor):
+    """A gRPC client interceptor which traces requests to plugins made as part
+    of a traced operation, and propagates the trace to the plugin in the
+    ``traceparent`` request metadata.
+
+    Requests made outside of a traced operation (e.g. background health
+    checks) are not traced.
+    """
+
+    def __init__(self) -> None:
+        # Initialize with no plugin defined. This is because we create the
+        # gRPC client before we know the identity of the plugin.
+        self.plugin = ''
+
+    def _start(self, client_call_details) -> Tuple[Optional[Span], Any]:
+        parent = current()
+        if parent is None:
+            return None, client_call_details
+
+        service, method = get_metadata(client_call_details)
+        s = start_span(
+            f'grpc {method}', parent=parent,
+            plugin=self.plugin, service=service, method=method,
+        )
+
+        metadata = list(client_call_details.metadata or [])
+        metadata.append((TRACEPARENT, s.traceparent))
+        return s, CallDetails(
+            client_call_details.method,
+            client_call_details.timeout,
+            metadata,
+            client_call_details.credentials,
+            getattr(client_call_details, 'wait_for_ready', None),
+            getattr(client_call_details, 'compression', None),
+        )
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        s, details = self._start(client_call_details)
+        resp = continuation(details, request)
+        if s is not None:
+            err = resp.exception()
+            if err is not None:
+                s.set_error(err)
+            s.finish()
+        return resp
+
+    def intercept_unary_stream(self, continuation, client_call_details, request):
+        s, details = self._start(client_call_details)
+        resp = continuation(details, request)
+        if s is None:
+            return resp
+        return _traced_stream(resp, s)
+
+
+def _traced_stream(response, s: Span):
+    """Wrap a stream response so its span is finished once the stream is
+    exhausted, closed, or fails.
+    """
+    count = 0
+    try:
+        for item in response:
+            count += 1
+            yield item
+    except Exception as e:
+        s.set_error(e)
+        raise
+    finally:
+        s.set_attribute('messages', count)
+        s.finish()
+
+
+def _random_id(bits: int) -> str:
+    # An all-zero ID is invalid, so it is never generated.
+    return f'{random.getrandbits(bits) or 1:0{bits // 4}x}'
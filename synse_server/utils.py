@@ -6,7 +6,7 @@ from typing import Dict, List, Union
 import sanic.response
 import ujson
 
-from synse_server import config
+from synse_server import config, timing
 
 
 def normalize_write_ctx(data: Dict) -> None:
@@ -82,6 +82,7 @@ def http_json_response(body: Union[Dict, List], **kwargs) -> sanic.response.HTTP
     Returns:
         The Sanic endpoint response with the given body encoded as JSON.
     """
-    if config.options.get('pretty_json'):
-        return sanic.response.json(body, indent=2, dumps=_dumps, **kwargs)
-    return sanic.response.json(body, **kwargs)
+    with timing.stage(timing.ENCODE):
+        if config.options.get('pretty_json'):
+            return sanic.response.json(body, indent=2, dumps=_dumps, **kwargs)
+        return sanic.response.json(body, **kwargs)
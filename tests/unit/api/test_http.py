@@ -4,7 +4,14 @@ import asynctest
 import pytest
 import ujson
 
-from synse_server import errors
+from synse_server import errors, plugin
+
+
+def trip_breaker(p):
+    """Record enough failed calls through a plugin's circuit breaker to open it."""
+    for _ in range(p.breaker.min_calls):
+        p.breaker.record(success=False)
+    assert p.breaker.state == p.breaker.OPEN
 
 
 class TestCoreTest:
@@ -42,6 +49,47 @@ class TestCoreTest:
         mock_cmd.assert_called_once()
 
 
+class TestCoreReady:
+    """Tests for the Synse core API 'ready' route."""
+
+    @pytest.mark.parametrize(
+        'method', (
+            'post',
+            'put',
+            'delete',
+            'patch',
+            'head',
+            'options',
+        )
+    )
+    def test_methods_not_allowed(self, synse_app, method):
+        fn = getattr(synse_app.test_client, method)
+        _, response = fn('/ready', gather_request=False)
+        assert response.status == 405
+
+    @pytest.mark.parametrize(
+        'ready,status', (
+            (True, 200),
+            (False, 503),
+        )
+    )
+    def test_ok(self, synse_app, ready, status):
+        with asynctest.patch('synse_server.cmd.ready') as mock_cmd:
+            mock_cmd.return_value = {
+                'ready': ready,
+                'timestamp': '2019-04-22T13:30:00Z',
+            }
+
+            _, resp = synse_app.test_client.get('/ready', gather_request=False)
+            assert resp.status == status
+            assert resp.headers['Content-Type'] == 'application/json'
+
+            body = ujson.loads(resp.body)
+            assert body == mock_cmd.return_value
+
+        mock_cmd.assert_called_once()
+
+
 class TestCoreVersion:
     """Tests for the Synse core API 'version' route."""
 
@@ -900,6 +948,8 @@ class TestV3Read:
             ns='default',
             tag_groups=[],
             plugin_id=None,
+            deadline=None,
+            partial=False,
         )
 
     def test_error(self, synse_app):
@@ -923,6 +973,8 @@ class TestV3Read:
             ns='default',
             tag_groups=[],
             plugin_id=None,
+            deadline=None,
+            partial=False,
         )
 
     def test_invalid_multiple_ns(self, synse_app):
@@ -977,7 +1029,9 @@ class TestV3Read:
         mock_cmd.assert_called_with(
             ns='default',
             tag_groups=expected,
-            plugin_id=None
+            plugin_id=None,
+            deadline=None,
+            partial=False,
         )
 
     @pytest.mark.parametrize(
@@ -1014,6 +1068,8 @@ class TestV3Read:
             ns=expected,
             tag_groups=[],
             plugin_id=None,
+            deadline=None,
+            partial=False,
         )
 
     def test_param_plugin(self, synse_app, mocker):
@@ -1037,6 +1093,8 @@ class TestV3Read:
             ns='default',
             tag_groups=[],
             plugin_id='123456',
+            deadline=None,
+            partial=False,
         )
 
     def test_param_plugin_no_plugin(self, synse_app):
@@ -1052,6 +1110,68 @@ class TestV3Read:
 
         mock_cmd.assert_not_called()
 
+    @pytest.mark.parametrize(
+        'qparam,deadline,partial', [
+            ('?deadline=2', 2.0, False),
+            ('?deadline=0.25', 0.25, False),
+            ('?partial=true', None, True),
+            ('?deadline=1.5&partial=true', 1.5, True),
+        ]
+    )
+    def test_param_deadline_partial(self, synse_app, qparam, deadline, partial):
+        with asynctest.patch('synse_server.cmd.read') as mock_cmd:
+            mock_cmd.return_value = [{'value': 1, 'type': 'temperature'}]
+
+            _, resp = synse_app.test_client.get(
+                '/v3/read' + qparam,
+                gather_request=False,
+            )
+            assert resp.status == 200
+
+        mock_cmd.assert_called_once_with(
+            ns='default',
+            tag_groups=[],
+            plugin_id=None,
+            deadline=deadline,
+            partial=partial,
+        )
+
+    @pytest.mark.parametrize(
+        'qparam', [
+            '?deadline=foo',
+            '?deadline=-1',
+            '?deadline=1&deadline=2',
+            '?deadline=nan',
+            '?deadline=inf',
+        ]
+    )
+    def test_param_deadline_invalid(self, synse_app, qparam):
+        with asynctest.patch('synse_server.cmd.read') as mock_cmd:
+            _, resp = synse_app.test_client.get(
+                '/v3/read' + qparam,
+                gather_request=False,
+            )
+            assert resp.status == 400
+            assert resp.headers['Content-Type'] == 'application/json'
+
+        mock_cmd.assert_not_called()
+
+    @pytest.mark.usefixtures('clear_manager_plugins')
+    def test_circuit_breaker_open(self, synse_app, simple_plugin):
+        trip_breaker(simple_plugin)
+        plugin.manager.plugins[simple_plugin.id] = simple_plugin
+
+        _, resp = synse_app.test_client.get('/v3/read', gather_request=False)
+        assert resp.status == 503
+
+        body = ujson.loads(resp.body)
+        assert body == {
+            'context': 'circuit breaker open for plugin 123: not accepting requests',
+            'description': 'plugin unavailable',
+            'http_code': 503,
+            'timestamp': '2019-04-22T13:30:00Z',
+        }
+
 
 @pytest.mark.usefixtures('patch_utils_rfc3339now')
 class TestV3ReadCache:
@@ -1109,7 +1229,7 @@ class TestV3ReadCache:
             assert resp.body == b'{"value":1,"type":"temperature"}\n{"value":2,"type":"temperature"}\n{"value":3,"type":"temperature"}\n'  # noqa: E501
 
         mock_cmd.assert_called_once()
-        mock_cmd.assert_called_with('', '')
+        mock_cmd.assert_called_with('', '', ordered=False)
 
     def test_ok_with_bytes(self, synse_app):
         """Ensure that streaming responses works when values are provided as bytes instead
@@ -1154,7 +1274,7 @@ class TestV3ReadCache:
             assert resp.body == b'{"value":1,"type":"temperature"}\n{"value":2,"type":"temperature"}\n{"value":3,"type":"temperature"}\n'  # noqa: E501
 
         mock_cmd.assert_called_once()
-        mock_cmd.assert_called_with('', '')
+        mock_cmd.assert_called_with('', '', ordered=False)
 
     def test_error(self, synse_app):
         # Need to define a side-effect function for the test rather than utilizing
@@ -1179,7 +1299,7 @@ class TestV3ReadCache:
             assert resp.body == b'{"foo":"bar"}\n'
 
         mock_cmd.assert_called_once()
-        mock_cmd.assert_called_with('', '')
+        mock_cmd.assert_called_with('', '', ordered=False)
 
     def test_invalid_multiple_start(self, synse_app):
         with asynctest.patch('synse_server.cmd.read_cache') as mock_cmd:
@@ -1259,7 +1379,7 @@ class TestV3ReadCache:
             assert resp.body == b'{"value":1,"type":"temperature"}\n'
 
         mock_cmd.assert_called_once()
-        mock_cmd.assert_called_with(expected, '')
+        mock_cmd.assert_called_with(expected, '', ordered=False)
 
     @pytest.mark.parametrize(
         'qparam,expected', [
@@ -1300,7 +1420,32 @@ class TestV3ReadCache:
             assert resp.body == b'{"value":1,"type":"temperature"}\n'
 
         mock_cmd.assert_called_once()
-        mock_cmd.assert_called_with('', expected)
+        mock_cmd.assert_called_with('', expected, ordered=False)
+
+    @pytest.mark.parametrize(
+        'qparam,expected', [
+            ('?ordered=false', False),
+            ('?ordered=False', False),
+            ('?ordered=true', True),
+            ('?ordered=True', True),
+        ]
+    )
+    def test_param_ordered(self, synse_app, qparam, expected):
+        async def mock_read_cache(*args, **kwargs):
+            yield {'value': 1, 'type': 'temperature'}
+
+        with asynctest.patch('synse_server.cmd.read_cache') as mock_cmd:
+            mock_cmd.side_effect = mock_read_cache
+
+            _, resp = synse_app.test_client.get(
+                '/v3/readcache' + qparam,
+                gather_request=False,
+            )
+            assert resp.status == 200
+            assert resp.body == b'{"value":1,"type":"temperature"}\n'
+
+        mock_cmd.assert_called_once()
+        mock_cmd.assert_called_with('', '', ordered=expected)
 
 
 @pytest.mark.usefixtures('patch_utils_rfc3339now')
@@ -1402,6 +1547,25 @@ class TestV3ReadDevice:
         mock_cmd.assert_called_once()
         mock_cmd.assert_called_with('123')
 
+    def test_circuit_breaker_open(self, synse_app, simple_plugin):
+        trip_breaker(simple_plugin)
+
+        with asynctest.patch('synse_server.cache.get_plugin') as mock_get:
+            mock_get.return_value = simple_plugin
+
+            _, resp = synse_app.test_client.get('/v3/read/123', gather_request=False)
+            assert resp.status == 503
+
+            body = ujson.loads(resp.body)
+            assert body == {
+                'context': 'circuit breaker open for plugin 123: not accepting requests',
+                'description': 'plugin unavailable',
+                'http_code': 503,
+                'timestamp': '2019-04-22T13:30:00Z',
+            }
+
+        mock_get.assert_called_once_with('123')
+
 
 @pytest.mark.usefixtures('patch_utils_rfc3339now')
 class TestV3AsyncWrite:
@@ -1572,6 +1736,29 @@ class TestV3AsyncWrite:
             payload=[{'action': 'foo', 'data': 'bar'}],
         )
 
+    def test_circuit_breaker_open(self, synse_app, simple_plugin):
+        trip_breaker(simple_plugin)
+
+        with asynctest.patch('synse_server.cache.get_plugin') as mock_get:
+            mock_get.return_value = simple_plugin
+
+            _, resp = synse_app.test_client.post(
+                '/v3/write/123',
+                data=ujson.dumps({'action': 'foo', 'data': 'bar'}),
+                gather_request=False,
+            )
+            assert resp.status == 503
+
+            body = ujson.loads(resp.body)
+            assert body == {
+                'context': 'circuit breaker open for plugin 123: not accepting requests',
+                'description': 'plugin unavailable',
+                'http_code': 503,
+                'timestamp': '2019-04-22T13:30:00Z',
+            }
+
+        mock_get.assert_called_once_with('123')
+
 
 @pytest.mark.usefixtures('patch_utils_rfc3339now')
 class TestV3SyncWrite:
@@ -1742,6 +1929,29 @@ class TestV3SyncWrite:
             payload=[{'action': 'foo', 'data': 'bar'}],
         )
 
+    def test_circuit_breaker_open(self, synse_app, simple_plugin):
+        trip_breaker(simple_plugin)
+
+        with asynctest.patch('synse_server.cache.get_plugin') as mock_get:
+            mock_get.return_value = simple_plugin
+
+            _, resp = synse_app.test_client.post(
+                '/v3/write/wait/123',
+                data=ujson.dumps({'action': 'foo', 'data': 'bar'}),
+                gather_request=False,
+            )
+            assert resp.status == 503
+
+            body = ujson.loads(resp.body)
+            assert body == {
+                'context': 'circuit breaker open for plugin 123: not accepting requests',
+                'description': 'plugin unavailable',
+                'http_code': 503,
+                'timestamp': '2019-04-22T13:30:00Z',
+            }
+
+        mock_get.assert_called_once_with('123')
+
 
 @pytest.mark.usefixtures('patch_utils_rfc3339now')
 class TestV3Transactions:
@@ -1878,6 +2088,30 @@ class TestV3Transaction:
         mock_cmd.assert_called_once()
         mock_cmd.assert_called_with('123')
 
+    @pytest.mark.usefixtures('clear_manager_plugins')
+    def test_circuit_breaker_open(self, synse_app, simple_plugin):
+        trip_breaker(simple_plugin)
+        plugin.manager.plugins[simple_plugin.id] = simple_plugin
+
+        with asynctest.patch('synse_server.cache.get_transaction') as mock_get:
+            mock_get.return_value = {
+                'plugin': '123',
+                'device': 'abc',
+            }
+
+            _, resp = synse_app.test_client.get('/v3/transaction/txn-1', gather_request=False)
+            assert resp.status == 503
+
+            body = ujson.loads(resp.body)
+            assert body == {
+                'context': 'circuit breaker open for plugin 123: not accepting requests',
+                'description': 'plugin unavailable',
+                'http_code': 503,
+                'timestamp': '2019-04-22T13:30:00Z',
+            }
+
+        mock_get.assert_called_once_with('txn-1')
+
 
 @pytest.mark.usefixtures('patch_utils_rfc3339now')
 class TestV3Device:
@@ -2425,3 +2659,120 @@ class TestV3Device:
             device_id='123',
             payload=[{'action': 'foo', 'data': 'bar'}],
         )
+
+
+class TestV3DebugProfile:
+    """Tests for the Synse v3 API 'debug/profile' route."""
+
+    route = '/v3/debug/profile'
+
+    def test_not_enabled(self, synse_app):
+        _, resp = synse_app.test_client.get(self.route, gather_request=False)
+        assert resp.status == 404
+
+    def test_unauthorized(self, synse_app, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'debug': {'token': 'secret'},
+        })
+        _, resp = synse_app.test_client.get(
+            self.route,
+            headers={'Authorization': 'Bearer wrong'},
+            gather_request=False,
+        )
+        assert resp.status == 401
+
+    @pytest.mark.parametrize(
+        'qparam', (
+            'duration=foo',
+            'interval=foo',
+            'top=1.5',
+            'duration=-1',
+            'top=0',
+            'format=svg',
+        )
+    )
+    def test_invalid_params(self, synse_app, qparam):
+        with asynctest.patch('synse_server.cmd.authorize_debug'), \
+                asynctest.patch('synse_server.cmd.profile') as mock_cmd:
+            _, resp = synse_app.test_client.get(
+                f'{self.route}?{qparam}', gather_request=False,
+            )
+            assert resp.status == 400
+
+        mock_cmd.assert_not_called()
+
+    def test_ok_json(self, synse_app):
+        with asynctest.patch('synse_server.cmd.authorize_debug'), \
+                asynctest.patch('synse_server.cmd.profile') as mock_cmd:
+            mock_cmd.return_value = {
+                'samples': 4,
+                'stacks': {'main;a': 1, 'main;b': 3},
+                'duration': 2.0,
+                'interval': 0.5,
+                'memory': None,
+            }
+
+            _, resp = synse_app.test_client.get(
+                f'{self.route}?duration=2&interval=0.5&memory=true&top=3',
+                gather_request=False,
+            )
+            assert resp.status == 200
+            assert resp.headers['Content-Type'] == 'application/json'
+
+            body = ujson.loads(resp.body)
+            assert list(body['stacks']) == ['main;b', 'main;a']
+            assert body['samples'] == 4
+
+        mock_cmd.assert_called_once_with(duration=2.0, interval=0.5, memory=True, top=3)
+
+    def test_ok_collapsed(self, synse_app):
+        with asynctest.patch('synse_server.cmd.authorize_debug'), \
+                asynctest.patch('synse_server.cmd.profile') as mock_cmd:
+            mock_cmd.return_value = {
+                'samples': 4,
+                'stacks': {'main;a': 1, 'main;b': 3},
+                'duration': 2.0,
+                'interval': 0.5,
+                'memory': None,
+            }
+
+            _, resp = synse_app.test_client.get(
+                f'{self.route}?format=collapsed', gather_request=False,
+            )
+            assert resp.status == 200
+            assert resp.headers['Content-Type'].startswith('text/plain')
+            assert resp.body == b'main;b 3\nmain;a 1\n'
+
+    def test_conflict(self, synse_app):
+        with asynctest.patch('synse_server.cmd.authorize_debug'), \
+                asynctest.patch('synse_server.cmd.profile') as mock_cmd:
+            mock_cmd.side_effect = errors.Conflict('a profile is already running')
+
+            _, resp = synse_app.test_client.get(self.route, gather_request=False)
+            assert resp.status == 409
+
+
+class TestV3DebugCache:
+    """Tests for the Synse v3 API 'debug/cache' route."""
+
+    route = '/v3/debug/cache'
+
+    def test_not_enabled(self, synse_app):
+        _, resp = synse_app.test_client.get(self.route, gather_request=False)
+        assert resp.status == 404
+
+    def test_ok(self, synse_app):
+        with asynctest.patch('synse_server.cmd.authorize_debug'), \
+                asynctest.patch('synse_server.cmd.cache_summary') as mock_cmd:
+            mock_cmd.return_value = {
+                'devices': {'tags': 3, 'postings': 4},
+            }
+
+            _, resp = synse_app.test_client.get(self.route, gather_request=False)
+            assert resp.status == 200
+            assert resp.headers['Content-Type'] == 'application/json'
+
+            body = ujson.loads(resp.body)
+            assert body == {'devices': {'tags': 3, 'postings': 4}}
+
+        mock_cmd.assert_called_once()
@@ -605,6 +605,8 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             ns='default',
             tag_groups=[],
+            deadline=None,
+            partial=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
@@ -629,6 +631,8 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             ns='foo',
             tag_groups=[],
+            deadline=None,
+            partial=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
@@ -653,6 +657,8 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             ns='default',
             tag_groups=[['foo', 'bar']],
+            deadline=None,
+            partial=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
@@ -677,6 +683,8 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             ns='default',
             tag_groups=[['foo', 'bar']],
+            deadline=None,
+            partial=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
@@ -701,6 +709,8 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             ns='default',
             tag_groups=[['foo', 'bar'], ['baz']],
+            deadline=None,
+            partial=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
@@ -709,6 +719,40 @@ class TestMessageHandler:
             'data': mock_cmd.return_value,
         }))
 
+    @pytest.mark.asyncio
+    async def test_request_read_deadline(self):
+        with asynctest.patch('synse_server.cmd.read') as mock_cmd:
+            with asynctest.patch('websockets.WebSocketCommonProtocol.send') as mock_send:
+                mock_cmd.return_value = [{
+                    'key': 'value',
+                }]
+
+                p = make_payload(data={'deadline': 2, 'partial': True})
+                m = websocket.MessageHandler(websockets.WebSocketCommonProtocol())
+                await m.handle_request_read(p)
+
+        mock_cmd.assert_called_once()
+        mock_cmd.assert_called_with(
+            ns='default',
+            tag_groups=[],
+            deadline=2.0,
+            partial=True,
+        )
+        mock_send.assert_called_once()
+
+    @pytest.mark.parametrize('deadline', [-1, 'soon', 'nan', float('inf'), [1], {}])
+    @pytest.mark.asyncio
+    async def test_request_read_invalid_deadline(self, deadline):
+        with asynctest.patch('synse_server.cmd.read') as mock_cmd:
+            with asynctest.patch('websockets.WebSocketCommonProtocol.send') as mock_send:
+                p = make_payload(data={'deadline': deadline})
+                m = websocket.MessageHandler(websockets.WebSocketCommonProtocol())
+                with pytest.raises(errors.InvalidUsage):
+                    await m.handle_request_read(p)
+
+        mock_cmd.assert_not_called()
+        mock_send.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_request_read_device(self):
         with asynctest.patch('synse_server.cmd.read_device') as mock_cmd:
@@ -785,6 +829,7 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             start=None,
             end=None,
+            ordered=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
@@ -835,6 +880,7 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             start='now',
             end=None,
+            ordered=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
@@ -877,6 +923,7 @@ class TestMessageHandler:
         mock_cmd.assert_called_with(
             start=None,
             end='now',
+            ordered=False,
         )
         mock_send.assert_called_once()
         mock_send.assert_called_with(json.dumps({
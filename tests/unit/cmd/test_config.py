@@ -65,3 +65,23 @@ async def test_config_with_mixed_items(mocker):
         'b': 2,
         'c': 3,
     }
+
+
+@pytest.mark.asyncio
+async def test_config_debug_token_redacted(mocker):
+    # Mock test data
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'debug': {
+            'token': 'secret',
+            'max_profile_duration': 60,
+        },
+    })
+
+    # --- Test case -----------------------------
+    resp = await cmd.config()
+    assert resp == {
+        'debug': {
+            'token': '<redacted>',
+            'max_profile_duration': 60,
+        },
+    }
@@ -0,0 +1,104 @@
+"""Unit tests for the ``synse_server.cmd.debug`` module."""
+
+import pytest
+
+from synse_server import cmd, errors, profiler, tracing
+
+
+def test_authorize_debug_not_enabled():
+    with pytest.raises(errors.NotFound):
+        cmd.authorize_debug('Bearer secret')
+
+
+@pytest.mark.parametrize(
+    'header', (
+        None,
+        '',
+        'secret',
+        'Bearer wrong',
+        'Basic secret',
+    )
+)
+def test_authorize_debug_unauthorized(mocker, header):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'debug': {'token': 'secret'},
+    })
+
+    with pytest.raises(errors.Unauthorized):
+        cmd.authorize_debug(header)
+
+
+def test_authorize_debug_ok(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'debug': {'token': 'secret'},
+    })
+
+    cmd.authorize_debug('Bearer secret')
+
+
+@pytest.mark.asyncio
+async def test_profile(mocker):
+    mock_profile = mocker.patch(
+        'synse_server.profiler.profile',
+        return_value={'samples': 1, 'stacks': {'a;b': 1}},
+    )
+
+    resp = await cmd.profile(duration=1, interval=0.1, memory=True, top=5)
+    assert resp == {'samples': 1, 'stacks': {'a;b': 1}}
+
+    mock_profile.assert_called_once_with(1, 0.1, memory=True, top=5)
+
+
+@pytest.mark.asyncio
+async def test_profile_exceeds_max_duration(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'debug': {'max_profile_duration': 5},
+    })
+    mock_profile = mocker.patch('synse_server.profiler.profile')
+
+    with pytest.raises(errors.InvalidUsage):
+        await cmd.profile(duration=10)
+
+    mock_profile.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_profile_busy(mocker):
+    mocker.patch(
+        'synse_server.profiler.profile',
+        side_effect=profiler.ProfilerBusy('a profile is already running'),
+    )
+
+    with pytest.raises(errors.Conflict):
+        await cmd.profile(duration=1)
+
+
+@pytest.mark.asyncio
+async def test_traces_not_enabled():
+    with pytest.raises(errors.NotFound):
+        await cmd.traces()
+
+
+@pytest.mark.asyncio
+async def test_traces(mocker):
+    exporter = tracing.MemoryExporter()
+    mocker.patch('synse_server.tracing.enabled', True)
+    mocker.patch('synse_server.tracing._exporter', exporter)
+
+    a = tracing.Span('a', '1' * 32)
+    b = tracing.Span('b', '2' * 32)
+    a.finish()
+    b.finish()
+
+    assert await cmd.traces() == [a.to_dict(), b.to_dict()]
+    assert await cmd.traces('2' * 32) == [b.to_dict()]
+
+
+@pytest.mark.asyncio
+async def test_cache_summary(mocker):
+    mock_summary = mocker.patch(
+        'synse_server.cache.get_summary', return_value={'devices': {'tags': 3}},
+    )
+
+    assert await cmd.cache_summary() == {'devices': {'tags': 3}}
+    mock_summary.assert_called_once()
@@ -76,6 +76,7 @@ async def test_plugin_ok(mocker, simple_plugin):
         'tag': 'test/foo',  # from simple_plugin fixture
         'vcs': 'https://github.com/vapor-ware/synse-server',  # from simple_plugin fixture
         'active': True,
+        'circuit_breaker': 'closed',
         'network': {  # from simple_plugin fixture
             'address': 'localhost:5432',
             'protocol': 'tcp',
@@ -120,6 +121,7 @@ async def test_plugin_ok_refresh(mocker, simple_plugin):
         'tag': 'test/foo',  # from simple_plugin fixture
         'vcs': 'https://github.com/vapor-ware/synse-server',  # from simple_plugin fixture
         'active': True,
+        'circuit_breaker': 'closed',
         'network': {  # from simple_plugin fixture
             'address': 'localhost:5432',
             'protocol': 'tcp',
@@ -170,6 +172,7 @@ async def test_plugins_ok(mocker, simple_plugin):
             'id': '123',
             'tag': 'test/foo',
             'active': True,
+            'circuit_breaker': 'closed',
         },
     ]
 
@@ -193,6 +196,7 @@ async def test_plugins_ok_with_refresh(mocker, simple_plugin):
             'id': '123',
             'tag': 'test/foo',
             'active': True,
+            'circuit_breaker': 'closed',
         },
     ]
 
@@ -319,3 +323,28 @@ async def test_plugin_health_inactive(mocker, simple_plugin):
 
     mock_health.assert_called_once()
     mock_refresh.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('patch_utils_rfc3339now')
+async def test_plugin_health_cached(mocker, simple_plugin):
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.manager.plugins', {
+        '123': simple_plugin,
+    })
+    mock_health = mocker.patch(
+        'synse_grpc.client.PluginClientV3.health',
+        return_value=api.V3Health(
+            timestamp='2019-04-22T13:30:00Z',
+            status=api.OK,
+            checks=[],
+        ),
+    )
+
+    # --- Test case -----------------------------
+    first = await cmd.plugin_health()
+    second = await cmd.plugin_health()
+    assert first == second
+    assert second['healthy'] == ['123']
+
+    mock_health.assert_called_once()
@@ -1,13 +1,17 @@
 """Unit tests for the ``synse_server.cmd.read`` module."""
 
+import asyncio
+import math
+import threading
 from typing import Any
 
 import asynctest
 import pytest
 from synse_grpc import api, client
 
-from synse_server import cmd, errors, plugin
-from synse_server.cmd.read import reading_to_dict
+from synse_server import channels, cmd, errors, plugin
+from synse_server.cmd.read import (CacheStream, _discard_result,
+                                   reading_to_dict, timestamp_key)
 
 
 @pytest.mark.asyncio
@@ -130,6 +134,310 @@ async def test_read_fails_read_multiple_one_fail(mocker, simple_plugin, temperat
     # ensure that it was actually called prior to the error read
 
 
+@pytest.mark.asyncio
+async def test_read_partial_one_fail(mocker, simple_plugin, temperature_reading):
+    # Mock test data
+    error_plugin = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/bar', 'id': '456'},
+        version={},
+    )
+
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+        '456': error_plugin,
+    })
+
+    simple_plugin.client.read = mocker.MagicMock(return_value=[temperature_reading])
+    error_plugin.client.read = mocker.MagicMock(side_effect=ValueError('test error'))
+
+    # --- Test case -----------------------------
+    simple_plugin.active = True
+    error_plugin.active = True
+
+    resp = await cmd.read('default', [['default/foo']], partial=True)
+    assert resp['partial'] is True
+    assert resp['errors'] == [
+        {
+            'plugin': '456',
+            'error': 'error',
+            'context': 'test error',
+        },
+    ]
+    assert len(resp['readings']) == 1
+    assert resp['readings'][0]['device'] == 'aaa'
+
+    assert simple_plugin.active is True
+    assert error_plugin.active is False
+
+
+@pytest.mark.asyncio
+async def test_read_partial_ok(mocker, simple_plugin, temperature_reading):
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch(
+        'synse_grpc.client.PluginClientV3.read',
+        return_value=[temperature_reading],
+    )
+
+    # --- Test case -----------------------------
+    resp = await cmd.read('default', [], partial=True)
+    assert resp['partial'] is False
+    assert resp['errors'] == []
+    assert len(resp['readings']) == 1
+
+
+@pytest.mark.asyncio
+async def test_read_hedged_to_replica(mocker, simple_plugin, temperature_reading):
+    replica = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/foo', 'id': '123'},
+        version={},
+    )
+    replica.active = True
+
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch.dict('synse_server.plugin.PluginManager.replicas', {
+        '123': [replica],
+    })
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'hedging': {'enabled': True, 'delay': 0.05}},
+    })
+
+    stop = threading.Event()
+
+    def slowread(*args, **kwargs):
+        stop.wait(2)
+        return []
+
+    simple_plugin.client.read = mocker.MagicMock(side_effect=slowread)
+    replica.client.read = mocker.MagicMock(return_value=[temperature_reading])
+    mocker.patch.object(plugin.manager, '_select', return_value=simple_plugin)
+
+    # --- Test case -----------------------------
+    try:
+        resp = await cmd.read('default', [], deadline=1)
+    finally:
+        stop.set()
+
+    assert len(resp) == 1
+    simple_plugin.client.read.assert_called_once()
+    replica.client.read.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_read_hedged_deadline_cancels_reads(mocker, simple_plugin):
+    replica = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/foo', 'id': '123'},
+        version={},
+    )
+    replica.active = True
+
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch.dict('synse_server.plugin.PluginManager.replicas', {
+        '123': [replica],
+    })
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'hedging': {'enabled': True, 'delay': 0.05}},
+    })
+
+    cancelled = threading.Semaphore(0)
+
+    def hungread(*args, **kwargs):
+        # Stand in for the call tracker, and block until the call is cancelled.
+        call = mocker.Mock()
+        event = threading.Event()
+        call.cancel.side_effect = event.set
+        channels._tracking.group.add(call)
+        assert event.wait(2)
+        cancelled.release()
+        raise ValueError('cancelled')
+
+    simple_plugin.client.read = mocker.MagicMock(side_effect=hungread)
+    replica.client.read = mocker.MagicMock(side_effect=hungread)
+    mocker.patch.object(plugin.manager, '_select', return_value=simple_plugin)
+
+    # --- Test case -----------------------------
+    resp = await cmd.read('default', [], deadline=0.2, partial=True)
+    assert resp['partial'] is True
+
+    # Both the first read and the hedged read are cancelled.
+    loop = asyncio.get_event_loop()
+    assert await loop.run_in_executor(None, cancelled.acquire, True, 2)
+    assert await loop.run_in_executor(None, cancelled.acquire, True, 2)
+    simple_plugin.client.read.assert_called_once()
+    replica.client.read.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_read_hedged_on_early_failure(mocker, simple_plugin, temperature_reading):
+    replica = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/foo', 'id': '123'},
+        version={},
+    )
+    replica.active = True
+
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch.dict('synse_server.plugin.PluginManager.replicas', {
+        '123': [replica],
+    })
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'hedging': {'enabled': True, 'delay': 5}},
+    })
+
+    simple_plugin.client.read = mocker.MagicMock(side_effect=ValueError())
+    replica.client.read = mocker.MagicMock(return_value=[temperature_reading])
+    mocker.patch.object(plugin.manager, '_select', return_value=simple_plugin)
+
+    # --- Test case -----------------------------
+    # The primary fails well before the hedge delay, so the replica is read
+    # without waiting it out.
+    resp = await asyncio.wait_for(cmd.read('default', []), timeout=1)
+
+    assert len(resp) == 1
+    simple_plugin.client.read.assert_called_once()
+    replica.client.read.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_read_hedging_not_needed(mocker, simple_plugin, temperature_reading):
+    replica = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/foo', 'id': '123'},
+        version={},
+    )
+    replica.active = True
+
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch.dict('synse_server.plugin.PluginManager.replicas', {
+        '123': [replica],
+    })
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'hedging': {'enabled': True, 'delay': 1}},
+    })
+
+    simple_plugin.client.read = mocker.MagicMock(return_value=[temperature_reading])
+    replica.client.read = mocker.MagicMock(return_value=[temperature_reading])
+    mocker.patch.object(plugin.manager, '_select', return_value=simple_plugin)
+
+    # --- Test case -----------------------------
+    resp = await cmd.read('default', [])
+
+    assert len(resp) == 1
+    simple_plugin.client.read.assert_called_once()
+    replica.client.read.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_read_deadline_exceeded(mocker, simple_plugin, temperature_reading):
+    slow_plugin = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/bar', 'id': '456'},
+        version={},
+    )
+    slow_plugin.active = True
+
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+        '456': slow_plugin,
+    })
+
+    stop = threading.Event()
+
+    def slowread(*args, **kwargs):
+        stop.wait(2)
+        return [temperature_reading]
+
+    simple_plugin.client.read = mocker.MagicMock(return_value=[temperature_reading])
+    slow_plugin.client.read = mocker.MagicMock(side_effect=slowread)
+
+    # --- Test case -----------------------------
+    try:
+        with pytest.raises(errors.ServerError):
+            await cmd.read('default', [], deadline=0.1)
+
+        resp = await cmd.read('default', [], deadline=0.1, partial=True)
+    finally:
+        stop.set()
+
+    assert resp['partial'] is True
+    assert resp['errors'] == [
+        {
+            'plugin': '456',
+            'error': 'timeout',
+            'context': 'no response within request deadline (0.1s)',
+        },
+    ]
+    assert len(resp['readings']) == 1
+    assert resp['readings'][0]['device'] == 'aaa'
+
+
+@pytest.mark.asyncio
+async def test_read_deadline_cancels_call(mocker, simple_plugin, temperature_reading):
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+
+    cancelled = threading.Event()
+    call = mocker.Mock(**{'cancel.side_effect': cancelled.set})
+    finished = threading.Event()
+
+    def hungread(*args, **kwargs):
+        # Stand in for the call tracker, which adds the gRPC call to the
+        # read's call group when the call is started.
+        channels._tracking.group.add(call)
+        yield temperature_reading
+        # Block, as a hung gRPC stream would, until the call is cancelled.
+        assert cancelled.wait(2)
+        finished.set()
+        raise ValueError('cancelled')
+
+    mocker.patch.object(simple_plugin.client, 'read', side_effect=hungread)
+
+    # --- Test case -----------------------------
+    resp = await cmd.read('default', [], deadline=0.1, partial=True)
+    assert resp['partial'] is True
+    assert resp['readings'] == []
+
+    # The read which missed the deadline is cancelled, releasing its thread.
+    loop = asyncio.get_event_loop()
+    assert await loop.run_in_executor(None, cancelled.wait, 2)
+    assert await loop.run_in_executor(None, finished.wait, 2)
+
+
+@pytest.mark.asyncio
+async def test_read_deadline_from_config(mocker, simple_plugin, temperature_reading):
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch(
+        'synse_grpc.client.PluginClientV3.read',
+        return_value=[temperature_reading],
+    )
+    mock_wait = mocker.patch('asyncio.wait', wraps=asyncio.wait)
+    mocker.patch.dict('synse_server.config.options._full_config', {'read': {'deadline': 5}})
+
+    # --- Test case -----------------------------
+    resp = await cmd.read('default', [])
+    assert len(resp) == 1
+
+    assert mock_wait.call_args[1]['timeout'] == 5
+
+
 @pytest.mark.asyncio
 async def test_read_ok_inactive_plugin(mocker, simple_plugin, state_reading):
     # Mock test data
@@ -213,6 +521,28 @@ async def test_read_ok_no_tags(mocker, simple_plugin, temperature_reading, humid
     mock_read.assert_called_with()
 
 
+@pytest.mark.asyncio
+async def test_read_no_tags_not_deduplicated(mocker, simple_plugin, temperature_reading):
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch(
+        'synse_grpc.client.PluginClientV3.read',
+        return_value=[temperature_reading, temperature_reading],
+    )
+
+    # --- Test case -----------------------------
+    # Every reading is returned for a read with no tag filter, even if two
+    # share a device, type and timestamp.
+    resp = await cmd.read('default', [])
+    assert len(resp) == 2
+
+    # Readings are de-duplicated when merging tag groups.
+    resp = await cmd.read('default', [['foo/bar'], ['vapor/ware']])
+    assert len(resp) == 1
+
+
 @pytest.mark.asyncio
 async def test_read_ok_tags_with_ns(mocker, simple_plugin, state_reading):
     # Mock test data
@@ -626,6 +956,237 @@ async def test_read_cache_inactive_plugin(mocker, simple_plugin, humidity_readin
     mock_read.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_read_cache_multiple_plugins(mocker, simple_plugin, humidity_reading, state_reading):
+    other = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/bar', 'id': '456'},
+        version={},
+    )
+    other.active = True
+
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+        '456': other,
+    })
+
+    mocker.patch.object(
+        simple_plugin.client, 'read_cache', return_value=iter([humidity_reading] * 2),
+    )
+    mocker.patch.object(
+        other.client, 'read_cache', return_value=iter([state_reading] * 3),
+    )
+
+    # --- Test case -----------------------------
+    resp = [r async for r in cmd.read_cache()]
+    assert len(resp) == 5
+    assert len([r for r in resp if r['device'] == 'bbb']) == 2
+    assert len([r for r in resp if r['device'] == 'ccc']) == 3
+
+
+@pytest.mark.asyncio
+async def test_read_cache_ordered(mocker, simple_plugin):
+    other = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/bar', 'id': '456'},
+        version={},
+    )
+    other.active = True
+
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+        '456': other,
+    })
+
+    def readings(device, *timestamps):
+        return iter([
+            api.V3Reading(id=device, timestamp=ts, type='state', string_value='on')
+            for ts in timestamps
+        ])
+
+    mocker.patch.object(
+        simple_plugin.client, 'read_cache', return_value=readings(
+            'aaa', '2019-04-22T13:30:01Z', '2019-04-22T13:30:04Z', '2019-04-22T13:30:05Z',
+        ),
+    )
+    mocker.patch.object(
+        other.client, 'read_cache', return_value=readings(
+            'bbb', '2019-04-22T13:30:02Z', '2019-04-22T13:30:03Z', '2019-04-22T13:30:06Z',
+        ),
+    )
+
+    # --- Test case -----------------------------
+    resp = [r async for r in cmd.read_cache(ordered=True)]
+    assert [(r['device'], r['timestamp']) for r in resp] == [
+        ('aaa', '2019-04-22T13:30:01Z'),
+        ('bbb', '2019-04-22T13:30:02Z'),
+        ('bbb', '2019-04-22T13:30:03Z'),
+        ('aaa', '2019-04-22T13:30:04Z'),
+        ('aaa', '2019-04-22T13:30:05Z'),
+        ('bbb', '2019-04-22T13:30:06Z'),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_cache_ordered_mixed_formats(mocker, simple_plugin):
+    other = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/bar', 'id': '456'},
+        version={},
+    )
+    other.active = True
+
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+        '456': other,
+    })
+
+    def readings(device, *timestamps):
+        return iter([
+            api.V3Reading(id=device, timestamp=ts, type='state', string_value='on')
+            for ts in timestamps
+        ])
+
+    # As strings, these would not order by time: the offsets and precision
+    # of the fractional seconds differ between the plugins.
+    mocker.patch.object(
+        simple_plugin.client, 'read_cache', return_value=readings(
+            'aaa', '2019-04-22T13:30:01.5Z', '2019-04-22T13:30:03Z',
+        ),
+    )
+    mocker.patch.object(
+        other.client, 'read_cache', return_value=readings(
+            'bbb', '2019-04-22T15:30:01.123456789+02:00', '2019-04-22T15:30:02+02:00',
+        ),
+    )
+
+    # --- Test case -----------------------------
+    resp = [r async for r in cmd.read_cache(ordered=True)]
+    assert [(r['device'], r['timestamp']) for r in resp] == [
+        ('bbb', '2019-04-22T15:30:01.123456789+02:00'),
+        ('aaa', '2019-04-22T13:30:01.5Z'),
+        ('bbb', '2019-04-22T15:30:02+02:00'),
+        ('aaa', '2019-04-22T13:30:03Z'),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_cache_plugin_exceeds_deadline(mocker, simple_plugin, humidity_reading):
+    slow = plugin.Plugin(
+        client=client.PluginClientV3('localhost:5433', 'tcp'),
+        info={'tag': 'test/bar', 'id': '456'},
+        version={},
+    )
+    slow.active = True
+
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+        '456': slow,
+    })
+    mocker.patch('synse_server.config.options.get', return_value=0.1)
+
+    stop = threading.Event()
+
+    def slowreadcache(*args, **kwargs):
+        yield humidity_reading
+        stop.wait(2)
+        yield humidity_reading
+
+    mocker.patch.object(
+        simple_plugin.client, 'read_cache', return_value=iter([humidity_reading] * 2),
+    )
+    mocker.patch.object(slow.client, 'read_cache', side_effect=slowreadcache)
+
+    # --- Test case -----------------------------
+    try:
+        resp = [r async for r in cmd.read_cache()]
+    finally:
+        stop.set()
+
+    # Two readings from the fast plugin, one from the slow plugin before
+    # it exceeded its deadline.
+    assert len(resp) == 3
+    assert simple_plugin.active is True
+    assert slow.active is True
+
+
+@pytest.mark.asyncio
+async def test_read_cache_deadline_cancels_call(mocker, simple_plugin, humidity_reading):
+    # Mock test data
+    mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+        '123': simple_plugin,
+    })
+    mocker.patch('synse_server.config.options.get', return_value=0.1)
+
+    cancelled = threading.Event()
+    call = mocker.Mock(**{'cancel.side_effect': cancelled.set})
+    finished = threading.Event()
+
+    def hungreadcache(*args, **kwargs):
+        # Stand in for the call tracker, which adds the gRPC call to the
+        # stream's call group when the call is started.
+        channels._tracking.group.add(call)
+        yield humidity_reading
+        # Block, as a hung gRPC stream would, until the call is cancelled.
+        assert cancelled.wait(2)
+        finished.set()
+        yield humidity_reading
+        raise ValueError('cancelled')
+
+    mocker.patch.object(simple_plugin.client, 'read_cache', side_effect=hungreadcache)
+
+    # --- Test case -----------------------------
+    resp = [r async for r in cmd.read_cache()]
+
+    # The reading yielded after the deadline is dropped, not queued after
+    # the stream finished.
+    assert len(resp) == 1
+    call.cancel.assert_called()
+    assert await asyncio.get_event_loop().run_in_executor(None, finished.wait, 2)
+
+
+@pytest.mark.asyncio
+async def test_cache_stream_put_after_finished(simple_plugin):
+    q = asyncio.Queue()
+    stream = CacheStream(simple_plugin, None, None, 1, q)
+    stream._put({'device': 'a'})
+    stream.finished = True
+    stream._put({'device': 'b'})
+
+    assert q.qsize() == 1
+    assert q.get_nowait() == {'device': 'a'}
+
+
+@pytest.mark.asyncio
+async def test_discard_result():
+    loop = asyncio.get_event_loop()
+    fut = loop.create_future()
+    fut.add_done_callback(_discard_result)
+    fut.set_exception(ValueError())
+    await asyncio.sleep(0)
+
+    # The exception was retrieved, so it is not logged when the future is
+    # garbage collected.
+    assert fut._log_traceback is False
+
+
+@pytest.mark.parametrize('timestamp,expected', [
+    ('2019-04-22T13:30:00Z', (1555939800, 0)),
+    ('2019-04-22T13:30:00.5Z', (1555939800, 500000000)),
+    ('2019-04-22T13:30:00.000000001Z', (1555939800, 1)),
+    ('2019-04-22T15:30:00+02:00', (1555939800, 0)),
+    ('2019-04-22T13:30:00.1234567891-00:00', (1555939800, 123456789)),
+    ('not a timestamp', (-math.inf, 0)),
+    ('', (-math.inf, 0)),
+])
+def test_timestamp_key(timestamp, expected):
+    assert timestamp_key(timestamp) == expected
+
+
 def test_reading_to_dict_1(temperature_reading):
     actual = reading_to_dict(temperature_reading)
     assert actual == {
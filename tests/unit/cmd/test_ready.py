@@ -0,0 +1,133 @@
+"""Unit tests for the ``synse_server.cmd.ready`` module."""
+
+import asyncio
+
+import pytest
+
+from synse_server import cache, cmd, plugin
+
+
+@pytest.fixture()
+def manager_expected():
+    """Fixture to reset the plugin manager's expected plugin count."""
+
+    plugin.manager.expected = None
+    yield
+    plugin.manager.expected = None
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('patch_utils_rfc3339now', 'manager_expected')
+async def test_ready_not_discovered(mocker):
+    mocker.patch.dict('synse_server.plugin.manager.plugins', {})
+    mocker.patch('synse_server.cache.loaded', True)
+
+    resp = await cmd.ready()
+    assert resp == {
+        'ready': False,
+        'timestamp': '2019-04-22T13:30:00Z',  # from fixture: patch_utils_rfc3339now
+        'plugins': {
+            'ready': 0,
+            'expected': 0,
+            'required': 0,
+        },
+        'device_cache': {
+            'loaded': True,
+            'stale': False,
+        },
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('patch_utils_rfc3339now', 'manager_expected')
+async def test_ready_no_plugins(mocker):
+    mocker.patch.dict('synse_server.plugin.manager.plugins', {})
+    mocker.patch('synse_server.cache.loaded', True)
+    plugin.manager.expected = 0
+
+    resp = await cmd.ready()
+    assert resp['ready'] is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('manager_expected')
+async def test_ready_cache_not_loaded(mocker, simple_plugin):
+    mocker.patch.dict('synse_server.plugin.manager.plugins', {'123': simple_plugin})
+    mocker.patch('synse_server.cache.loaded', False)
+    plugin.manager.expected = 1
+
+    resp = await cmd.ready()
+    assert resp['ready'] is False
+    assert resp['plugins'] == {'ready': 1, 'expected': 1, 'required': 1}
+    assert resp['device_cache']['loaded'] is False
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('manager_expected')
+async def test_ready_plugin_fraction(mocker, simple_plugin):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'ready': {'plugins': 0.5},
+    })
+    mocker.patch.dict('synse_server.plugin.manager.plugins', {'123': simple_plugin})
+    mocker.patch('synse_server.cache.loaded', True)
+
+    # Only one of the four expected plugins has registered.
+    plugin.manager.expected = 4
+    resp = await cmd.ready()
+    assert resp['ready'] is False
+    assert resp['plugins'] == {'ready': 1, 'expected': 4, 'required': 2}
+
+    plugin.manager.expected = 2
+    resp = await cmd.ready()
+    assert resp['ready'] is True
+    assert resp['plugins'] == {'ready': 1, 'expected': 2, 'required': 1}
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('manager_expected')
+async def test_ready_plugin_inactive(mocker, simple_plugin):
+    mocker.patch.dict('synse_server.plugin.manager.plugins', {'123': simple_plugin})
+    mocker.patch('synse_server.cache.loaded', True)
+    simple_plugin.active = False
+    plugin.manager.expected = 1
+
+    resp = await cmd.ready()
+    assert resp['ready'] is False
+    assert resp['plugins'] == {'ready': 0, 'expected': 1, 'required': 1}
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('manager_expected', 'clear_manager_plugins', 'clear_device_cache')
+async def test_ready_refresh_started_before_rebuild(mocker, simple_plugin, simple_device):
+    mocker.patch('synse_server.cache.loaded', False)
+    mocker.patch('synse_server.plugin.PluginManager.load', return_value=[('localhost:5432', 'tcp')])
+    mocker.patch('synse_server.plugin.Plugin.refresh_state')
+    mocker.patch.object(simple_plugin.client, 'devices', return_value=[simple_device])
+    release = asyncio.Event()
+
+    async def register(address, protocol):
+        await release.wait()
+        plugin.manager.plugins[simple_plugin.id] = simple_plugin
+        return simple_plugin.id
+
+    mocker.patch.object(plugin.manager, 'register', side_effect=register)
+
+    # The periodic plugin refresh starts registering the plugins before the
+    # device cache rebuild runs.
+    refresh = asyncio.ensure_future(plugin.manager.refresh())
+    await asyncio.sleep(0)
+    rebuild = asyncio.ensure_future(cache.update_device_cache())
+    await asyncio.sleep(0.01)
+
+    # The rebuild waits for the plugins, so Synse Server is not ready yet.
+    resp = await cmd.ready()
+    assert resp['ready'] is False
+    assert resp['device_cache']['loaded'] is False
+
+    release.set()
+    await asyncio.wait_for(asyncio.gather(refresh, rebuild), 1)
+
+    # Synse Server is only ready once the plugin's devices are cached.
+    resp = await cmd.ready()
+    assert resp['ready'] is True
+    assert len(cache.get_cached_device_tags()) > 0
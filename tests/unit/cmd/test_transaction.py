@@ -5,7 +5,7 @@ import pytest
 from synse_grpc import api
 from synse_grpc.errors import PluginError
 
-from synse_server import cmd, errors
+from synse_server import cmd, errors, plugin
 
 
 @pytest.mark.asyncio
@@ -51,7 +51,27 @@ async def test_transaction_plugin_not_found():
     mock_get.assert_called_once()
     mock_get.assert_called_with('123')
     mock_plugin_get.assert_called_once()
-    mock_plugin_get.assert_called_with('test-plugin')
+    mock_plugin_get.assert_called_with('test-plugin', address=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('clear_manager_plugins')
+async def test_transaction_plugin_replica_gone(simple_plugin):
+    plugin.manager.plugins[simple_plugin.id] = simple_plugin
+
+    with asynctest.patch('synse_server.cache.get_transaction') as mock_get:
+        mock_get.return_value = {
+            'plugin': '123',
+            'device': 'test-device',
+            'address': 'localhost:5001',
+        }
+        with asynctest.patch.object(simple_plugin.client, 'transaction') as mock_txn:
+            with pytest.raises(errors.NotFound) as e:
+                await cmd.transaction('txn-1')
+
+    assert 'no longer registered' in str(e.value)
+    # The remaining replica cannot know the transaction, so it is not asked.
+    mock_txn.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -82,7 +102,7 @@ async def test_transaction_client_unexpected_error(mocker, simple_plugin):
     mock_get.assert_called_once()
     mock_get.assert_called_with('123')
     mock_plugin_get.assert_called_once()
-    mock_plugin_get.assert_called_with('test-plugin')
+    mock_plugin_get.assert_called_with('test-plugin', address=None)
     mock_txn.assert_called_once()
     mock_txn.assert_called_with('123')
 
@@ -115,7 +135,7 @@ async def test_transaction_client_expected_error(mocker, simple_plugin):
     mock_get.assert_called_once()
     mock_get.assert_called_with('123')
     mock_plugin_get.assert_called_once()
-    mock_plugin_get.assert_called_with('test-plugin')
+    mock_plugin_get.assert_called_with('test-plugin', address=None)
     mock_txn.assert_called_once()
     mock_txn.assert_called_with('123')
 
@@ -168,7 +188,7 @@ async def test_transaction_client_ok(mocker, simple_plugin):
     mock_get.assert_called_once()
     mock_get.assert_called_with('123')
     mock_plugin_get.assert_called_once()
-    mock_plugin_get.assert_called_with('test-plugin')
+    mock_plugin_get.assert_called_with('test-plugin', address=None)
     mock_txn.assert_called_once()
     mock_txn.assert_called_with('123')
 
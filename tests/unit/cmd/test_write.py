@@ -99,7 +99,7 @@ async def test_write_async_add_transaction_error(mocker, simple_plugin):
     mock_write_async.assert_called_once()
     mock_write_async.assert_called_with(device_id='abc', data={'action': 'foo'})
     mock_add.assert_called_once()
-    mock_add.assert_called_with('txn-1', 'abc', '123')
+    mock_add.assert_called_with('txn-1', 'abc', '123', 'localhost:5432')
 
 
 @pytest.mark.asyncio
@@ -190,9 +190,9 @@ async def test_write_async_ok(mocker, simple_plugin):
         ])
     mock_add.assert_called()
     mock_add.assert_has_calls([
-        mocker.call('txn-1', 'abc', '123'),
-        mocker.call('txn-2', 'abc', '123'),
-        mocker.call('txn-3', 'abc', '123'),
+        mocker.call('txn-1', 'abc', '123', 'localhost:5432'),
+        mocker.call('txn-2', 'abc', '123', 'localhost:5432'),
+        mocker.call('txn-3', 'abc', '123', 'localhost:5432'),
     ])
 
 
@@ -289,7 +289,7 @@ async def test_write_sync_add_transaction_error(mocker, simple_plugin):
     mock_write_sync.assert_called_once()
     mock_write_sync.assert_called_with(device_id='abc', data={'action': 'foo'})
     mock_add.assert_called_once()
-    mock_add.assert_called_with('txn-1', 'abc', '123')
+    mock_add.assert_called_with('txn-1', 'abc', '123', 'localhost:5432')
 
 
 @pytest.mark.asyncio
@@ -395,7 +395,7 @@ async def test_write_sync_ok(mocker, simple_plugin):
         ])
     mock_add.assert_called()
     mock_add.assert_has_calls([
-        mocker.call('txn-1', 'abc', '123'),
-        mocker.call('txn-2', 'abc', '123'),
-        mocker.call('txn-3', 'abc', '123'),
+        mocker.call('txn-1', 'abc', '123', 'localhost:5432'),
+        mocker.call('txn-2', 'abc', '123', 'localhost:5432'),
+        mocker.call('txn-3', 'abc', '123', 'localhost:5432'),
     ])
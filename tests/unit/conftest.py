@@ -7,7 +7,7 @@ import pytest
 from sanic_testing import TestManager
 from synse_grpc import api, client
 
-from synse_server import app, cache, plugin, utils
+from synse_server import app, cache, health, plugin, utils
 
 TEST_DATETIME = datetime.datetime(2019, 4, 19, 2, 1, 53, 680718)
 
@@ -35,6 +35,29 @@ def disable_loggers():
     logging.getLogger('sanic.root').disabled = True
 
 
+@pytest.fixture(autouse=True)
+def clear_manager_replicas():
+    """Fixture to clear the ``synse_server.plugin.PluginManager`` replica state.
+
+    Plugin registration may add replicas for plugins with duplicate IDs, so this
+    is cleared for every test to keep registrations from leaking between tests.
+    """
+
+    yield
+    plugin.PluginManager.replicas = {}
+    plugin.PluginManager._rr = {}
+
+
+@pytest.fixture(autouse=True)
+def clear_health_summary():
+    """Fixture to clear the cached plugin health summary, so that cached plugin
+    health does not leak between tests.
+    """
+
+    yield
+    health.summary = None
+
+
 @pytest.fixture()
 def patch_datetime_utcnow(monkeypatch):
     """Fixture to patch ``datetime.datetime.utcnow`` so we have determinable timestamps.
@@ -57,6 +80,7 @@ def clear_manager_plugins():
 
     yield
     plugin.PluginManager.plugins = {}
+    plugin.PluginManager.replicas = {}
 
 
 @pytest.fixture()
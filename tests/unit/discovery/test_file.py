@@ -0,0 +1,164 @@
+"""Unit tests for the ``synse_server.discovery.file`` module."""
+
+import os
+
+import pytest
+
+from synse_server.discovery import file
+
+
+def write(path, content, mtime=None):
+    path.write_text(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_discover_no_cfg():
+    assert file.discover() == []
+
+
+def test_discover_from_cfg(mocker, tmp_path):
+    path = tmp_path / 'plugins.yaml'
+    write(path, 'tcp:\n- localhost:5001\n')
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'discover': {'file': {'path': str(path)}}},
+    })
+
+    assert file.discover() == [('localhost:5001', 'tcp')]
+
+
+def test_discover_from_watcher(mocker):
+    w = file.FileWatcher('plugins.yaml')
+    w.plugins = [('localhost:5001', 'tcp')]
+    w.synced = True
+    mocker.patch.object(file, 'watcher', w)
+
+    assert file.discover() == [('localhost:5001', 'tcp')]
+
+
+def test_read(tmp_path):
+    path = tmp_path / 'plugins.yaml'
+    write(path, (
+        'tcp:\n- localhost:5001\n- localhost:5001\n- localhost:5002\n'
+        'unix:\n- plugin.sock\n'
+    ))
+
+    assert file.read(str(path)) == [
+        ('localhost:5001', 'tcp'),
+        ('localhost:5002', 'tcp'),
+        ('plugin.sock', 'unix'),
+    ]
+
+
+def test_read_empty(tmp_path):
+    path = tmp_path / 'plugins.yaml'
+    write(path, '')
+
+    assert file.read(str(path)) == []
+
+
+@pytest.mark.parametrize(
+    'content', [
+        '- localhost:5001\n',
+        'tcp: localhost:5001\n',
+        'tcp:\n- 5001\n',
+    ]
+)
+def test_read_invalid(tmp_path, content):
+    path = tmp_path / 'plugins.yaml'
+    write(path, content)
+
+    with pytest.raises(ValueError):
+        file.read(str(path))
+
+
+class TestFileWatcher:
+    """Test cases for the ``synse_server.discovery.file.FileWatcher`` class."""
+
+    @pytest.mark.asyncio
+    async def test_check_changes(self, tmp_path):
+        path = tmp_path / 'plugins.yaml'
+        changes = []
+
+        async def on_change(added, removed):
+            changes.append((added, removed))
+
+        w = file.FileWatcher(str(path), on_change=on_change)
+
+        # The file does not exist yet.
+        await w.check()
+        assert w.synced is False
+
+        write(path, 'tcp:\n- localhost:5001\n', mtime=1000)
+        await w.check()
+        assert w.synced is True
+        assert w.plugins == [('localhost:5001', 'tcp')]
+
+        # The file has not changed.
+        await w.check()
+
+        write(path, 'tcp:\n- localhost:5002\nunix:\n- plugin.sock\n', mtime=2000)
+        await w.check()
+        assert w.plugins == [('localhost:5002', 'tcp'), ('plugin.sock', 'unix')]
+
+        assert changes == [
+            ([('localhost:5001', 'tcp')], []),
+            ([('localhost:5002', 'tcp'), ('plugin.sock', 'unix')], [('localhost:5001', 'tcp')]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_check_keeps_plugins_on_error(self, tmp_path):
+        path = tmp_path / 'plugins.yaml'
+        w = file.FileWatcher(str(path))
+
+        write(path, 'tcp:\n- localhost:5001\n', mtime=1000)
+        await w.check()
+
+        write(path, 'tcp: [', mtime=2000)
+        await w.check()
+        assert w.plugins == [('localhost:5001', 'tcp')]
+
+        path.unlink()
+        await w.check()
+        assert w.plugins == [('localhost:5001', 'tcp')]
+
+    @pytest.mark.asyncio
+    async def test_check_callback_error(self, tmp_path):
+        path = tmp_path / 'plugins.yaml'
+
+        async def on_change(added, removed):
+            raise ValueError('test error')
+
+        w = file.FileWatcher(str(path), on_change=on_change)
+
+        write(path, 'tcp:\n- localhost:5001\n')
+        await w.check()
+        assert w.plugins == [('localhost:5001', 'tcp')]
+
+    @pytest.mark.asyncio
+    async def test_run_stop(self, tmp_path):
+        path = tmp_path / 'plugins.yaml'
+        write(path, 'tcp:\n- localhost:5001\n')
+
+        async def on_change(added, removed):
+            w.stop()
+
+        w = file.FileWatcher(str(path), on_change=on_change, interval=0)
+        await w.run()
+
+        assert w.plugins == [('localhost:5001', 'tcp')]
+
+    def test_from_config_not_configured(self):
+        assert file.FileWatcher.from_config() is None
+
+    def test_from_config(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'plugin': {'discover': {'file': {
+                'path': '/etc/synse/plugins.yaml',
+                'poll_interval': 2,
+            }}},
+        })
+        w = file.FileWatcher.from_config()
+
+        assert w.path == '/etc/synse/plugins.yaml'
+        assert w.interval == 2
@@ -1,5 +1,7 @@
 """Unit tests for the ``synse_server.discovery.kubernetes`` module."""
 
+from unittest import mock
+
 import kubernetes as k8s
 import pytest
 
@@ -50,14 +52,14 @@ def test_no_endpoints():
     """The specified labels result in no endpoints being found."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
     class MockCoreV1Api:
         def list_namespaced_endpoints(self, *args, **kwargs):
             return k8s.client.V1EndpointsList(items=[])
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -70,7 +72,7 @@ def test_one_endpoint_no_subsets():
     """The endpoint contains no subsets."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -85,7 +87,7 @@ def test_one_endpoint_no_subsets():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -98,7 +100,7 @@ def test_one_endpoint_no_addresses():
     """The endpoint has a single subset with no addresses."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -124,7 +126,7 @@ def test_one_endpoint_no_addresses():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -137,7 +139,7 @@ def test_one_endpoint_no_ports():
     """The endpoint has a single subset with address but no port."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -168,7 +170,7 @@ def test_one_endpoint_no_ports():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -181,7 +183,7 @@ def test_endpoint_no_addr_match():
     """The endpoint address does not match the criteria (pod, with target_ref)"""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -218,7 +220,7 @@ def test_endpoint_no_addr_match():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -231,7 +233,7 @@ def test_one_endpoint():
     """Endpoint has one subset with address and port."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -268,7 +270,7 @@ def test_one_endpoint():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -281,7 +283,7 @@ def test_one_endpoint_multiple_ports_ok():
     """Endpoint has multiple ports, one of which has the name 'http'."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -323,7 +325,7 @@ def test_one_endpoint_multiple_ports_ok():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -336,7 +338,7 @@ def test_one_endpoint_multiple_ports_invalid():
     """Endpoint has multiple ports, none of which has the name 'http'."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -378,7 +380,7 @@ def test_one_endpoint_multiple_ports_invalid():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -393,7 +395,7 @@ def test_one_endpoint_multiple_addrs():
     """
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -459,7 +461,7 @@ def test_one_endpoint_multiple_addrs():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -472,7 +474,7 @@ def test_one_endpoint_multiple_subsets():
     """One endpoint with multiple valid subsets."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -530,7 +532,7 @@ def test_one_endpoint_multiple_subsets():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
@@ -543,7 +545,7 @@ def test_multiple_endpoints():
     """Multiple valid endpoints."""
 
     # mock out the 'load incluster config' fn so it does nothing
-    kubernetes.kubernetes.config.load_incluster_config = lambda: None
+    k8s.config.load_incluster_config = lambda: None
 
     # mock out the CoreV1Api object's list_namespaced_endpoints
     # to return no endpoints.
@@ -608,10 +610,237 @@ def test_multiple_endpoints():
                 )
             ])
 
-    kubernetes.kubernetes.client.CoreV1Api = MockCoreV1Api
+    k8s.client.CoreV1Api = MockCoreV1Api
 
     res = kubernetes._register_from_endpoints(
         ns='default',
         cfg={'labels': {'foo': 'bar'}}
     )
     assert res == ['127.0.0.1:7766', '128.0.0.1:7755']
+
+
+def make_endpoints(name, ips, port=5001, resource_version='1'):
+    """Make an Endpoints resource with a single subset of pod addresses."""
+
+    return k8s.client.V1Endpoints(
+        metadata=k8s.client.V1ObjectMeta(name=name, resource_version=resource_version),
+        subsets=[
+            k8s.client.V1EndpointSubset(
+                addresses=[
+                    k8s.client.V1EndpointAddress(
+                        ip=ip,
+                        target_ref=k8s.client.V1ObjectReference(kind='Pod'),
+                    ) for ip in ips
+                ],
+                ports=[k8s.client.V1EndpointPort(port=port)],
+            )
+        ],
+    )
+
+
+class FakeWatch:
+    """A fake Kubernetes watch which streams a fixed sequence of events.
+
+    Each call to ``stream`` yields the next batch of events. Once all batches
+    are exhausted, the watcher is stopped.
+    """
+
+    def __init__(self, watcher, *batches):
+        self.watcher = watcher
+        self.batches = list(batches)
+        self.calls = []
+
+    def stream(self, func, **kwargs):
+        self.calls.append(kwargs)
+        if not self.batches:
+            self.watcher.stop()
+            return
+        batch = self.batches.pop(0)
+        if isinstance(batch, Exception):
+            raise batch
+        for event in batch:
+            yield event
+
+    def stop(self):
+        pass
+
+
+class FakeCoreV1Api:
+    """A fake CoreV1Api which lists a fixed sequence of endpoints."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def list_namespaced_endpoints(self, *args, **kwargs):
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def make_watcher(api, *batches):
+    changes = []
+
+    async def on_change(added, removed):
+        changes.append((added, removed))
+
+    w = kubernetes.EndpointWatcher(
+        ns='default',
+        label_selector='app=plugin',
+        on_change=on_change,
+        api=api,
+    )
+    fake = FakeWatch(w, *batches)
+    w.new_watch = mock.Mock(return_value=fake)
+    return w, changes
+
+
+@pytest.mark.asyncio
+async def test_watcher_list_and_watch():
+    api = FakeCoreV1Api(
+        k8s.client.V1EndpointsList(
+            metadata=k8s.client.V1ListMeta(resource_version='10'),
+            items=[make_endpoints('ep-1', ['10.0.0.1'])],
+        ),
+    )
+    w, changes = make_watcher(api, [
+        {'type': 'MODIFIED', 'object': make_endpoints('ep-1', ['10.0.0.1', '10.0.0.2'], resource_version='11')},  # noqa
+        {'type': 'ADDED', 'object': make_endpoints('ep-2', ['10.0.0.3'], resource_version='12')},
+        {'type': 'DELETED', 'object': make_endpoints('ep-1', [], resource_version='13')},
+    ])
+
+    await w.run()
+
+    assert w.synced is True
+    assert w.addresses == ['10.0.0.3:5001']
+    assert w.resource_version == '13'
+    assert api.calls == 1
+    assert w.watch.calls[0]['resource_version'] == '10'
+    assert changes == [
+        (['10.0.0.1:5001'], []),
+        (['10.0.0.2:5001'], []),
+        (['10.0.0.3:5001'], []),
+        ([], ['10.0.0.1:5001', '10.0.0.2:5001']),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_watcher_resumes_from_resource_version():
+    api = FakeCoreV1Api(
+        k8s.client.V1EndpointsList(
+            metadata=k8s.client.V1ListMeta(resource_version='10'),
+            items=[],
+        ),
+    )
+    w, changes = make_watcher(
+        api,
+        [{'type': 'ADDED', 'object': make_endpoints('ep-1', ['10.0.0.1'], resource_version='11')}],
+        [{'type': 'BOOKMARK', 'raw_object': {'metadata': {'resourceVersion': '15'}}}],
+        [],
+    )
+
+    await w.run()
+
+    # The watch is resumed without relisting.
+    assert api.calls == 1
+    assert [c['resource_version'] for c in w.watch.calls] == ['10', '11', '15', '15']
+    assert changes == [(['10.0.0.1:5001'], [])]
+
+
+@pytest.mark.asyncio
+async def test_watcher_relist_on_expired():
+    api = FakeCoreV1Api(
+        k8s.client.V1EndpointsList(
+            metadata=k8s.client.V1ListMeta(resource_version='10'),
+            items=[make_endpoints('ep-1', ['10.0.0.1'])],
+        ),
+        k8s.client.V1EndpointsList(
+            metadata=k8s.client.V1ListMeta(resource_version='20'),
+            items=[make_endpoints('ep-1', ['10.0.0.2'])],
+        ),
+    )
+    w, changes = make_watcher(
+        api,
+        [{'type': 'ERROR', 'raw_object': {'code': 410, 'message': 'too old resource version'}}],
+    )
+
+    await w.run()
+
+    assert api.calls == 2
+    assert w.addresses == ['10.0.0.2:5001']
+    assert [c['resource_version'] for c in w.watch.calls] == ['10', '20']
+    assert changes == [
+        (['10.0.0.1:5001'], []),
+        (['10.0.0.2:5001'], ['10.0.0.1:5001']),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_watcher_retries_on_error(mocker):
+    mocker.patch('synse_server.backoff.ExponentialBackoff.delay', return_value=0)
+    api = FakeCoreV1Api(
+        k8s.client.V1EndpointsList(
+            metadata=k8s.client.V1ListMeta(resource_version='10'),
+            items=[],
+        ),
+    )
+    w, _ = make_watcher(api, ValueError('connection reset'), [])
+
+    await w.run()
+
+    # The watch is retried from the same resource version without relisting.
+    assert api.calls == 1
+    assert [c['resource_version'] for c in w.watch.calls] == ['10', '10', '10']
+    # A new watch is created for each watch request.
+    assert w.new_watch.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_watcher_backoff_reset_after_event(mocker):
+    mock_delay = mocker.patch('synse_server.backoff.ExponentialBackoff.delay', return_value=0)
+    mock_reset = mocker.patch('synse_server.backoff.ExponentialBackoff.reset')
+    api = FakeCoreV1Api(
+        k8s.client.V1EndpointsList(
+            metadata=k8s.client.V1ListMeta(resource_version='10'),
+            items=[],
+        ),
+    )
+    w, _ = make_watcher(
+        api,
+        ValueError('connection reset'),
+        [{'type': 'ADDED', 'object': make_endpoints('ep-1', ['10.0.0.1'], resource_version='11')}],
+    )
+
+    await w.run()
+
+    mock_delay.assert_called_once()
+    # The backoff is reset once the stream delivers an event.
+    mock_reset.assert_called_once()
+
+
+def test_watcher_from_config_not_enabled(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'discover': {'kubernetes': {'endpoints': {'labels': {'app': 'plugin'}}}}},
+    })
+    assert kubernetes.EndpointWatcher.from_config() is None
+
+
+def test_watcher_from_config(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'discover': {'kubernetes': {
+            'watch': True,
+            'namespace': 'vapor',
+            'endpoints': {'labels': {'app': 'plugin', 'component': 'synse'}},
+        }}},
+    })
+    w = kubernetes.EndpointWatcher.from_config()
+    assert w.ns == 'vapor'
+    assert w.label_selector == 'app=plugin,component=synse'
+
+
+def test_discover_from_watcher(mocker):
+    w = kubernetes.EndpointWatcher(ns='default', label_selector='app=plugin')
+    w.endpoints = {'ep-1': ['10.0.0.1:5001']}
+    w.synced = True
+    mocker.patch.object(kubernetes, 'watcher', w)
+
+    assert kubernetes.discover() == ['10.0.0.1:5001']
@@ -1,9 +1,12 @@
 """Unit tests for the ``synse_server.app`` module."""
 
+import contextvars as contextvars_std
+from types import SimpleNamespace
+
 from sanic.response import HTTPResponse, StreamingHTTPResponse
 from structlog import contextvars
 
-from synse_server import app, errors
+from synse_server import app, errors, log, timing, tracing
 
 
 def test_new_app():
@@ -57,3 +60,95 @@ def test_on_response_streaming_http_response():
 
     ctx = contextvars._CONTEXT_VARS
     assert ctx['structlog_request_id'].get() is Ellipsis
+
+
+def test_on_response_server_timing(mocker):
+    mocker.patch('synse_server.config.options.get', return_value=True)
+
+    class MockRequest:
+        method = 'GET'
+        url = 'http://localhost'
+
+    def run():
+        timing.start()
+        timing.record('cache', 0.001)
+        resp = HTTPResponse()
+        app.on_response(MockRequest(), resp)
+        return resp
+
+    resp = contextvars_std.copy_context().run(run)
+    assert resp.headers['Server-Timing'].startswith('cache;dur=1.00, total;dur=')
+
+
+def test_on_response_server_timing_disabled():
+    class MockRequest:
+        method = 'GET'
+        url = 'http://localhost'
+
+    def run():
+        timing.start()
+        resp = HTTPResponse()
+        app.on_response(MockRequest(), resp)
+        return resp
+
+    resp = contextvars_std.copy_context().run(run)
+    assert 'Server-Timing' not in resp.headers
+
+
+def test_on_request_response_traced():
+    class MockRequest:
+        method = 'GET'
+        ip = '127.0.0.1'
+        path = '/v3/read/123'
+        uri_template = '/v3/read/<device_id>'
+        url = 'http://localhost/v3/read/123'
+        args = {}
+        headers = {'traceparent': '00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01'}
+
+        def __init__(self):
+            self.ctx = SimpleNamespace()
+
+    exporter = tracing.MemoryExporter()
+    original = tracing.get_exporter()
+    tracing.set_exporter(exporter)
+    tracing.enabled = True
+
+    def run():
+        req = MockRequest()
+        app.on_request(req)
+        assert tracing.current() is req.ctx.span
+        app.on_response(req, HTTPResponse(status=500))
+
+    try:
+        contextvars_std.copy_context().run(run)
+    finally:
+        tracing.enabled = False
+        tracing.set_exporter(original)
+
+    span = exporter.spans[0]
+    assert span.name == 'GET /v3/read/<device_id>'
+    assert span.trace_id == '4bf92f3577b34da6a3ce929d0e0e4736'
+    assert span.parent_id == '00f067aa0ba902b7'
+    assert span.status == 'error'
+    assert span.attributes['status'] == 500
+    assert span.attributes['path'] == '/v3/read/123'
+
+
+def test_on_request_debug_header(mocker):
+    mocker.patch('synse_server.config.options.get', return_value='secret')
+
+    class MockRequest:
+        method = 'GET'
+        ip = '127.0.0.1'
+        path = '/v3/read/123'
+        args = {}
+        headers = {'X-Synse-Debug': 'secret'}
+
+        def __init__(self):
+            self.ctx = SimpleNamespace()
+
+    def run():
+        app.on_request(MockRequest())
+        return log.in_debug_scope()
+
+    assert contextvars_std.copy_context().run(run) is True
@@ -33,3 +33,11 @@ class TestExponentialBackoff:
         assert 0 < delay_10 < 512
         assert 0 < delay_11 < 512
         assert 0 < delay_12 < 512
+
+    def test_reset(self):
+        back = backoff.ExponentialBackoff()
+        for _ in range(5):
+            back.delay()
+
+        back.reset()
+        assert 0 < back.delay() < 2
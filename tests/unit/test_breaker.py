@@ -0,0 +1,176 @@
+"""Unit tests for the ``synse_server.breaker`` module."""
+
+from unittest import mock
+
+from synse_server.breaker import CircuitBreaker
+
+
+class TestCircuitBreaker:
+    """Test cases for the ``synse_server.breaker.CircuitBreaker`` class."""
+
+    def test_init(self):
+        b = CircuitBreaker()
+
+        assert b.state == CircuitBreaker.CLOSED
+        assert b.allow() is True
+
+    def test_stays_closed_below_min_calls(self):
+        b = CircuitBreaker(min_calls=5)
+        for _ in range(4):
+            b.record(success=False)
+
+        assert b.state == CircuitBreaker.CLOSED
+        assert b.allow() is True
+
+    def test_opens_on_error_rate(self):
+        b = CircuitBreaker(min_calls=4, error_rate=0.5)
+        b.record(success=True)
+        b.record(success=True)
+        b.record(success=False)
+        assert b.state == CircuitBreaker.CLOSED
+
+        b.record(success=False)
+        assert b.state == CircuitBreaker.OPEN
+        assert b.allow() is False
+
+    def test_error_rate_uses_window(self):
+        b = CircuitBreaker(window=4, min_calls=4, error_rate=0.75)
+        for _ in range(2):
+            b.record(success=False)
+        for _ in range(4):
+            b.record(success=True)
+
+        # The earlier failures have rolled out of the window.
+        assert b.state == CircuitBreaker.CLOSED
+        b.record(success=False)
+        b.record(success=False)
+        assert b.state == CircuitBreaker.CLOSED
+
+    def test_opens_on_slow_call_rate(self):
+        b = CircuitBreaker(min_calls=2, slow_call_duration=1, slow_call_rate=0.5)
+        b.record(success=True, duration=0.5)
+        assert b.state == CircuitBreaker.CLOSED
+
+        b.record(success=True, duration=2)
+        assert b.state == CircuitBreaker.OPEN
+
+    def test_slow_calls_disabled(self):
+        b = CircuitBreaker(min_calls=1, slow_call_duration=0, slow_call_rate=0.1)
+        b.record(success=True, duration=100)
+
+        assert b.state == CircuitBreaker.CLOSED
+
+    def test_half_open_after_reset_timeout(self):
+        b = CircuitBreaker(min_calls=1, reset_timeout=10)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=100):
+            b.record(success=False)
+        assert b._state == CircuitBreaker.OPEN
+
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=105):
+            assert b.state == CircuitBreaker.OPEN
+            assert b.allow() is False
+
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=110):
+            assert b.state == CircuitBreaker.HALF_OPEN
+            # Only a single trial call is allowed through.
+            assert b.allow() is True
+            assert b.allow() is False
+
+    def test_half_open_trial_success(self):
+        b = CircuitBreaker(min_calls=1, reset_timeout=0)
+        b.record(success=False)
+        assert b.allow() is True
+        assert b.state == CircuitBreaker.HALF_OPEN
+
+        b.record(success=True)
+        assert b.state == CircuitBreaker.CLOSED
+        assert len(b._calls) == 0
+
+    def test_half_open_trial_failure(self):
+        b = CircuitBreaker(min_calls=1, reset_timeout=10)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=100):
+            b.record(success=False)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=110):
+            assert b.allow() is True
+            b.record(success=False)
+            assert b.state == CircuitBreaker.OPEN
+            assert b.allow() is False
+
+    def test_release_trial(self):
+        b = CircuitBreaker(min_calls=1, reset_timeout=10)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=100):
+            b.record(success=False)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=110):
+            assert b.allow() is True
+            assert b.allow() is False
+
+            b.release()
+            assert b.state == CircuitBreaker.HALF_OPEN
+            assert b.allow() is True
+
+    def test_half_open_trial_expires(self):
+        b = CircuitBreaker(min_calls=1, reset_timeout=10)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=100):
+            b.record(success=False)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=110):
+            assert b.allow() is True
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=115):
+            assert b.allow() is False
+
+        # The trial's outcome was never recorded, so another trial is allowed.
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=120):
+            assert b.state == CircuitBreaker.HALF_OPEN
+            assert b.allow() is True
+            assert b.allow() is False
+
+    def test_admit(self):
+        b = CircuitBreaker(min_calls=1, reset_timeout=10)
+        assert b.admit() is True
+
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=100):
+            b.record(success=False)
+            assert b.admit() is False
+
+        # Long-lived calls are not admitted as the half-open trial.
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=110):
+            assert b.admit() is False
+            assert b.state == CircuitBreaker.HALF_OPEN
+            assert b.allow() is True
+
+    def test_reset(self):
+        b = CircuitBreaker(min_calls=1)
+        b.record(success=False)
+        assert b.state == CircuitBreaker.OPEN
+
+        b.reset()
+        assert b.state == CircuitBreaker.CLOSED
+        assert len(b._calls) == 0
+
+    def test_on_state_change(self):
+        changes = []
+        b = CircuitBreaker(min_calls=1, reset_timeout=0, on_state_change=changes.append)
+
+        b.record(success=False)
+        b.allow()
+        b.record(success=True)
+
+        assert changes == [
+            CircuitBreaker.OPEN,
+            CircuitBreaker.HALF_OPEN,
+            CircuitBreaker.CLOSED,
+        ]
+
+    def test_on_state_change_when_read(self):
+        changes = []
+        b = CircuitBreaker(min_calls=1, reset_timeout=10, on_state_change=changes.append)
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=100):
+            b.record(success=False)
+
+        # Reading the state after the reset timeout makes the transition, so
+        # the callback fires without waiting for a call through the breaker.
+        with mock.patch('synse_server.breaker.time.monotonic', return_value=110):
+            assert b.state == CircuitBreaker.HALF_OPEN
+            assert changes == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN]
+
+            assert b.allow() is True
+            assert changes == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN]
@@ -1,5 +1,9 @@
 """Unit tests for the ``synse_server.cache`` module."""
 
+import asyncio
+import collections
+import threading
+
 import asynctest
 import grpc
 import mock
@@ -88,6 +92,18 @@ class TestTransactionCache:
         assert len(cache.transaction_cache._cache) == 1
         assert f'{cache.NS_TRANSACTION}txn-1' in cache.transaction_cache._cache
 
+    @pytest.mark.asyncio
+    async def test_add_transaction_with_address(self):
+        assert len(cache.transaction_cache._cache) == 0
+
+        await cache.add_transaction('txn-1', 'abc', '123', 'localhost:5001')
+
+        assert cache.transaction_cache._cache[f'{cache.NS_TRANSACTION}txn-1'] == {
+            'plugin': '123',
+            'device': 'abc',
+            'address': 'localhost:5001',
+        }
+
     @pytest.mark.asyncio
     async def test_add_transaction_existing_id(self, mocker):
         # Mock test data
@@ -110,6 +126,41 @@ class TestTransactionCache:
             'device': 'def',
         }
 
+    @pytest.mark.asyncio
+    async def test_add_transaction_tracks_expiry(self, mocker):
+        mocker.patch('synse_server.cache._transaction_expiry', collections.OrderedDict())
+        mocker.patch('synse_server.cache.transaction_evictions', 0)
+
+        await cache.add_transaction('txn-1', 'abc', '123')
+        await cache.add_transaction('txn-2', 'def', '123')
+        await cache.add_transaction('txn-1', 'abc', '123')
+
+        # Re-adding a transaction moves it to the back of the expiry order.
+        assert list(cache._transaction_expiry) == ['txn-2', 'txn-1']
+        assert cache._expire_transactions() == 2
+        assert cache.transaction_evictions == 0
+
+    def test_expire_transactions(self, mocker):
+        mocker.patch('synse_server.cache._transaction_expiry', collections.OrderedDict([
+            ('txn-1', 100),
+            ('txn-2', 110),
+            ('txn-3', 120),
+        ]))
+        mocker.patch('synse_server.cache.transaction_evictions', 0)
+        mock_monitor = mocker.patch('synse_server.cache.Monitor')
+        mock_time = mocker.patch('synse_server.cache.time')
+
+        mock_time.monotonic.return_value = 90
+        assert cache._expire_transactions() == 3
+        assert cache.transaction_evictions == 0
+        mock_monitor.transaction_cache_evictions.inc.assert_not_called()
+
+        mock_time.monotonic.return_value = 115
+        assert cache._expire_transactions() == 1
+        assert cache.transaction_evictions == 2
+        assert list(cache._transaction_expiry) == ['txn-3']
+        mock_monitor.transaction_cache_evictions.inc.assert_called_once_with(2)
+
 
 @pytest.mark.usefixtures('clear_device_cache')
 class TestDeviceCache:
@@ -312,6 +363,209 @@ class TestDeviceCache:
             mocker.call(),
         ])
 
+        assert cache.last_rebuild['duration'] > 0
+        assert '123' in cache.plugin_rebuilds
+
+    @pytest.mark.asyncio
+    async def test_update_plugin_devices_replaces_plugin_devices(self, mocker, simple_plugin):
+        old = api.V3Device(
+            id='1', plugin='123', alias='old',
+            tags=[api.V3Tag(namespace='system', annotation='id', label='1')],
+        )
+        other = api.V3Device(
+            id='2', plugin='456', alias='other',
+            tags=[
+                api.V3Tag(namespace='system', annotation='id', label='2'),
+                api.V3Tag(label='foo'),
+            ],
+        )
+        new = api.V3Device(
+            id='3', plugin='123', alias='new',
+            tags=[
+                api.V3Tag(namespace='system', annotation='id', label='3'),
+                api.V3Tag(label='foo'),
+            ],
+        )
+
+        # Mock test data
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+            '123': simple_plugin,
+        })
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+            f'{cache.NS_DEVICE}system/id:1': [old],
+            f'{cache.NS_DEVICE}system/id:2': [other],
+            f'{cache.NS_DEVICE}foo': [other],
+            f'{cache.NS_ALIAS}old': old,
+            f'{cache.NS_ALIAS}other': other,
+        })
+        mock_devices = mocker.patch(
+            'synse_grpc.client.PluginClientV3.devices',
+            return_value=[new],
+        )
+
+        # --- Test case -----------------------------
+        await cache.update_plugin_devices('123')
+
+        assert await cache.device_cache.get('system/id:1') is None
+        assert await cache.device_cache.get('system/id:2') == [other]
+        assert await cache.device_cache.get('system/id:3') == [new]
+        assert await cache.device_cache.get('foo') == [other, new]
+        assert await cache.get_alias('old') is None
+        assert await cache.get_alias('other') == other
+        assert await cache.get_alias('new') == new
+
+        mock_devices.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_update_plugin_devices_plugin_disabled(self, mocker, simple_plugin):
+        dev = api.V3Device(
+            id='1', plugin='123', alias='dev',
+            tags=[api.V3Tag(namespace='system', annotation='id', label='1')],
+        )
+        simple_plugin.disabled = True
+
+        # Mock test data
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+            '123': simple_plugin,
+        })
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+            f'{cache.NS_DEVICE}system/id:1': [dev],
+            f'{cache.NS_ALIAS}dev': dev,
+        })
+        mock_devices = mocker.patch('synse_grpc.client.PluginClientV3.devices')
+
+        # --- Test case -----------------------------
+        await cache.update_plugin_devices('123')
+
+        assert await cache.device_cache.get('system/id:1') is None
+        assert await cache.get_alias('dev') is None
+        mock_devices.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_update_plugin_devices_rpc_error(self, mocker, simple_plugin):
+        dev = api.V3Device(
+            id='1', plugin='123',
+            tags=[api.V3Tag(namespace='system', annotation='id', label='1')],
+        )
+
+        # Mock test data
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+            '123': simple_plugin,
+        })
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+            f'{cache.NS_DEVICE}system/id:1': [dev],
+        })
+        mocker.patch(
+            'synse_grpc.client.PluginClientV3.devices',
+            side_effect=grpc.RpcError(),
+        )
+        mock_schedule = mocker.patch('synse_server.cache.on_plugin_event')
+        plugin.PluginManager.add_listener(mock_schedule)
+
+        # --- Test case -----------------------------
+        try:
+            await cache.update_plugin_devices('123')
+        finally:
+            plugin.PluginManager.remove_listener(mock_schedule)
+
+        # The cached devices are left as-is, and the plugin is marked inactive.
+        assert await cache.device_cache.get('system/id:1') == [dev]
+        assert simple_plugin.active is False
+        mock_schedule.assert_called_once_with('deactivated', simple_plugin)
+
+    @pytest.mark.asyncio
+    async def test_update_plugin_devices_plugin_inactive(self, mocker, simple_plugin):
+        dev = api.V3Device(
+            id='1', plugin='123', alias='dev',
+            tags=[api.V3Tag(namespace='system', annotation='id', label='1')],
+        )
+        simple_plugin.active = False
+
+        # Mock test data
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+            '123': simple_plugin,
+        })
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+            f'{cache.NS_DEVICE}system/id:1': [dev],
+            f'{cache.NS_ALIAS}dev': dev,
+        })
+        mock_devices = mocker.patch('synse_grpc.client.PluginClientV3.devices')
+
+        # --- Test case -----------------------------
+        await cache.update_plugin_devices('123')
+
+        # An inactive plugin keeps its devices until it recovers.
+        assert await cache.device_cache.get('system/id:1') == [dev]
+        assert await cache.get_alias('dev') == dev
+        mock_devices.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_update_plugin_devices_serialized_with_rebuild(self, mocker, simple_plugin):
+        old = api.V3Device(
+            id='1', plugin='123',
+            tags=[api.V3Tag(namespace='system', annotation='id', label='1')],
+        )
+        new = api.V3Device(
+            id='2', plugin='123',
+            tags=[api.V3Tag(namespace='system', annotation='id', label='2')],
+        )
+
+        # Mock test data
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+            '123': simple_plugin,
+        })
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {})
+        # The cache locks are bound to the Synse loop, not the test loop.
+        mocker.patch('synse_server.cache.device_update_lock', asyncio.Lock())
+        release = threading.Event()
+
+        def devices():
+            # The plugin's update is slow to get its (older) devices; the full
+            # rebuild which starts after it gets the newer devices.
+            if mock_devices.call_count == 1:
+                assert release.wait(2)
+                return [old]
+            return [new]
+
+        mock_devices = mocker.patch(
+            'synse_grpc.client.PluginClientV3.devices', side_effect=devices,
+        )
+
+        # --- Test case -----------------------------
+        update = asyncio.ensure_future(cache.update_plugin_devices('123'))
+        await asyncio.sleep(0.01)
+        rebuild = asyncio.ensure_future(cache.update_device_cache())
+        await asyncio.sleep(0.01)
+
+        # The rebuild waits for the plugin's update to finish.
+        assert mock_devices.call_count == 1
+        assert not rebuild.done()
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(update, rebuild), 2)
+
+        # The plugin's older devices do not overwrite the rebuild.
+        assert await cache.device_cache.get('system/id:1') is None
+        assert await cache.device_cache.get('system/id:2') == [new]
+
+    @pytest.mark.asyncio
+    async def test_on_plugin_event_debounced(self, mocker, simple_plugin):
+        # Mock test data
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'cache': {'device': {'refresh_debounce': 0.01}},
+        })
+        mock_update = mocker.patch('synse_server.cache.update_plugin_devices')
+
+        # --- Test case -----------------------------
+        cache.on_plugin_event('registered', simple_plugin)
+        cache.on_plugin_event('activated', simple_plugin)
+        assert list(cache._pending_refreshes) == ['123']
+
+        await asyncio.sleep(0.05)
+
+        assert cache._pending_refreshes == {}
+        mock_update.assert_called_once_with('123')
+
     @pytest.mark.asyncio
     async def test_get_device_ok(self, mocker, simple_device):
         # Mock test data
@@ -458,3 +712,78 @@ class TestDeviceCache:
 
         mock_get.assert_called_once()
         mock_get.assert_called_with('device-1')
+
+    @pytest.mark.asyncio
+    async def test_get_device_lookup_metrics(self, mocker, simple_device):
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+            f'{cache.NS_ALIAS}foo': simple_device,
+        })
+        mock_monitor = mocker.patch('synse_server.cache.Monitor')
+
+        # --- Test case -----------------------------
+        device = await cache.get_device('foo')
+        assert device == simple_device
+
+        mock_monitor.cache_lookups.labels.assert_has_calls([
+            mocker.call('id', 'miss'),
+            mocker.call().inc(),
+            mocker.call('alias', 'hit'),
+            mocker.call().inc(),
+        ])
+        mock_monitor.cache_lock_wait.labels.assert_any_call('device')
+        mock_monitor.cache_lock_wait.labels.assert_any_call('alias')
+        mock_monitor.cache_lock_hold.labels.assert_any_call('device')
+        mock_monitor.cache_lock_hold.labels.assert_any_call('alias')
+
+    @pytest.mark.asyncio
+    async def test_get_devices_lookup_metrics(self, mocker, simple_device):
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+            f'{cache.NS_DEVICE}foo': [simple_device],
+        })
+        mock_monitor = mocker.patch('synse_server.cache.Monitor')
+
+        # --- Test case -----------------------------
+        devices = await cache.get_devices('foo', 'bar')
+        assert devices == []
+
+        mock_monitor.cache_lookups.labels.assert_has_calls([
+            mocker.call('tag', 'hit'),
+            mocker.call().inc(),
+            mocker.call('tag', 'miss'),
+            mocker.call().inc(),
+        ])
+
+    def test_get_index_stats(self, mocker, simple_device):
+        other = api.V3Device(id='test-device-2', plugin='123')
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+            f'{cache.NS_DEVICE}system/id:test-device-1': [simple_device],
+            f'{cache.NS_DEVICE}system/id:test-device-2': [other],
+            f'{cache.NS_DEVICE}vapor/unit:test': [simple_device, other],
+            f'{cache.NS_ALIAS}foo': simple_device,
+            f'{cache.NS_TRANSACTION}txn-1': {'plugin': '123', 'device': 'abc'},
+        })
+
+        # --- Test case -----------------------------
+        stats = cache.get_index_stats()
+        assert stats['tags'] == 3
+        assert stats['postings'] == 4
+        assert stats['devices'] == 2
+        assert stats['aliases'] == 1
+        assert stats['size_bytes'] > simple_device.ByteSize() + other.ByteSize()
+
+    def test_get_summary(self, mocker):
+        mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {}, clear=True)
+        mocker.patch('synse_server.cache.last_rebuild', {'time': 1.0, 'duration': 0.5})
+        mocker.patch.dict('synse_server.cache.plugin_rebuilds', {'123': 0.25}, clear=True)
+        mocker.patch('synse_server.cache._transaction_expiry', collections.OrderedDict())
+        mocker.patch('synse_server.cache.transaction_evictions', 2)
+
+        # --- Test case -----------------------------
+        summary = cache.get_summary()
+        assert summary['devices']['tags'] == 0
+        assert summary['devices']['last_rebuild'] == {'time': 1.0, 'duration': 0.5}
+        assert summary['devices']['plugin_rebuilds'] == {'123': 0.25}
+        assert summary['devices']['locked'] is False
+        assert summary['aliases'] == {'entries': 0, 'locked': False}
+        assert summary['transactions']['entries'] == 0
+        assert summary['transactions']['evictions'] == 2
@@ -0,0 +1,183 @@
+"""Unit tests for the ``synse_server.channels`` module."""
+
+import grpc
+import mock
+import pytest
+from synse_grpc.api import V3Metadata
+
+from synse_server import channels
+
+
+class TestStubPool:
+    """Tests for the StubPool."""
+
+    def test_round_robin(self):
+        stubs = [mock.Mock(), mock.Mock(), mock.Mock()]
+        pool = channels.StubPool(stubs)
+        assert len(pool) == 3
+
+        for _ in range(2):
+            for stub in stubs:
+                assert pool.Read is stub.Read
+
+
+class TestCallGroup:
+    """Tests for the CallGroup."""
+
+    def test_cancel(self):
+        group = channels.CallGroup()
+        call = mock.Mock()
+        group.add(call)
+        call.cancel.assert_not_called()
+
+        group.cancel()
+        call.cancel.assert_called_once()
+        assert group.cancelled is True
+
+    def test_add_after_cancel(self):
+        group = channels.CallGroup()
+        group.cancel()
+
+        call = mock.Mock()
+        group.add(call)
+        call.cancel.assert_called_once()
+
+
+class TestCallTracker:
+    """Tests for the CallTracker interceptor."""
+
+    def test_tracked(self):
+        group = channels.CallGroup()
+        call = mock.Mock()
+        continuation = mock.Mock(return_value=call)
+
+        with channels.track(group):
+            resp = channels.CallTracker().intercept_unary_stream(continuation, 'details', 'req')
+        assert resp is call
+
+        group.cancel()
+        call.cancel.assert_called_once()
+
+    def test_not_tracked(self):
+        group = channels.CallGroup()
+        call = mock.Mock()
+        continuation = mock.Mock(return_value=call)
+
+        with channels.track(group):
+            pass
+        channels.CallTracker().intercept_unary_stream(continuation, 'details', 'req')
+
+        group.cancel()
+        call.cancel.assert_not_called()
+
+
+class TestPluginClient:
+    """Tests for the PluginClient."""
+
+    def test_single_channel(self):
+        c = channels.PluginClient('localhost:5001', 'tcp')
+        assert not isinstance(c.client, channels.StubPool)
+        assert c.options == []
+        assert c.pool_size == 1
+
+    @mock.patch('grpc.insecure_channel', wraps=grpc.insecure_channel)
+    def test_channel_options(self, mock_channel):
+        c = channels.PluginClient(
+            'localhost:5001', 'tcp',
+            options=[('grpc.keepalive_time_ms', 30000)],
+            compression=grpc.Compression.Gzip,
+        )
+
+        assert c.options == [('grpc.keepalive_time_ms', 30000)]
+        mock_channel.assert_called_once_with(
+            'localhost:5001',
+            options=[('grpc.keepalive_time_ms', 30000)],
+            compression=grpc.Compression.Gzip,
+        )
+
+    @mock.patch('grpc.insecure_channel', wraps=grpc.insecure_channel)
+    def test_channel_pool(self, mock_channel):
+        c = channels.PluginClient('localhost:5001', 'tcp', pool_size=3)
+
+        assert isinstance(c.client, channels.StubPool)
+        assert len(c.client) == 3
+        assert mock_channel.call_count == 3
+        for call in mock_channel.call_args_list:
+            assert call[1]['options'] == [('grpc.use_local_subchannel_pool', 1)]
+
+    def test_channel_pool_interceptors(self):
+        interceptor = mock.Mock(spec=grpc.UnaryUnaryClientInterceptor)
+        c = channels.PluginClient(
+            'localhost:5001', 'tcp', interceptors=[interceptor], pool_size=2,
+        )
+        assert len(c.client) == 2
+        assert c.interceptors == [interceptor]
+
+    @mock.patch('grpc.intercept_channel', wraps=grpc.intercept_channel)
+    def test_call_tracker_innermost(self, mock_intercept):
+        interceptor = mock.Mock(spec=grpc.UnaryUnaryClientInterceptor)
+        channels.PluginClient('localhost:5001', 'tcp', interceptors=[interceptor])
+
+        args = mock_intercept.call_args[0]
+        assert args[1] is interceptor
+        assert isinstance(args[-1], channels.CallTracker)
+
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    def test_client_methods(self, mock_metadata):
+        c = channels.PluginClient('localhost:5001', 'tcp', pool_size=2)
+        assert c.metadata() == V3Metadata(id='123', tag='foo')
+
+
+class TestFromConfig:
+    """Tests for getting the channel arguments from config."""
+
+    def test_defaults(self):
+        assert channels.from_config() == {
+            'options': [],
+            'compression': grpc.Compression.NoCompression,
+            'pool_size': 1,
+        }
+
+    def test_configured(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'grpc': {
+                'compression': 'gzip',
+                'pool_size': 4,
+                'max_send_message_size': 1024,
+                'max_receive_message_size': 2048,
+                'keepalive': {
+                    'time': 30,
+                    'timeout': 5,
+                    'without_calls': True,
+                },
+            },
+        })
+
+        assert channels.from_config() == {
+            'options': [
+                ('grpc.keepalive_time_ms', 30000),
+                ('grpc.keepalive_timeout_ms', 5000),
+                ('grpc.keepalive_permit_without_calls', 1),
+                ('grpc.http2.max_pings_without_data', 0),
+                ('grpc.max_send_message_length', 1024),
+                ('grpc.max_receive_message_length', 2048),
+            ],
+            'compression': grpc.Compression.Gzip,
+            'pool_size': 4,
+        }
+
+    def test_keepalive_disabled(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'grpc': {'keepalive': {'time': 0, 'timeout': 5}},
+        })
+        assert channels.from_config()['options'] == []
+
+    def test_unsupported_compression(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'grpc': {'compression': 'brotli'},
+        })
+        with pytest.raises(ValueError):
+            channels.from_config()
@@ -17,8 +17,10 @@ class TestSynseErrorHandler:
         [
             (errors.SynseError, 500),
             (errors.InvalidUsage, 400),
+            (errors.Unauthorized, 401),
             (errors.NotFound, 404),
             (errors.UnsupportedAction, 405),
+            (errors.Conflict, 409),
             (errors.ServerError, 500),
         ]
     )
@@ -0,0 +1,310 @@
+"""Unit tests for the ``synse_server.health`` module."""
+
+import asyncio
+import time
+
+import mock
+import pytest
+from synse_grpc import api, client
+
+from synse_server import health, plugin
+
+
+@pytest.fixture()
+def monitor():
+    return health.HealthMonitor(
+        interval=0.01, jitter=0, timeout=0.5, failure_threshold=2, success_threshold=1,
+    )
+
+
+class TestPluginHealth:
+    """Tests for the PluginHealth state."""
+
+    def test_to_dict_initial(self):
+        assert health.PluginHealth().to_dict() == {
+            'status': 'unknown',
+            'failures': 0,
+            'last_checked': None,
+            'last_error': None,
+            'latency': {
+                'p50': None,
+                'p99': None,
+            },
+        }
+
+
+class TestHealthMonitor:
+    """Tests for the HealthMonitor."""
+
+    def test_from_config_defaults(self):
+        m = health.HealthMonitor.from_config()
+        assert m.interval == 10
+        assert m.jitter == 0.2
+        assert m.timeout == 3
+        assert m.failure_threshold == 2
+        assert m.success_threshold == 1
+
+    def test_from_config_disabled(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'plugin': {'health_check': {'enabled': False}},
+        })
+        assert health.HealthMonitor.from_config() is None
+
+    def test_from_config_configured(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'plugin': {'health_check': {'interval': 30, 'failure_threshold': 3}},
+        })
+        m = health.HealthMonitor.from_config()
+        assert m.interval == 30
+        assert m.failure_threshold == 3
+
+    @pytest.mark.asyncio
+    @mock.patch('synse_grpc.client.PluginClientV3.test')
+    async def test_probe_healthy(self, mock_test, monitor, simple_plugin):
+        simple_plugin.active = False
+
+        state = await monitor.probe(simple_plugin)
+        assert state.status == 'healthy'
+        assert state.successes == 1
+        assert state.failures == 0
+        assert state.last_checked is not None
+        assert state.latency.quantile(0.5) is not None
+        assert simple_plugin.active is True
+        mock_test.assert_called_once()
+
+    @pytest.mark.asyncio
+    @mock.patch('synse_grpc.client.PluginClientV3.test', side_effect=ValueError('down'))
+    async def test_probe_failure_threshold(self, mock_test, monitor, simple_plugin):
+        state = await monitor.probe(simple_plugin)
+        assert state.status == 'unknown'
+        assert state.failures == 1
+        assert state.last_error == 'down'
+        assert simple_plugin.active is True
+
+        state = await monitor.probe(simple_plugin)
+        assert state.status == 'unhealthy'
+        assert state.failures == 2
+        assert simple_plugin.active is False
+
+    @pytest.mark.asyncio
+    @mock.patch('synse_grpc.client.PluginClientV3.test')
+    async def test_probe_closes_half_open_breaker(self, mock_test, monitor, simple_plugin):
+        simple_plugin.breaker.min_calls = 1
+        simple_plugin.breaker.reset_timeout = 0
+        simple_plugin.breaker.record(success=False)
+
+        # A trial call was allowed through, but its outcome is never recorded.
+        assert simple_plugin.breaker.allow() is True
+
+        await monitor.probe(simple_plugin)
+        assert simple_plugin.circuit_state() == 'closed'
+
+    @pytest.mark.asyncio
+    @mock.patch('synse_grpc.client.PluginClientV3.test', side_effect=ValueError('down'))
+    async def test_probe_reopens_half_open_breaker(self, mock_test, monitor, simple_plugin):
+        simple_plugin.breaker.min_calls = 1
+        simple_plugin.breaker.reset_timeout = 10
+        simple_plugin.breaker.record(success=False)
+        simple_plugin.breaker._opened_at -= 10
+        assert simple_plugin.circuit_state() == 'half-open'
+
+        await monitor.probe(simple_plugin)
+        assert simple_plugin.circuit_state() == 'open'
+
+    @pytest.mark.asyncio
+    async def test_probe_timeout(self, monitor, simple_plugin):
+        monitor.timeout = 0.01
+        monitor.failure_threshold = 1
+        with mock.patch(
+            'synse_grpc.client.PluginClientV3.test', side_effect=lambda: time.sleep(0.1),
+        ):
+            state = await monitor.probe(simple_plugin)
+
+        assert state.status == 'unhealthy'
+        assert simple_plugin.active is False
+
+    @pytest.mark.asyncio
+    @mock.patch('synse_grpc.client.PluginClientV3.test')
+    async def test_check_all_plugins(self, mock_test, mocker, monitor, simple_plugin):
+        replica = plugin.Plugin(
+            info={'tag': 'test/foo', 'id': '123'},
+            version={},
+            client=client.PluginClientV3('localhost:5433', 'tcp'),
+        )
+        disabled = plugin.Plugin(
+            info={'tag': 'test/bar', 'id': '456'},
+            version={},
+            client=client.PluginClientV3('localhost:5434', 'tcp'),
+        )
+        disabled.disabled = True
+
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+            '123': simple_plugin,
+            '456': disabled,
+        })
+        mocker.patch.dict('synse_server.plugin.PluginManager.replicas', {
+            '123': [replica],
+        })
+        monitor.states[('789', 'localhost:5000')] = health.PluginHealth()
+
+        await monitor.check()
+
+        assert mock_test.call_count == 2
+        assert set(monitor.states) == {
+            ('123', 'localhost:5432'),
+            ('123', 'localhost:5433'),
+        }
+        assert replica.active is True
+        assert disabled.active is False
+
+    @pytest.mark.asyncio
+    @mock.patch('synse_grpc.client.PluginClientV3.test')
+    async def test_run_disables_reconnect(self, mock_test, mocker, monitor):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {})
+
+        task = asyncio.ensure_future(monitor.run())
+        await asyncio.sleep(0.02)
+        assert plugin.Plugin.reconnect_on_error is False
+
+        monitor.stop()
+        await asyncio.wait_for(task, 1)
+        assert plugin.Plugin.reconnect_on_error is True
+
+
+class TestHealthSummary:
+    """Tests for the HealthSummary cache."""
+
+    def test_from_config_defaults(self):
+        s = health.HealthSummary.from_config()
+        assert s.ttl == 5
+        assert s.timeout == 3
+
+    def test_get_summary_created_once(self):
+        s = health.get_summary()
+        assert health.get_summary() is s
+
+    @pytest.mark.asyncio
+    async def test_get_first_waits(self, mocker, simple_plugin):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {'123': simple_plugin})
+        mock_health = mocker.patch(
+            'synse_grpc.client.PluginClientV3.health',
+            return_value=api.V3Health(status=api.OK),
+        )
+
+        s = health.HealthSummary()
+        results = await s.get()
+
+        assert results == {'123': api.V3Health(status=api.OK)}
+        assert s.updated is not None
+        assert s.is_fresh()
+        mock_health.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_get_fresh_cached(self, mocker, simple_plugin):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {'123': simple_plugin})
+        mock_health = mocker.patch(
+            'synse_grpc.client.PluginClientV3.health',
+            return_value=api.V3Health(status=api.OK),
+        )
+
+        s = health.HealthSummary()
+        await s.get()
+        await s.get()
+        await s.get()
+
+        mock_health.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_get_stale_refreshes_in_background(self, mocker, simple_plugin):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {'123': simple_plugin})
+        mock_health = mocker.patch(
+            'synse_grpc.client.PluginClientV3.health',
+            return_value=api.V3Health(status=api.OK),
+        )
+
+        s = health.HealthSummary(ttl=0)
+        await s.get()
+        mock_health.return_value = api.V3Health(status=api.FAILING)
+
+        # The stale results are returned while the refresh runs.
+        results = await s.get()
+        assert results == {'123': api.V3Health(status=api.OK)}
+
+        await s.refresh()
+        assert s.results == {'123': api.V3Health(status=api.FAILING)}
+        assert mock_health.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_new_plugin_waits(self, mocker, simple_plugin):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {})
+        mock_health = mocker.patch(
+            'synse_grpc.client.PluginClientV3.health',
+            return_value=api.V3Health(status=api.OK),
+        )
+
+        s = health.HealthSummary()
+        assert await s.get() == {}
+
+        plugin.PluginManager.plugins['123'] = simple_plugin
+        assert await s.get() == {'123': api.V3Health(status=api.OK)}
+        mock_health.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_refresh_single_flight(self, mocker, simple_plugin):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {'123': simple_plugin})
+        mock_health = mocker.patch(
+            'synse_grpc.client.PluginClientV3.health',
+            return_value=api.V3Health(status=api.OK),
+        )
+
+        s = health.HealthSummary()
+        first = s.refresh()
+        assert s.refresh() is first
+        await first
+
+        mock_health.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_refresh_concurrent(self, mocker, simple_plugin):
+        other = plugin.Plugin(
+            info={'tag': 'test/bar', 'id': '456'},
+            version={},
+            client=client.PluginClientV3('localhost:5433', 'tcp'),
+        )
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {
+            '123': simple_plugin,
+            '456': other,
+        })
+
+        def slow_health():
+            time.sleep(0.1)
+            return api.V3Health(status=api.OK)
+
+        mocker.patch('synse_grpc.client.PluginClientV3.health', side_effect=slow_health)
+
+        start = time.monotonic()
+        await health.HealthSummary().refresh()
+        assert time.monotonic() - start < 0.19
+
+    @pytest.mark.asyncio
+    async def test_refresh_error(self, mocker, simple_plugin):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {'123': simple_plugin})
+        mocker.patch('synse_grpc.client.PluginClientV3.health', side_effect=ValueError())
+
+        s = health.HealthSummary()
+        await s.refresh()
+
+        assert s.results == {'123': None}
+        assert simple_plugin.active is False
+
+    @pytest.mark.asyncio
+    async def test_refresh_timeout(self, mocker, simple_plugin):
+        mocker.patch.dict('synse_server.plugin.PluginManager.plugins', {'123': simple_plugin})
+        mocker.patch(
+            'synse_grpc.client.PluginClientV3.health', side_effect=lambda: time.sleep(0.1),
+        )
+
+        s = health.HealthSummary(timeout=0.01)
+        await s.refresh()
+
+        assert s.results == {'123': None}
@@ -0,0 +1,99 @@
+"""Unit tests for the ``synse_server.lag`` module."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from synse_server import lag
+from synse_server.metrics import Monitor
+
+
+def blocked_count():
+    return Monitor.loop_blocked._value.get()
+
+
+def test_from_config_defaults():
+    m = lag.LoopMonitor.from_config()
+    assert m.interval == 0.25
+    assert m.threshold == 0.5
+
+
+def test_from_config_disabled(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'loop_monitor': {'enabled': False},
+    })
+    assert lag.LoopMonitor.from_config() is None
+
+
+def test_from_config_configured(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'loop_monitor': {'interval': 1, 'threshold': 2},
+    })
+    m = lag.LoopMonitor.from_config()
+    assert m.interval == 1
+    assert m.threshold == 2
+
+
+@pytest.mark.asyncio
+async def test_run_records_lag():
+    m = lag.LoopMonitor(interval=0.01, threshold=1)
+    total = Monitor.loop_lag._sum.get()
+
+    task = asyncio.ensure_future(m.run())
+    await asyncio.sleep(0.05)
+    m.stop()
+    await asyncio.wait_for(task, 1)
+
+    assert Monitor.loop_lag._sum.get() > total
+
+    m._watchdog.join(1)
+    assert not m._watchdog.is_alive()
+
+
+@pytest.mark.asyncio
+async def test_blocked_loop_reported(mocker):
+    mock_report = mocker.patch.object(lag.LoopMonitor, 'report')
+    m = lag.LoopMonitor(interval=0.01, threshold=0.05)
+
+    task = asyncio.ensure_future(m.run())
+    await asyncio.sleep(0.02)
+
+    # Block the event loop, longer than the threshold.
+    time.sleep(0.3)
+    await asyncio.sleep(0.05)
+
+    m.stop()
+    await asyncio.wait_for(task, 1)
+
+    # The stall is reported once, however long it lasted.
+    mock_report.assert_called_once()
+    assert mock_report.call_args[0][0] > 0.05
+
+
+@pytest.mark.asyncio
+async def test_not_blocked_not_reported(mocker):
+    mock_report = mocker.patch.object(lag.LoopMonitor, 'report')
+    m = lag.LoopMonitor(interval=0.01, threshold=0.2)
+
+    task = asyncio.ensure_future(m.run())
+    await asyncio.sleep(0.1)
+    m.stop()
+    await asyncio.wait_for(task, 1)
+
+    mock_report.assert_not_called()
+
+
+def test_report_logs_stack(mocker):
+    mock_warning = mocker.patch('synse_server.lag.logger.warning')
+    m = lag.LoopMonitor()
+    m._thread_id = threading.get_ident()
+    count = blocked_count()
+
+    m.report(1.5)
+
+    assert blocked_count() == count + 1
+    mock_warning.assert_called_once()
+    stack = mock_warning.call_args[1]['stack']
+    assert 'test_report_logs_stack' in stack
@@ -1,14 +1,19 @@
 """Unit tests for the ``synse_server.log`` module."""
 
+import contextvars
+import io
+import json
 import logging
 
 import mock
+import pytest
 import structlog
 
 from synse_server import log
 
 
 def test_setup_logger_defaults():
+    log.configure_logging()
     logger = structlog.get_logger('synse_server')
     logger.setLevel(logging.DEBUG)
 
@@ -21,3 +26,225 @@ def test_setup_logger_configured(mock_get):
     log.setup_logger()
     assert structlog.get_logger('synse_server').getEffectiveLevel() == logging.ERROR
     mock_get.assert_called_once_with('logging', 'info')
+
+
+@mock.patch('synse_server.log.override_sanic_loggers')
+@mock.patch('synse_server.log.logging.config.dictConfig')
+def test_configure_logging_once(mock_dict_config, mock_override):
+    with mock.patch('synse_server.log._configured', False):
+        log.configure_logging()
+        log.configure_logging()
+
+    mock_dict_config.assert_called_once_with(log.logging_config)
+    mock_override.assert_called_once()
+
+
+def test_filtering_bound_logger_drops_below_level():
+    stdlib_logger = logging.getLogger('synse_server.test.filtering')
+    stdlib_logger.setLevel(logging.INFO)
+    processor = mock.Mock(side_effect=structlog.DropEvent)
+
+    logger = log.FilteringBoundLogger(stdlib_logger, [processor], {})
+    logger.debug('dropped', foo='bar')
+    processor.assert_not_called()
+
+    logger.info('processed', foo='bar')
+    processor.assert_called_once()
+
+
+@mock.patch('synse_server.log.start_queue')
+@mock.patch('synse_server.log._handlers')
+def test_setup_handlers_json(mock_handlers, mock_start):
+    handler = logging.StreamHandler(io.StringIO())
+    mock_handlers.return_value = [handler]
+
+    options = {'log_format': 'json', 'log_async': False}
+    with mock.patch('synse_server.log.config.options.get', side_effect=options.get):
+        log.setup_handlers()
+
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'hello', (), None)
+    assert json.loads(handler.format(record))['event'] == 'hello'
+    mock_start.assert_not_called()
+
+
+@mock.patch('synse_server.log.start_queue')
+@mock.patch('synse_server.log._handlers')
+def test_setup_handlers_defaults(mock_handlers, mock_start):
+    handler = logging.StreamHandler(io.StringIO())
+    mock_handlers.return_value = [handler]
+
+    with mock.patch('synse_server.log.config.options.get', side_effect=lambda k, d: d):
+        log.setup_handlers()
+
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'hello', (), None)
+    assert "event='hello'" in handler.format(record)
+    mock_start.assert_called_once()
+
+
+def test_start_stop_queue():
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    logger = logging.getLogger('synse_server.test.queue')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    with mock.patch.dict(log.logging_config, {'loggers': {'synse_server.test.queue': {}}}):
+        log.start_queue()
+        try:
+            assert len(log._listeners) == 1
+            assert isinstance(logger.handlers[0], log.QueueHandler)
+
+            logger.warning('queued')
+        finally:
+            log.stop_queue()
+
+    assert log._listeners == []
+    assert logger.handlers == [handler]
+    assert stream.getvalue() == 'queued\n'
+    logger.removeHandler(handler)
+
+
+def test_filtering_bound_logger_scoped():
+    stdlib_logger = logging.getLogger('synse_server.test.scoped')
+    stdlib_logger.setLevel(logging.INFO)
+    processor = mock.Mock(return_value=(({'event': 'scoped'},), {'extra': {}}))
+
+    logger = log.FilteringBoundLogger(stdlib_logger, [processor], {})
+    with mock.patch.object(stdlib_logger, 'handle') as mock_handle:
+        with mock.patch('synse_server.log.debug_devices', {'dev-1'}):
+            logger.debug('scoped', device='dev-1')
+            logger.debug('not scoped', device='dev-2')
+
+    processor.assert_called_once()
+    mock_handle.assert_called_once()
+    record = mock_handle.call_args[0][0]
+    assert record.levelno == logging.DEBUG
+    assert record.msg == {'event': 'scoped'}
+
+
+@mock.patch('synse_server.log.time.monotonic')
+def test_rate_limiter(mock_monotonic):
+    mock_monotonic.return_value = 100
+    limiter = log.RateLimiter(rate=1, burst=2)
+    logger = logging.getLogger('synse_server.test.limited')
+
+    assert limiter(logger, 'debug', {'event': 'a'}) == {'event': 'a'}
+    assert limiter(logger, 'debug', {'event': 'a'}) == {'event': 'a'}
+    with pytest.raises(structlog.DropEvent):
+        limiter(logger, 'debug', {'event': 'a'})
+
+    # Other events, and events above the debug level, are not limited.
+    assert limiter(logger, 'debug', {'event': 'b'}) == {'event': 'b'}
+    assert limiter(logger, 'info', {'event': 'a'}) == {'event': 'a'}
+    assert limiter(logger, 'warning', {'event': 'a'}) == {'event': 'a'}
+
+    # Once the bucket refills, the suppressed events are reported.
+    mock_monotonic.return_value = 101
+    assert limiter(logger, 'debug', {'event': 'a'}) == {'event': 'a', 'suppressed': 1}
+
+
+@mock.patch('synse_server.log.time.monotonic', return_value=100)
+def test_rate_limiter_level(_):
+    limiter = log.RateLimiter(rate=1, burst=1, level='info')
+    logger = logging.getLogger('synse_server.test.limited')
+
+    assert limiter(logger, 'info', {'event': 'a'}) == {'event': 'a'}
+    with pytest.raises(structlog.DropEvent):
+        limiter(logger, 'debug', {'event': 'a'})
+    with pytest.raises(structlog.DropEvent):
+        limiter(logger, 'info', {'event': 'a'})
+
+    # Warnings and errors are not limited.
+    assert limiter(logger, 'warning', {'event': 'a'}) == {'event': 'a'}
+    assert limiter(logger, 'error', {'event': 'a'}) == {'event': 'a'}
+
+
+def test_rate_limiter_disabled():
+    limiter = log.RateLimiter()
+    for _ in range(100):
+        assert limiter(None, 'debug', {'event': 'a'}) == {'event': 'a'}
+
+
+@mock.patch('synse_server.log.random.random', return_value=0.5)
+def test_sampler(_):
+    sampler = log.Sampler({'a': 0.25, 'b': 0.75})
+
+    with pytest.raises(structlog.DropEvent):
+        sampler(None, 'debug', {'event': 'a'})
+    assert sampler(None, 'debug', {'event': 'b'}) == {'event': 'b'}
+    assert sampler(None, 'debug', {'event': 'c'}) == {'event': 'c'}
+
+
+def test_setup_filters(mocker):
+    mocker.patch.object(log.rate_limiter, 'rate', 0)
+    mocker.patch.object(log.rate_limiter, 'level', 'debug')
+    mocker.patch.object(log.sampler, 'rates', {})
+    mocker.patch('synse_server.log.debug_plugins', set())
+    mocker.patch('synse_server.log.debug_devices', set())
+
+    options = {
+        'log_limits': {'rate': 5, 'burst': 20, 'level': 'info', 'sample': {'a': 0.1}},
+        'log_debug': {'plugins': ['123'], 'devices': ['dev-1']},
+    }
+    with mock.patch('synse_server.log.config.options.get', side_effect=options.get):
+        log.setup_filters()
+
+    assert log.rate_limiter.rate == 5
+    assert log.rate_limiter.burst == 20
+    assert log.rate_limiter.level == 'info'
+    assert log.sampler.rates == {'a': 0.1}
+    assert log.debug_plugins == {'123'}
+    assert log.debug_devices == {'dev-1'}
+
+
+@pytest.mark.parametrize(
+    'fields,expected', [
+        (None, False),
+        ({}, False),
+        ({'plugin_id': '123'}, True),
+        ({'plugin': '123'}, True),
+        ({'plugin': '456'}, False),
+        ({'id': 'dev-1'}, False),
+        ({'device_id': 'dev-1'}, True),
+        ({'device': 'dev-1'}, True),
+        ({'device': {'id': 'dev-1'}}, False),
+    ]
+)
+def test_in_debug_scope(mocker, fields, expected):
+    mocker.patch('synse_server.log.debug_plugins', {'123'})
+    mocker.patch('synse_server.log.debug_devices', {'dev-1'})
+
+    assert log.in_debug_scope(fields) is expected
+
+
+@pytest.mark.parametrize(
+    'token,header,expected', [
+        (None, None, False),
+        (None, 'secret', False),
+        ('secret', None, False),
+        ('secret', 'wrong', False),
+        ('secret', 'secret', True),
+    ]
+)
+def test_debug_request(token, header, expected):
+    def run():
+        with mock.patch('synse_server.log.config.options.get', return_value=token):
+            log.debug_request(header)
+        return log.in_debug_scope(), log.debug_enabled('synse_server.test.request')
+
+    logging.getLogger('synse_server.test.request').setLevel(logging.INFO)
+    assert contextvars.copy_context().run(run) == (expected, expected)
+
+
+def test_debug_scope(mocker):
+    mocker.patch('synse_server.log.debug_plugins', {'123'})
+    mocker.patch('synse_server.log.debug_devices', {'dev-1'})
+
+    def run(**kwargs):
+        log.debug_scope(**kwargs)
+        return log.in_debug_scope()
+
+    assert contextvars.copy_context().run(run, plugin='456', device='dev-2') is False
+    assert contextvars.copy_context().run(run, plugin='123', device='dev-2') is True
+    assert contextvars.copy_context().run(run, plugin='456', device='dev-1') is True
@@ -0,0 +1,164 @@
+"""Unit tests for the ``synse_server.metrics`` module."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from synse_server import metrics
+
+
+def make_request(path, ip='10.1.1.1', method='GET', template='/v3/read/<device_id>'):
+    return SimpleNamespace(method=method, uri_template=template, path=path, ip=ip)
+
+
+def series(metric, method):
+    """Get the label sets of a metric's series for the given request method."""
+    return {
+        tuple(sorted(s.labels.items()))
+        for m in metric.collect()
+        for s in m.samples
+        if s.labels.get('method') == method
+    }
+
+
+class TestCardinalityLimiter:
+    """Tests for the CardinalityLimiter."""
+
+    def test_admits_under_limit(self):
+        limiter = metrics.CardinalityLimiter(limit=2, fold=(1,))
+        assert limiter(('a', '1')) == ('a', '1')
+        assert limiter(('a', '2')) == ('a', '2')
+
+    def test_folds_over_limit(self):
+        limiter = metrics.CardinalityLimiter(limit=2, fold=(1,))
+        limiter(('a', '1'))
+        limiter(('a', '2'))
+        assert limiter(('a', '3')) == ('a', 'other')
+        assert limiter(('b', '4')) == ('b', 'other')
+
+    def test_seen_over_limit(self):
+        limiter = metrics.CardinalityLimiter(limit=1, fold=(1,))
+        limiter(('a', '1'))
+        limiter(('a', '2'))
+        assert limiter(('a', '1')) == ('a', '1')
+        assert limiter.seen == {('a', '1')}
+
+
+class TestMonitor:
+    """Tests for the Monitor HTTP metrics labels."""
+
+    def test_http_labels_defaults(self):
+        m = metrics.Monitor(None)
+        labels = m.http_labels(make_request('/v3/read/123'), 200)
+        assert labels == ('GET', '/v3/read/<device_id>', '', '200', '')
+
+    def test_http_labels_unmatched(self):
+        m = metrics.Monitor(None)
+        labels = m.http_labels(make_request('/foo', template=None), 404)
+        assert labels == ('GET', 'unmatched', '', '404', '')
+
+    def test_http_labels_opt_in(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'metrics': {'http': {'client_ip': True, 'path': True}},
+        })
+        m = metrics.Monitor(None)
+        labels = m.http_labels(make_request('/v3/read/123'), 200)
+        assert labels == ('GET', '/v3/read/<device_id>', '/v3/read/123', '200', '10.1.1.1')
+
+    @pytest.mark.parametrize(
+        'cfg,expected', [
+            ({}, 1),
+            ({'client_ip': True, 'path': True, 'max_series': 100}, 101),
+        ]
+    )
+    def test_series_bounded(self, mocker, cfg, expected):
+        # Use a distinct method per case so series from other tests are not counted.
+        method = f'TEST{expected}'
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'metrics': {'http': cfg},
+        })
+        m = metrics.Monitor(None)
+
+        for i in range(10000):
+            ip = f'10.0.{i // 256}.{i % 256}'
+            labels = m.http_labels(make_request(f'/v3/read/device-{i}', ip, method), 200)
+            m.http_req_count.labels(*labels).inc()
+
+        assert len(series(m.http_req_count, method)) == expected
+
+
+def sample(metric, suffix, **labels):
+    """Get the value of a metric sample with the given name suffix and labels."""
+    for m in metric.collect():
+        for s in m.samples:
+            if s.name.endswith(suffix) and s.labels == labels:
+                return s.value
+    return 0
+
+
+class TestMetricsInterceptor:
+    """Tests for the MetricsInterceptor stream timing."""
+
+    @staticmethod
+    def stream(n, delay):
+        for i in range(n):
+            time.sleep(delay)
+            yield i
+
+    def call_details(self, method):
+        return SimpleNamespace(method=f'/synse.V3Plugin/{method}')
+
+    def test_unary_stream_exhausted(self):
+        interceptor = metrics.MetricsInterceptor()
+        interceptor.plugin = 'stream-exhausted'
+        labels = dict(type='server_streaming', service='synse.V3Plugin', method='Read',
+                      plugin='stream-exhausted')
+
+        resp = interceptor.intercept_unary_stream(
+            lambda *_: self.stream(3, 0.02), self.call_details('Read'), None,
+        )
+
+        # Nothing is recorded until the stream is consumed.
+        assert sample(metrics.Monitor.grpc_req_latency, '_count', **labels) == 0
+
+        assert list(resp) == [0, 1, 2]
+        assert sample(metrics.Monitor.grpc_msg_received, '_total', **labels) == 3
+        assert sample(metrics.Monitor.grpc_stream_first_message_latency, '_count', **labels) == 1
+        assert sample(metrics.Monitor.grpc_stream_message_interval, '_count', **labels) == 2
+        assert sample(metrics.Monitor.grpc_req_latency, '_count', **labels) == 1
+        assert sample(metrics.Monitor.grpc_req_latency, '_sum', **labels) >= 0.06
+
+    def test_unary_stream_closed(self):
+        interceptor = metrics.MetricsInterceptor()
+        interceptor.plugin = 'stream-closed'
+        labels = dict(type='server_streaming', service='synse.V3Plugin', method='ReadStream',
+                      plugin='stream-closed')
+
+        resp = interceptor.intercept_unary_stream(
+            lambda *_: self.stream(10, 0), self.call_details('ReadStream'), None,
+        )
+        assert next(resp) == 0
+        resp.close()
+
+        assert sample(metrics.Monitor.grpc_msg_received, '_total', **labels) == 1
+        assert sample(metrics.Monitor.grpc_stream_message_interval, '_count', **labels) == 0
+        assert sample(metrics.Monitor.grpc_req_latency, '_count', **labels) == 1
+
+    def test_unary_stream_error(self):
+        interceptor = metrics.MetricsInterceptor()
+        interceptor.plugin = 'stream-error'
+        labels = dict(type='server_streaming', service='synse.V3Plugin', method='Devices',
+                      plugin='stream-error')
+
+        def failing():
+            yield 0
+            raise ValueError()
+
+        resp = interceptor.intercept_unary_stream(
+            lambda *_: failing(), self.call_details('Devices'), None,
+        )
+        with pytest.raises(ValueError):
+            list(resp)
+
+        assert sample(metrics.Monitor.grpc_req_latency, '_count', **labels) == 1
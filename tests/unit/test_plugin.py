@@ -1,6 +1,7 @@
 """Unit tests for the ``synse_server.plugin`` module."""
 
 import asyncio
+import time
 from collections.abc import Iterable
 
 import asynctest
@@ -10,14 +11,22 @@ from grpc import RpcError
 from synse_grpc import client, errors
 from synse_grpc.api import V3Metadata, V3Version
 
+from synse_server import channels
 from synse_server import errors as synse_errors
-from synse_server import plugin
+from synse_server import plugin, tracing
+from synse_server.metrics import Monitor
+from synse_server.timeouts import AdaptiveTimeoutInterceptor, LatencyTracker
 
 
 @pytest.mark.usefixtures('clear_manager_plugins')
 class TestPluginManager:
     """Test cases for the ``synse_server.plugin.PluginManager`` class."""
 
+    @pytest.fixture(autouse=True)
+    def mock_channel(self, mocker):
+        # Plugin clients created on registration should not open gRPC channels.
+        mocker.patch('synse_server.channels.PluginClient.make_channel')
+
     def test_iterate_no_plugins(self):
         m = plugin.PluginManager()
 
@@ -79,6 +88,102 @@ class TestPluginManager:
         assert result is not None
         assert result == 'placeholder'
 
+    def test_get_plugin_replicas_round_robin(self):
+        m = plugin.PluginManager()
+        p1, p2 = mock.Mock(), mock.Mock()
+        p1.is_available.return_value = True
+        p2.is_available.return_value = True
+        m.plugins = {'1': p1}
+        m.replicas = {'1': [p2]}
+
+        assert [m.get('1') for _ in range(4)] == [p1, p2, p1, p2]
+
+    def test_get_plugin_replicas_skips_unavailable(self):
+        m = plugin.PluginManager()
+        p1, p2 = mock.Mock(), mock.Mock()
+        p1.is_available.return_value = False
+        p2.is_available.return_value = True
+        m.plugins = {'1': p1}
+        m.replicas = {'1': [p2]}
+
+        assert [m.get('1') for _ in range(3)] == [p2, p2, p2]
+
+    def test_get_plugin_replicas_none_available(self):
+        m = plugin.PluginManager()
+        p1, p2 = mock.Mock(), mock.Mock()
+        p1.is_available.return_value = False
+        p2.is_available.return_value = False
+        m.plugins = {'1': p1}
+        m.replicas = {'1': [p2]}
+
+        assert m.get('1') == p1
+
+    def test_get_plugin_replica_by_address(self):
+        m = plugin.PluginManager()
+        p1, p2 = mock.Mock(address='localhost:5001'), mock.Mock(address='localhost:5002')
+        m.plugins = {'1': p1}
+        m.replicas = {'1': [p2]}
+
+        assert m.get('1', address='localhost:5002') == p2
+        assert m.get('1', address='localhost:5001') == p1
+
+    def test_get_plugin_replica_by_address_not_found(self):
+        m = plugin.PluginManager()
+        p1, p2 = mock.Mock(address='localhost:5001'), mock.Mock(address='localhost:5002')
+        m.plugins = {'1': p1}
+        m.replicas = {'1': [p2]}
+
+        # Another replica cannot stand in for a specific one.
+        assert m.get('1', address='localhost:5003') is None
+
+    def test_iterate_plugin_replicas(self):
+        m = plugin.PluginManager()
+        p1, p2, p3 = mock.Mock(), mock.Mock(), mock.Mock()
+        p1.is_available.return_value = False
+        p2.is_available.return_value = True
+        m.plugins = {'1': p1, '2': p3}
+        m.replicas = {'1': [p2]}
+
+        # One plugin is yielded per plugin ID.
+        assert list(m) == [p2, p3]
+
+    def test_iterate_does_not_advance_round_robin(self):
+        m = plugin.PluginManager()
+        p1, p2 = mock.Mock(), mock.Mock()
+        p1.is_available.return_value = True
+        p2.is_available.return_value = True
+        m.plugins = {'1': p1}
+        m.replicas = {'1': [p2]}
+
+        # Monitoring the plugins does not change which replica gets the next request.
+        assert list(m) == [p1]
+        assert any(p is p2 for p in m) is False
+        assert m.get('1') == p1
+        assert list(m) == [p2]
+        assert m.get('1') == p2
+
+    def test_select_all_round_robin(self):
+        m = plugin.PluginManager()
+        p1, p2, p3 = mock.Mock(), mock.Mock(), mock.Mock()
+        p1.is_available.return_value = True
+        p2.is_available.return_value = True
+        m.plugins = {'1': p1, '2': p3}
+        m.replicas = {'1': [p2]}
+
+        assert m.select_all() == [p1, p3]
+        assert m.select_all() == [p2, p3]
+        assert m.select_all() == [p1, p3]
+
+    def test_group_and_all(self):
+        m = plugin.PluginManager()
+        m.plugins = {'1': 'a', '2': 'c'}
+        m.replicas = {'1': ['b']}
+
+        assert m.group('1') == ['a', 'b']
+        assert m.group('2') == ['c']
+        assert m.group('3') == []
+        assert m.all() == ['a', 'b', 'c']
+
     def test_all_ready_true_no_plugins(self):
         m = plugin.PluginManager()
         assert m.all_ready() is True
@@ -151,37 +256,40 @@ class TestPluginManager:
 
         assert m.all_ready() is False
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.client.PluginClientV3.__init__', side_effect=ValueError)
-    def test_register_fail_client_create(self, mock_init):
+    async def test_register_fail_client_create(self, mock_init):
         m = plugin.PluginManager()
 
         with pytest.raises(synse_errors.ClientCreateError):
-            m.register('localhost:5432', 'tcp')
+            await m.register('localhost:5432', 'tcp')
 
         # Ensure nothing was added to the manager.
         assert len(m.plugins) == 0
 
         mock_init.assert_called_once()
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.client.PluginClientV3.metadata', side_effect=RpcError)
-    def test_register_fail_metadata_call(self, mock_metadata):
+    async def test_register_fail_metadata_call(self, mock_metadata):
         m = plugin.PluginManager()
 
         with pytest.raises(RpcError):
-            m.register('localhost:5432', 'tcp')
+            await m.register('localhost:5432', 'tcp')
 
         # Ensure nothing was added to the manager.
         assert len(m.plugins) == 0
 
         mock_metadata.assert_called_once()
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.client.PluginClientV3.metadata', return_value=V3Metadata())
     @mock.patch('synse_server.plugin.client.PluginClientV3.version', side_effect=RpcError)
-    def test_register_fail_version_call(self, mock_version, mock_metadata):
+    async def test_register_fail_version_call(self, mock_version, mock_metadata):
         m = plugin.PluginManager()
 
         with pytest.raises(RpcError):
-            m.register('localhost:5432', 'tcp')
+            await m.register('localhost:5432', 'tcp')
 
         # Ensure nothing was added to the manager.
         assert len(m.plugins) == 0
@@ -189,13 +297,14 @@ class TestPluginManager:
         mock_metadata.assert_called_once()
         mock_version.assert_called_once()
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.client.PluginClientV3.metadata', return_value=V3Metadata())
     @mock.patch('synse_server.plugin.client.PluginClientV3.version', return_value=V3Version())
-    def test_register_fail_plugin_init(self, mock_version, mock_metadata):
+    async def test_register_fail_plugin_init(self, mock_version, mock_metadata):
         m = plugin.PluginManager()
 
         with pytest.raises(ValueError):
-            m.register('localhost:5432', 'tcp')
+            await m.register('localhost:5432', 'tcp')
 
         # Ensure nothing was added to the manager.
         assert len(m.plugins) == 0
@@ -211,31 +320,68 @@ class TestPluginManager:
         'synse_server.plugin.client.PluginClientV3.version',
         return_value=V3Version(),
     )
-    def test_register_duplicate_plugin_id_both_active(self, mock_version, mock_metadata):
-        """Plugins with the same Plugin ID are registered. Both are considered active,
-        so Synse should keep the cached Plugin instance.
+    @pytest.mark.asyncio
+    async def test_register_duplicate_plugin_id_both_active(self, mock_version, mock_metadata):
+        """Plugins with the same Plugin ID and tag are registered at different addresses.
+        Both are considered active, so Synse should track the new plugin as a replica.
         """
 
         m = plugin.PluginManager()
         p = plugin.Plugin(
-            {'id': 'foo', 'tag': 'foo'},
+            {'id': '123', 'tag': 'foo'},
             {},
             client.PluginClientV3('foo', 'tcp'),
         )
         m.plugins = {'123': p}
 
-        plugin_id = m.register('localhost:5432', 'tcp')
+        plugin_id = await m.register('localhost:5432', 'tcp')
         assert plugin_id == '123'
-        # Ensure nothing new was added to the manager.
+        # Ensure nothing new was added to the manager's primary plugins.
         assert len(m.plugins) == 1
-        assert m.plugins[plugin_id].active is True
-        assert m.plugins[plugin_id].disabled is False
+        assert id(m.plugins[plugin_id]) == id(p)
+
+        # The new plugin should be registered as an active replica.
+        assert len(m.replicas[plugin_id]) == 1
+        replica = m.replicas[plugin_id][0]
+        assert replica.address == 'localhost:5432'
+        assert replica.active is True
+        assert m.group(plugin_id) == [p, replica]
 
-        # Since the plugins are both active, Synse keeps the existing one, so
-        # the object ID of the cached Plugin should not have changed from the
-        # seed value.
+        mock_metadata.assert_called_once()
+        mock_version.assert_called_once()
+
+    @mock.patch(
+        'synse_server.plugin.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    @mock.patch(
+        'synse_server.plugin.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @pytest.mark.asyncio
+    async def test_register_duplicate_plugin_id_same_address(self, mock_version, mock_metadata):
+        """A plugin which is already registered at the same address is re-registered.
+        Synse should keep the cached Plugin instance.
+        """
+
+        m = plugin.PluginManager()
+        p = plugin.Plugin(
+            {'id': '123', 'tag': 'foo'},
+            {},
+            client.PluginClientV3('localhost:5432', 'tcp'),
+        )
+        m.plugins = {'123': p}
+
+        with mock.patch.object(m, '_new_client') as mock_new_client:
+            plugin_id = await m.register('localhost:5432', 'tcp')
+        assert plugin_id == '123'
+        assert len(m.plugins) == 1
         assert id(m.plugins[plugin_id]) == id(p)
+        assert m.plugins[plugin_id].active is True
+        assert m.replicas.get(plugin_id) is None
 
+        # The plugin is probed with its existing client; no new client is created.
+        mock_new_client.assert_not_called()
         mock_metadata.assert_called_once()
         mock_version.assert_called_once()
 
@@ -247,7 +393,66 @@ class TestPluginManager:
         'synse_server.plugin.client.PluginClientV3.version',
         return_value=V3Version(),
     )
-    def test_register_duplicate_id_old_disabled_new_active(self, mock_version, mock_metadata):
+    @pytest.mark.asyncio
+    async def test_register_new_plugin_at_known_address(self, mock_version, mock_metadata):
+        """A different plugin now runs at the address of a registered plugin.
+        Synse should register it with a new client.
+        """
+
+        m = plugin.PluginManager()
+        p = plugin.Plugin(
+            {'id': '456', 'tag': 'bar'},
+            {},
+            client.PluginClientV3('localhost:5432', 'tcp'),
+        )
+        m.plugins = {'456': p}
+
+        plugin_id = await m.register('localhost:5432', 'tcp')
+        assert plugin_id == '123'
+        assert len(m.plugins) == 2
+        assert m.plugins['456'] is p
+        assert m.plugins['123'].client is not p.client
+        assert isinstance(m.plugins['123'].client, channels.PluginClient)
+
+    @mock.patch(
+        'synse_server.plugin.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='bar'),
+    )
+    @mock.patch(
+        'synse_server.plugin.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @pytest.mark.asyncio
+    async def test_register_duplicate_plugin_id_collision(self, mock_version, mock_metadata):
+        """Plugins with the same Plugin ID but different tags are registered. This is
+        a plugin ID collision, so Synse should keep the cached Plugin instance.
+        """
+
+        m = plugin.PluginManager()
+        p = plugin.Plugin(
+            {'id': '123', 'tag': 'foo'},
+            {},
+            client.PluginClientV3('foo', 'tcp'),
+        )
+        m.plugins = {'123': p}
+
+        plugin_id = await m.register('localhost:5432', 'tcp')
+        assert plugin_id == '123'
+        assert len(m.plugins) == 1
+        assert id(m.plugins[plugin_id]) == id(p)
+        assert m.plugins[plugin_id].active is True
+        assert m.replicas.get(plugin_id) is None
+
+    @mock.patch(
+        'synse_server.plugin.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    @mock.patch(
+        'synse_server.plugin.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @pytest.mark.asyncio
+    async def test_register_duplicate_id_old_disabled_new_active(self, mock_version, mock_metadata):
         """Plugins with the same Plugin ID are registered. The cached Plugin is disabled, while
         the new one is active. In this case Synse should replace the cached disabled instance with
         the new active one.
@@ -262,7 +467,7 @@ class TestPluginManager:
         p.disabled = True
         m.plugins = {'123': p}
 
-        plugin_id = m.register('localhost:5432', 'tcp')
+        plugin_id = await m.register('localhost:5432', 'tcp')
         assert plugin_id == '123'
         assert len(m.plugins) == 1
         assert m.plugins[plugin_id].active is True
@@ -284,7 +489,8 @@ class TestPluginManager:
         'synse_server.plugin.client.PluginClientV3.version',
         return_value=V3Version(),
     )
-    def test_register_duplicate_id_existing_disabled_new_address_changed(self, mock_version, mock_metadata):  # noqa
+    @pytest.mark.asyncio
+    async def test_register_duplicate_id_existing_disabled_new_address_changed(self, mock_version, mock_metadata):  # noqa
         """Plugins with the same Plugin ID are registered. The cached plugin is disabled and has
         a different address than the new plugin, which is active. Synse should replace the cached
         disabled instance with the new active one.
@@ -299,7 +505,7 @@ class TestPluginManager:
         p.disabled = True
         m.plugins = {'123': p}
 
-        plugin_id = m.register('localhost:5432', 'tcp')
+        plugin_id = await m.register('localhost:5432', 'tcp')
         assert plugin_id == '123'
         assert len(m.plugins) == 1
         assert m.plugins[plugin_id].active is True
@@ -321,10 +527,11 @@ class TestPluginManager:
         'synse_server.plugin.client.PluginClientV3.version',
         return_value=V3Version(),
     )
-    def test_register_success(self, mock_version, mock_metadata):
+    @pytest.mark.asyncio
+    async def test_register_success(self, mock_version, mock_metadata):
         m = plugin.PluginManager()
 
-        plugin_id = m.register('localhost:5432', 'tcp')
+        plugin_id = await m.register('localhost:5432', 'tcp')
         assert plugin_id == '123'
         assert len(m.plugins) == 1
         assert m.plugins[plugin_id].active is True
@@ -332,6 +539,151 @@ class TestPluginManager:
         mock_metadata.assert_called_once()
         mock_version.assert_called_once()
 
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @mock.patch.object(plugin.PluginManager, 'listeners', [])
+    @pytest.mark.asyncio
+    async def test_register_emits_events(self, mock_version, mock_metadata):
+        listener = mock.Mock()
+        m = plugin.PluginManager()
+        m.add_listener(listener)
+
+        plugin_id = await m.register('localhost:5432', 'tcp')
+        p = m.plugins[plugin_id]
+        listener.assert_has_calls([
+            mock.call('registered', p),
+            mock.call('activated', p),
+        ])
+
+        # Re-registering the same plugin emits nothing new.
+        listener.reset_mock()
+        await m.register('localhost:5432', 'tcp')
+        listener.assert_not_called()
+
+    @mock.patch.object(plugin.PluginManager, 'listeners', [])
+    def test_add_remove_listener(self):
+        listener = mock.Mock()
+        m = plugin.PluginManager()
+
+        m.add_listener(listener)
+        m.add_listener(listener)
+        assert m.listeners == [listener]
+
+        m.remove_listener(listener)
+        m.remove_listener(listener)
+        assert m.listeners == []
+
+    @mock.patch.object(plugin.PluginManager, 'listeners', [])
+    def test_emit_listener_error(self, simple_plugin):
+        failing = mock.Mock(side_effect=ValueError())
+        listener = mock.Mock()
+        m = plugin.PluginManager()
+        m.add_listener(failing)
+        m.add_listener(listener)
+
+        m.emit('activated', simple_plugin)
+
+        failing.assert_called_once_with('activated', simple_plugin)
+        listener.assert_called_once_with('activated', simple_plugin)
+
+    @mock.patch.object(plugin.PluginManager, 'listeners', [])
+    def test_disable_enable_emit_events(self, simple_plugin):
+        listener = mock.Mock()
+        plugin.PluginManager.add_listener(listener)
+
+        plugin.PluginManager._disable(simple_plugin)
+        plugin.PluginManager._enable(simple_plugin)
+
+        listener.assert_has_calls([
+            mock.call('disabled', simple_plugin),
+            mock.call('enabled', simple_plugin),
+        ])
+
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @pytest.mark.asyncio
+    async def test_register_channel_config(self, mock_version, mock_metadata, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'grpc': {'pool_size': 2, 'keepalive': {'time': 60}},
+        })
+        m = plugin.PluginManager()
+
+        plugin_id = await m.register('localhost:5432', 'tcp')
+        c = m.plugins[plugin_id].client
+        assert isinstance(c, channels.PluginClient)
+        assert c.pool_size == 2
+        assert ('grpc.keepalive_time_ms', 60000) in c.options
+
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @mock.patch('synse_server.tracing.enabled', True)
+    @pytest.mark.asyncio
+    async def test_register_tracing_enabled(self, mock_version, mock_metadata):
+        m = plugin.PluginManager()
+
+        plugin_id = await m.register('localhost:5432', 'tcp')
+        interceptors = m.plugins[plugin_id].client.interceptors
+        assert isinstance(interceptors[0], tracing.TracingInterceptor)
+        assert interceptors[0].plugin == '123'
+
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @pytest.mark.asyncio
+    async def test_register_adaptive_timeout_disabled_by_default(self, mock_version, mock_metadata):
+        m = plugin.PluginManager()
+
+        plugin_id = await m.register('localhost:5432', 'tcp')
+        interceptors = m.plugins[plugin_id].client.interceptors
+        assert not any(isinstance(i, AdaptiveTimeoutInterceptor) for i in interceptors)
+
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.metadata',
+        return_value=V3Metadata(id='123', tag='foo'),
+    )
+    @mock.patch(
+        'synse_grpc.client.PluginClientV3.version',
+        return_value=V3Version(),
+    )
+    @pytest.mark.asyncio
+    async def test_register_adaptive_timeout_capped(self, mock_version, mock_metadata, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'grpc': {'timeout': 3, 'adaptive_timeout': {'enabled': True, 'max': 30}},
+        })
+        m = plugin.PluginManager()
+
+        plugin_id = await m.register('localhost:5432', 'tcp')
+        interceptors = [
+            i for i in m.plugins[plugin_id].client.interceptors
+            if isinstance(i, AdaptiveTimeoutInterceptor)
+        ]
+        assert len(interceptors) == 1
+        # The adaptive timeout may not exceed the configured timeout.
+        assert interceptors[0]._tracker('Read').ceiling == 3
+
     @mock.patch.dict('synse_server.config.options._full_config', {'plugin': {}})
     def test_load_no_config(self):
         m = plugin.PluginManager()
@@ -490,52 +842,87 @@ class TestPluginManager:
         assert p1 in existing
         assert p2 in removed
 
-    def test_refresh_already_refreshing(self):
+    @pytest.mark.asyncio
+    async def test_refresh_already_refreshing(self):
         m = plugin.PluginManager()
         m.is_refreshing = True
 
         assert len(m.plugins) == 0
-        m.refresh()
+        await m.refresh()
         assert len(m.plugins) == 0
 
-    def test_refresh_no_addresses(self):
+    @pytest.mark.asyncio
+    @mock.patch('synse_server.plugin.PluginManager.load', return_value=[('localhost:5001', 'tcp')])
+    async def test_refresh_waits_for_refresh_in_progress(self, mock_load):
+        m = plugin.PluginManager()
+        registering = asyncio.Event()
+        release = asyncio.Event()
+
+        async def register(address, protocol):
+            registering.set()
+            await release.wait()
+
+        with mock.patch.object(m, 'register', side_effect=register) as register_mock:
+            first = asyncio.ensure_future(m.refresh())
+            await registering.wait()
+
+            # A refresh started while another is registering plugins waits for
+            # it, rather than returning before any plugins are registered.
+            second = asyncio.ensure_future(m.refresh())
+            await asyncio.sleep(0.01)
+            assert not second.done()
+
+            release.set()
+            await asyncio.wait_for(asyncio.gather(first, second), 1)
+
+        register_mock.assert_called_once()
+        assert m.is_refreshing is False
+
+    @pytest.mark.asyncio
+    async def test_refresh_no_addresses(self):
         m = plugin.PluginManager()
+        assert m.expected is None
 
         assert len(m.plugins) == 0
-        m.refresh()
+        await m.refresh()
         assert len(m.plugins) == 0
+        assert m.expected == 0
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.load', return_value=[('localhost:5001', 'tcp')])
     @mock.patch('synse_server.plugin.PluginManager.register', side_effect=synse_errors.ClientCreateError)  # noqa
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_client_create_error(self, mock_refresh, mock_register, mock_load):
+    async def test_refresh_client_create_error(self, mock_refresh, mock_register, mock_load):
         m = plugin.PluginManager()
 
         with pytest.raises(synse_errors.ClientCreateError):
-            m.refresh()
+            await m.refresh()
 
         mock_load.assert_called_once()
         mock_register.assert_called_once_with(address='localhost:5001', protocol='tcp')
         mock_refresh.assert_not_called()
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.load', return_value=[('localhost:5001', 'tcp')])
     @mock.patch('synse_server.plugin.PluginManager.register')
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_loaded_ok(self, mock_refresh, mock_register, mock_load):
+    async def test_refresh_loaded_ok(self, mock_refresh, mock_register, mock_load):
         m = plugin.PluginManager()
-        m.refresh()
+        await m.refresh()
+        assert m.expected == 1
 
         mock_load.assert_called_once()
         mock_register.assert_called_once_with(address='localhost:5001', protocol='tcp')
         # empty because register is mocked, so nothing gets added to manager
         mock_refresh.assert_has_calls([])
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.load', return_value=[('localhost:5001', 'tcp')])
     @mock.patch('synse_server.plugin.PluginManager.register', side_effect=ValueError)
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_loaded_fail(self, mock_refresh, mock_register, mock_load):
+    async def test_refresh_loaded_fail(self, mock_refresh, mock_register, mock_load):
         m = plugin.PluginManager()
-        m.refresh()
+        await m.refresh()
 
         mock_load.assert_called_once()
         mock_register.assert_called_once_with(address='localhost:5001', protocol='tcp')
@@ -545,11 +932,12 @@ class TestPluginManager:
         'synse_server.plugin.PluginManager.discover',
         return_value=[('localhost:5001', 'tcp')],
     )
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.register')
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_discover_ok(self, mock_refresh, mock_register, mock_discover):
+    async def test_refresh_discover_ok(self, mock_refresh, mock_register, mock_discover):
         m = plugin.PluginManager()
-        m.refresh()
+        await m.refresh()
 
         mock_discover.assert_called_once()
         mock_register.assert_called_once_with(address='localhost:5001', protocol='tcp')
@@ -560,56 +948,150 @@ class TestPluginManager:
         'synse_server.plugin.PluginManager.discover',
         return_value=[('localhost:5001', 'tcp')],
     )
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.register', side_effect=ValueError)
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_discover_fail(self, mock_refresh, mock_register, mock_discover):
+    async def test_refresh_discover_fail(self, mock_refresh, mock_register, mock_discover):
         m = plugin.PluginManager()
-        m.refresh()
+        await m.refresh()
 
         mock_discover.assert_called_once()
         mock_register.assert_called_once_with(address='localhost:5001', protocol='tcp')
         mock_refresh.assert_has_calls([])
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.load', return_value=[('localhost:5001', 'tcp')])
     @mock.patch('synse_server.plugin.PluginManager.register')
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_new_plugin(self, mock_refresh, register_mock, load_mock):
+    async def test_refresh_new_plugin(self, mock_refresh, register_mock, load_mock):
         m = plugin.PluginManager()
-        m.refresh()
+        await m.refresh()
 
         load_mock.assert_called_once()
         register_mock.assert_called_once_with(address='localhost:5001', protocol='tcp')
         # empty because register is mocked, so nothing gets added to manager
         mock_refresh.assert_has_calls([])
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.load', return_value=[])
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_removed_plugin(self, mock_refresh, load_mock, simple_plugin):
+    async def test_refresh_removed_plugin(self, mock_refresh, load_mock, simple_plugin):
         m = plugin.PluginManager()
         m.plugins[simple_plugin.id] = simple_plugin
         simple_plugin.cancel_tasks = mock.MagicMock()
         assert simple_plugin.disabled is False
 
-        m.refresh()
+        await m.refresh()
 
         assert simple_plugin.disabled is True
         load_mock.assert_called_once()
         simple_plugin.cancel_tasks.assert_called_once()
         mock_refresh.assert_has_calls([])
 
+    @pytest.mark.asyncio
     @mock.patch('synse_server.plugin.PluginManager.load', return_value=[('localhost:5432', 'tcp')])
     @mock.patch('synse_server.plugin.Plugin.refresh_state')
-    def test_refresh_existing_plugin(self, mock_refresh, load_mock, simple_plugin):
+    async def test_refresh_existing_plugin(self, mock_refresh, load_mock, simple_plugin):
         m = plugin.PluginManager()
         m.plugins[simple_plugin.id] = simple_plugin
         simple_plugin.disabled = True
 
-        m.refresh()
+        await m.refresh()
 
         assert simple_plugin.disabled is False
         load_mock.assert_called_once()
         mock_refresh.assert_has_calls([])
 
+    @pytest.mark.asyncio
+    @mock.patch(
+        'synse_server.plugin.PluginManager.load',
+        return_value=[('localhost:5001', 'tcp'), ('localhost:5002', 'tcp')],
+    )
+    async def test_refresh_registers_concurrently(self, load_mock):
+        m = plugin.PluginManager()
+        in_flight = []
+        max_in_flight = []
+
+        async def register(address, protocol):
+            in_flight.append(address)
+            max_in_flight.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(address)
+
+        with mock.patch.object(m, 'register', side_effect=register) as register_mock:
+            await m.refresh()
+
+        assert register_mock.call_count == 2
+        assert max(max_in_flight) == 2
+
+    @pytest.mark.asyncio
+    @mock.patch(
+        'synse_server.plugin.PluginManager.load',
+        return_value=[('localhost:5001', 'tcp'), ('localhost:5002', 'tcp')],
+    )
+    async def test_refresh_register_timeout(self, load_mock, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'cache': {'plugin': {'refresh_timeout': 0.05}},
+        })
+        m = plugin.PluginManager()
+
+        async def register(address, protocol):
+            if address == 'localhost:5001':
+                await asyncio.sleep(1)
+
+        with mock.patch.object(m, 'register', side_effect=register) as register_mock:
+            await m.refresh()
+
+        assert register_mock.call_count == 2
+        assert m.is_refreshing is False
+
+    @pytest.mark.asyncio
+    @mock.patch('synse_server.plugin.PluginManager.load', return_value=[])
+    @mock.patch('synse_server.plugin.Plugin.refresh_state')
+    async def test_refresh_discover_timeout(self, mock_refresh, load_mock, simple_plugin, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'cache': {'plugin': {'refresh_timeout': 0.05}},
+        })
+        m = plugin.PluginManager()
+        m.plugins[simple_plugin.id] = simple_plugin
+
+        def discover():
+            time.sleep(0.2)
+            return []
+
+        with mock.patch.object(m, 'discover', side_effect=discover):
+            await m.refresh()
+
+        # Discovery did not complete, so the plugin should not be disabled.
+        assert simple_plugin.disabled is False
+        mock_refresh.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_update_discovered(self, mocker):
+        m = plugin.PluginManager()
+        p1 = plugin.Plugin(
+            client=client.PluginClientV3('10.0.0.1:5001', 'tcp'),
+            info={'tag': 'test/foo', 'id': '123'},
+            version={},
+        )
+        p2 = plugin.Plugin(
+            client=client.PluginClientV3('10.0.0.2:5001', 'tcp'),
+            info={'tag': 'test/bar', 'id': '456'},
+            version={},
+        )
+        p2.disabled = True
+        m.plugins = {'123': p1, '456': p2}
+        register_mock = mocker.patch.object(m, 'register')
+
+        await m.update_discovered(
+            added=[('10.0.0.2:5001', 'tcp'), ('10.0.0.3:5001', 'tcp')],
+            removed=[('10.0.0.1:5001', 'tcp')],
+        )
+
+        register_mock.assert_called_once_with(address='10.0.0.3:5001', protocol='tcp')
+        assert p1.disabled is True
+        assert p2.disabled is False
+
 
 class TestPlugin:
     """Test cases for the ``synse_server.plugin.Plugin`` class."""
@@ -676,6 +1158,17 @@ class TestPlugin:
                 raise ValueError('test error')
 
         assert simple_plugin.active is False
+        assert simple_plugin._reconnect_task is not None
+        simple_plugin._reconnect_task.cancel()
+
+    @mock.patch.object(plugin.Plugin, 'reconnect_on_error', False)
+    def test_context_unexpected_error_no_reconnect(self, simple_plugin):
+        with pytest.raises(ValueError):
+            with simple_plugin:
+                raise ValueError('test error')
+
+        assert simple_plugin.active is False
+        assert simple_plugin._reconnect_task is None
 
     def test_context_plugin_error(self, simple_plugin):
         simple_plugin.active = False
@@ -687,6 +1180,95 @@ class TestPlugin:
 
         assert simple_plugin.active is True
 
+    def test_context_breaker_open(self, simple_plugin):
+        simple_plugin.breaker.min_calls = 1
+        simple_plugin.breaker.record(success=False)
+        assert simple_plugin.circuit_state() == 'open'
+
+        with pytest.raises(synse_errors.PluginUnavailable):
+            with simple_plugin:
+                pass
+
+    def test_context_breaker_records_success(self, simple_plugin):
+        with simple_plugin:
+            pass
+
+        assert list(simple_plugin.breaker._calls) == [(False, False)]
+
+    @mock.patch.object(plugin.Plugin, 'reconnect_on_error', False)
+    def test_context_breaker_records_failure(self, simple_plugin):
+        with pytest.raises(ValueError):
+            with simple_plugin:
+                raise ValueError('test error')
+
+        assert list(simple_plugin.breaker._calls) == [(True, False)]
+
+    def test_context_breaker_ignores_cancelled(self, simple_plugin):
+        with pytest.raises(asyncio.CancelledError):
+            with simple_plugin:
+                raise asyncio.CancelledError()
+
+        assert list(simple_plugin.breaker._calls) == []
+
+    def test_stream_not_recorded(self, simple_plugin):
+        simple_plugin.active = False
+        with simple_plugin.stream() as c:
+            assert c == simple_plugin.client
+
+        assert list(simple_plugin.breaker._calls) == []
+        assert simple_plugin.active is True
+
+    @mock.patch.object(plugin.Plugin, 'reconnect_on_error', False)
+    def test_stream_failure_not_recorded(self, simple_plugin):
+        with pytest.raises(ValueError):
+            with simple_plugin.stream():
+                raise ValueError('test error')
+
+        assert list(simple_plugin.breaker._calls) == []
+        assert simple_plugin.active is False
+
+    def test_stream_breaker_not_closed(self, simple_plugin):
+        simple_plugin.breaker.min_calls = 1
+        simple_plugin.breaker.reset_timeout = 0
+        simple_plugin.breaker.record(success=False)
+        assert simple_plugin.circuit_state() == 'half-open'
+
+        with pytest.raises(synse_errors.PluginUnavailable):
+            with simple_plugin.stream():
+                pass
+
+        # The stream did not take the half-open trial.
+        assert simple_plugin.breaker.allow() is True
+
+    def test_timeout_static(self, simple_plugin):
+        simple_plugin.client.timeout = 3
+        assert simple_plugin.timeout('Read') == 3
+
+    def test_timeout_adaptive(self, simple_plugin):
+        interceptor = AdaptiveTimeoutInterceptor(min_samples=1, floor=1)
+        interceptor.trackers['Read'] = LatencyTracker(min_samples=1, floor=1)
+        interceptor.trackers['Read'].record(0.01)
+        simple_plugin.client.timeout = 3
+        simple_plugin.client.interceptors = [interceptor]
+
+        assert simple_plugin.timeout('Read') == 1
+        assert simple_plugin.timeout('Devices') == 3
+
+    def test_is_available(self, simple_plugin):
+        assert simple_plugin.is_available() is True
+
+        simple_plugin.breaker.min_calls = 1
+        simple_plugin.breaker.record(success=False)
+        assert simple_plugin.is_available() is False
+
+    def test_is_available_not_ready(self, simple_plugin):
+        simple_plugin.active = False
+        assert simple_plugin.is_available() is False
+
+    def test_circuit_state_disabled(self, simple_plugin):
+        simple_plugin.breaker = None
+        assert simple_plugin.circuit_state() == 'disabled'
+
     def test_mark_active_from_active(self, simple_plugin):
         simple_plugin.active = True
         simple_plugin.mark_active()
@@ -707,6 +1289,43 @@ class TestPlugin:
         simple_plugin.mark_inactive()
         assert simple_plugin.active is False
 
+    def test_mark_active_inactive_metric_replicas(self, mocker, simple_plugin):
+        replica = plugin.Plugin(
+            client=client.PluginClientV3('localhost:5433', 'tcp'),
+            info={'tag': 'test/foo', 'id': '123'},
+            version={},
+        )
+        replica.active = False
+        mocker.patch.dict(plugin.PluginManager.plugins, {'123': simple_plugin})
+        mocker.patch.dict(plugin.PluginManager.replicas, {'123': [replica]})
+        gauge = Monitor.plugin_active.labels('123')
+
+        # The plugin is counted as active once, however many replicas are active.
+        replica.mark_active()
+        assert gauge._value.get() == 1
+
+        simple_plugin.mark_inactive()
+        assert gauge._value.get() == 1
+
+        replica.mark_inactive()
+        assert gauge._value.get() == 0
+
+    @mock.patch.object(plugin.PluginManager, 'listeners', [])
+    def test_mark_active_inactive_emit_events(self, simple_plugin):
+        listener = mock.Mock()
+        plugin.PluginManager.add_listener(listener)
+        simple_plugin.active = False
+
+        simple_plugin.mark_active()
+        simple_plugin.mark_active()
+        simple_plugin.mark_inactive()
+        simple_plugin.mark_inactive()
+
+        assert listener.call_args_list == [
+            mock.call('activated', simple_plugin),
+            mock.call('deactivated', simple_plugin),
+        ]
+
     def test_is_ready_false_inactive(self, simple_plugin):
         simple_plugin.active = False
         simple_plugin.disabled = False
@@ -807,8 +1426,9 @@ class TestPlugin:
             mock.call(), mock.call(), mock.call(),
         ])
 
+    @pytest.mark.asyncio
     @mock.patch('synse_grpc.client.PluginClientV3.test')
-    def test_refresh_state(self, test_mock):
+    async def test_refresh_state(self, test_mock):
         p = plugin.Plugin(
             client=client.PluginClientV3('localhost:5001', 'tcp'),
             info={'tag': 'test/foo', 'id': '123'},
@@ -818,14 +1438,15 @@ class TestPlugin:
         p.disabled = False
         p.active = False
 
-        p.refresh_state()
+        await p.refresh_state()
 
         assert p.disabled is False
         assert p.active is True
         test_mock.assert_called_once()
 
+    @pytest.mark.asyncio
     @mock.patch('synse_grpc.client.PluginClientV3.test')
-    def test_refresh_state_plugin_disabled(self, test_mock):
+    async def test_refresh_state_plugin_disabled(self, test_mock):
         p = plugin.Plugin(
             client=client.PluginClientV3('localhost:5001', 'tcp'),
             info={'tag': 'test/foo', 'id': '123'},
@@ -835,14 +1456,29 @@ class TestPlugin:
         p.disabled = True
         p.active = False
 
-        p.refresh_state()
+        await p.refresh_state()
 
         assert p.disabled is True
         assert p.active is False
         test_mock.assert_not_called()
 
+    @pytest.mark.asyncio
+    async def test_refresh_state_timeout(self):
+        p = plugin.Plugin(
+            client=client.PluginClientV3('localhost:5001', 'tcp'),
+            info={'tag': 'test/foo', 'id': '123'},
+            version={},
+        )
+        p.active = True
+
+        with mock.patch.object(p.client, 'test', side_effect=lambda: time.sleep(0.2)):
+            await p.refresh_state(timeout=0.05)
+
+        assert p.active is False
+
+    @pytest.mark.asyncio
     @mock.patch('synse_grpc.client.PluginClientV3.test', side_effect=ValueError())
-    def test_refresh_state_fails_refresh(self, test_mock):
+    async def test_refresh_state_fails_refresh(self, test_mock):
         p = plugin.Plugin(
             client=client.PluginClientV3('localhost:5001', 'tcp'),
             info={'tag': 'test/foo', 'id': '123'},
@@ -852,7 +1488,7 @@ class TestPlugin:
         p.disabled = False
         p.active = True
 
-        p.refresh_state()
+        await p.refresh_state()
 
         assert p.disabled is False
         assert p.active is False
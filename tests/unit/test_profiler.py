@@ -0,0 +1,75 @@
+"""Unit tests for the ``synse_server.profiler`` module."""
+
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from synse_server import profiler
+
+
+def busy_worker(stop):
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+@pytest.fixture()
+def worker():
+    stop = threading.Event()
+    t = threading.Thread(target=busy_worker, args=(stop,), name='test-worker')
+    t.start()
+    yield t
+    stop.set()
+    t.join()
+
+
+def test_sample(worker):
+    result = profiler.sample(duration=0.05, interval=0.005)
+
+    assert result['samples'] > 0
+    worker_stacks = [s for s in result['stacks'] if s.startswith('test-worker;')]
+    assert worker_stacks
+    assert all('busy_worker' in s for s in worker_stacks)
+
+    # The sampling thread itself is not sampled.
+    assert not any(s.split(';')[-1].startswith('sample ') for s in result['stacks'])
+
+
+def test_profile(worker):
+    result = profiler.profile(duration=0.05, interval=0.005)
+
+    assert result['samples'] > 0
+    assert result['interval'] == 0.005
+    assert result['duration'] >= 0.05
+    assert result['memory'] is None
+    assert result['stacks']
+
+
+def test_profile_memory():
+    assert not tracemalloc.is_tracing()
+
+    result = profiler.profile(duration=0.01, interval=0.005, memory=True, top=5)
+
+    assert isinstance(result['memory'], list)
+    assert len(result['memory']) <= 5
+    for item in result['memory']:
+        assert set(item) == {'location', 'size', 'count'}
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_busy():
+    assert profiler._lock.acquire(blocking=False)
+    try:
+        with pytest.raises(profiler.ProfilerBusy):
+            profiler.profile(duration=0.01, interval=0.005)
+    finally:
+        profiler._lock.release()
+
+
+def test_collapsed():
+    assert profiler.collapsed({'a;b': 1, 'a;c': 3}) == 'a;c 3\na;b 1\n'
+
+
+def test_collapsed_empty():
+    assert profiler.collapsed({}) == ''
@@ -0,0 +1,153 @@
+"""Unit tests for the ``synse_server.snapshot`` module."""
+
+import pytest
+from synse_grpc import api
+
+from synse_server import cache, snapshot
+
+
+@pytest.fixture()
+def devices():
+    dev1 = api.V3Device(
+        id='1', plugin='123', alias='one',
+        tags=[
+            api.V3Tag(namespace='system', annotation='id', label='1'),
+            api.V3Tag(label='foo'),
+        ],
+    )
+    dev2 = api.V3Device(
+        id='2', plugin='456',
+        tags=[
+            api.V3Tag(namespace='system', annotation='id', label='2'),
+            api.V3Tag(label='foo'),
+        ],
+    )
+    return dev1, dev2
+
+
+def test_encode_decode(devices):
+    dev1, dev2 = devices
+    tags = {
+        'system/id:1': [dev1],
+        'system/id:2': [dev2],
+        'foo': [dev1, dev2],
+    }
+    aliases = {'one': dev1}
+
+    data = snapshot.encode(tags, aliases)
+    assert data.startswith(snapshot.MAGIC)
+
+    decoded_tags, decoded_aliases = snapshot.decode(data)
+    assert decoded_tags == tags
+    assert decoded_aliases == aliases
+
+    # Each device is only stored once, regardless of how many tags it has.
+    assert decoded_tags['foo'][0] is decoded_tags['system/id:1'][0]
+
+
+def test_encode_decode_empty():
+    assert snapshot.decode(snapshot.encode({}, {})) == ({}, {})
+
+
+@pytest.mark.parametrize(
+    'data', [
+        b'',
+        b'not a snapshot',
+        snapshot.MAGIC + b'\x09',
+    ]
+)
+def test_decode_invalid(data):
+    with pytest.raises(ValueError):
+        snapshot.decode(data)
+
+
+def test_decode_truncated(devices):
+    data = snapshot.encode({'foo': list(devices)}, {})
+
+    with pytest.raises(ValueError):
+        snapshot.decode(data[:-3])
+
+
+@pytest.mark.asyncio
+async def test_save_load(mocker, tmpdir, devices):
+    dev1, dev2 = devices
+    path = str(tmpdir.join('devices.snapshot'))
+
+    # Mock test data
+    mocker.patch('synse_server.cache.stale', False)
+    cached = mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+        f'{cache.NS_DEVICE}system/id:1': [dev1],
+        f'{cache.NS_DEVICE}foo': [dev1, dev2],
+        f'{cache.NS_ALIAS}one': dev1,
+    })
+
+    # --- Test case -----------------------------
+    await snapshot.save(path)
+
+    cached.clear()
+    assert await snapshot.load(path) is True
+
+    assert await cache.device_cache.get('system/id:1') == [dev1]
+    assert await cache.device_cache.get('foo') == [dev1, dev2]
+    assert await cache.get_alias('one') == dev1
+    assert cache.stale is True
+
+
+@pytest.mark.asyncio
+async def test_save_writes_without_locks(mocker, tmpdir, devices):
+    dev1, _ = devices
+    path = str(tmpdir.join('devices.snapshot'))
+
+    def write(p, data):
+        # The file is written off the loop, once the cache locks are released.
+        assert not cache.device_cache_lock.locked()
+        assert not cache.alias_cache_lock.locked()
+        with open(p, 'wb') as f:
+            f.write(data)
+
+    # Mock test data
+    mock_write = mocker.patch('synse_server.snapshot._write_file', side_effect=write)
+    mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+        f'{cache.NS_DEVICE}system/id:1': [dev1],
+    })
+
+    # --- Test case -----------------------------
+    await snapshot.save(path)
+
+    mock_write.assert_called_once()
+    with open(path, 'rb') as f:
+        assert snapshot.decode(f.read()) == ({'system/id:1': [dev1]}, {})
+
+
+@pytest.mark.asyncio
+async def test_load_no_file(tmpdir):
+    assert await snapshot.load(str(tmpdir.join('missing'))) is False
+
+
+@pytest.mark.asyncio
+async def test_load_invalid_file(mocker, tmpdir):
+    path = tmpdir.join('devices.snapshot')
+    path.write_binary(b'not a snapshot')
+    mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {})
+
+    assert await snapshot.load(str(path)) is False
+    assert cache.get_cached_device_tags() == []
+
+
+@pytest.mark.asyncio
+async def test_load_cache_populated(mocker, tmpdir, devices):
+    dev1, dev2 = devices
+    path = str(tmpdir.join('devices.snapshot'))
+    with open(path, 'wb') as f:
+        f.write(snapshot.encode({'system/id:1': [dev1]}, {}))
+
+    # Mock test data
+    mocker.patch('synse_server.cache.stale', False)
+    mocker.patch.dict('aiocache.SimpleMemoryCache._cache', {
+        f'{cache.NS_DEVICE}system/id:2': [dev2],
+    })
+
+    # --- Test case -----------------------------
+    assert await snapshot.load(path) is False
+    assert await cache.device_cache.get('system/id:1') is None
+    assert cache.stale is False
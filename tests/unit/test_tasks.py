@@ -2,9 +2,10 @@
 
 from unittest import mock
 
+import bison
 from sanic import Sanic
 
-from synse_server import tasks
+from synse_server import config, tasks
 
 
 def test_register_with_app():
@@ -15,4 +16,97 @@ def test_register_with_app():
     app.add_task.assert_has_calls([
         mock.call(tasks._rebuild_device_cache),
         mock.call(tasks._refresh_plugins),
+        mock.call(tasks._monitor_plugin_health),
+        mock.call(tasks._monitor_event_loop),
     ])
+
+
+def test_register_with_app_loop_monitor_disabled(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'loop_monitor': {'enabled': False},
+    })
+    app = Sanic('test-app-no-loop-monitor')
+    app.add_task = mock.MagicMock()
+
+    tasks.register_with_app(app)
+    assert mock.call(tasks._monitor_event_loop) not in app.add_task.call_args_list
+
+
+def test_register_with_app_health_check_disabled(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'health_check': {'enabled': False}},
+    })
+    app = Sanic('test-app-no-health')
+    app.add_task = mock.MagicMock()
+
+    tasks.register_with_app(app)
+    app.add_task.assert_has_calls([
+        mock.call(tasks._rebuild_device_cache),
+        mock.call(tasks._refresh_plugins),
+    ])
+    assert mock.call(tasks._monitor_plugin_health) not in app.add_task.call_args_list
+
+
+def test_register_with_app_kubernetes_watch(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'discover': {'kubernetes': {'watch': True}}},
+    })
+    app = Sanic('test-app-watch')
+    app.add_task = mock.MagicMock()
+
+    tasks.register_with_app(app)
+    app.add_task.assert_has_calls([
+        mock.call(tasks._rebuild_device_cache),
+        mock.call(tasks._refresh_plugins),
+        mock.call(tasks._monitor_plugin_health),
+        mock.call(tasks._watch_kubernetes_endpoints),
+    ])
+
+
+def test_register_with_app_file_watch(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'plugin': {'discover': {'file': {'path': '/etc/synse/plugins.yaml'}}},
+    })
+    app = Sanic('test-app-file-watch')
+    app.add_task = mock.MagicMock()
+
+    tasks.register_with_app(app)
+    app.add_task.assert_has_calls([
+        mock.call(tasks._rebuild_device_cache),
+        mock.call(tasks._refresh_plugins),
+        mock.call(tasks._monitor_plugin_health),
+        mock.call(tasks._watch_plugins_file),
+    ])
+
+
+def test_register_with_app_snapshot(mocker):
+    mocker.patch.dict('synse_server.config.options._full_config', {
+        'cache': {'device': {'snapshot': {'path': '/tmp/synse/devices.snapshot'}}},
+    })
+    app = Sanic('test-app-snapshot')
+    app.add_task = mock.MagicMock()
+
+    tasks.register_with_app(app)
+    app.add_task.assert_has_calls([
+        mock.call(tasks._rebuild_device_cache),
+        mock.call(tasks._refresh_plugins),
+        mock.call(tasks._monitor_plugin_health),
+        mock.call(tasks._snapshot_device_cache),
+    ])
+
+
+def test_register_with_app_snapshot_not_configured(mocker):
+    # Load the configuration through the scheme with no config file, as the
+    # server does when none is given. The snapshot path is optional, so the
+    # defaults validate and the snapshot task is not added.
+    options = bison.Bison(config.scheme)
+    options.parse(requires_cfg=False)
+    options.validate()
+    assert options.get('cache.device.snapshot.path') is None
+    mocker.patch('synse_server.config.options', options)
+
+    app = Sanic('test-app-no-snapshot')
+    app.add_task = mock.MagicMock()
+
+    tasks.register_with_app(app)
+    assert mock.call(tasks._snapshot_device_cache) not in app.add_task.call_args_list
@@ -0,0 +1,215 @@
+"""Unit tests for the ``synse_server.timeouts`` module."""
+
+from unittest import mock
+
+import grpc
+import pytest
+
+from synse_server import timeouts
+
+
+def make_details(method='/synse.V3Plugin/Read', timeout=3):
+    return timeouts.CallDetails(method, timeout, None, None, None, None)
+
+
+class DeadlineError(grpc.RpcError, grpc.Call):
+    """A stand-in for a gRPC error raised for an exceeded deadline."""
+
+    def code(self):
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+
+    def details(self):
+        return 'deadline exceeded'
+
+    def initial_metadata(self):
+        return None
+
+    def trailing_metadata(self):
+        return None
+
+    def is_active(self):
+        return False
+
+    def time_remaining(self):
+        return None
+
+    def cancel(self):
+        return False
+
+    def add_callback(self, callback):
+        return False
+
+
+class TestLatencyTracker:
+    """Test cases for the ``synse_server.timeouts.LatencyTracker`` class."""
+
+    def test_no_deadline_below_min_samples(self):
+        t = timeouts.LatencyTracker(min_samples=3)
+        t.record(0.1)
+        t.record(0.1)
+
+        assert t.deadline is None
+
+    def test_deadline_from_percentile(self):
+        t = timeouts.LatencyTracker(min_samples=1, percentile=0.9, factor=2, floor=0)
+        for i in range(1, 11):
+            t.record(i / 10)
+
+        # The 90th percentile of 0.1..1.0 is 0.9
+        assert t.deadline == pytest.approx(1.8)
+
+    def test_deadline_clamped_to_floor(self):
+        t = timeouts.LatencyTracker(min_samples=1, floor=0.5)
+        t.record(0.001)
+
+        assert t.deadline == 0.5
+
+    def test_deadline_clamped_to_ceiling(self):
+        t = timeouts.LatencyTracker(min_samples=1, ceiling=10)
+        t.record(20)
+
+        assert t.deadline == 10
+
+    def test_deadline_uses_window(self):
+        t = timeouts.LatencyTracker(window=2, min_samples=1, factor=1, floor=0)
+        t.record(5)
+        t.record(0.1)
+        t.record(0.2)
+
+        assert t.deadline == pytest.approx(0.2)
+
+
+class TestAdaptiveTimeoutInterceptor:
+    """Test cases for the ``synse_server.timeouts.AdaptiveTimeoutInterceptor`` class."""
+
+    def test_deadline_unknown_method(self):
+        i = timeouts.AdaptiveTimeoutInterceptor()
+        assert i.deadline('Read') is None
+
+    def test_unary_no_samples_uses_static_timeout(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=2)
+        resp = mock.Mock(**{'exception.return_value': None})
+        continuation = mock.Mock(return_value=resp)
+        details = make_details('/synse.V3Plugin/Metadata')
+
+        assert i.intercept_unary_unary(continuation, details, 'req') == resp
+        continuation.assert_called_once_with(details, 'req')
+        assert i.deadline('Metadata') is None
+        assert len(i.trackers['Metadata']._samples) == 1
+
+    def test_unary_adaptive_timeout(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1, floor=1)
+        resp = mock.Mock(**{'exception.return_value': None})
+        continuation = mock.Mock(return_value=resp)
+
+        i.intercept_unary_unary(continuation, make_details('/synse.V3Plugin/Metadata'), 'req')
+        assert i.deadline('Metadata') == 1
+
+        i.intercept_unary_unary(continuation, make_details('/synse.V3Plugin/Metadata'), 'req')
+        assert continuation.call_args[0][0].timeout == 1
+        assert continuation.call_args[0][0].method == '/synse.V3Plugin/Metadata'
+
+    def test_unary_error_not_recorded(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1)
+        resp = mock.Mock(**{'exception.return_value': ValueError()})
+        continuation = mock.Mock(return_value=resp)
+
+        i.intercept_unary_unary(continuation, make_details('/synse.V3Plugin/Test'), 'req')
+        assert len(i.trackers) == 0
+
+    def test_unary_deadline_exceeded_recorded_at_deadline(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1)
+        resp = mock.Mock(**{'exception.return_value': DeadlineError()})
+        continuation = mock.Mock(return_value=resp)
+
+        with mock.patch('synse_server.timeouts.time.monotonic', side_effect=[0, 10]):
+            i.intercept_unary_unary(continuation, make_details('/synse.V3Plugin/Test'), 'req')
+        assert list(i.trackers['Test']._samples) == [3]
+
+    def test_unary_hung_plugin_deadline_capped(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1, floor=1, ceiling=3)
+        ok = mock.Mock(**{'exception.return_value': None})
+        i.intercept_unary_unary(mock.Mock(return_value=ok), make_details(), 'req')
+        assert i.deadline('Read') == 1
+
+        # Calls timing out back the deadline off, but never past the ceiling.
+        timed_out = mock.Mock(**{'exception.return_value': DeadlineError()})
+        for _ in range(50):
+            i.intercept_unary_unary(mock.Mock(return_value=timed_out), make_details(), 'req')
+        assert i.deadline('Read') == 3
+
+    def test_unary_deadline_recovers_from_slow_plugin(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(
+            window=10, min_samples=1, percentile=0.9, factor=2, floor=0.1, ceiling=30,
+        )
+        ok = mock.Mock(**{'exception.return_value': None})
+        timed_out = mock.Mock(**{'exception.return_value': DeadlineError()})
+
+        # The plugin answers in 0.1s, so the deadline tightens to 0.2s.
+        with mock.patch('synse_server.timeouts.time.monotonic', side_effect=[0, 0.1] * 10):
+            for _ in range(10):
+                i.intercept_unary_unary(mock.Mock(return_value=ok), make_details(), 'req')
+        assert i.deadline('Read') == pytest.approx(0.2)
+
+        # The plugin slows to 1s, so calls time out until the deadline has
+        # backed off past its new latency.
+        calls = 0
+        while i.deadline('Read') <= 1:
+            calls += 1
+            assert calls < 10
+            i.intercept_unary_unary(mock.Mock(return_value=timed_out), make_details(), 'req')
+
+        # Calls succeed again, and the deadline follows the new latency.
+        with mock.patch('synse_server.timeouts.time.monotonic', side_effect=[0, 1] * 10):
+            for _ in range(10):
+                continuation = mock.Mock(return_value=ok)
+                i.intercept_unary_unary(continuation, make_details(), 'req')
+                assert continuation.call_args[0][0].timeout > 1
+        assert i.deadline('Read') == pytest.approx(2)
+
+    def test_stream_recorded_on_completion(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1)
+        continuation = mock.Mock(return_value=iter([1, 2, 3]))
+
+        resp = i.intercept_unary_stream(continuation, make_details(), 'req')
+        assert 'Read' not in i.trackers
+
+        assert list(resp) == [1, 2, 3]
+        assert i.deadline('Read') is not None
+
+    def test_stream_deadline_exceeded_recorded_at_deadline(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1)
+
+        def stream():
+            yield 1
+            raise DeadlineError()
+
+        continuation = mock.Mock(return_value=stream())
+        resp = i.intercept_unary_stream(continuation, make_details(), 'req')
+
+        with pytest.raises(DeadlineError):
+            list(resp)
+        assert list(i.trackers['Read']._samples) == [3]
+
+    def test_stream_error_not_recorded(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1)
+
+        def stream():
+            yield 1
+            raise ValueError()
+
+        continuation = mock.Mock(return_value=stream())
+        resp = i.intercept_unary_stream(continuation, make_details(), 'req')
+
+        with pytest.raises(ValueError):
+            list(resp)
+        assert 'Read' not in i.trackers
+
+    def test_stream_no_timeout_untouched(self):
+        i = timeouts.AdaptiveTimeoutInterceptor(min_samples=1)
+        stream = iter([1, 2])
+        continuation = mock.Mock(return_value=stream)
+        details = make_details('/synse.V3Plugin/ReadStream', timeout=None)
+
+        assert i.intercept_unary_stream(continuation, details, 'req') is stream
+        continuation.assert_called_once_with(details, 'req')
@@ -0,0 +1,95 @@
+"""Unit tests for the ``synse_server.timing`` module."""
+
+import contextvars
+import re
+
+import pytest
+
+from synse_server import timing
+from synse_server.metrics import Monitor
+
+
+@pytest.fixture(autouse=True)
+def isolated_context():
+    """Run each test in its own context, so request timings do not leak."""
+    ctx = contextvars.copy_context()
+    ctx.run(timing._timings.set, None)
+
+    def run(fn, *args):
+        return ctx.run(fn, *args)
+
+    return run
+
+
+def stage_count(name):
+    """Get the number of observations of a stage in its latency histogram."""
+    return sum(b.get() for b in Monitor.request_stage_latency.labels(name)._buckets)
+
+
+class TestTimings:
+    """Tests for the Timings of a request."""
+
+    def test_add(self):
+        t = timing.Timings()
+        t.add('grpc', 0.5)
+        t.add('cache', 0.1)
+        t.add('grpc', 0.25)
+        assert t.stages == {'grpc': 0.75, 'cache': 0.1}
+
+    def test_header(self):
+        t = timing.Timings()
+        t.add('cache', 0.0012)
+        t.add('grpc', 0.5)
+        header = t.header()
+        assert re.fullmatch(
+            r'cache;dur=1\.20, grpc;dur=500\.00, total;dur=\d+\.\d{2}', header,
+        )
+
+    def test_header_no_stages(self):
+        assert timing.Timings().header().startswith('total;dur=')
+
+
+def test_current_not_started(isolated_context):
+    assert isolated_context(timing.current) is None
+
+
+def test_start(isolated_context):
+    t = isolated_context(timing.start)
+    assert isolated_context(timing.current) is t
+
+
+def test_record_no_request(isolated_context):
+    count = stage_count('test-record-none')
+    isolated_context(timing.record, 'test-record-none', 0.1)
+    assert stage_count('test-record-none') == count + 1
+
+
+def test_record(isolated_context):
+    t = isolated_context(timing.start)
+    isolated_context(timing.record, 'test-record', 0.1)
+    isolated_context(timing.record, 'test-record', 0.2)
+    assert t.stages == {'test-record': pytest.approx(0.3)}
+
+
+def test_stage(isolated_context):
+    t = isolated_context(timing.start)
+
+    def run():
+        with timing.stage('test-stage'):
+            pass
+
+    isolated_context(run)
+    assert list(t.stages) == ['test-stage']
+    assert t.stages['test-stage'] >= 0
+
+
+def test_stage_error(isolated_context):
+    t = isolated_context(timing.start)
+
+    def run():
+        with timing.stage('test-stage-error'):
+            raise ValueError()
+
+    with pytest.raises(ValueError):
+        isolated_context(run)
+    assert 'test-stage-error' in t.stages
@@ -0,0 +1,365 @@
+"""Unit tests for the ``synse_server.tracing`` module."""
+
+import asyncio
+import contextvars
+import json
+import threading
+from unittest import mock
+
+import pytest
+
+from synse_server import timeouts, tracing
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+class CustomExporter(tracing.Exporter):
+    """An exporter for testing exporter import paths."""
+
+    def export(self, span):
+        pass
+
+
+@pytest.fixture()
+def exporter():
+    """Enable tracing for a test, exporting to a new in-memory exporter."""
+    original = tracing.get_exporter()
+    memory = tracing.MemoryExporter()
+    tracing.set_exporter(memory)
+    tracing.enabled = True
+    tracing.sample_rate = 1.0
+
+    yield memory
+
+    tracing.enabled = False
+    tracing.sample_rate = 1.0
+    tracing.set_exporter(original)
+
+
+def make_details(method='/synse.V3Plugin/Read', metadata=None):
+    return timeouts.CallDetails(method, 3, metadata, None, None, None)
+
+
+@pytest.mark.parametrize(
+    'value,expected', (
+        (f'00-{TRACE_ID}-{PARENT_ID}-01', (TRACE_ID, PARENT_ID, True)),
+        (f'00-{TRACE_ID}-{PARENT_ID}-00', (TRACE_ID, PARENT_ID, False)),
+        (f'00-{TRACE_ID.upper()}-{PARENT_ID}-01', (TRACE_ID, PARENT_ID, True)),
+        (f'01-{TRACE_ID}-{PARENT_ID}-01-extra', (TRACE_ID, PARENT_ID, True)),
+        (f'00-{TRACE_ID}-{PARENT_ID}-01-extra', None),
+        (f'ff-{TRACE_ID}-{PARENT_ID}-01', None),
+        (f'00-{"0" * 32}-{PARENT_ID}-01', None),
+        (f'00-{TRACE_ID}-{"0" * 16}-01', None),
+        (f'00-{TRACE_ID[:-1]}-{PARENT_ID}-01', None),
+        ('foo', None),
+        ('', None),
+        (None, None),
+    )
+)
+def test_parse_traceparent(value, expected):
+    assert tracing.parse_traceparent(value) == expected
+
+
+class TestSpan:
+    """Tests for the Span of a trace."""
+
+    def test_traceparent(self):
+        s = tracing.Span('test', TRACE_ID)
+        assert s.traceparent == f'00-{TRACE_ID}-{s.span_id}-01'
+        assert tracing.parse_traceparent(s.traceparent) == (TRACE_ID, s.span_id, True)
+
+    def test_traceparent_not_sampled(self):
+        s = tracing.Span('test', TRACE_ID, sampled=False)
+        assert s.traceparent.endswith('-00')
+
+    def test_finish_exports(self, exporter):
+        s = tracing.Span('test', TRACE_ID)
+        s.finish()
+        s.finish()
+
+        assert exporter.spans == [s]
+        assert s.duration >= 0
+
+    def test_finish_not_sampled(self, exporter):
+        tracing.Span('test', TRACE_ID, sampled=False).finish()
+        assert exporter.spans == []
+
+    def test_finish_export_error(self, exporter):
+        with mock.patch.object(exporter, 'export', side_effect=ValueError()):
+            tracing.Span('test', TRACE_ID).finish()
+
+    def test_to_dict(self):
+        s = tracing.Span('test', TRACE_ID, PARENT_ID, attributes={'a': 1})
+        s.set_error(ValueError('boom'))
+        d = s.to_dict()
+
+        assert d['name'] == 'test'
+        assert d['trace_id'] == TRACE_ID
+        assert d['parent_id'] == PARENT_ID
+        assert d['status'] == 'error'
+        assert d['error'] == 'boom'
+        assert d['attributes'] == {'a': 1}
+
+
+class TestStartSpan:
+    """Tests for starting spans."""
+
+    def test_new_trace(self):
+        s = tracing.start_span('test', foo='bar')
+        assert len(s.trace_id) == 32
+        assert len(s.span_id) == 16
+        assert s.parent_id is None
+        assert s.sampled is True
+        assert s.attributes == {'foo': 'bar'}
+
+    def test_new_trace_not_sampled(self, exporter):
+        tracing.sample_rate = 0
+        assert tracing.start_span('test').sampled is False
+
+    def test_remote_parent(self):
+        s = tracing.start_span('test', traceparent=f'00-{TRACE_ID}-{PARENT_ID}-00')
+        assert s.trace_id == TRACE_ID
+        assert s.parent_id == PARENT_ID
+        assert s.sampled is False
+
+    def test_invalid_remote_parent(self):
+        s = tracing.start_span('test', traceparent='invalid')
+        assert s.trace_id != TRACE_ID
+        assert s.parent_id is None
+
+    def test_parent(self):
+        parent = tracing.Span('parent', TRACE_ID)
+        s = tracing.start_span('test', parent=parent, traceparent='ignored')
+        assert s.trace_id == TRACE_ID
+        assert s.parent_id == parent.span_id
+
+
+def test_span_disabled():
+    with tracing.span('test') as s:
+        assert s is None
+        assert tracing.current() is None
+
+
+def test_span_nested(exporter):
+    def run():
+        with tracing.span('outer') as outer:
+            assert tracing.current() is outer
+            with tracing.span('inner', a=1) as inner:
+                assert tracing.current() is inner
+            assert tracing.current() is outer
+        assert tracing.current() is None
+        return outer, inner
+
+    outer, inner = contextvars.copy_context().run(run)
+
+    assert exporter.spans == [inner, outer]
+    assert inner.trace_id == outer.trace_id
+    assert inner.parent_id == outer.span_id
+    assert inner.attributes == {'a': 1}
+
+
+def test_span_error(exporter):
+    def run():
+        with tracing.span('test'):
+            raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        contextvars.copy_context().run(run)
+
+    assert exporter.spans[0].status == 'error'
+    assert exporter.spans[0].error == 'boom'
+
+
+@pytest.mark.asyncio
+async def test_traced(exporter):
+    @tracing.traced('test-op')
+    async def op(x):
+        return tracing.current(), x
+
+    s, x = await op(2)
+    assert x == 2
+    assert exporter.spans == [s]
+    assert s.name == 'test-op'
+
+
+@pytest.mark.asyncio
+async def test_propagate(exporter):
+    with tracing.span('test') as s:
+        in_executor = await asyncio.get_event_loop().run_in_executor(
+            None, tracing.propagate(tracing.current),
+        )
+    assert in_executor is s
+
+
+class TestConfigure:
+    """Tests for configuring tracing."""
+
+    @pytest.fixture(autouse=True)
+    def restore(self):
+        original = tracing.get_exporter()
+        yield
+        tracing.enabled = False
+        tracing.sample_rate = 1.0
+        tracing.set_exporter(original)
+
+    def test_disabled(self):
+        tracing.configure()
+        assert tracing.enabled is False
+
+    def test_memory(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'tracing': {'enabled': True, 'buffer': 5, 'sample_rate': 0.5},
+        })
+        tracing.configure()
+
+        assert tracing.enabled is True
+        assert tracing.sample_rate == 0.5
+        assert isinstance(tracing.get_exporter(), tracing.MemoryExporter)
+        assert tracing.get_exporter()._spans.maxlen == 5
+
+    def test_file(self, mocker, tmp_path):
+        path = tmp_path / 'spans.jsonl'
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'tracing': {'enabled': True, 'exporter': 'file', 'path': str(path)},
+        })
+        tracing.configure()
+
+        s = tracing.Span('test', TRACE_ID)
+        s.finish()
+        tracing.Span('test2', TRACE_ID).finish()
+
+        # Closing the exporter writes out any queued spans.
+        tracing.get_exporter().close()
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0]) == s.to_dict()
+
+    def test_file_written_by_writer_thread(self, tmp_path):
+        exporter = tracing.FileExporter(str(tmp_path / 'spans.jsonl'))
+        handler = exporter._listener.handlers[0]
+        threads = []
+        emit = handler.emit
+
+        def record_thread(record):
+            threads.append(threading.current_thread())
+            emit(record)
+
+        handler.emit = record_thread
+        exporter.export(tracing.Span('test', TRACE_ID))
+        exporter.close()
+
+        assert len(threads) == 1
+        assert threads[0] is not threading.current_thread()
+        assert len((tmp_path / 'spans.jsonl').read_text().splitlines()) == 1
+
+    def test_set_exporter_closes_previous(self, tmp_path):
+        exporter = tracing.FileExporter(str(tmp_path / 'spans.jsonl'))
+        tracing.set_exporter(exporter)
+        tracing.set_exporter(tracing.MemoryExporter())
+
+        assert exporter._closed is True
+
+    def test_file_no_path(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'tracing': {'enabled': True, 'exporter': 'file'},
+        })
+        with pytest.raises(ValueError):
+            tracing.configure()
+
+    def test_import_path(self, mocker):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'tracing': {'enabled': True, 'exporter': 'tests.unit.test_tracing.CustomExporter'},
+        })
+        tracing.configure()
+        assert isinstance(tracing.get_exporter(), CustomExporter)
+
+    @pytest.mark.parametrize(
+        'path', (
+            'tests.unit.test_tracing.NotAnExporter',
+            'not.a.module.Exporter',
+            'noexporter',
+        )
+    )
+    def test_invalid_import_path(self, mocker, path):
+        mocker.patch.dict('synse_server.config.options._full_config', {
+            'tracing': {'enabled': True, 'exporter': path},
+        })
+        with pytest.raises(ValueError):
+            tracing.configure()
+
+
+class TestTracingInterceptor:
+    """Tests for the TracingInterceptor."""
+
+    def test_unary_not_traced(self, exporter):
+        i = tracing.TracingInterceptor()
+        resp = mock.Mock(**{'exception.return_value': None})
+        continuation = mock.Mock(return_value=resp)
+        details = make_details()
+
+        assert i.intercept_unary_unary(continuation, details, 'req') == resp
+        continuation.assert_called_once_with(details, 'req')
+        assert exporter.spans == []
+
+    def test_unary_traced(self, exporter):
+        i = tracing.TracingInterceptor()
+        i.plugin = '123'
+        resp = mock.Mock(**{'exception.return_value': None})
+        continuation = mock.Mock(return_value=resp)
+
+        def run():
+            with tracing.span('request') as parent:
+                i.intercept_unary_unary(
+                    continuation, make_details('/synse.V3Plugin/Metadata', [('a', 'b')]), 'req',
+                )
+            return parent
+
+        parent = contextvars.copy_context().run(run)
+        child = exporter.spans[0]
+
+        assert child.name == 'grpc Metadata'
+        assert child.parent_id == parent.span_id
+        assert child.attributes == {
+            'plugin': '123', 'service': 'synse.V3Plugin', 'method': 'Metadata',
+        }
+
+        details = continuation.call_args[0][0]
+        assert details.method == '/synse.V3Plugin/Metadata'
+        assert details.timeout == 3
+        assert details.metadata == [('a', 'b'), ('traceparent', child.traceparent)]
+
+    def test_unary_error(self, exporter):
+        i = tracing.TracingInterceptor()
+        resp = mock.Mock(**{'exception.return_value': ValueError('boom')})
+        continuation = mock.Mock(return_value=resp)
+
+        def run():
+            with tracing.span('request'):
+                i.intercept_unary_unary(continuation, make_details(), 'req')
+
+        contextvars.copy_context().run(run)
+        assert exporter.spans[0].status == 'error'
+
+    def test_stream_not_traced(self, exporter):
+        i = tracing.TracingInterceptor()
+        stream = iter([1, 2])
+        continuation = mock.Mock(return_value=stream)
+
+        assert i.intercept_unary_stream(continuation, make_details(), 'req') is stream
+
+    def test_stream_traced(self, exporter):
+        i = tracing.TracingInterceptor()
+        continuation = mock.Mock(return_value=iter([1, 2, 3]))
+
+        def run():
+            with tracing.span('request'):
+                return i.intercept_unary_stream(continuation, make_details(), 'req')
+
+        resp = contextvars.copy_context().run(run)
+
+        # The gRPC span is finished once the stream is consumed.
+        assert [s.name for s in exporter.spans] == ['request']
+        assert list(resp) == [1, 2, 3]
+        assert exporter.spans[1].name == 'grpc Read'
+        assert exporter.spans[1].attributes['messages'] == 3